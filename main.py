@@ -3,24 +3,37 @@ EkkoScope - GEO Engine for AI Visibility
 FastAPI application with admin panel and persistence (Sprint 1)
 """
 
+import asyncio
 import json
 import os
 import secrets
 from datetime import datetime
 from io import BytesIO
 from typing import Optional
+from urllib.parse import urlencode
 
 from fastapi import FastAPI, Request, Form, Depends, HTTPException, Cookie, BackgroundTasks
-from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse, FileResponse, Response, JSONResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse, FileResponse, Response, JSONResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from sqlalchemy import and_, or_, func
 from starlette.middleware.sessions import SessionMiddleware
 
 from services.analysis import run_analysis, MissingAPIKeyError
 from services.reporting import build_ekkoscope_pdf
 from services.dossier_generator import build_dossier_pdf
-from services.database import init_db, get_db_session, Business, Audit, User, Purchase
-from services.audit_runner import run_audit_for_business, get_audit_analysis_data
+from services.database import init_db, get_db_session, Business, Audit, User, Purchase, refresh_business_projection
+from services.audit_checkpoints import clear_audit_checkpoints
+from services.audit_runner import get_audit_analysis_data
+from services.audit_aggregates import get_audit_aggregates
+from services.blob_store import load_visibility_summary
+from services.tracing import waterfall_rows
+from services.metrics import render_metrics, monitor_event_loop_lag
+from services.cost_ledger import get_audit_cost
+from services.job_queue import enqueue_audit, start_worker_pool, stop_worker_pool
+from services.http_clients import close_shared_async_http_client
+from services.cancellation import cancel_audit
+from services.response_cache import bypass_response_cache, get_cache_stats
 from services.stripe_client import load_stripe_config, create_checkout_session, create_subscription_checkout_session, create_ekkobrain_addon_checkout_session, verify_webhook_signature, get_stripe_client
 from services.auth import get_current_user, login_user, logout_user, create_user, authenticate_user
 from services.email_service import send_welcome_email, send_followup_email, send_audit_complete_email
@@ -39,6 +52,8 @@ TENANTS = {}
 ADMIN_USERNAME = os.getenv("ADMIN_USERNAME", "admin")
 ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "ekkoscope2024")
 ADMIN_EMAILS = [e.strip().lower() for e in os.getenv("ADMIN_EMAILS", "").split(",") if e.strip()]
+ADMIN_BUSINESSES_PAGE_SIZE = int(os.getenv("ADMIN_BUSINESSES_PAGE_SIZE", "50"))
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
 
 if ADMIN_PASSWORD == "ekkoscope2024":
     import warnings
@@ -92,9 +107,18 @@ async def startup():
     finally:
         db.close()
     
+    start_worker_pool()
+    
     import asyncio
     asyncio.create_task(scheduler_loop(interval_minutes=60))
     print("[STARTUP] Audit scheduler started (checks hourly for due audits)")
+    asyncio.create_task(monitor_event_loop_lag())
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    stop_worker_pool()
+    await close_shared_async_http_client()
 
 
 def get_tenant_list():
@@ -362,7 +386,7 @@ async def dashboard_business_detail(request: Request, business_id: int):
 
 
 @app.post("/dashboard/business/{business_id}/run-audit")
-async def dashboard_run_audit(request: Request, business_id: int, background_tasks: BackgroundTasks):
+async def dashboard_run_audit(request: Request, business_id: int):
     """Admin-only: Run an audit without payment (runs in background)."""
     user = get_current_user(request)
     if not user or not user.is_admin:
@@ -383,7 +407,7 @@ async def dashboard_run_audit(request: Request, business_id: int, background_tas
         db.commit()
         db.refresh(audit)
         
-        background_tasks.add_task(run_audit_background, business.id, audit.id)
+        enqueue_audit(business.id, audit.id)
         
         return RedirectResponse(url=f"/dashboard/business/{business.id}", status_code=302)
     finally:
@@ -391,7 +415,7 @@ async def dashboard_run_audit(request: Request, business_id: int, background_tas
 
 
 @app.post("/dashboard/business/{business_id}/run-free-audit")
-async def dashboard_run_free_audit(request: Request, business_id: int, background_tasks: BackgroundTasks):
+async def dashboard_run_free_audit(request: Request, business_id: int):
     """Run a free first audit for the user (one-time only)."""
     session_user = get_current_user(request)
     if not session_user:
@@ -425,7 +449,7 @@ async def dashboard_run_free_audit(request: Request, business_id: int, backgroun
         db.commit()
         db.refresh(audit)
         
-        background_tasks.add_task(run_audit_background, business.id, audit.id)
+        enqueue_audit(business.id, audit.id)
         
         return RedirectResponse(url=f"/dashboard/business/{business.id}", status_code=302)
     finally:
@@ -458,19 +482,11 @@ async def dashboard_audit_detail(request: Request, business_id: int, audit_id: i
         
         analysis_data = get_audit_analysis_data(audit)
         
-        if audit.status in ("completed", "done") and audit.audit_queries:
-            total_queries = len(audit.audit_queries)
-            total_provider_probes = 0
-            total_provider_hits = 0
-            
-            for aq in audit.audit_queries:
-                for vr in aq.visibility_results:
-                    total_provider_probes += 1
-                    is_target = getattr(vr, 'is_target', False) or (
-                        vr.brand_name and business.name.lower() in vr.brand_name.lower()
-                    )
-                    if is_target:
-                        total_provider_hits += 1
+        aggregate = get_audit_aggregates(db, audit, business) if audit.status in ("completed", "done") else None
+        if aggregate is not None and aggregate.total_queries:
+            total_queries = aggregate.total_queries
+            total_provider_probes = aggregate.total_probes
+            total_provider_hits = aggregate.target_hits
             
             visibility_score = round((total_provider_hits / total_provider_probes) * 100, 1) if total_provider_probes > 0 else 0.0
             avg_score = round((total_provider_hits / total_provider_probes) * 2, 2) if total_provider_probes > 0 else 0.0
@@ -522,78 +538,22 @@ async def dashboard_audit_analytics(request: Request, business_id: int, audit_id
         multi_llm = visibility_summary.get("multi_llm_visibility", {})
         nested_summary = multi_llm.get("summary", {}) if isinstance(multi_llm, dict) else {}
         
-        provider_name_map = {
-            "openai_sim": "openai",
-            "perplexity_web": "perplexity",
-            "gemini_sim": "gemini"
+        aggregate = get_audit_aggregates(db, audit, business)
+        total_queries = aggregate.total_queries
+        total_provider_probes = aggregate.total_probes
+        total_provider_hits = aggregate.target_hits
+        provider_stats = aggregate.get_provider_stats()
+        intent_breakdown = {
+            intent: stats["queries"] for intent, stats in aggregate.get_intent_stats().items() if intent
         }
         
-        queries = []
-        total_queries = len(audit.audit_queries)
-        total_provider_probes = 0
-        total_provider_hits = 0
-        provider_stats = {"openai": {"target_found": 0, "total_probes": 0}, "perplexity": {"target_found": 0, "total_probes": 0}, "gemini": {"target_found": 0, "total_probes": 0}}
-        competitor_counts = {}
-        intent_breakdown = {}
-        
-        for aq in audit.audit_queries:
-            providers_list = []
-            query_hits = 0
-            query_probes = 0
-            
-            if aq.intent:
-                intent_breakdown[aq.intent] = intent_breakdown.get(aq.intent, 0) + 1
-            
-            for vr in aq.visibility_results:
-                is_target = getattr(vr, 'is_target', False) or (
-                    vr.brand_name and business.name.lower() in vr.brand_name.lower()
-                )
-                normalized_provider = provider_name_map.get(vr.provider, vr.provider)
-                
-                total_provider_probes += 1
-                query_probes += 1
-                
-                if normalized_provider in provider_stats:
-                    provider_stats[normalized_provider]["total_probes"] += 1
-                    if is_target:
-                        provider_stats[normalized_provider]["target_found"] += 1
-                
-                if is_target:
-                    total_provider_hits += 1
-                    query_hits += 1
-                
-                if vr.brand_name and not is_target:
-                    competitor_counts[vr.brand_name] = competitor_counts.get(vr.brand_name, 0) + 1
-                
-                providers_list.append({
-                    "provider": normalized_provider,
-                    "target_found": is_target,
-                    "brand_name": vr.brand_name,
-                    "rank": vr.rank
-                })
-            
-            query_score_percent = round((query_hits / query_probes) * 100) if query_probes > 0 else 0
-            query_obj = type('Query', (), {
-                "query": aq.query_text,
-                "intent": aq.intent,
-                "providers": providers_list,
-                "target_found_count": query_hits,
-                "total_probes": query_probes,
-                "score_percent": query_score_percent
-            })()
-            queries.append(query_obj)
+        queries = [type('Query', (), row)() for row in aggregate.get_query_rows()]
         
         visibility_percent = round((total_provider_hits / total_provider_probes) * 100, 1) if total_provider_probes > 0 else 0.0
         
-        for pname, stats in provider_stats.items():
-            if stats["total_probes"] > 0:
-                stats["target_percent"] = round((stats["target_found"] / stats["total_probes"]) * 100, 1)
-            else:
-                stats["target_percent"] = 0.0
-        
         top_competitors = [
-            {"name": name, "count": count, "percent": round((count / total_provider_probes) * 100, 1) if total_provider_probes > 0 else 0}
-            for name, count in sorted(competitor_counts.items(), key=lambda x: -x[1])[:10]
+            {"name": c["name"], "count": c["count"], "percent": round((c["count"] / total_provider_probes) * 100, 1) if total_provider_probes > 0 else 0}
+            for c in aggregate.get_competitor_counts()[:10]
         ]
         
         summary = {
@@ -624,9 +584,6 @@ async def dashboard_audit_analytics(request: Request, business_id: int, audit_id
 @app.get("/dashboard/business/{business_id}/audit/{audit_id}/mission", response_class=HTMLResponse)
 async def dashboard_mission_control(request: Request, business_id: int, audit_id: int):
     """Mission Control - Living dashboard for AI visibility operations."""
-    from sqlalchemy.orm import joinedload
-    from services.database import AuditQuery
-    
     user = get_current_user(request)
     if not user:
         return RedirectResponse(url="/auth/login", status_code=302)
@@ -644,9 +601,7 @@ async def dashboard_mission_control(request: Request, business_id: int, audit_id
         if not business:
             return RedirectResponse(url="/dashboard", status_code=302)
         
-        audit = db.query(Audit).options(
-            joinedload(Audit.audit_queries).joinedload(AuditQuery.visibility_results)
-        ).filter(Audit.id == audit_id, Audit.business_id == business_id).first()
+        audit = db.query(Audit).filter(Audit.id == audit_id, Audit.business_id == business_id).first()
         if not audit:
             return RedirectResponse(url=f"/dashboard/business/{business_id}", status_code=302)
         
@@ -655,69 +610,16 @@ async def dashboard_mission_control(request: Request, business_id: int, audit_id
         
         visibility_summary = audit.get_visibility_summary() or {}
         
-        provider_name_map = {
-            "openai_sim": "openai",
-            "perplexity_web": "perplexity",
-            "gemini_sim": "gemini"
-        }
-        
-        total_queries = len(audit.audit_queries)
-        total_provider_probes = 0
-        total_provider_hits = 0
-        provider_stats = {"openai": {"target_found": 0, "total_probes": 0}, "perplexity": {"target_found": 0, "total_probes": 0}, "gemini": {"target_found": 0, "total_probes": 0}}
-        competitor_counts = {}
-        
-        for aq in audit.audit_queries:
-            for vr in aq.visibility_results:
-                is_target = getattr(vr, 'is_target', False) or (
-                    vr.brand_name and business.name.lower() in vr.brand_name.lower()
-                )
-                normalized_provider = provider_name_map.get(vr.provider, vr.provider)
-                
-                total_provider_probes += 1
-                
-                if normalized_provider in provider_stats:
-                    provider_stats[normalized_provider]["total_probes"] += 1
-                    if is_target:
-                        provider_stats[normalized_provider]["target_found"] += 1
-                
-                if is_target:
-                    total_provider_hits += 1
-                
-                if vr.brand_name and not is_target:
-                    competitor_counts[vr.brand_name] = competitor_counts.get(vr.brand_name, 0) + 1
+        aggregate = get_audit_aggregates(db, audit, business)
+        total_queries = aggregate.total_queries
+        total_provider_probes = aggregate.total_probes
+        total_provider_hits = aggregate.target_hits
+        provider_stats = aggregate.get_provider_stats()
         
         queries_found = total_provider_hits
         visibility_score = round((total_provider_hits / total_provider_probes) * 100, 1) if total_provider_probes > 0 else 0.0
         
-        for pname, stats in provider_stats.items():
-            if stats["total_probes"] > 0:
-                stats["target_percent"] = round((stats["target_found"] / stats["total_probes"]) * 100, 1)
-            else:
-                stats["target_percent"] = 0.0
-        
-        raw_competitors = [
-            {"name": name, "count": count}
-            for name, count in sorted(competitor_counts.items(), key=lambda x: -x[1])[:15]
-        ]
-        
-        if not raw_competitors:
-            from collections import Counter
-            competitor_counter = Counter()
-            business_aliases = [business.name.lower()]
-            brand_aliases = getattr(business, 'brand_aliases', None)
-            if brand_aliases:
-                business_aliases.extend([a.strip().lower() for a in brand_aliases.split(',') if a.strip()])
-            
-            for aq in audit.audit_queries:
-                for vr in aq.visibility_results:
-                    if vr.brand_name:
-                        brand_lower = vr.brand_name.lower()
-                        is_our_brand = any(alias in brand_lower or brand_lower in alias for alias in business_aliases)
-                        if not is_our_brand and len(vr.brand_name) > 2:
-                            competitor_counter[vr.brand_name] += 1
-            
-            raw_competitors = [{"name": name, "count": count} for name, count in competitor_counter.most_common(15)]
+        raw_competitors = aggregate.get_competitor_counts()[:15]
         
         competitors = []
         total_competitor_mentions = sum(c.get("count", 0) for c in raw_competitors) if raw_competitors else 0
@@ -741,18 +643,10 @@ async def dashboard_mission_control(request: Request, business_id: int, audit_id
             market_leader_score = max(35, visibility_score + 20)
         
         intent_breakdown = {}
-        for aq in audit.audit_queries:
-            intent = aq.intent or "general"
-            if intent not in intent_breakdown:
-                intent_breakdown[intent] = {"total_probes": 0, "found": 0}
-            
-            for vr in aq.visibility_results:
-                intent_breakdown[intent]["total_probes"] += 1
-                is_target = getattr(vr, 'is_target', False) or (
-                    vr.brand_name and business.name.lower() in vr.brand_name.lower()
-                )
-                if is_target:
-                    intent_breakdown[intent]["found"] += 1
+        for intent, stats in aggregate.get_intent_stats().items():
+            merged = intent_breakdown.setdefault(intent or "general", {"total_probes": 0, "found": 0})
+            merged["total_probes"] += stats["total_probes"]
+            merged["found"] += stats["found"]
         
         formatted_intent = {}
         for intent_type, data in intent_breakdown.items():
@@ -766,18 +660,7 @@ async def dashboard_mission_control(request: Request, business_id: int, audit_id
         if not formatted_intent:
             formatted_intent = {"general": {"total": total_provider_probes, "found": total_provider_hits}}
         
-        missing_queries = []
-        for aq in audit.audit_queries:
-            found_in_any = False
-            for vr in aq.visibility_results:
-                if vr.brand_name and business.name.lower() in vr.brand_name.lower():
-                    found_in_any = True
-                    break
-            if not found_in_any:
-                missing_queries.append({
-                    "text": aq.query_text,
-                    "intent": aq.intent or "general"
-                })
+        missing_queries = aggregate.get_missing_queries()
         
         recommendations = []
         try:
@@ -1010,7 +893,9 @@ async def dashboard_delete_audit(request: Request, business_id: int, audit_id: i
                 import os as osmod
                 if osmod.path.exists(audit.pdf_path):
                     osmod.remove(audit.pdf_path)
+            clear_audit_checkpoints(audit.id, db)
             db.delete(audit)
+            refresh_business_projection(db, business_id)
             db.commit()
         
         return RedirectResponse(url=f"/dashboard/business/{business_id}", status_code=302)
@@ -1020,7 +905,7 @@ async def dashboard_delete_audit(request: Request, business_id: int, audit_id: i
 
 @app.post("/dashboard/business/{business_id}/audit/{audit_id}/stop")
 async def dashboard_stop_audit(request: Request, business_id: int, audit_id: int):
-    """Stop a running audit by setting its status to error."""
+    """Stop a running audit: mark it stopped and cancel its in-flight pipeline."""
     user = get_current_user(request)
     if not user:
         return RedirectResponse(url="/auth/login", status_code=302)
@@ -1043,6 +928,7 @@ async def dashboard_stop_audit(request: Request, business_id: int, audit_id: int
             audit.status = 'stopped'
             audit.set_visibility_summary({"error": "Audit was manually stopped by user"})
             db.commit()
+            cancel_audit(audit.id)
         
         return RedirectResponse(url=f"/dashboard/business/{business_id}", status_code=302)
     finally:
@@ -1604,7 +1490,7 @@ async def dashboard_business_audits(request: Request, business_id: int):
 
 
 @app.post("/analyze", response_class=HTMLResponse)
-async def analyze(request: Request, tenant_id: str = Form(...)):
+async def analyze(request: Request, tenant_id: str = Form(...), refresh: bool = Form(False)):
     try:
         if tenant_id not in TENANTS:
             return templates.TemplateResponse(
@@ -1619,7 +1505,8 @@ async def analyze(request: Request, tenant_id: str = Form(...)):
             )
         
         tenant_config = TENANTS[tenant_id]
-        analysis = run_analysis(tenant_config)
+        with bypass_response_cache(refresh):
+            analysis = run_analysis(tenant_config)
         
         return templates.TemplateResponse(
             "index.html",
@@ -1658,7 +1545,7 @@ async def analyze(request: Request, tenant_id: str = Form(...)):
 
 
 @app.get("/report/{tenant_id}")
-async def download_report(request: Request, tenant_id: str):
+async def download_report(request: Request, tenant_id: str, refresh: bool = False):
     """Generate and download an EkkoScope PDF report for the given tenant."""
     try:
         if tenant_id not in TENANTS:
@@ -1674,7 +1561,8 @@ async def download_report(request: Request, tenant_id: str):
             )
         
         tenant_config = TENANTS[tenant_id]
-        analysis = run_analysis(tenant_config)
+        with bypass_response_cache(refresh):
+            analysis = run_analysis(tenant_config)
         pdf_bytes = build_ekkoscope_pdf(tenant_config, analysis)
         
         return StreamingResponse(
@@ -1735,7 +1623,7 @@ async def download_dossier(request: Request, business_id: int):
         if not latest_audit:
             raise HTTPException(status_code=400, detail="No completed audit available. Run an audit first.")
         
-        analysis = latest_audit.get_visibility_summary()
+        analysis = load_visibility_summary(latest_audit, db)
         if not analysis:
             raise HTTPException(status_code=400, detail="No audit results available. Run an audit first.")
         
@@ -2059,6 +1947,27 @@ async def admin_dashboard(request: Request):
         db.close()
 
 
+@app.get("/metrics")
+async def metrics(request: Request):
+    """Prometheus text-format metrics. Requires a bearer token when METRICS_TOKEN is set."""
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        return PlainTextResponse("Unauthorized", status_code=401)
+
+    return PlainTextResponse(
+        await asyncio.to_thread(render_metrics),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@app.get("/admin/response-cache")
+async def admin_response_cache_stats(request: Request):
+    """Provider response cache hit/miss counts and size."""
+    if not is_authenticated(request):
+        return JSONResponse({"error": "Admin access required"}, status_code=403)
+
+    return JSONResponse(await asyncio.to_thread(get_cache_stats))
+
+
 @app.get("/admin/demo-pdf")
 async def admin_demo_pdf(request: Request):
     """Generate a demo PDF report for prospect presentations."""
@@ -2083,37 +1992,45 @@ async def admin_demo_pdf(request: Request):
 
 
 @app.get("/admin/businesses", response_class=HTMLResponse)
-async def admin_businesses(request: Request):
-    """List all businesses with visibility monitoring."""
+async def admin_businesses(
+    request: Request,
+    plan: Optional[str] = None,
+    subscription: Optional[str] = None,
+    source: Optional[str] = None,
+    after: Optional[str] = None
+):
+    """
+    List businesses with visibility monitoring, newest first.
+    
+    Reads the latest-audit projection columns on Business, so no audits are
+    loaded. Pages are keyset-paginated on (created_at, id), with a NULL
+    created_at sorting as the oldest: `after` is the cursor of the last row
+    on the previous page.
+    """
     if not is_authenticated(request):
         return RedirectResponse(url="/admin/login", status_code=302)
     
     db = get_db_session()
     try:
+        query = db.query(Business)
+        if plan:
+            query = query.filter(Business.plan == plan)
+        if subscription in ("active", "inactive"):
+            query = query.filter(Business.subscription_active == (subscription == "active"))
+        if source:
+            query = query.filter(Business.source == source)
+        
+        cursor = _decode_business_cursor(after)
         businesses = (
-            db.query(Business)
-            .order_by(Business.created_at.desc())
+            _page_businesses(query, cursor)
+            .limit(ADMIN_BUSINESSES_PAGE_SIZE + 1)
             .all()
         )
+        has_more = len(businesses) > ADMIN_BUSINESSES_PAGE_SIZE
+        businesses = businesses[:ADMIN_BUSINESSES_PAGE_SIZE]
         
         business_data = []
         for biz in businesses:
-            latest_audit = None
-            visibility_score = None
-            last_scan = None
-            
-            completed_audits = [a for a in biz.audits if a.status == 'done']
-            if completed_audits:
-                latest_audit = max(completed_audits, key=lambda a: a.completed_at or a.created_at)
-                last_scan = latest_audit.completed_at or latest_audit.created_at
-                
-                try:
-                    summary = latest_audit.get_visibility_summary()
-                    if summary:
-                        visibility_score = summary.get('visibility_score', summary.get('overall_visibility'))
-                except:
-                    pass
-            
             business_data.append({
                 "id": biz.id,
                 "name": biz.name,
@@ -2123,23 +2040,70 @@ async def admin_businesses(request: Request):
                 "subscription_active": biz.subscription_active,
                 "plan": biz.plan or "snapshot",
                 "created_at": biz.created_at,
-                "audit_count": len(biz.audits),
-                "visibility_score": visibility_score,
-                "last_scan": last_scan,
+                "audit_count": biz.audit_count or 0,
+                "visibility_score": biz.latest_visibility_score,
+                "last_scan": biz.last_scan_at,
                 "autofix_enabled": biz.autofix_enabled if hasattr(biz, 'autofix_enabled') else False
             })
         
+        filters = {"plan": plan, "subscription": subscription, "source": source}
+        filter_params = {k: v for k, v in filters.items() if v}
+        next_url = None
+        if has_more and businesses:
+            next_url = "/admin/businesses?" + urlencode(
+                dict(filter_params, after=_encode_business_cursor(businesses[-1]))
+            )
+        first_url = None
+        if cursor:
+            first_url = "/admin/businesses"
+            if filter_params:
+                first_url += "?" + urlencode(filter_params)
+        
         return templates.TemplateResponse(
+            request,
             "admin/businesses.html",
             {
-                "request": request,
-                "businesses": business_data
+                "businesses": business_data,
+                "filters": filters,
+                "next_url": next_url,
+                "first_url": first_url
             }
         )
     finally:
         db.close()
 
 
+# Sort/cursor value for businesses without created_at, so they page as the oldest rows.
+_NULL_CREATED_AT = datetime.min
+
+
+def _page_businesses(query, cursor):
+    """Order businesses newest first and start after the decoded cursor, if any."""
+    created_at_key = func.coalesce(Business.created_at, _NULL_CREATED_AT)
+    if cursor:
+        created_at, business_id = cursor
+        query = query.filter(or_(
+            created_at_key < created_at,
+            and_(created_at_key == created_at, Business.id < business_id)
+        ))
+    return query.order_by(created_at_key.desc(), Business.id.desc())
+
+
+def _encode_business_cursor(business: Business) -> str:
+    created_at = business.created_at or _NULL_CREATED_AT
+    return f"{created_at.isoformat()}_{business.id}"
+
+
+def _decode_business_cursor(after: Optional[str]):
+    if not after or "_" not in after:
+        return None
+    created_at, _, business_id = after.rpartition("_")
+    try:
+        return datetime.fromisoformat(created_at), int(business_id)
+    except ValueError:
+        return None
+
+
 @app.get("/admin/business/new", response_class=HTMLResponse)
 async def admin_business_form(request: Request):
     """Show admin business creation form."""
@@ -2287,7 +2251,7 @@ async def admin_business_mission_control(request: Request, business_id: int):
 
 
 @app.post("/admin/business/{business_id}/run")
-async def admin_run_audit(request: Request, business_id: int, background_tasks: BackgroundTasks):
+async def admin_run_audit(request: Request, business_id: int):
     """Run an EkkoScope audit for a business (runs in background)."""
     if not is_authenticated(request):
         return RedirectResponse(url="/admin/login", status_code=302)
@@ -2307,7 +2271,7 @@ async def admin_run_audit(request: Request, business_id: int, background_tasks:
         db.commit()
         db.refresh(audit)
         
-        background_tasks.add_task(run_audit_background, business.id, audit.id)
+        enqueue_audit(business.id, audit.id)
         
         return RedirectResponse(url=f"/admin/business/{business_id}", status_code=302)
     finally:
@@ -2315,7 +2279,7 @@ async def admin_run_audit(request: Request, business_id: int, background_tasks:
 
 
 @app.post("/admin/business/{business_id}/refresh")
-async def admin_refresh_audit(request: Request, business_id: int, background_tasks: BackgroundTasks):
+async def admin_refresh_audit(request: Request, business_id: int):
     """Run a monthly refresh audit for an ongoing subscription business (runs in background)."""
     if not is_authenticated(request):
         return RedirectResponse(url="/admin/login", status_code=302)
@@ -2338,7 +2302,7 @@ async def admin_refresh_audit(request: Request, business_id: int, background_tas
         db.commit()
         db.refresh(audit)
         
-        background_tasks.add_task(run_audit_background, business.id, audit.id)
+        enqueue_audit(business.id, audit.id)
         
         return RedirectResponse(url=f"/admin/business/{business_id}", status_code=302)
     finally:
@@ -2782,7 +2746,9 @@ async def admin_delete_audit(request: Request, audit_id: int):
                 import os as osmod
                 if osmod.path.exists(audit.pdf_path):
                     osmod.remove(audit.pdf_path)
+            clear_audit_checkpoints(audit.id, db)
             db.delete(audit)
+            refresh_business_projection(db, business_id)
             db.commit()
             return RedirectResponse(url=f"/admin/business/{business_id}", status_code=302)
         return RedirectResponse(url="/admin/businesses", status_code=302)
@@ -2806,8 +2772,10 @@ async def admin_audit_detail(request: Request, audit_id: int):
             )
         
         business = audit.business
-        visibility = audit.get_visibility_summary() or {}
+        visibility = load_visibility_summary(audit, db) or {}
         suggestions = audit.get_suggestions() or {}
+        trace = audit.get_trace()
+        cost = get_audit_cost(db, audit.id)
         
         return templates.TemplateResponse(
             "admin/audit_detail.html",
@@ -2828,7 +2796,10 @@ async def admin_audit_detail(request: Request, audit_id: int):
                     "name": business.name
                 } if business else None,
                 "visibility": visibility,
-                "suggestions": suggestions
+                "suggestions": suggestions,
+                "trace": trace,
+                "trace_rows": waterfall_rows(trace),
+                "cost": cost
             }
         )
     finally:
@@ -3192,7 +3163,6 @@ async def activate_landing(request: Request):
 @app.post("/activate")
 async def activate_submit(
     request: Request,
-    background_tasks: BackgroundTasks,
     code: str = Form(...),
     name: str = Form(""),
     primary_domain: str = Form(""),
@@ -3266,7 +3236,7 @@ async def activate_submit(
         db.commit()
         db.refresh(audit)
         
-        background_tasks.add_task(run_audit_background, business.id, audit.id)
+        enqueue_audit(business.id, audit.id)
         
         return RedirectResponse(
             url=f"/dashboard/business/{business.id}?activated=true",
@@ -3967,7 +3937,7 @@ async def sales_teaser_audit(request: Request):
     
     Returns: Sales packet with 0% visibility hook for outreach.
     """
-    from services.sales_mode import run_teaser_audit
+    from services.sales_mode import run_teaser_audit_async
     
     client_ip = request.client.host if request.client else "unknown"
     if not _check_sales_rate_limit(client_ip):
@@ -3984,7 +3954,7 @@ async def sales_teaser_audit(request: Request):
         if not valid:
             return JSONResponse({"error": url_or_error}, status_code=400)
         
-        result = run_teaser_audit(url_or_error)
+        result = await run_teaser_audit_async(url_or_error)
         
         if not result.get("success"):
             return JSONResponse(result, status_code=422)
@@ -4446,57 +4416,6 @@ async def ongoing_audit_download(request: Request, audit_id: int):
         db.close()
 
 
-def run_audit_background(business_id: int, audit_id: int):
-    """Background task to run an audit."""
-    print(f"[AUDIT DEBUG] Starting background task for audit {audit_id}, business {business_id}")
-    import sys
-    sys.stdout.flush()
-    
-    db = get_db_session()
-    try:
-        print(f"[AUDIT DEBUG] Got DB session for audit {audit_id}")
-        sys.stdout.flush()
-        
-        business = db.query(Business).filter(Business.id == business_id).first()
-        audit = db.query(Audit).filter(Audit.id == audit_id).first()
-        
-        print(f"[AUDIT DEBUG] Found business={business is not None}, audit={audit is not None}")
-        sys.stdout.flush()
-        
-        if business and audit:
-            try:
-                print(f"[AUDIT DEBUG] Calling run_audit_for_business for audit {audit_id}")
-                sys.stdout.flush()
-                run_audit_for_business(business, audit, db)
-                print(f"[AUDIT DEBUG] Audit {audit_id} completed successfully")
-                sys.stdout.flush()
-            except Exception as e:
-                import traceback
-                print(f"[AUDIT DEBUG] Audit {audit_id} EXCEPTION: {e}")
-                print(f"[AUDIT DEBUG] Traceback: {traceback.format_exc()}")
-                sys.stdout.flush()
-                audit.status = "error"
-                audit.set_visibility_summary({
-                    "error": str(e),
-                    "error_type": type(e).__name__,
-                    "error_details": traceback.format_exc()
-                })
-                db.commit()
-                print(f"Audit {audit_id} failed: {e}")
-        else:
-            print(f"[AUDIT DEBUG] Missing business or audit for {audit_id}")
-            sys.stdout.flush()
-    except Exception as outer_e:
-        print(f"[AUDIT DEBUG] OUTER EXCEPTION in audit {audit_id}: {outer_e}")
-        import traceback
-        print(f"[AUDIT DEBUG] Outer traceback: {traceback.format_exc()}")
-        sys.stdout.flush()
-    finally:
-        db.close()
-        print(f"[AUDIT DEBUG] Background task finished for audit {audit_id}")
-        sys.stdout.flush()
-
-
 @app.get("/api/audit/{audit_id}/status")
 async def api_audit_status(request: Request, audit_id: int):
     """Get audit status for polling (authenticated)."""
@@ -4557,7 +4476,7 @@ async def api_latest_audit(request: Request, business_id: int):
 
 
 @app.post("/webhooks/stripe")
-async def stripe_webhook(request: Request, background_tasks: BackgroundTasks):
+async def stripe_webhook(request: Request):
     """Handle Stripe webhook events."""
     try:
         payload = await request.body()
@@ -4623,7 +4542,7 @@ async def stripe_webhook(request: Request, background_tasks: BackgroundTasks):
                             db.commit()
                             db.refresh(audit)
                             
-                            background_tasks.add_task(run_audit_background, business.id, audit.id)
+                            enqueue_audit(business.id, audit.id)
                             print(f"Created initial audit {audit.id} for Auto-Fix subscriber {business.id}")
                 finally:
                     db.close()
@@ -4695,7 +4614,7 @@ async def stripe_webhook(request: Request, background_tasks: BackgroundTasks):
                                 db.commit()
                                 db.refresh(audit)
                                 
-                                background_tasks.add_task(run_audit_background, business.id, audit.id)
+                                enqueue_audit(business.id, audit.id)
                                 print(f"Created initial audit {audit.id} for new subscriber {business.id}")
                 finally:
                     db.close()
@@ -0,0 +1,110 @@
+"""
+Adaptive Repeated Sampling for EkkoScope visibility probes.
+LLM recommendations are stochastic, so a single probe gives a noisy 0/1
+target_found. In sampling mode a query is re-asked up to
+ADAPTIVE_SAMPLING_MAX_SAMPLES times. After each sample a Wilson score
+interval for the found-rate is computed, and sampling stops as soon as the
+interval sits clearly on one side of 50% or is narrow enough. Queries with
+a consistent answer stop after a few samples; extra calls go to borderline
+ones.
+"""
+
+import math
+import logging
+from statistics import NormalDist
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from services.config import (
+    ADAPTIVE_SAMPLING_MIN_SAMPLES,
+    ADAPTIVE_SAMPLING_MAX_SAMPLES,
+    ADAPTIVE_SAMPLING_CONFIDENCE,
+    ADAPTIVE_SAMPLING_MAX_HALF_WIDTH,
+)
+from services.visibility_models import ProviderVisibility
+from services.shared_probes import independent_samples
+
+logger = logging.getLogger(__name__)
+
+DECISION_THRESHOLD = 0.5
+
+
+def wilson_interval(successes: int, n: int, confidence: float = ADAPTIVE_SAMPLING_CONFIDENCE) -> Tuple[float, float]:
+    """Wilson score interval for a binomial proportion."""
+    if n <= 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf(1 - (1 - confidence) / 2)
+    p = successes / n
+    denom = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denom
+    margin = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, centre - margin), min(1.0, centre + margin)
+
+
+def sampling_decided(successes: int, n: int) -> bool:
+    """
+    Sequential stopping rule: stop once at least the minimum number of
+    samples is in and the interval either excludes the 50% decision
+    threshold or is narrower than the target half-width.
+    """
+    if n >= ADAPTIVE_SAMPLING_MAX_SAMPLES:
+        return True
+    if n < ADAPTIVE_SAMPLING_MIN_SAMPLES:
+        return False
+    low, high = wilson_interval(successes, n)
+    if low > DECISION_THRESHOLD or high < DECISION_THRESHOLD:
+        return True
+    return (high - low) / 2 <= ADAPTIVE_SAMPLING_MAX_HALF_WIDTH
+
+
+def sample_probe(
+    probe_fn: Callable[..., Optional[ProviderVisibility]],
+    business_name: str,
+    primary_domain: str,
+    regions: List[str],
+    item: Dict[str, Any],
+    brand_aliases: Optional[List[str]] = None,
+    domains: Optional[List[str]] = None
+) -> Optional[ProviderVisibility]:
+    """
+    Probe a query repeatedly until its found-rate is decided.
+
+    The first sample may come from the shared probe store or response cache;
+    later samples bypass both so each one is a fresh answer, and are not
+    published to the shared store. Failed samples
+    do not count toward n, but they do count toward the sample cap.
+
+    Returns:
+        The first successful sample's visibility (brands, position). It
+        carries samples, found_count, found_rate and found_interval, and
+        target_found set to whether the found-rate is at least 50%.
+    """
+    first = probe_fn(business_name, primary_domain, regions, item, brand_aliases=brand_aliases, domains=domains)
+    if first is None or not first.success:
+        return first
+
+    successes = 1 if first.target_found else 0
+    n = 1
+    attempts = 1
+    with independent_samples():
+        while attempts < ADAPTIVE_SAMPLING_MAX_SAMPLES and not sampling_decided(successes, n):
+            attempts += 1
+            vis = probe_fn(business_name, primary_domain, regions, item, brand_aliases=brand_aliases, domains=domains)
+            if vis is None or not vis.success:
+                continue
+            n += 1
+            successes += 1 if vis.target_found else 0
+
+    low, high = wilson_interval(successes, n)
+    rate = successes / n
+    logger.info(
+        "Sampled %s %r: %d/%d found (%.2f, CI %.2f-%.2f)",
+        first.provider, first.query, successes, n, rate, low, high
+    )
+    return first.model_copy(update={
+        "target_found": rate >= DECISION_THRESHOLD,
+        "target_position": first.target_position if rate >= DECISION_THRESHOLD else None,
+        "samples": n,
+        "found_count": successes,
+        "found_rate": round(rate, 3),
+        "found_interval": [round(low, 3), round(high, 3)],
+    })
@@ -5,11 +5,26 @@ from datetime import datetime
 from typing import Dict, List, Any, Optional
 from openai import OpenAI
 from services.genius import generate_genius_insights
+from services.provider_gateway import chat_completion
 from services.site_inspector import fetch_site_snapshot
-from services.perplexity_visibility import run_perplexity_visibility_probe
+from services.perplexity_visibility import (
+    run_perplexity_visibility_probe, perplexity_visibility_from_results
+)
 from services.visibility_hub import run_multi_llm_visibility, format_multi_llm_visibility_for_genius
-from services.config import PERPLEXITY_ENABLED, OPENAI_ENABLED, GEMINI_ENABLED
+from services.visibility_models import MultiLLMVisibilityResult, ProviderVisibility
+from services.brand_matcher import BrandMatcher, get_brand_matcher
+from services.config import (
+    PERPLEXITY_ENABLED, OPENAI_ENABLED, GEMINI_ENABLED, ANALYSIS_SINGLE_PASS, ANALYSIS_STAGE_WORKERS
+)
+from services.pipeline import PipelineStage, run_stage_graph
+from services.cost_ledger import spend_cap_guard
 from services.ekkobrain_reader import fetch_ekkobrain_context
+from services.cancellation import CancellationToken, AuditCancelled, check_cancelled, current_cancel_token
+from services.audit_checkpoints import (
+    AuditCheckpointer, run_stage,
+    STAGE_QUERIES, STAGE_PROBES_PREFIX, STAGE_LEGACY_RESULTS, STAGE_PERPLEXITY_LEGACY,
+    STAGE_SUGGESTIONS, STAGE_SITE_SNAPSHOT, STAGE_EKKOBRAIN_CONTEXT, STAGE_GENIUS
+)
 
 logger = logging.getLogger(__name__)
 
@@ -26,13 +41,7 @@ def get_openai_client() -> OpenAI:
     return OpenAI(api_key=api_key)
 
 
-def normalize_name(name: str) -> str:
-    return name.strip().lower()
-
-
-def score_query_result(brand_aliases: List[str], recommendations: List[Dict[str, str]]) -> Dict[str, Any]:
-    normalized_aliases = [normalize_name(alias) for alias in brand_aliases]
-    
+def score_query_result(matcher: BrandMatcher, recommendations: List[Dict[str, str]]) -> Dict[str, Any]:
     mentioned = False
     primary_recommendation = False
     our_names = []
@@ -41,10 +50,8 @@ def score_query_result(brand_aliases: List[str], recommendations: List[Dict[str,
     
     for idx, rec in enumerate(recommendations):
         rec_name = rec.get("name", "")
-        normalized_rec = normalize_name(rec_name)
         
-        if any(normalized_rec == alias or alias in normalized_rec or normalized_rec in alias 
-               for alias in normalized_aliases):
+        if matcher.matches(rec_name, rec.get("url")):
             mentioned = True
             our_names.append(rec_name)
             if idx == 0:
@@ -68,10 +75,12 @@ def score_query_result(brand_aliases: List[str], recommendations: List[Dict[str,
     }
 
 
-def get_recommendations_for_query(query: str) -> List[Dict[str, str]]:
+def get_recommendations_for_query(query: str) -> Optional[List[Dict[str, str]]]:
+    """Ask OpenAI for recommendations for a query; None if the call failed."""
     try:
         client = get_openai_client()
-        response = client.chat.completions.create(
+        response = chat_completion(
+            client,
             model="gpt-4o-mini",
             messages=[
                 {
@@ -100,7 +109,7 @@ List 3 to 5 businesses you would genuinely recommend. Be realistic and do not fa
             response_format={"type": "json_object"}
         )
         
-        content = response.choices[0].message.content
+        content = response.text
         if not content:
             return []
         parsed = json.loads(content)
@@ -109,8 +118,66 @@ List 3 to 5 businesses you would genuinely recommend. Be realistic and do not fa
     except MissingAPIKeyError:
         raise
     except Exception as e:
-        print(f"Error getting recommendations for query '{query}': {e}")
-        return []
+        logger.warning("Error getting recommendations for query %r: %s", query, e)
+        return None
+
+
+def _hub_results_by_query(
+    multi_llm_visibility: Optional[MultiLLMVisibilityResult],
+    provider: str
+) -> Dict[str, ProviderVisibility]:
+    """Map query -> that provider's hub result, for queries the hub probed."""
+    if multi_llm_visibility is None:
+        return {}
+    by_query = {}
+    for agg in multi_llm_visibility.queries:
+        vis = agg.get_provider(provider)
+        if vis is not None:
+            by_query[agg.query] = vis
+    return by_query
+
+
+def recommendations_from_visibility(vis: Optional[ProviderVisibility]) -> Optional[List[Dict[str, str]]]:
+    """
+    Legacy {"name", "reason"} recommendations from a hub probe result.
+    Returns None when the probe did not succeed, so the caller can fall back.
+    """
+    if vis is None or not vis.success:
+        return None
+    return [
+        {"name": brand.name, "reason": brand.reason or ""}
+        for brand in vis.recommended_brands
+    ]
+
+
+def _restore_probe_checkpoints(
+    checkpointer: Optional[AuditCheckpointer]
+) -> Dict[str, List[ProviderVisibility]]:
+    """Provider -> probe results from 'probes:<provider>' checkpoints."""
+    if checkpointer is None:
+        return {}
+    restored = {}
+    for provider in ("openai_sim", "perplexity_web", "gemini_sim"):
+        payload = checkpointer.get(STAGE_PROBES_PREFIX + provider)
+        if payload is not None:
+            restored[provider] = [ProviderVisibility.model_validate(p) for p in payload]
+    return restored
+
+
+def _probe_checkpoint_saver(checkpointer: Optional[AuditCheckpointer]):
+    """
+    Hub callback that checkpoints a provider's successful probes. Failed
+    probes are left out, so a retry probes those queries again.
+    """
+    if checkpointer is None:
+        return None
+    
+    def _save(provider: str, results: List[ProviderVisibility]):
+        successful = [r.model_dump() for r in results if r.success]
+        if successful:
+            checkpointer.save(STAGE_PROBES_PREFIX + provider, successful)
+    
+    return _save
 
 
 def generate_suggestions(tenant_config: Dict[str, Any], analysis_summary: Dict[str, Any]) -> Dict[str, Any]:
@@ -126,7 +193,8 @@ def generate_suggestions(tenant_config: Dict[str, Any], analysis_summary: Dict[s
         domains = ", ".join(tenant_config.get("domains", []))
         
         client = get_openai_client()
-        response = client.chat.completions.create(
+        response = chat_completion(
+            client,
             model="gpt-4o-mini",
             messages=[
                 {
@@ -166,7 +234,7 @@ Rules:
             response_format={"type": "json_object"}
         )
         
-        content = response.choices[0].message.content
+        content = response.text
         if not content:
             return {
                 "visibility_summary": "Unable to generate suggestions at this time.",
@@ -177,17 +245,35 @@ Rules:
     except MissingAPIKeyError:
         raise
     except Exception as e:
-        print(f"Error generating suggestions: {e}")
+        logger.warning("Error generating suggestions: %s", e)
         return {
             "visibility_summary": "Unable to generate suggestions at this time.",
             "suggestions": []
         }
 
 
-def run_analysis(tenant_config: Dict[str, Any], business: Optional[Any] = None) -> Dict[str, Any]:
-    import sys
-    print("[ANALYSIS DEBUG] Starting run_analysis")
-    sys.stdout.flush()
+def _assemble_summary(
+    base: Dict[str, Any],
+    suggestions_data: Dict[str, Any],
+    site_snapshot: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Combine the results stage with suggestions and the site snapshot."""
+    summary = dict(base)
+    summary["visibility_summary"] = suggestions_data.get("visibility_summary", "")
+    summary["suggestions"] = suggestions_data.get("suggestions", [])
+    summary["site_snapshot"] = site_snapshot
+    return summary
+
+
+def run_analysis(
+    tenant_config: Dict[str, Any],
+    business: Optional[Any] = None,
+    cancel_token: Optional[CancellationToken] = None,
+    checkpointer: Optional[AuditCheckpointer] = None,
+    packed_probes: bool = False,
+    sampling: Optional[bool] = None
+) -> Dict[str, Any]:
+    audit_id = checkpointer.audit_id if checkpointer is not None else None
     
     tenant_id = tenant_config["id"]
     tenant_name = tenant_config["display_name"]
@@ -196,163 +282,288 @@ def run_analysis(tenant_config: Dict[str, Any], business: Optional[Any] = None)
     domains = tenant_config.get("domains", [])
     geo_focus = tenant_config.get("geo_focus", [])
     
-    print(f"[ANALYSIS DEBUG] Tenant: {tenant_name}, {len(queries)} queries")
-    sys.stdout.flush()
-    
-    from services.query_generator import get_query_intent_map
-    print("[ANALYSIS DEBUG] Getting query intent map...")
-    sys.stdout.flush()
-    query_intent_map = get_query_intent_map(
-        name=tenant_name,
-        categories=tenant_config.get("categories", []),
-        regions=geo_focus,
-        business_type=tenant_config.get("business_type", ""),
-        max_queries=len(queries)
-    )
-    print("[ANALYSIS DEBUG] Query intent map complete")
-    sys.stdout.flush()
+    logger.info("Audit %s: starting analysis for %s with %d queries", audit_id, tenant_name, len(queries))
     
     primary_domain = domains[0] if domains else ""
+    brand_matcher = get_brand_matcher(tenant_name, brand_aliases, domains)
     
-    queries_with_intent = [
-        {
-            "query": q,
-            "intent": query_intent_map.get(q, {}).get("intent_type", "informational"),
-            "intent_value": query_intent_map.get(q, {}).get("intent_value", 5)
-        }
-        for q in queries
-    ]
+    # The audit as a stage graph. Independent stages overlap, so the critical
+    # path is max(queries -> probes -> results -> suggestions, site fetch,
+    # queries -> EkkoBrain) followed by Genius.
     
-    multi_llm_visibility = None
-    perplexity_visibility = None
-    
-    print("[ANALYSIS DEBUG] Running multi-LLM visibility probe...")
-    sys.stdout.flush()
-    logger.info("Running multi-LLM visibility probe for %s", tenant_name)
-    try:
-        multi_llm_visibility = run_multi_llm_visibility(
-            business_name=tenant_name,
-            primary_domain=primary_domain,
-            regions=geo_focus,
-            queries_with_intent=queries_with_intent,
-            run_openai=True,
-            run_perplexity=PERPLEXITY_ENABLED,
-            run_gemini=GEMINI_ENABLED
-        )
-        print("[ANALYSIS DEBUG] Multi-LLM visibility complete")
-        sys.stdout.flush()
-        logger.info(
-            "Multi-LLM visibility complete: %d queries, providers: %s",
-            len(multi_llm_visibility.queries),
-            ", ".join(multi_llm_visibility.providers_used)
+    def _queries_stage(out: Dict[str, Any]) -> Dict[str, Any]:
+        from services.query_generator import get_query_intent_map
+        logger.info("Audit %s stage %s: building query intent map", audit_id, STAGE_QUERIES)
+        query_intent_map = run_stage(
+            checkpointer, STAGE_QUERIES,
+            lambda: get_query_intent_map(
+                name=tenant_name,
+                categories=tenant_config.get("categories", []),
+                regions=geo_focus,
+                business_type=tenant_config.get("business_type", ""),
+                max_queries=len(queries)
+            )
         )
+        logger.info("Audit %s stage %s: query intent map complete", audit_id, STAGE_QUERIES)
+        
+        queries_with_intent = [
+            {
+                "query": q,
+                "intent": query_intent_map.get(q, {}).get("intent_type", "informational"),
+                "intent_value": query_intent_map.get(q, {}).get("intent_value", 5)
+            }
+            for q in queries
+        ]
+        return {"query_intent_map": query_intent_map, "queries_with_intent": queries_with_intent}
+    
+    def _probes_stage(out: Dict[str, Any]) -> Dict[str, Any]:
+        queries_with_intent = out["queries"]["queries_with_intent"]
+        multi_llm_visibility = None
+        perplexity_visibility = None
+        # The graph's stage token is also cancelled when a sibling stage fails;
+        # the hub opens its own scope, so hand it that token rather than the audit's.
+        stage_token = current_cancel_token() or cancel_token
         
-        if PERPLEXITY_ENABLED:
-            print("[ANALYSIS DEBUG] Running Perplexity visibility...")
-            sys.stdout.flush()
-            perplexity_visibility = run_perplexity_visibility_probe(
+        logger.info("Audit %s stage probes: running multi-LLM visibility for %s", audit_id, tenant_name)
+        try:
+            multi_llm_visibility = run_multi_llm_visibility(
                 business_name=tenant_name,
                 primary_domain=primary_domain,
                 regions=geo_focus,
-                queries=queries
+                queries_with_intent=queries_with_intent,
+                run_openai=True,
+                run_perplexity=PERPLEXITY_ENABLED,
+                run_gemini=GEMINI_ENABLED,
+                brand_aliases=brand_aliases,
+                domains=domains,
+                cancel_token=stage_token,
+                completed_results=_restore_probe_checkpoints(checkpointer),
+                on_provider_complete=_probe_checkpoint_saver(checkpointer),
+                packed=packed_probes,
+                sampling=sampling
             )
-            print("[ANALYSIS DEBUG] Perplexity visibility complete")
-            sys.stdout.flush()
-    except Exception as e:
-        print(f"[ANALYSIS DEBUG] Multi-LLM visibility FAILED: {e}")
-        sys.stdout.flush()
-        logger.warning("Multi-LLM visibility probe failed (non-fatal): %s", e)
-        multi_llm_visibility = None
-    
-    results = []
+            logger.info(
+                "Audit %s stage probes: multi-LLM visibility complete: %d queries, providers: %s",
+                audit_id,
+                len(multi_llm_visibility.queries),
+                ", ".join(multi_llm_visibility.providers_used)
+            )
+            
+            # A failed Perplexity query is reported as unsuccessful; keep it out
+            # of the checkpoint so a retry asks again.
+            def _all_perplexity_succeeded(data: Dict[str, Any]) -> bool:
+                return all(q.get("success") for q in data.get("queries", []))
+            
+            if PERPLEXITY_ENABLED and ANALYSIS_SINGLE_PASS:
+                perplexity_visibility = run_stage(
+                    checkpointer, STAGE_PERPLEXITY_LEGACY,
+                    lambda: perplexity_visibility_from_results(
+                        business_name=tenant_name,
+                        primary_domain=primary_domain,
+                        regions=geo_focus,
+                        queries=queries,
+                        provider_results=list(
+                            _hub_results_by_query(multi_llm_visibility, "perplexity_web").values()
+                        ),
+                        brand_aliases=brand_aliases,
+                        domains=domains
+                    ),
+                    should_save=_all_perplexity_succeeded
+                )
+            elif PERPLEXITY_ENABLED:
+                logger.info("Audit %s stage %s: running Perplexity visibility", audit_id, STAGE_PERPLEXITY_LEGACY)
+                perplexity_visibility = run_stage(
+                    checkpointer, STAGE_PERPLEXITY_LEGACY,
+                    lambda: run_perplexity_visibility_probe(
+                        business_name=tenant_name,
+                        primary_domain=primary_domain,
+                        regions=geo_focus,
+                        queries=queries,
+                        brand_aliases=brand_aliases,
+                        domains=domains
+                    ),
+                    should_save=_all_perplexity_succeeded
+                )
+                logger.info("Audit %s stage %s: Perplexity visibility complete", audit_id, STAGE_PERPLEXITY_LEGACY)
+        except AuditCancelled:
+            raise
+        except Exception as e:
+            logger.exception("Audit %s stage probes: multi-LLM visibility failed (non-fatal): %s", audit_id, e)
+            multi_llm_visibility = None
+        
+        return {"multi_llm": multi_llm_visibility, "perplexity": perplexity_visibility}
     
-    for query in queries:
-        recommendations = get_recommendations_for_query(query)
+    def _results_stage(out: Dict[str, Any]) -> Dict[str, Any]:
+        query_intent_map = out["queries"]["query_intent_map"]
+        multi_llm_visibility = out["probes"]["multi_llm"]
         
-        scoring = score_query_result(brand_aliases, recommendations)
+        # Single-pass mode reuses the hub's OpenAI answers for the legacy per-query
+        # results; only queries the hub did not answer get a separate call.
+        openai_by_query = (
+            _hub_results_by_query(multi_llm_visibility, "openai_sim")
+            if ANALYSIS_SINGLE_PASS else {}
+        )
         
-        intent_info = query_intent_map.get(query, {})
+        failed_queries: List[str] = []
+        stage_token = current_cancel_token() or cancel_token
         
-        result = {
-            "query": query,
-            "mentioned": scoring["mentioned"],
-            "primary_recommendation": scoring["primary_recommendation"],
-            "score": scoring["score"],
-            "our_names": scoring["our_names"],
-            "competitors": scoring["competitors"],
-            "raw_recommendations": recommendations,
-            "intent_type": intent_info.get("intent_type", "informational"),
-            "intent_value": intent_info.get("intent_value", 5),
-            "category_focus": intent_info.get("category_focus", "")
-        }
+        def _legacy_results() -> List[Dict[str, Any]]:
+            legacy = []
+            for query in queries:
+                recommendations = recommendations_from_visibility(openai_by_query.get(query))
+                if recommendations is None:
+                    check_cancelled(stage_token)
+                    recommendations = get_recommendations_for_query(query)
+                if recommendations is None:
+                    failed_queries.append(query)
+                    recommendations = []
+                
+                scoring = score_query_result(brand_matcher, recommendations)
+                
+                intent_info = query_intent_map.get(query, {})
+                
+                legacy.append({
+                    "query": query,
+                    "mentioned": scoring["mentioned"],
+                    "primary_recommendation": scoring["primary_recommendation"],
+                    "score": scoring["score"],
+                    "our_names": scoring["our_names"],
+                    "competitors": scoring["competitors"],
+                    "raw_recommendations": recommendations,
+                    "intent_type": intent_info.get("intent_type", "informational"),
+                    "intent_value": intent_info.get("intent_value", 5),
+                    "category_focus": intent_info.get("category_focus", "")
+                })
+            return legacy
         
-        results.append(result)
-    
-    total_queries = len(results)
-    mentioned_count = sum(1 for r in results if r["mentioned"])
-    primary_count = sum(1 for r in results if r["primary_recommendation"])
-    avg_score = sum(r["score"] for r in results) / total_queries if total_queries > 0 else 0
-    
-    multi_llm_data = None
-    if multi_llm_visibility:
-        multi_llm_data = {
-            "queries": [q.model_dump() for q in multi_llm_visibility.queries],
-            "summary": multi_llm_visibility.summary.model_dump(),
-            "providers_used": multi_llm_visibility.providers_used
+        # A failed call scores as "not mentioned"; keep it out of the checkpoint
+        # so a retry asks again.
+        results = run_stage(
+            checkpointer, STAGE_LEGACY_RESULTS, _legacy_results,
+            should_save=lambda _: not failed_queries
+        )
+        
+        total_queries = len(results)
+        mentioned_count = sum(1 for r in results if r["mentioned"])
+        primary_count = sum(1 for r in results if r["primary_recommendation"])
+        avg_score = sum(r["score"] for r in results) / total_queries if total_queries > 0 else 0
+        
+        multi_llm_data = None
+        if multi_llm_visibility:
+            multi_llm_data = {
+                "queries": [q.model_dump() for q in multi_llm_visibility.queries],
+                "summary": multi_llm_visibility.summary.model_dump(),
+                "providers_used": multi_llm_visibility.providers_used,
+                "providers_skipped": multi_llm_visibility.providers_skipped,
+                "packing_agreement": multi_llm_visibility.packing_agreement
+            }
+        
+        return {
+            "tenant_id": tenant_id,
+            "tenant_name": tenant_name,
+            "run_at": datetime.utcnow().isoformat() + "Z",
+            "total_queries": total_queries,
+            "mentioned_count": mentioned_count,
+            "primary_count": primary_count,
+            "avg_score": round(avg_score, 2),
+            "results": results,
+            "perplexity_visibility": out["probes"]["perplexity"],
+            "multi_llm_visibility": multi_llm_data
         }
     
-    summary = {
-        "tenant_id": tenant_id,
-        "tenant_name": tenant_name,
-        "run_at": datetime.utcnow().isoformat() + "Z",
-        "total_queries": total_queries,
-        "mentioned_count": mentioned_count,
-        "primary_count": primary_count,
-        "avg_score": round(avg_score, 2),
-        "results": results,
-        "perplexity_visibility": perplexity_visibility,
-        "multi_llm_visibility": multi_llm_data
-    }
-    
-    suggestions_data = generate_suggestions(tenant_config, summary)
-    summary["visibility_summary"] = suggestions_data.get("visibility_summary", "")
-    summary["suggestions"] = suggestions_data.get("suggestions", [])
+    def _suggestions_stage(out: Dict[str, Any]) -> Dict[str, Any]:
+        return run_stage(
+            checkpointer, STAGE_SUGGESTIONS,
+            lambda: generate_suggestions(tenant_config, out["results"]),
+            should_save=lambda data: bool(data.get("suggestions"))
+        )
     
-    try:
-        site_snapshot = fetch_site_snapshot(tenant_config)
-        summary["site_snapshot"] = site_snapshot
-    except Exception as e:
-        logger.warning("Error fetching site snapshot (non-fatal): %s", e)
-        site_snapshot = {"pages": [], "fetch_status": "error"}
-        summary["site_snapshot"] = site_snapshot
+    def _site_snapshot_stage(out: Dict[str, Any]) -> Dict[str, Any]:
+        def _site_snapshot() -> Dict[str, Any]:
+            try:
+                return fetch_site_snapshot(tenant_config)
+            except Exception as e:
+                logger.warning(
+                    "Audit %s stage %s: error fetching site snapshot (non-fatal): %s",
+                    audit_id, STAGE_SITE_SNAPSHOT, e
+                )
+                return {"pages": [], "fetch_status": "error"}
+        
+        return run_stage(
+            checkpointer, STAGE_SITE_SNAPSHOT, _site_snapshot,
+            should_save=lambda snap: snap.get("fetch_status") != "error"
+        )
     
-    ekkobrain_context = None
-    if business is not None:
-        try:
-            ekkobrain_context = fetch_ekkobrain_context(
-                business=business,
-                queries_with_intent=queries_with_intent
-            )
-            logger.info("EkkoBrain context fetched: enabled=%s", ekkobrain_context.get("enabled", False))
-        except Exception as e:
-            logger.warning("Error fetching EkkoBrain context (non-fatal): %s", e)
-            ekkobrain_context = None
+    def _ekkobrain_stage(out: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if business is None:
+            return None
+        
+        def _ekkobrain_context() -> Optional[Dict[str, Any]]:
+            try:
+                context = fetch_ekkobrain_context(
+                    business=business,
+                    queries_with_intent=out["queries"]["queries_with_intent"]
+                )
+                logger.info(
+                    "Audit %s stage %s: EkkoBrain context fetched: enabled=%s",
+                    audit_id, STAGE_EKKOBRAIN_CONTEXT, context.get("enabled", False)
+                )
+                return context
+            except Exception as e:
+                logger.warning(
+                    "Audit %s stage %s: error fetching EkkoBrain context (non-fatal): %s",
+                    audit_id, STAGE_EKKOBRAIN_CONTEXT, e
+                )
+                return None
+        
+        return run_stage(
+            checkpointer, STAGE_EKKOBRAIN_CONTEXT, _ekkobrain_context,
+            should_save=lambda context: context is not None
+        )
     
-    try:
-        genius_data = generate_genius_insights(
-            tenant_config, 
-            summary, 
-            site_snapshot,
-            perplexity_visibility=perplexity_visibility,
-            multi_llm_visibility=multi_llm_visibility,
-            ekkobrain_context=ekkobrain_context
+    def _genius_stage(out: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        summary = _assemble_summary(out["results"], out["suggestions"], out["site_snapshot"])
+        
+        def _genius() -> Optional[Dict[str, Any]]:
+            try:
+                return generate_genius_insights(
+                    tenant_config, 
+                    summary, 
+                    out["site_snapshot"],
+                    perplexity_visibility=out["probes"]["perplexity"],
+                    multi_llm_visibility=out["probes"]["multi_llm"],
+                    ekkobrain_context=out["ekkobrain_context"]
+                )
+            except Exception as e:
+                logger.warning(
+                    "Audit %s stage %s: error generating genius insights (non-fatal): %s",
+                    audit_id, STAGE_GENIUS, e
+                )
+                return None
+        
+        return run_stage(
+            checkpointer, STAGE_GENIUS, _genius,
+            should_save=lambda genius: genius is not None
         )
-        summary["genius_insights"] = genius_data
-    except Exception as e:
-        logger.warning("Error generating genius insights (non-fatal): %s", e)
-        summary["genius_insights"] = None
     
-    summary["queries_with_intent"] = queries_with_intent
-    summary["multi_llm_visibility_data"] = multi_llm_data
+    out, stage_timings = run_stage_graph([
+        PipelineStage("queries", _queries_stage),
+        PipelineStage("site_snapshot", _site_snapshot_stage),
+        PipelineStage("ekkobrain_context", _ekkobrain_stage, deps=["queries"]),
+        PipelineStage("probes", _probes_stage, deps=["queries"], expensive=True),
+        PipelineStage("results", _results_stage, deps=["queries", "probes"], expensive=True),
+        PipelineStage("suggestions", _suggestions_stage, deps=["results"], expensive=True),
+        PipelineStage(
+            "genius", _genius_stage,
+            deps=["queries", "probes", "results", "suggestions", "site_snapshot", "ekkobrain_context"],
+            expensive=True
+        ),
+    ], max_workers=ANALYSIS_STAGE_WORKERS, cancel_token=cancel_token, guard=spend_cap_guard(business))
+    
+    summary = _assemble_summary(out["results"], out["suggestions"], out["site_snapshot"])
+    summary["genius_insights"] = out["genius"]
+    summary["queries_with_intent"] = out["queries"]["queries_with_intent"]
+    summary["multi_llm_visibility_data"] = summary["multi_llm_visibility"]
+    summary["stage_timings"] = stage_timings
     
     return summary
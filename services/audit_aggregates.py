@@ -0,0 +1,154 @@
+"""
+Audit Aggregates for EkkoScope dashboards.
+Completed audits are immutable, so the per-provider, per-intent, competitor
+and missing-query rollups the dashboards show are computed once, in a single
+pass over the audit's AuditQuery x QueryVisibilityResult rows, and stored in
+an AuditAggregate row. Dashboards then read that row instead of walking every
+visibility result on each page load.
+"""
+
+import json
+import logging
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from services.database import Audit, AuditAggregate, AuditQuery, Business, QueryVisibilityResult
+from services.brand_matcher import get_business_matcher
+
+logger = logging.getLogger(__name__)
+
+PROVIDER_NAME_MAP = {
+    "openai_sim": "openai",
+    "perplexity_web": "perplexity",
+    "gemini_sim": "gemini",
+}
+
+MAX_STORED_COMPETITORS = 50
+
+
+def _percent(found: int, total: int) -> float:
+    return round((found / total) * 100, 1) if total > 0 else 0.0
+
+
+def materialize_audit_aggregates(db: Session, audit: Audit, business: Business) -> AuditAggregate:
+    """
+    Compute and store the dashboard aggregates for one audit, replacing any
+    existing row. Commits the session.
+    """
+    matcher = get_business_matcher(business)
+    rows = (
+        db.query(AuditQuery, QueryVisibilityResult)
+        .outerjoin(QueryVisibilityResult, QueryVisibilityResult.audit_query_id == AuditQuery.id)
+        .filter(AuditQuery.audit_id == audit.id)
+        .order_by(AuditQuery.id, QueryVisibilityResult.id)
+        .all()
+    )
+
+    provider_stats: Dict[str, Dict[str, Any]] = {
+        name: {"target_found": 0, "total_probes": 0} for name in PROVIDER_NAME_MAP.values()
+    }
+    intent_stats: Dict[str, Dict[str, int]] = {}
+    competitor_counts: Dict[str, int] = {}
+    query_rows: Dict[int, Dict[str, Any]] = {}
+    total_probes = 0
+    target_hits = 0
+
+    for aq, vr in rows:
+        query_row = query_rows.get(aq.id)
+        if query_row is None:
+            query_row = {
+                "query": aq.query_text,
+                "intent": aq.intent,
+                "providers": [],
+                "target_found_count": 0,
+                "total_probes": 0,
+            }
+            query_rows[aq.id] = query_row
+            intent = intent_stats.setdefault(aq.intent or "", {"queries": 0, "total_probes": 0, "found": 0})
+            intent["queries"] += 1
+
+        if vr is None:
+            continue
+
+        is_target = bool(vr.is_target) or matcher.matches(vr.brand_name, vr.brand_url)
+        provider = PROVIDER_NAME_MAP.get(vr.provider, vr.provider)
+        intent = intent_stats[aq.intent or ""]
+
+        total_probes += 1
+        query_row["total_probes"] += 1
+        intent["total_probes"] += 1
+        if provider in provider_stats:
+            provider_stats[provider]["total_probes"] += 1
+
+        if is_target:
+            target_hits += 1
+            query_row["target_found_count"] += 1
+            intent["found"] += 1
+            if provider in provider_stats:
+                provider_stats[provider]["target_found"] += 1
+        elif vr.brand_name:
+            competitor_counts[vr.brand_name] = competitor_counts.get(vr.brand_name, 0) + 1
+
+        query_row["providers"].append({
+            "provider": provider,
+            "target_found": is_target,
+            "brand_name": vr.brand_name,
+            "rank": vr.rank
+        })
+
+    for stats in provider_stats.values():
+        stats["target_percent"] = _percent(stats["target_found"], stats["total_probes"])
+
+    for query_row in query_rows.values():
+        query_row["score_percent"] = round(_percent(query_row["target_found_count"], query_row["total_probes"]))
+
+    competitors = [
+        {"name": name, "count": count}
+        for name, count in sorted(competitor_counts.items(), key=lambda x: -x[1])[:MAX_STORED_COMPETITORS]
+    ]
+    missing_queries = [
+        {"text": q["query"], "intent": q["intent"] or "general"}
+        for q in query_rows.values() if q["target_found_count"] == 0
+    ]
+
+    aggregate = db.query(AuditAggregate).filter(AuditAggregate.audit_id == audit.id).first()
+    if aggregate is None:
+        aggregate = AuditAggregate(audit_id=audit.id)
+        db.add(aggregate)
+    aggregate.total_queries = len(query_rows)
+    aggregate.total_probes = total_probes
+    aggregate.target_hits = target_hits
+    aggregate.provider_stats_json = json.dumps(provider_stats)
+    aggregate.intent_stats_json = json.dumps(intent_stats)
+    aggregate.competitor_counts_json = json.dumps(competitors)
+    aggregate.missing_queries_json = json.dumps(missing_queries)
+    aggregate.query_rows_json = json.dumps(list(query_rows.values()))
+    db.commit()
+
+    logger.info(
+        "Materialized aggregates for audit %d: %d queries, %d probes, %d hits",
+        audit.id, len(query_rows), total_probes, target_hits
+    )
+    return aggregate
+
+
+def get_audit_aggregates(db: Session, audit: Audit, business: Business) -> AuditAggregate:
+    """
+    Load an audit's aggregates, materializing them first for audits that
+    completed before aggregates existed.
+    """
+    aggregate = db.query(AuditAggregate).filter(AuditAggregate.audit_id == audit.id).first()
+    if aggregate is None:
+        aggregate = materialize_audit_aggregates(db, audit, business)
+    return aggregate
+
+
+def refresh_audit_aggregates(db: Session, audit: Audit, business: Business) -> Optional[AuditAggregate]:
+    """Materialize aggregates at audit completion; failures are logged, not raised."""
+    try:
+        return materialize_audit_aggregates(db, audit, business)
+    except Exception as e:
+        logger.warning("Audit aggregate materialization failed (non-fatal): %s", e)
+        db.rollback()
+        return None
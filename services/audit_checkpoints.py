@@ -0,0 +1,144 @@
+"""
+Audit Stage Checkpoints for EkkoScope.
+Each pipeline stage's output is saved as its own audit_checkpoints row, so a
+retry or resume of the same audit starts from the first missing stage instead
+of re-paying for provider probes.
+"""
+
+import json
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from services.database import AuditCheckpoint, get_db_session
+
+logger = logging.getLogger(__name__)
+
+STAGE_QUERIES = "queries"
+STAGE_PROBES_PREFIX = "probes:"
+STAGE_LEGACY_RESULTS = "legacy_results"
+STAGE_PERPLEXITY_LEGACY = "perplexity_visibility"
+STAGE_SUGGESTIONS = "suggestions"
+STAGE_SITE_SNAPSHOT = "site_snapshot"
+STAGE_EKKOBRAIN_CONTEXT = "ekkobrain_context"
+STAGE_GENIUS = "genius"
+STAGE_PDF = "pdf"
+
+
+class AuditCheckpointer:
+    """
+    Loads an audit's checkpoints once and saves new ones as stages finish.
+    Payloads must be JSON-serializable.
+    """
+
+    def __init__(self, audit_id: int):
+        self.audit_id = audit_id
+        self._lock = threading.Lock()
+        self._payloads: Dict[str, Any] = {}
+
+        db = get_db_session()
+        try:
+            rows = db.query(AuditCheckpoint).filter(AuditCheckpoint.audit_id == audit_id).all()
+            for row in rows:
+                try:
+                    self._payloads[row.stage] = json.loads(row.payload_json) if row.payload_json else None
+                except ValueError:
+                    logger.warning("Ignoring unreadable checkpoint %s for audit %d", row.stage, audit_id)
+        finally:
+            db.close()
+
+        if self._payloads:
+            logger.info("Audit %d resuming with checkpoints: %s", audit_id, sorted(self._payloads))
+
+    def has(self, stage: str) -> bool:
+        with self._lock:
+            return stage in self._payloads
+
+    def get(self, stage: str, default: Any = None) -> Any:
+        with self._lock:
+            return self._payloads.get(stage, default)
+
+    def save(self, stage: str, payload: Any):
+        """Persist a stage's output. Failures are logged and non-fatal."""
+        payload_json = json.dumps(payload, default=str)
+        with self._lock:
+            self._payloads[stage] = json.loads(payload_json)
+
+        db = get_db_session()
+        try:
+            row = db.query(AuditCheckpoint).filter(
+                AuditCheckpoint.audit_id == self.audit_id,
+                AuditCheckpoint.stage == stage
+            ).first()
+            if row is None:
+                db.add(AuditCheckpoint(audit_id=self.audit_id, stage=stage, payload_json=payload_json))
+            else:
+                row.payload_json = payload_json
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+        except Exception as e:
+            db.rollback()
+            logger.warning("Could not save checkpoint %s for audit %d: %s", stage, self.audit_id, e)
+        finally:
+            db.close()
+
+    def run(
+        self,
+        stage: str,
+        compute: Callable[[], Any],
+        dump: Callable[[Any], Any] = lambda value: value,
+        load: Callable[[Any], Any] = lambda payload: payload,
+        should_save: Callable[[Any], bool] = lambda value: True
+    ) -> Any:
+        """
+        Return the stage's checkpointed value, or compute and checkpoint it.
+
+        Args:
+            stage: Stage name
+            compute: Produces the stage output on a miss
+            dump: Converts the output to a JSON-serializable payload
+            load: Converts a stored payload back to the output
+            should_save: Return False for degraded outputs (e.g. a non-fatal
+                failure fallback) so a retry computes the stage again
+        """
+        if self.has(stage):
+            logger.info("Audit %d: stage '%s' restored from checkpoint", self.audit_id, stage)
+            return load(self.get(stage))
+        value = compute()
+        if should_save(value):
+            self.save(stage, dump(value))
+        return value
+
+
+def run_stage(
+    checkpointer: Optional[AuditCheckpointer],
+    stage: str,
+    compute: Callable[[], Any],
+    **kwargs
+) -> Any:
+    """AuditCheckpointer.run that degrades to a plain call without a checkpointer."""
+    if checkpointer is None:
+        return compute()
+    return checkpointer.run(stage, compute, **kwargs)
+
+
+def clear_audit_checkpoints(audit_id: int, db: Optional[Session] = None):
+    """
+    Delete every checkpoint for an audit, once it is done or being deleted.
+
+    With a session the delete joins the caller's transaction (commit is left
+    to the caller); otherwise it runs and commits in its own session.
+    """
+    if db is not None:
+        db.query(AuditCheckpoint).filter(AuditCheckpoint.audit_id == audit_id).delete()
+        return
+    db = get_db_session()
+    try:
+        db.query(AuditCheckpoint).filter(AuditCheckpoint.audit_id == audit_id).delete()
+        db.commit()
+    finally:
+        db.close()
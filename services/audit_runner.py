@@ -6,16 +6,29 @@ Now integrates EkkoBrain for pattern-based learning.
 
 import os
 import json
+import time
 import logging
 from datetime import datetime
 from typing import Optional, List, Dict, Any
 from sqlalchemy.orm import Session
 
-from services.database import Business, Audit
+from services.config import PACKED_PROBES_ENABLED
+from services.database import Business, Audit, get_db_session, refresh_business_projection
 from services.analysis import run_analysis, MissingAPIKeyError
+from services.job_queue import register_job_handler, PermanentJobError
+from services.audit_checkpoints import AuditCheckpointer, STAGE_PDF, clear_audit_checkpoints
+from services.cancellation import (
+    CancellationToken, AuditCancelled, cancellation_scope, check_cancelled, open_audit_token, close_audit_token
+)
+from services.http_clients import close_cancellable_http_client
 from services.reporting import build_ekkoscope_pdf
 from services.ekkobrain_reader import fetch_ekkobrain_context
 from services.ekkobrain_writer import log_audit_to_ekkobrain
+from services.audit_aggregates import refresh_audit_aggregates
+from services.blob_store import store_visibility_summary, load_visibility_summary
+from services.tracing import Trace, span, start_trace
+from services.metrics import AUDIT_RUNS, AUDIT_RUN_SECONDS
+from services.cost_ledger import SpendCapExceeded, usage_scope
 
 logger = logging.getLogger(__name__)
 
@@ -29,7 +42,20 @@ def ensure_reports_dir():
         os.makedirs(REPORTS_DIR)
 
 
-def run_audit_for_business(business: Business, audit: Audit, db_session: Session) -> Audit:
+def _raise_if_stopped(audit: Audit, db_session: Session, cancel_token: Optional[CancellationToken]):
+    """Checkpoint: honour the token and a stop written to the DB by another session."""
+    check_cancelled(cancel_token)
+    status = db_session.query(Audit.status).filter(Audit.id == audit.id).scalar()
+    if status == "stopped":
+        raise AuditCancelled(f"Audit {audit.id} was stopped")
+
+
+def run_audit_for_business(
+    business: Business,
+    audit: Audit,
+    db_session: Session,
+    cancel_token: Optional[CancellationToken] = None
+) -> Audit:
     """
     Run a complete EkkoScope audit for a business.
     
@@ -44,33 +70,69 @@ def run_audit_for_business(business: Business, audit: Audit, db_session: Session
     - Fetches relevant patterns before Genius Mode
     - Logs audit artifacts after completion for future pattern learning
     
+    Each stage's output is checkpointed per audit, so a retry of the same
+    audit resumes from the first stage that has not completed.
+    
     Args:
         business: The Business model instance
         audit: The Audit model instance (must be created with status='pending')
         db_session: SQLAlchemy database session
+        cancel_token: Optional token checked between stages; cancelling it
+            aborts in-flight provider requests, raises AuditCancelled and
+            leaves the audit 'stopped'
+    
+    The run is traced (stages, probes and provider calls) and the trace is
+    saved on the audit, whether the run succeeds or not. Provider usage is
+    recorded in the cost ledger under the audit, and expensive stages do not
+    start once the business is over its plan's spend cap (SpendCapExceeded).
     
     Returns:
         Updated Audit instance
     """
-    import sys
-    print(f"[RUNNER DEBUG] Starting run_audit_for_business for audit {audit.id}")
-    sys.stdout.flush()
+    started = time.perf_counter()
+    with start_trace(f"audit {audit.id}") as trace, usage_scope(audit.id, business.id):
+        try:
+            with cancellation_scope(cancel_token):
+                return _run_audit(business, audit, db_session, cancel_token)
+        finally:
+            if cancel_token is not None:
+                close_cancellable_http_client(cancel_token)
+            _save_audit_trace(db_session, audit, trace)
+            AUDIT_RUNS.inc(status=audit.status)
+            AUDIT_RUN_SECONDS.observe(time.perf_counter() - started, status=audit.status)
+
+
+def _save_audit_trace(db_session: Session, audit: Audit, trace: Trace):
+    """Persist a run's trace on the audit; failures are logged, not raised."""
+    try:
+        audit.set_trace(trace.to_dict())
+        db_session.commit()
+    except Exception as e:
+        logger.warning("Saving audit trace failed (non-fatal): %s", e)
+        db_session.rollback()
+
+
+def _run_audit(
+    business: Business,
+    audit: Audit,
+    db_session: Session,
+    cancel_token: Optional[CancellationToken]
+) -> Audit:
+    """Body of run_audit_for_business, run inside the audit's trace."""
+    logger.info("Starting audit %d for business %d", audit.id, business.id)
     
     try:
         audit.status = "running"
         db_session.commit()
-        print(f"[RUNNER DEBUG] Set status to running for audit {audit.id}")
-        sys.stdout.flush()
         
         tenant_config = business.to_tenant_config()
-        print(f"[RUNNER DEBUG] Got tenant config for audit {audit.id}")
-        sys.stdout.flush()
-        
-        print(f"[RUNNER DEBUG] Calling run_analysis for audit {audit.id}...")
-        sys.stdout.flush()
-        analysis = run_analysis(tenant_config, business=business)
-        print(f"[RUNNER DEBUG] run_analysis completed for audit {audit.id}")
-        sys.stdout.flush()
+        checkpointer = AuditCheckpointer(audit.id)
+        analysis = run_analysis(
+            tenant_config, business=business,
+            cancel_token=cancel_token, checkpointer=checkpointer,
+            packed_probes=PACKED_PROBES_ENABLED and audit.channel == "scheduled"
+        )
+        logger.info("Analysis finished for audit %d", audit.id)
         
         multi_llm = analysis.get("multi_llm_visibility", {})
         multi_llm_summary = multi_llm.get("summary", {}) if isinstance(multi_llm, dict) else {}
@@ -91,7 +153,8 @@ def run_audit_for_business(business: Business, audit: Audit, db_session: Session
             "overall_target_percent": multi_llm_summary.get("overall_target_percent", 0),
             "provider_stats": multi_llm_summary.get("provider_stats", {}),
             "top_competitors": multi_llm_summary.get("top_competitors", []),
-            "intent_breakdown": multi_llm_summary.get("intent_breakdown", {})
+            "intent_breakdown": multi_llm_summary.get("intent_breakdown", {}),
+            "stage_timings": dict(analysis.get("stage_timings") or {})
         }
         
         suggestions_data = {
@@ -100,7 +163,7 @@ def run_audit_for_business(business: Business, audit: Audit, db_session: Session
             "site_snapshot": analysis.get("site_snapshot")
         }
         
-        audit.set_visibility_summary(visibility_summary)
+        store_visibility_summary(db_session, audit, visibility_summary)
         audit.set_suggestions(suggestions_data)
         
         site_snapshot = analysis.get("site_snapshot", {})
@@ -110,33 +173,59 @@ def run_audit_for_business(business: Business, audit: Audit, db_session: Session
             len(site_snapshot.get("pages", [])) > 0
         )
         
-        ensure_reports_dir()
+        _raise_if_stopped(audit, db_session, cancel_token)
         
-        pdf_bytes = build_ekkoscope_pdf(tenant_config, analysis)
+        pdf_started = time.perf_counter()
+        with span("pdf", kind="stage", deps=["genius"]):
+            pdf_path = (checkpointer.get(STAGE_PDF) or {}).get("pdf_path")
+            if not pdf_path or not os.path.exists(pdf_path):
+                ensure_reports_dir()
+                
+                pdf_bytes = build_ekkoscope_pdf(tenant_config, analysis, cancel_token=cancel_token)
+                
+                timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+                safe_name = "".join(c if c.isalnum() else "_" for c in business.name)
+                pdf_filename = f"ekkoscope_{safe_name}_{audit.id}_{timestamp}.pdf"
+                pdf_path = os.path.join(REPORTS_DIR, pdf_filename)
+                
+                with open(pdf_path, "wb") as f:
+                    f.write(pdf_bytes)
+                
+                checkpointer.save(STAGE_PDF, {"pdf_path": pdf_path})
         
-        timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-        safe_name = "".join(c if c.isalnum() else "_" for c in business.name)
-        pdf_filename = f"ekkoscope_{safe_name}_{audit.id}_{timestamp}.pdf"
-        pdf_path = os.path.join(REPORTS_DIR, pdf_filename)
-        
-        with open(pdf_path, "wb") as f:
-            f.write(pdf_bytes)
+        visibility_summary["stage_timings"]["pdf"] = {
+            "duration_ms": round((time.perf_counter() - pdf_started) * 1000),
+            "status": "ok",
+            "deps": ["genius"]
+        }
+        store_visibility_summary(db_session, audit, visibility_summary)
         
+        _raise_if_stopped(audit, db_session, cancel_token)
         audit.pdf_path = pdf_path
         audit.status = "done"
         audit.completed_at = datetime.utcnow()
+        refresh_business_projection(db_session, business.id)
+        clear_audit_checkpoints(audit.id, db_session)
         
         db_session.commit()
         
-        _log_audit_artifacts_to_ekkobrain(
-            db_session=db_session,
-            audit=audit,
-            business=business,
-            analysis=analysis
-        )
+        with span("finalize", kind="stage"):
+            _log_audit_artifacts_to_ekkobrain(
+                db_session=db_session,
+                audit=audit,
+                business=business,
+                analysis=analysis
+            )
+            refresh_audit_aggregates(db_session, audit, business)
         
         return audit
         
+    except AuditCancelled:
+        db_session.rollback()
+        audit.status = "stopped"
+        db_session.commit()
+        raise
+        
     except MissingAPIKeyError as e:
         audit.status = "error"
         audit.set_visibility_summary({"error": str(e)})
@@ -150,6 +239,57 @@ def run_audit_for_business(business: Business, audit: Audit, db_session: Session
         raise
 
 
+def run_audit_background(business_id: int, audit_id: int):
+    """
+    Job-queue handler that runs one audit in its own DB session.
+    
+    Failures are recorded on the Audit and re-raised so the queue can retry;
+    a missing API key is not retryable. Audits that were stopped or already
+    finished are skipped, and a stop during the run ends it at the next
+    checkpoint without a retry.
+    """
+    import traceback
+    
+    db = get_db_session()
+    try:
+        business = db.query(Business).filter(Business.id == business_id).first()
+        audit = db.query(Audit).filter(Audit.id == audit_id).first()
+        
+        if not business or not audit:
+            logger.warning("Audit job %d: business %d or audit not found", audit_id, business_id)
+            return
+        
+        if audit.status in ("stopped", "done"):
+            logger.info("Audit %d is %s; skipping", audit_id, audit.status)
+            return
+        
+        cancel_token = open_audit_token(audit_id)
+        try:
+            run_audit_for_business(business, audit, db, cancel_token=cancel_token)
+            logger.info("Audit %d completed", audit_id)
+        except AuditCancelled:
+            logger.info("Audit %d stopped", audit_id)
+        except Exception as e:
+            logger.error("Audit %d failed: %s", audit_id, e)
+            audit.status = "error"
+            audit.set_visibility_summary({
+                "error": str(e),
+                "error_type": type(e).__name__,
+                "error_details": traceback.format_exc()
+            })
+            db.commit()
+            if isinstance(e, (MissingAPIKeyError, SpendCapExceeded)):
+                raise PermanentJobError(str(e)) from e
+            raise
+        finally:
+            close_audit_token(audit_id)
+    finally:
+        db.close()
+
+
+register_job_handler("audit", run_audit_background)
+
+
 def _log_audit_artifacts_to_ekkobrain(
     db_session: Session,
     audit: Audit,
@@ -189,7 +329,7 @@ def get_audit_analysis_data(audit: Audit) -> Optional[dict]:
     Returns data in the format expected by templates.
     Also returns error information for failed audits.
     """
-    visibility = audit.get_visibility_summary()
+    visibility = load_visibility_summary(audit)
     suggestions = audit.get_suggestions()
     
     if audit.status in ("error", "stopped"):
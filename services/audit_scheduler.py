@@ -6,10 +6,13 @@ Auto-remediation agents run automatically after each bi-weekly report.
 
 import asyncio
 import json
+import random
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, List, Optional
 from services.database import get_db_session, Business, Audit
-from services.audit_runner import run_audit_for_business
+from services.audit_runner import run_audit_background
+from services.job_queue import enqueue_audit, register_job_handler
+from services.config import SCHEDULED_AUDIT_PRIORITY, SCHEDULER_JITTER_SECONDS
 from services.pdf_parser import parse_geo_report
 from services.fix_planner import generate_fix_plan
 from services.remediation_agents import RemediationOrchestrator
@@ -127,11 +130,40 @@ def run_auto_remediation(business_id: int, audit_id: int) -> bool:
         db.close()
 
 
-async def run_scheduled_audit(business_id: int) -> Optional[int]:
+def run_scheduled_audit_job(business_id: int, audit_id: int):
+    """
+    Job-queue handler for scheduled audits: runs the audit, then advances
+    the schedule and runs auto-remediation for autofix subscribers.
     """
-    Run a scheduled audit for a business.
+    run_audit_background(business_id, audit_id)
+    
+    db = get_db_session()
+    try:
+        audit = db.query(Audit).filter(Audit.id == audit_id).first()
+        business = db.query(Business).filter(Business.id == business_id).first()
+        if not audit or audit.status != "done" or not business:
+            return
+        autofix_enabled = business.autofix_enabled
+    finally:
+        db.close()
+    
+    update_next_audit_date(business_id)
+    
+    if autofix_enabled:
+        run_auto_remediation(business_id, audit_id)
+        print(f"[SCHEDULER] Completed audit + auto-fix for business {business_id}")
+    else:
+        print(f"[SCHEDULER] Completed audit for business {business_id} (no auto-fix)")
+
+
+register_job_handler("scheduled_audit", run_scheduled_audit_job)
+
+
+def enqueue_scheduled_audit(business_id: int, run_after: Optional[datetime] = None) -> Optional[int]:
+    """
+    Create a scheduled audit for a business and enqueue it on the job queue.
     Auto-remediation only runs for $1188/month subscribers (autofix_enabled=True).
-    Returns the audit ID if successful.
+    Returns the audit ID if one was enqueued.
     """
     db = get_db_session()
     try:
@@ -139,6 +171,14 @@ async def run_scheduled_audit(business_id: int) -> Optional[int]:
         if not business or not business.subscription_active:
             return None
         
+        in_flight = db.query(Audit).filter(
+            Audit.business_id == business.id,
+            Audit.channel == "scheduled",
+            Audit.status.in_(["pending", "running"])
+        ).first()
+        if in_flight:
+            return None
+        
         audit = Audit(
             business_id=business.id,
             channel="scheduled",
@@ -148,44 +188,89 @@ async def run_scheduled_audit(business_id: int) -> Optional[int]:
         db.commit()
         db.refresh(audit)
         
-        audit_id = audit.id
-        
-        try:
-            run_audit_for_business(business.id, audit_id)
-            update_next_audit_date(business.id)
-            
-            if business.autofix_enabled:
-                run_auto_remediation(business.id, audit_id)
-                print(f"[SCHEDULER] Completed audit + auto-fix for business {business_id}")
-            else:
-                print(f"[SCHEDULER] Completed audit for business {business_id} (no auto-fix)")
-            
-        except Exception as e:
-            print(f"Scheduled audit failed for business {business.id}: {e}")
-            audit.status = "error"
-            audit.error_message = str(e)[:500]
-            db.commit()
-        
-        return audit_id
+        enqueue_audit(
+            business.id, audit.id,
+            kind="scheduled_audit",
+            priority=SCHEDULED_AUDIT_PRIORITY,
+            run_after=run_after
+        )
+        return audit.id
     finally:
         db.close()
 
 
-async def run_scheduler_cycle():
+async def run_scheduled_audit(business_id: int) -> Optional[int]:
+    """Enqueue a scheduled audit without blocking the event loop."""
+    return await asyncio.to_thread(enqueue_scheduled_audit, business_id)
+
+
+def _interleave_by_tenant(business_ids: List[int]) -> List[int]:
     """
-    Run one cycle of the scheduler.
-    Checks for due audits and runs them.
+    Round-robin due businesses across owners so that an owner with many
+    businesses gets its turns spread through the cycle instead of in a block.
+    """
+    db = get_db_session()
+    try:
+        rows = db.query(Business.id, Business.owner_user_id).filter(
+            Business.id.in_(business_ids)
+        ).all()
+    finally:
+        db.close()
+    
+    by_owner: Dict[str, List[int]] = {}
+    for business_id, owner_id in rows:
+        key = f"user:{owner_id}" if owner_id else f"business:{business_id}"
+        by_owner.setdefault(key, []).append(business_id)
+    
+    queues = list(by_owner.values())
+    random.shuffle(queues)
+    
+    ordered: List[int] = []
+    while queues:
+        for queue in list(queues):
+            ordered.append(queue.pop(0))
+            if not queue:
+                queues.remove(queue)
+    return ordered
+
+
+def enqueue_due_audits(spread_seconds: int = SCHEDULER_JITTER_SECONDS) -> int:
     """
-    business_ids = get_businesses_due_for_audit()
+    Enqueue every due audit, with start times spread across spread_seconds.
+    
+    Each business gets an evenly spaced slot (in tenant round-robin order)
+    plus random jitter within its slot, so a day with hundreds of due
+    subscribers feeds the worker pool steadily instead of all at once.
+    Scheduled jobs run at SCHEDULED_AUDIT_PRIORITY so interactive audits
+    are still claimed first.
+    """
+    business_ids = _interleave_by_tenant(get_businesses_due_for_audit())
+    if not business_ids:
+        return 0
+    
+    now = datetime.utcnow()
+    slot = spread_seconds / len(business_ids) if spread_seconds > 0 else 0
     
-    for business_id in business_ids:
+    enqueued = 0
+    for i, business_id in enumerate(business_ids):
+        run_after = now + timedelta(seconds=slot * i + random.uniform(0, slot))
         try:
-            print(f"[SCHEDULER] Running scheduled audit for business {business_id}")
-            await run_scheduled_audit(business_id)
+            if enqueue_scheduled_audit(business_id, run_after=run_after):
+                enqueued += 1
+                print(f"[SCHEDULER] Enqueued scheduled audit for business {business_id} at {run_after:%H:%M:%S}")
         except Exception as e:
-            print(f"[SCHEDULER] Error running audit for business {business_id}: {e}")
+            print(f"[SCHEDULER] Error enqueueing audit for business {business_id}: {e}")
     
-    return len(business_ids)
+    return enqueued
+
+
+async def run_scheduler_cycle():
+    """
+    Run one cycle of the scheduler.
+    Enqueues due audits for the worker pool from a worker thread, so the
+    event loop is never blocked by scheduling or by the audits themselves.
+    """
+    return await asyncio.to_thread(enqueue_due_audits)
 
 
 async def scheduler_loop(interval_minutes: int = 60):
@@ -199,7 +284,7 @@ async def scheduler_loop(interval_minutes: int = 60):
         try:
             count = await run_scheduler_cycle()
             if count > 0:
-                print(f"[SCHEDULER] Processed {count} scheduled audits")
+                print(f"[SCHEDULER] Enqueued {count} scheduled audits")
         except Exception as e:
             print(f"[SCHEDULER] Error in scheduler cycle: {e}")
         
@@ -13,6 +13,8 @@ import httpx
 from bs4 import BeautifulSoup
 
 from services.config import OPENAI_API_KEY
+from services.provider_gateway import chat_completion
+from services.provider_cassette import cassette_transport
 
 logger = logging.getLogger(__name__)
 
@@ -53,7 +55,7 @@ def scrape_url_for_inference(url: str, timeout: float = 15.0) -> Dict[str, Any]:
             "User-Agent": "Mozilla/5.0 (compatible; EkkoScope/1.0; Business Analyzer)"
         }
         
-        with httpx.Client(timeout=timeout, follow_redirects=True) as client:
+        with httpx.Client(timeout=timeout, follow_redirects=True, transport=cassette_transport()) as client:
             response = client.get(url, headers=headers)
             
             if response.status_code != 200:
@@ -151,14 +153,15 @@ Return a JSON object with these exact fields:
 Be specific about the category - use industry terminology. If it's a local service business, include the city/region in service_area.
 Only return valid JSON, no markdown or explanation."""
 
-        response = client.chat.completions.create(
+        response = chat_completion(
+            client,
             model="gpt-4o-mini",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.2,
             max_tokens=500
         )
         
-        content = response.choices[0].message.content
+        content = response.text
         if not content:
             return _fallback_inference(scraped_data)
         raw = content.strip()
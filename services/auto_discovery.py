@@ -12,6 +12,8 @@ from typing import Dict, Any, List, Optional
 from bs4 import BeautifulSoup
 from openai import OpenAI
 
+from services.provider_gateway import chat_completion
+
 
 SERPER_API_KEY = os.getenv("SERPER_API_KEY", "")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
@@ -285,7 +287,8 @@ Address Candidates: {metadata.get('address_candidates', [])}
 Body Text Excerpt: {metadata.get('body_text', '')[:2000]}
 """
         
-        response = client.chat.completions.create(
+        response = chat_completion(
+            client,
             model="gpt-4o-mini",
             messages=[
                 {
@@ -312,7 +315,7 @@ Return ONLY valid JSON, no markdown."""
             max_tokens=600
         )
         
-        content = response.choices[0].message.content.strip()
+        content = response.text.strip()
         content = content.replace("```json", "").replace("```", "").strip()
         
         return json.loads(content)
@@ -410,7 +413,8 @@ async def find_competitors_fallback(
     try:
         client = OpenAI(api_key=OPENAI_API_KEY)
         
-        response = client.chat.completions.create(
+        response = chat_completion(
+            client,
             model="gpt-4o-mini",
             messages=[
                 {
@@ -432,7 +436,7 @@ Return ONLY valid JSON array, no markdown."""
             max_tokens=400
         )
         
-        content = response.choices[0].message.content.strip()
+        content = response.text.strip()
         content = content.replace("```json", "").replace("```", "").strip()
         competitors = json.loads(content)
         
@@ -0,0 +1,140 @@
+"""
+Content-addressed Blob Store for EkkoScope.
+Bulky audit data (every probe's raw_response, per-query multi-LLM results,
+the legacy per-query results and the Perplexity probe) is moved out of
+Audit.visibility_summary_json into zlib-compressed ContentBlob rows, keyed by
+the SHA-256 of the payload. The audit row keeps a slim summary that pages can
+parse cheaply. Pages that need the per-query data load it on demand with
+load_visibility_summary().
+"""
+
+import json
+import zlib
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, object_session
+
+from services.database import Audit, ContentBlob, get_db_session
+
+logger = logging.getLogger(__name__)
+
+# Summary keys that hold per-query or raw provider data
+DETAIL_KEYS = ("results", "perplexity_visibility", "multi_llm_visibility")
+# Parts of multi_llm_visibility kept in the slim summary
+MULTI_LLM_SLIM_KEYS = ("summary", "providers_used", "providers_skipped", "packing_agreement")
+
+_CACHE_SIZE = 32
+_cache_lock = threading.Lock()
+_json_cache: "OrderedDict[str, bytes]" = OrderedDict()
+
+
+def _blob_exists(db: Session, digest: str) -> bool:
+    return db.query(ContentBlob.digest).filter(ContentBlob.digest == digest).first() is not None
+
+
+def put_blob(db: Session, data: bytes) -> str:
+    """
+    Store bytes (compressed) if not already present; returns the digest.
+
+    The insert runs in a savepoint, so a worker that loses a race to store the
+    same payload treats the blob as stored without undoing the caller's
+    other pending changes.
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    if _blob_exists(db, digest):
+        return digest
+
+    stored = zlib.compress(data, 6)
+    try:
+        with db.begin_nested():
+            db.add(ContentBlob(
+                digest=digest,
+                codec="zlib",
+                raw_size=len(data),
+                stored_size=len(stored),
+                data=stored
+            ))
+    except IntegrityError:
+        logger.debug("Content blob %s was stored concurrently", digest)
+    return digest
+
+
+def get_blob(db: Session, digest: str) -> Optional[bytes]:
+    row = db.query(ContentBlob).filter(ContentBlob.digest == digest).first()
+    if row is None:
+        return None
+    return zlib.decompress(row.data) if row.codec == "zlib" else row.data
+
+
+def put_json(db: Session, obj: Any) -> str:
+    data = json.dumps(obj, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return put_blob(db, data)
+
+
+def get_json(db: Session, digest: str) -> Optional[Any]:
+    """
+    Load a JSON blob. Blobs are immutable, so recently used payloads stay
+    decompressed in memory; each call still returns a fresh object.
+    """
+    with _cache_lock:
+        data = _json_cache.get(digest)
+        if data is not None:
+            _json_cache.move_to_end(digest)
+
+    if data is None:
+        data = get_blob(db, digest)
+        if data is None:
+            logger.warning("Content blob %s is missing", digest)
+            return None
+        with _cache_lock:
+            _json_cache[digest] = data
+            while len(_json_cache) > _CACHE_SIZE:
+                _json_cache.popitem(last=False)
+    return json.loads(data)
+
+
+def store_visibility_summary(db: Session, audit: Audit, summary: Dict[str, Any]):
+    """
+    Save an audit's visibility summary, offloading the bulky parts to a blob.
+
+    The row keeps every top-level field except DETAIL_KEYS; of
+    multi_llm_visibility it keeps only the aggregate summary and provider lists.
+    """
+    details = {key: summary[key] for key in DETAIL_KEYS if summary.get(key) is not None}
+    slim = {key: value for key, value in summary.items() if key not in DETAIL_KEYS}
+
+    multi_llm = summary.get("multi_llm_visibility")
+    if isinstance(multi_llm, dict):
+        slim["multi_llm_visibility"] = {k: multi_llm[k] for k in MULTI_LLM_SLIM_KEYS if k in multi_llm}
+    slim["results_count"] = len(summary.get("results") or [])
+
+    audit.set_visibility_summary(slim)
+    audit.details_digest = put_json(db, details) if details else None
+
+
+def load_visibility_summary(audit: Audit, db: Optional[Session] = None) -> Optional[dict]:
+    """
+    Full visibility summary for an audit, with the offloaded details merged
+    back in. Audits saved before the blob store return their inline summary.
+    """
+    summary = audit.get_visibility_summary()
+    if summary is None or not audit.details_digest:
+        return summary
+
+    session = db or object_session(audit)
+    own_session = session is None
+    if own_session:
+        session = get_db_session()
+    try:
+        details = get_json(session, audit.details_digest) or {}
+    finally:
+        if own_session:
+            session.close()
+
+    summary.update(details)
+    return summary
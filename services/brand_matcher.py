@@ -0,0 +1,172 @@
+"""
+Brand Matcher for EkkoScope.
+One precompiled matcher per business decides whether a recommended brand is
+the target business. Every scoring path uses it: probe parsing, legacy
+scoring, EkkoBrain logging and the dashboards.
+
+A brand is the target when any of the following holds:
+- its normalized name contains the business name, or a multi-word alias,
+  as whole words (Aho-Corasick over the patterns)
+- its normalized name equals an alias (single-word aliases such as a first
+  word only count as exact matches, so "Best" does not flag "Best Buy")
+- its URL's domain is one of the business's domains, or the host contains
+  the business name with spaces removed
+- it shares two or more words with the business name including the first
+  word, or it is just that first word
+"""
+
+import re
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+def normalize_brand(name: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace."""
+    name = (name or "").lower().strip()
+    name = re.sub(r"[^\w\s]", "", name)
+    return re.sub(r"\s+", " ", name).strip()
+
+
+def extract_domain(url: str) -> str:
+    """Host of a URL or bare domain without scheme, www. or port."""
+    if not url:
+        return ""
+    url = url.lower().strip()
+    url = re.sub(r"^https?://", "", url)
+    url = re.sub(r"^www\.", "", url)
+    return url.split("/")[0].split(":")[0]
+
+
+class _AhoCorasick:
+    """Multi-pattern substring search; reports whether any pattern occurs."""
+
+    def __init__(self, patterns: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[bool] = [False]
+        for pattern in patterns:
+            self._add(pattern)
+        self._build()
+
+    def _add(self, pattern: str):
+        if not pattern:
+            return
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(False)
+            state = nxt
+        self._out[state] = True
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] or self._out[self._fail[nxt]]
+
+    def search(self, text: str) -> bool:
+        state = 0
+        for ch in text:
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            if self._out[state]:
+                return True
+        return False
+
+
+class BrandMatcher:
+    """
+    Precompiled target matcher for one business. Build it with
+    get_brand_matcher() so an audit reuses a single instance.
+    """
+
+    def __init__(
+        self,
+        business_name: str,
+        brand_aliases: Optional[Iterable[str]] = None,
+        domains: Optional[Iterable[str]] = None
+    ):
+        self.business_name = business_name or ""
+        self.name_norm = normalize_brand(self.business_name)
+        self.aliases: Set[str] = {normalize_brand(a) for a in (brand_aliases or []) if a}
+        self.aliases.discard("")
+        if self.name_norm:
+            self.aliases.add(self.name_norm)
+
+        self.domains: Set[str] = {extract_domain(d) for d in (domains or []) if d}
+        self.domains.discard("")
+        self.compact_name = self.name_norm.replace(" ", "")
+
+        self.name_tokens: Set[str] = set(self.name_norm.split())
+        self.primary_token = self.name_norm.split()[0] if self.name_norm else ""
+
+        # Patterns are padded with spaces so they only match whole words.
+        patterns = [f" {a} " for a in self.aliases if a == self.name_norm or " " in a]
+        self._automaton = _AhoCorasick(patterns)
+
+    def matches(self, brand_name: str, brand_url: Optional[str] = None) -> bool:
+        """True if a recommended brand (name and optional URL) is this business."""
+        norm = normalize_brand(brand_name)
+        if norm:
+            if norm in self.aliases:
+                return True
+            if self._automaton.search(f" {norm} "):
+                return True
+            tokens = set(norm.split())
+            overlap = tokens & self.name_tokens
+            if self.primary_token in overlap and (len(overlap) >= 2 or len(tokens) == 1):
+                return True
+
+        host = extract_domain(brand_url or "")
+        if host:
+            if host in self.domains:
+                return True
+            if len(self.compact_name) >= 4 and self.compact_name in host.replace("-", ""):
+                return True
+        return False
+
+    def find_position(self, recommended: Iterable[dict]) -> Optional[int]:
+        """1-based position of the first matching recommendation, or None."""
+        for i, rec in enumerate(recommended or []):
+            if not isinstance(rec, dict):
+                continue
+            if self.matches(rec.get("name") or "", rec.get("url")):
+                return i + 1
+        return None
+
+
+@lru_cache(maxsize=256)
+def _cached_matcher(business_name: str, aliases: Tuple[str, ...], domains: Tuple[str, ...]) -> BrandMatcher:
+    return BrandMatcher(business_name, aliases, domains)
+
+
+def get_brand_matcher(
+    business_name: str,
+    brand_aliases: Optional[Iterable[str]] = None,
+    domains: Optional[Iterable[str]] = None
+) -> BrandMatcher:
+    """Get the compiled matcher for a business (memoized per name/aliases/domains)."""
+    return _cached_matcher(
+        business_name or "",
+        tuple(sorted({a for a in (brand_aliases or []) if a})),
+        tuple(sorted({d for d in (domains or []) if d})),
+    )
+
+
+def get_business_matcher(business) -> BrandMatcher:
+    """Matcher for a Business row: its name, aliases and all its domains."""
+    return get_brand_matcher(business.name, business.get_brand_aliases(), business.get_all_domains())
@@ -0,0 +1,174 @@
+"""
+Cooperative Cancellation for EkkoScope audits.
+A CancellationToken is created per running audit and checked by the
+visibility hub, analysis stages and report builder between units of work.
+Stopping an audit cancels its token, which also fires callbacks that abort
+outstanding provider requests. The running audit's token is also kept in a
+contextvar (cancellation_scope) so the provider gateway can stop retrying
+and abort requests on the wire without every caller passing it down.
+"""
+
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+from services.database import Audit, get_db_session
+
+logger = logging.getLogger(__name__)
+
+CANCEL_POLL_SECONDS = 2.0
+
+_tokens_lock = threading.Lock()
+_tokens: Dict[int, "CancellationToken"] = {}
+_current_token: contextvars.ContextVar[Optional["CancellationToken"]] = contextvars.ContextVar(
+    "ekko_cancel_token", default=None
+)
+
+
+class AuditCancelled(Exception):
+    """Raised at a checkpoint when the audit's token has been cancelled."""
+    pass
+
+
+class CancellationToken:
+    """
+    Thread-safe, one-way cancellation flag with abort callbacks.
+    """
+
+    def __init__(self, audit_id: Optional[int] = None):
+        self.audit_id = audit_id
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self):
+        """Cancel the token and run every registered abort callback once."""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        logger.info("Cancellation requested for audit %s", self.audit_id)
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning("Cancellation callback failed: %s", e)
+
+    def add_callback(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """
+        Run callback on cancel (immediately if already cancelled).
+
+        Returns:
+            A function that unregisters the callback
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+
+                def _remove():
+                    with self._lock:
+                        if callback in self._callbacks:
+                            self._callbacks.remove(callback)
+                return _remove
+        callback()
+        return lambda: None
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise AuditCancelled(f"Audit {self.audit_id} was cancelled")
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until cancelled or timeout; returns True if cancelled."""
+        return self._event.wait(timeout)
+
+
+def check_cancelled(token: Optional[CancellationToken]):
+    """Checkpoint helper for code where the token is optional."""
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+def current_cancel_token() -> Optional[CancellationToken]:
+    """The token of the run this context belongs to, if any."""
+    return _current_token.get()
+
+
+@contextmanager
+def cancellation_scope(token: Optional[CancellationToken]) -> Iterator[Optional[CancellationToken]]:
+    """
+    Make token the current one for this context (and for work started from it
+    with contextvars.copy_context). A None token leaves the current one in place.
+    """
+    if token is None:
+        yield current_cancel_token()
+        return
+    reset = _current_token.set(token)
+    try:
+        yield token
+    finally:
+        _current_token.reset(reset)
+
+
+def _is_audit_stopped(audit_id: int) -> bool:
+    db = get_db_session()
+    try:
+        status = db.query(Audit.status).filter(Audit.id == audit_id).scalar()
+        return status == "stopped"
+    finally:
+        db.close()
+
+
+def open_audit_token(audit_id: int) -> CancellationToken:
+    """
+    Create and register the token for a running audit.
+
+    A watcher thread polls the audit's status every CANCEL_POLL_SECONDS, so a
+    stop issued from another process still cancels the run within seconds.
+    Call close_audit_token when the run finishes.
+    """
+    token = CancellationToken(audit_id)
+    with _tokens_lock:
+        _tokens[audit_id] = token
+
+    def _watch():
+        while not token.wait(CANCEL_POLL_SECONDS):
+            with _tokens_lock:
+                if _tokens.get(audit_id) is not token:
+                    return
+            try:
+                if _is_audit_stopped(audit_id):
+                    token.cancel()
+                    return
+            except Exception as e:
+                logger.warning("Cancellation watcher failed for audit %d: %s", audit_id, e)
+
+    threading.Thread(target=_watch, name=f"audit-cancel-{audit_id}", daemon=True).start()
+    return token
+
+
+def close_audit_token(audit_id: int):
+    """Unregister an audit's token (stops its watcher)."""
+    with _tokens_lock:
+        _tokens.pop(audit_id, None)
+
+
+def cancel_audit(audit_id: int) -> bool:
+    """
+    Cancel an audit running in this process.
+
+    Returns:
+        True if a live token was found
+    """
+    with _tokens_lock:
+        token = _tokens.get(audit_id)
+    if token is None:
+        return False
+    token.cancel()
+    return True
@@ -0,0 +1,146 @@
+"""
+Per-provider Circuit Breakers for EkkoScope.
+After CIRCUIT_FAILURE_THRESHOLD consecutive transient failures a provider's
+breaker opens and calls fail immediately with ProviderUnavailableError
+instead of each waiting out its own timeout. After CIRCUIT_RESET_SECONDS the
+breaker goes half-open and lets a single trial call through: success closes
+it, failure re-opens it for another window.
+"""
+
+import time
+import logging
+import threading
+from typing import Dict, Iterable
+
+from services.config import CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_SECONDS
+from services.metrics import MetricFamily, register_collector
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class ProviderUnavailableError(Exception):
+    """Raised instead of calling a provider whose circuit is open."""
+    pass
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker with half-open probing.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_seconds: float = 60.0):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.short_circuited = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def _current_state(self, now: float) -> str:
+        if self._state == OPEN and now - self._opened_at >= self.reset_seconds:
+            self._state = HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def is_open(self) -> bool:
+        """True while calls would be rejected (open and not yet due a trial)."""
+        return self.state == OPEN
+
+    def allow(self) -> bool:
+        """
+        Ask permission for one call. In half-open state only one trial call
+        is admitted until its outcome is recorded.
+        """
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.short_circuited += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self._state != CLOSED:
+                logger.info("Circuit for %s closed", self.name)
+            self._state = CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    logger.warning(
+                        "Circuit for %s opened after %d consecutive failures",
+                        self.name, self._failures
+                    )
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def abandon_trial(self):
+        """A call ended without an outcome (e.g. cancelled); free the half-open trial."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def check(self):
+        """Raise ProviderUnavailableError unless a call is allowed."""
+        if not self.allow():
+            raise ProviderUnavailableError(f"{self.name} circuit is open; skipping call")
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "state": self._current_state(time.monotonic()),
+                "consecutive_failures": self._failures,
+                "short_circuited": self.short_circuited,
+            }
+
+
+_breakers_lock = threading.Lock()
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """Get the process-wide breaker for a provider key."""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name, CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_SECONDS)
+            _breakers[name] = breaker
+        return breaker
+
+
+def all_circuit_breakers() -> Dict[str, CircuitBreaker]:
+    with _breakers_lock:
+        return dict(_breakers)
+
+
+def _breaker_metrics() -> Iterable[MetricFamily]:
+    state = MetricFamily("ekkoscope_circuit_open", "gauge", "1 while a provider circuit is open or half-open")
+    short = MetricFamily("ekkoscope_circuit_short_circuited_total", "counter", "Calls refused by an open circuit")
+    for name, breaker in sorted(all_circuit_breakers().items()):
+        snap = breaker.snapshot()
+        state.add(0 if snap["state"] == CLOSED else 1, provider=name)
+        short.add(snap["short_circuited"], provider=name)
+    yield state
+    yield short
+
+
+register_collector(_breaker_metrics)
@@ -4,7 +4,22 @@ Centralizes environment variable access and feature flags.
 """
 
 import os
-
+import json
+
+# Provider record/replay (services/provider_cassette.py): "record" saves
+# provider answers, Pinecone queries and site fetches to PROVIDER_CASSETTE_DIR;
+# "replay" serves them without network access. Replay fills in placeholder
+# API keys so every provider counts as configured.
+PROVIDER_CASSETTE_MODE = os.getenv("PROVIDER_CASSETTE_MODE", "off").lower()
+PROVIDER_CASSETTE_DIR = os.getenv("PROVIDER_CASSETTE_DIR", "data/cassettes")
+PROVIDER_REPLAY_LATENCY_MS = float(os.getenv("PROVIDER_REPLAY_LATENCY_MS", "0"))
+PROVIDER_REPLAY_JITTER_MS = float(os.getenv("PROVIDER_REPLAY_JITTER_MS", "0"))
+PROVIDER_REPLAY_ERROR_RATE = float(os.getenv("PROVIDER_REPLAY_ERROR_RATE", "0"))
+PROVIDER_REPLAY_RATE_LIMIT_RATE = float(os.getenv("PROVIDER_REPLAY_RATE_LIMIT_RATE", "0"))
+PROVIDER_REPLAY_SEED = int(os.getenv("PROVIDER_REPLAY_SEED", "0"))
+if PROVIDER_CASSETTE_MODE == "replay":
+    for _key in ("OPENAI_API_KEY", "PERPLEXITY_API_KEY", "GEMINI_API_KEY", "PINECONE_API_KEY"):
+        os.environ.setdefault(_key, "replay")
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
@@ -20,6 +35,124 @@ GEMINI_ENABLED = bool(GEMINI_API_KEY)
 
 MAX_VISIBILITY_QUERIES_PER_PROVIDER = int(os.getenv("MAX_VISIBILITY_QUERIES", "10"))
 
+PROVIDER_PROBE_CONCURRENCY = {
+    "openai_sim": int(os.getenv("OPENAI_PROBE_CONCURRENCY", "8")),
+    "perplexity_web": int(os.getenv("PERPLEXITY_PROBE_CONCURRENCY", "4")),
+    "gemini_sim": int(os.getenv("GEMINI_PROBE_CONCURRENCY", "6")),
+}
+
+# Per-provider API key limits. 0 disables a bucket. max_concurrency is the
+# AIMD ceiling; the governor halves it on 429s and grows it back on success.
+PROVIDER_RATE_LIMITS = {
+    "openai": {
+        "rpm": int(os.getenv("OPENAI_RPM", "500")),
+        "tpm": int(os.getenv("OPENAI_TPM", "200000")),
+        "max_concurrency": int(os.getenv("OPENAI_MAX_CONCURRENCY", "16")),
+    },
+    "openai_embeddings": {
+        "rpm": int(os.getenv("OPENAI_EMBED_RPM", "3000")),
+        "tpm": int(os.getenv("OPENAI_EMBED_TPM", "1000000")),
+        "max_concurrency": int(os.getenv("OPENAI_EMBED_MAX_CONCURRENCY", "8")),
+    },
+    "perplexity": {
+        "rpm": int(os.getenv("PERPLEXITY_RPM", "50")),
+        "tpm": int(os.getenv("PERPLEXITY_TPM", "0")),
+        "max_concurrency": int(os.getenv("PERPLEXITY_MAX_CONCURRENCY", "8")),
+    },
+    "gemini": {
+        "rpm": int(os.getenv("GEMINI_RPM", "300")),
+        "tpm": int(os.getenv("GEMINI_TPM", "1000000")),
+        "max_concurrency": int(os.getenv("GEMINI_MAX_CONCURRENCY", "16")),
+    },
+}
+PROVIDER_MAX_RETRIES = int(os.getenv("PROVIDER_MAX_RETRIES", "4"))
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "60"))
+
+# Hedging: duplicate a request still outstanding after the provider's p95,
+# spending at most HEDGE_BUDGET_FRACTION extra calls.
+HEDGING_ENABLED = os.getenv("HEDGING_ENABLED", "1") == "1"
+HEDGE_PROVIDERS = [p.strip() for p in os.getenv("HEDGE_PROVIDERS", "openai,perplexity,gemini").split(",") if p.strip()]
+HEDGE_BUDGET_FRACTION = float(os.getenv("HEDGE_BUDGET_FRACTION", "0.05"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_MIN_DELAY_SECONDS = float(os.getenv("HEDGE_MIN_DELAY_SECONDS", "2"))
+
+# Packed probes: scheduled audits send PACKED_PROBE_SIZE queries per OpenAI/
+# Gemini request, re-probing a sample unpacked to measure agreement.
+PACKED_PROBES_ENABLED = os.getenv("PACKED_PROBES_ENABLED", "0") == "1"
+PACKED_PROBE_SIZE = int(os.getenv("PACKED_PROBE_SIZE", "5"))
+PACKED_AGREEMENT_SAMPLE_RATE = float(os.getenv("PACKED_AGREEMENT_SAMPLE_RATE", "0.2"))
+
+# Adaptive sampling: re-ask each visibility query (between MIN and MAX times)
+# until the Wilson interval of its found-rate is decided at CONFIDENCE.
+ADAPTIVE_SAMPLING_ENABLED = os.getenv("ADAPTIVE_SAMPLING_ENABLED", "0") == "1"
+ADAPTIVE_SAMPLING_MIN_SAMPLES = int(os.getenv("ADAPTIVE_SAMPLING_MIN_SAMPLES", "3"))
+ADAPTIVE_SAMPLING_MAX_SAMPLES = int(os.getenv("ADAPTIVE_SAMPLING_MAX_SAMPLES", "8"))
+ADAPTIVE_SAMPLING_CONFIDENCE = float(os.getenv("ADAPTIVE_SAMPLING_CONFIDENCE", "0.9"))
+ADAPTIVE_SAMPLING_MAX_HALF_WIDTH = float(os.getenv("ADAPTIVE_SAMPLING_MAX_HALF_WIDTH", "0.2"))
+
+ANALYSIS_SINGLE_PASS = os.getenv("ANALYSIS_SINGLE_PASS", "1") == "1"
+ANALYSIS_STAGE_WORKERS = int(os.getenv("ANALYSIS_STAGE_WORKERS", "4"))
+
+AUDIT_WORKER_COUNT = int(os.getenv("AUDIT_WORKER_COUNT", "2"))
+AUDIT_JOB_LEASE_SECONDS = int(os.getenv("AUDIT_JOB_LEASE_SECONDS", "300"))
+AUDIT_JOB_HEARTBEAT_SECONDS = int(os.getenv("AUDIT_JOB_HEARTBEAT_SECONDS", "60"))
+AUDIT_JOB_MAX_ATTEMPTS = int(os.getenv("AUDIT_JOB_MAX_ATTEMPTS", "3"))
+AUDIT_JOB_RETRY_BASE_SECONDS = int(os.getenv("AUDIT_JOB_RETRY_BASE_SECONDS", "60"))
+AUDIT_JOB_POLL_SECONDS = float(os.getenv("AUDIT_JOB_POLL_SECONDS", "2"))
+AUDIT_JOB_MAX_PER_TENANT = int(os.getenv("AUDIT_JOB_MAX_PER_TENANT", "1"))
+
+SCHEDULED_AUDIT_PRIORITY = int(os.getenv("SCHEDULED_AUDIT_PRIORITY", "-1"))
+SCHEDULER_JITTER_SECONDS = int(os.getenv("SCHEDULER_JITTER_SECONDS", "3600"))
+
+SHARED_PROBES_ENABLED = os.getenv("SHARED_PROBES_ENABLED", "1") == "1"
+SHARED_PROBE_TTL_HOURS = float(os.getenv("SHARED_PROBE_TTL_HOURS", "24"))
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "1") == "1"
+RESPONSE_CACHE_MAX_MB = float(os.getenv("RESPONSE_CACHE_MAX_MB", "200"))
+# Per-provider freshness windows; 0 disables caching for that provider.
+# Perplexity searches the live web, so its answers go stale fastest.
+RESPONSE_CACHE_TTL_HOURS = {
+    "openai": float(os.getenv("OPENAI_CACHE_TTL_HOURS", "24")),
+    "openai_embeddings": float(os.getenv("OPENAI_EMBED_CACHE_TTL_HOURS", "720")),
+    "perplexity": float(os.getenv("PERPLEXITY_CACHE_TTL_HOURS", "6")),
+    "gemini": float(os.getenv("GEMINI_CACHE_TTL_HOURS", "24")),
+}
+
+# Cost ledger prices in USD per million tokens: (input, output). Models
+# match by longest prefix. PROVIDER_PRICES_JSON overrides or adds entries,
+# e.g. {"gpt-4o": [2.5, 10]}.
+PROVIDER_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "text-embedding-3-small": (0.02, 0.0),
+    "text-embedding-3-large": (0.13, 0.0),
+    "sonar-pro": (3.00, 15.00),
+    "sonar": (1.00, 1.00),
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-1.5-flash": (0.075, 0.30),
+}
+PROVIDER_PRICES.update({
+    model: tuple(price) for model, price in json.loads(os.getenv("PROVIDER_PRICES_JSON") or "{}").items()
+})
+
+# Provider spend caps per plan in USD: (daily, monthly); 0 means no cap.
+# Expensive audit stages do not start once a business is over its cap.
+# SPEND_CAPS_JSON overrides entries, e.g. {"ongoing": [5, 60]}.
+SPEND_CAPS_ENABLED = os.getenv("SPEND_CAPS_ENABLED", "1") == "1"
+SPEND_CAPS = {
+    "free": (2.0, 5.0),
+    "snapshot": (10.0, 25.0),
+    "report": (10.0, 25.0),
+    "activation": (10.0, 25.0),
+    "standard": (20.0, 100.0),
+    "ongoing": (20.0, 100.0),
+    "autofix": (50.0, 300.0),
+}
+SPEND_CAPS.update({
+    plan: tuple(caps) for plan, caps in json.loads(os.getenv("SPEND_CAPS_JSON") or "{}").items()
+})
+
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "ekkobrain")
 PINECONE_ENABLED = bool(PINECONE_API_KEY)
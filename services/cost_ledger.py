@@ -0,0 +1,228 @@
+"""
+Provider Cost Ledger for EkkoScope.
+Every provider reply that reaches the API (response cache hits and cassette
+replays are free) is priced from PROVIDER_PRICES and recorded in the
+provider_usage ledger, keyed by audit, business, provider and model. The
+provider gateway records usage for all chat and embedding calls.
+
+Audit runs open a usage_scope(): calls inside it are tallied in memory per
+provider/model and written as a handful of rows when the scope closes. Calls
+outside any scope are written straight away without audit or business ids.
+
+check_spend_cap() compares a business's spend today and this month, including
+the open scope's unwritten usage, with its plan's SPEND_CAPS. The audit
+pipeline runs it before each expensive stage.
+"""
+
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from services.config import PROVIDER_PRICES, SPEND_CAPS, SPEND_CAPS_ENABLED
+from services.database import ProviderUsage, get_db_session
+
+logger = logging.getLogger(__name__)
+
+_current_scope: contextvars.ContextVar[Optional["UsageScope"]] = contextvars.ContextVar("ekko_usage_scope", default=None)
+_unpriced_models = set()
+
+
+class SpendCapExceeded(Exception):
+    """Raised instead of starting an expensive stage for a business over its spend cap."""
+    pass
+
+
+def price_for(model: Optional[str]) -> Tuple[float, float]:
+    """(input, output) USD per million tokens; longest matching model prefix wins."""
+    model = (model or "").lower()
+    best = None
+    for prefix in PROVIDER_PRICES:
+        if model.startswith(prefix) and (best is None or len(prefix) > len(best)):
+            best = prefix
+    if best is None:
+        if model not in _unpriced_models:
+            _unpriced_models.add(model)
+            logger.warning("No price configured for model %r; recording usage at $0", model)
+        return 0.0, 0.0
+    return PROVIDER_PRICES[best]
+
+
+def estimate_cost(model: Optional[str], prompt_tokens: int, completion_tokens: int) -> float:
+    input_price, output_price = price_for(model)
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+
+class UsageScope:
+    """In-memory usage tally for one audit run, shared by its worker threads."""
+
+    def __init__(self, audit_id: Optional[int] = None, business_id: Optional[int] = None):
+        self.audit_id = audit_id
+        self.business_id = business_id
+        self._lock = threading.Lock()
+        # (provider, model) -> [calls, prompt_tokens, completion_tokens, cost_usd]
+        self._totals: Dict[Tuple[str, str], List[float]] = {}
+
+    def add(self, provider: str, model: str, prompt_tokens: int, completion_tokens: int, cost: float):
+        with self._lock:
+            totals = self._totals.setdefault((provider, model), [0, 0, 0, 0.0])
+            totals[0] += 1
+            totals[1] += prompt_tokens
+            totals[2] += completion_tokens
+            totals[3] += cost
+
+    def cost(self) -> float:
+        with self._lock:
+            return sum(totals[3] for totals in self._totals.values())
+
+    def rows(self) -> List[Dict[str, Any]]:
+        now = datetime.utcnow()
+        with self._lock:
+            return [
+                {
+                    "audit_id": self.audit_id,
+                    "business_id": self.business_id,
+                    "provider": provider,
+                    "model": model,
+                    "calls": int(calls),
+                    "prompt_tokens": int(prompt),
+                    "completion_tokens": int(completion),
+                    "cost_usd": round(cost, 6),
+                    "created_at": now,
+                }
+                for (provider, model), (calls, prompt, completion, cost) in self._totals.items()
+            ]
+
+
+def _write_rows(rows: List[Dict[str, Any]]):
+    if not rows:
+        return
+    db = get_db_session()
+    try:
+        db.execute(ProviderUsage.__table__.insert(), rows)
+        db.commit()
+    except Exception as e:
+        logger.warning("Writing provider usage failed (non-fatal): %s", e)
+        db.rollback()
+    finally:
+        db.close()
+
+
+@contextmanager
+def usage_scope(audit_id: Optional[int] = None, business_id: Optional[int] = None) -> Iterator[UsageScope]:
+    """Attribute provider usage in this context to an audit/business; written on exit."""
+    scope = UsageScope(audit_id, business_id)
+    token = _current_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _current_scope.reset(token)
+        _write_rows(scope.rows())
+
+
+def record_usage(provider: str, model: Optional[str], prompt_tokens: int, completion_tokens: int) -> float:
+    """Price one provider call and add it to the ledger; returns its cost in USD."""
+    model = model or ""
+    cost = estimate_cost(model, prompt_tokens, completion_tokens)
+    scope = _current_scope.get()
+    if scope is not None:
+        scope.add(provider, model, prompt_tokens, completion_tokens, cost)
+    else:
+        unscoped = UsageScope()
+        unscoped.add(provider, model, prompt_tokens, completion_tokens, cost)
+        _write_rows(unscoped.rows())
+    return cost
+
+
+def get_business_spend(db: Session, business_id: int) -> Tuple[float, float]:
+    """(today, this month) spend in USD for a business, UTC calendar periods."""
+    now = datetime.utcnow()
+    day_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    month_start = day_start.replace(day=1)
+    today, month = db.query(
+        func.coalesce(func.sum(ProviderUsage.cost_usd).filter(ProviderUsage.created_at >= day_start), 0.0),
+        func.coalesce(func.sum(ProviderUsage.cost_usd), 0.0)
+    ).filter(
+        ProviderUsage.business_id == business_id,
+        ProviderUsage.created_at >= month_start
+    ).one()
+    return float(today or 0.0), float(month or 0.0)
+
+
+def get_audit_cost(db: Session, audit_id: int) -> Dict[str, Any]:
+    """Ledger totals for one audit, overall and per provider/model."""
+    rows = db.query(
+        ProviderUsage.provider,
+        ProviderUsage.model,
+        func.sum(ProviderUsage.calls),
+        func.sum(ProviderUsage.prompt_tokens),
+        func.sum(ProviderUsage.completion_tokens),
+        func.sum(ProviderUsage.cost_usd)
+    ).filter(ProviderUsage.audit_id == audit_id).group_by(ProviderUsage.provider, ProviderUsage.model).all()
+
+    providers = [
+        {
+            "provider": provider,
+            "model": model,
+            "calls": int(calls or 0),
+            "prompt_tokens": int(prompt or 0),
+            "completion_tokens": int(completion or 0),
+            "cost_usd": round(float(cost or 0.0), 4),
+        }
+        for provider, model, calls, prompt, completion, cost in rows
+    ]
+    providers.sort(key=lambda p: -p["cost_usd"])
+    return {
+        "total_usd": round(sum(p["cost_usd"] for p in providers), 4),
+        "calls": sum(p["calls"] for p in providers),
+        "prompt_tokens": sum(p["prompt_tokens"] for p in providers),
+        "completion_tokens": sum(p["completion_tokens"] for p in providers),
+        "providers": providers,
+    }
+
+
+def check_spend_cap(business_id: int, plan: Optional[str], stage: str = ""):
+    """
+    Raise SpendCapExceeded if the business has reached its plan's daily or
+    monthly cap. Usage of the current audit that is not yet written counts.
+    """
+    if not SPEND_CAPS_ENABLED:
+        return
+    daily_cap, monthly_cap = SPEND_CAPS.get(plan or "free", (0.0, 0.0))
+    if not daily_cap and not monthly_cap:
+        return
+
+    db = get_db_session()
+    try:
+        today, month = get_business_spend(db, business_id)
+    finally:
+        db.close()
+
+    scope = _current_scope.get()
+    if scope is not None and scope.business_id == business_id:
+        pending = scope.cost()
+        today += pending
+        month += pending
+
+    where = f" before stage '{stage}'" if stage else ""
+    if daily_cap and today >= daily_cap:
+        raise SpendCapExceeded(
+            f"Daily provider spend cap reached{where}: ${today:.2f} of ${daily_cap:.2f} ({plan} plan)"
+        )
+    if monthly_cap and month >= monthly_cap:
+        raise SpendCapExceeded(
+            f"Monthly provider spend cap reached{where}: ${month:.2f} of ${monthly_cap:.2f} ({plan} plan)"
+        )
+
+
+def spend_cap_guard(business: Optional[Any]) -> Optional[Callable[[Any], None]]:
+    """Stage guard for run_stage_graph that enforces the business's spend cap."""
+    if business is None:
+        return None
+    business_id, plan = business.id, business.plan
+    return lambda stage: check_spend_cap(business_id, plan, stage.name)
@@ -7,11 +7,13 @@ import os
 import json
 from datetime import datetime
 from typing import Optional, List
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, DateTime, Text, ForeignKey
+from sqlalchemy import create_engine, event, func, Column, Integer, Float, String, Boolean, DateTime, Text, LargeBinary, ForeignKey, UniqueConstraint, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship, Session
 import bcrypt
 
+from services.metrics import DB_CONNECTIONS_IN_USE, MetricFamily, register_collector
+
 SQLITE_DATABASE_PATH = "ekkoscope.db"
 DATABASE_URL = f"sqlite:///./{SQLITE_DATABASE_PATH}"
 
@@ -20,6 +22,18 @@ engine = create_engine(
     connect_args={"check_same_thread": False}
 )
 
+
+
+@event.listens_for(engine, "checkout")
+def _count_checkout(dbapi_connection, connection_record, connection_proxy):
+    DB_CONNECTIONS_IN_USE.inc()
+
+
+@event.listens_for(engine, "checkin")
+def _count_checkin(dbapi_connection, connection_record):
+    DB_CONNECTIONS_IN_USE.dec()
+
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -113,6 +127,13 @@ class Business(Base):
     first_report_generated = Column(Boolean, default=False)  # True when first report completes for biweekly
     created_at = Column(DateTime, default=datetime.utcnow)
     
+    # Projection of the business's audits for list pages; kept current by
+    # refresh_business_projection() and the Audit insert/delete listeners.
+    latest_audit_id = Column(Integer, nullable=True)
+    latest_visibility_score = Column(Float, nullable=True)
+    last_scan_at = Column(DateTime, nullable=True)
+    audit_count = Column(Integer, default=0)
+    
     owner = relationship("User", back_populates="businesses")
     audits = relationship("Audit", back_populates="business", order_by="desc(Audit.created_at)")
     purchases = relationship("Purchase", back_populates="business")
@@ -160,15 +181,20 @@ class Business(Base):
         domains.extend(self.get_extra_domains())
         return [d for d in domains if d]
     
+    def get_brand_aliases(self) -> List[str]:
+        """Names that identify this business in AI answers."""
+        brand_aliases = [self.name]
+        name_parts = self.name.split()
+        if len(name_parts) > 1:
+            brand_aliases.append(name_parts[0])
+        return brand_aliases
+    
     def to_tenant_config(self) -> dict:
         """Convert Business to tenant_config format for existing analysis logic."""
         regions = self.get_regions()
         categories = self.get_categories()
         
-        brand_aliases = [self.name]
-        name_parts = self.name.split()
-        if len(name_parts) > 1:
-            brand_aliases.append(name_parts[0])
+        brand_aliases = self.get_brand_aliases()
         
         geo_focus = regions if regions else ["United States"]
         
@@ -206,12 +232,15 @@ class Audit(Base):
     completed_at = Column(DateTime, nullable=True)
     remediation_result = Column(Text, nullable=True)
     fixed_report_path = Column(String(500), nullable=True)
+    details_digest = Column(String(64), nullable=True)  # ContentBlob with the bulky visibility data
+    trace_json = Column(Text, nullable=True)  # Span trace of the last run (see services/tracing)
     
     business = relationship("Business", back_populates="audits")
     
     audit_queries = relationship("AuditQuery", back_populates="audit", cascade="all, delete-orphan")
     page_blueprints = relationship("PageBlueprint", back_populates="audit", cascade="all, delete-orphan")
     roadmap_tasks = relationship("RoadmapTask", back_populates="audit", cascade="all, delete-orphan")
+    aggregate = relationship("AuditAggregate", uselist=False, cascade="all, delete-orphan")
     
     def get_visibility_summary(self) -> Optional[dict]:
         if not self.visibility_summary_json:
@@ -222,7 +251,20 @@ class Audit(Base):
             return None
     
     def set_visibility_summary(self, data: dict):
+        """Store an inline summary; clears any offloaded details (see blob_store)."""
         self.visibility_summary_json = json.dumps(data)
+        self.details_digest = None
+    
+    def get_visibility_score(self) -> Optional[float]:
+        """Headline visibility score (percent) from the stored summary."""
+        summary = self.get_visibility_summary()
+        if not summary:
+            return None
+        score = summary.get('visibility_score', summary.get('overall_visibility', summary.get('overall_target_percent')))
+        try:
+            return float(score) if score is not None else None
+        except (TypeError, ValueError):
+            return None
     
     def get_suggestions(self) -> Optional[dict]:
         if not self.suggestions_json:
@@ -235,6 +277,17 @@ class Audit(Base):
     def set_suggestions(self, data: dict):
         self.suggestions_json = json.dumps(data)
     
+    def get_trace(self) -> Optional[dict]:
+        if not self.trace_json:
+            return None
+        try:
+            return json.loads(self.trace_json)
+        except:
+            return None
+    
+    def set_trace(self, data: dict):
+        self.trace_json = json.dumps(data, separators=(",", ":"))
+    
     @property
     def report_path(self) -> Optional[str]:
         """Alias for pdf_path for compatibility."""
@@ -245,6 +298,171 @@ class Audit(Base):
         self.pdf_path = value
 
 
+@event.listens_for(Audit, "after_insert")
+def _count_inserted_audit(mapper, connection, target):
+    connection.execute(
+        Business.__table__.update()
+        .where(Business.__table__.c.id == target.business_id)
+        .values(audit_count=func.coalesce(Business.__table__.c.audit_count, 0) + 1)
+    )
+
+
+@event.listens_for(Audit, "after_delete")
+def _count_deleted_audit(mapper, connection, target):
+    connection.execute(
+        Business.__table__.update()
+        .where(Business.__table__.c.id == target.business_id)
+        .values(audit_count=func.max(func.coalesce(Business.__table__.c.audit_count, 0) - 1, 0))
+    )
+
+
+def refresh_business_projection(db: Session, business_id: int):
+    """
+    Recompute a business's latest-audit projection (latest completed audit,
+    its score and scan time, and audit count). Call after an audit completes
+    or is deleted; the caller commits.
+    """
+    business = db.query(Business).filter(Business.id == business_id).first()
+    if business is None:
+        return
+    db.flush()
+    latest = (
+        db.query(Audit)
+        .filter(Audit.business_id == business_id, Audit.status == "done")
+        .order_by(func.coalesce(Audit.completed_at, Audit.created_at).desc(), Audit.id.desc())
+        .first()
+    )
+    business.latest_audit_id = latest.id if latest else None
+    business.latest_visibility_score = latest.get_visibility_score() if latest else None
+    business.last_scan_at = (latest.completed_at or latest.created_at) if latest else None
+    business.audit_count = db.query(func.count(Audit.id)).filter(Audit.business_id == business_id).scalar() or 0
+
+
+class AuditJob(Base):
+    """
+    Durable queue entry for running an audit outside the web request.
+    Workers claim jobs with a lease (claim_expires_at) that they extend via
+    heartbeats; a lease that lapses makes the job claimable again.
+    """
+    __tablename__ = "audit_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(30), default="audit", nullable=False)
+    audit_id = Column(Integer, ForeignKey("audits.id"), nullable=False, index=True)
+    business_id = Column(Integer, ForeignKey("businesses.id"), nullable=False, index=True)
+    tenant_key = Column(String(50), nullable=True, index=True)
+    status = Column(String(20), default="queued", index=True)
+    priority = Column(Integer, default=0)
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=3)
+    run_after = Column(DateTime, default=datetime.utcnow, index=True)
+    claimed_by = Column(String(100), nullable=True)
+    claim_expires_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+
+class AuditCheckpoint(Base):
+    """
+    Persisted output of one audit pipeline stage, so a retry or resume of the
+    same audit can skip stages that already completed.
+    """
+    __tablename__ = "audit_checkpoints"
+    __table_args__ = (
+        UniqueConstraint("audit_id", "stage", name="uq_audit_checkpoint_stage"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    audit_id = Column(Integer, ForeignKey("audits.id"), nullable=False, index=True)
+    stage = Column(String(50), nullable=False)
+    payload_json = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class AuditAggregate(Base):
+    """
+    Dashboard aggregates for a completed audit, materialized once from its
+    AuditQuery x QueryVisibilityResult rows (completed audits never change).
+    """
+    __tablename__ = "audit_aggregates"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    audit_id = Column(Integer, ForeignKey("audits.id"), nullable=False, unique=True, index=True)
+    total_queries = Column(Integer, default=0)
+    total_probes = Column(Integer, default=0)
+    target_hits = Column(Integer, default=0)
+    provider_stats_json = Column(Text, nullable=True)
+    intent_stats_json = Column(Text, nullable=True)
+    competitor_counts_json = Column(Text, nullable=True)
+    missing_queries_json = Column(Text, nullable=True)
+    query_rows_json = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    def _load(self, value: Optional[str], default):
+        if not value:
+            return default
+        try:
+            return json.loads(value)
+        except:
+            return default
+    
+    def get_provider_stats(self) -> dict:
+        return self._load(self.provider_stats_json, {})
+    
+    def get_intent_stats(self) -> dict:
+        return self._load(self.intent_stats_json, {})
+    
+    def get_competitor_counts(self) -> List[dict]:
+        return self._load(self.competitor_counts_json, [])
+    
+    def get_missing_queries(self) -> List[dict]:
+        return self._load(self.missing_queries_json, [])
+    
+    def get_query_rows(self) -> List[dict]:
+        return self._load(self.query_rows_json, [])
+
+
+class ContentBlob(Base):
+    """
+    Compressed, content-addressed storage for bulky payloads (raw provider
+    answers, per-query visibility data). Rows are immutable and keyed by the
+    SHA-256 of the uncompressed bytes, so identical payloads are stored once.
+    """
+    __tablename__ = "content_blobs"
+    
+    digest = Column(String(64), primary_key=True)
+    codec = Column(String(10), default="zlib", nullable=False)
+    raw_size = Column(Integer, default=0)
+    stored_size = Column(Integer, default=0)
+    data = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ProviderUsage(Base):
+    """
+    Cost ledger: token usage and priced cost of provider calls. Rows keep
+    plain audit/business ids (no foreign keys) so spend history survives
+    audit and business deletes.
+    """
+    __tablename__ = "provider_usage"
+    __table_args__ = (
+        Index("ix_provider_usage_business_created", "business_id", "created_at"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    audit_id = Column(Integer, nullable=True, index=True)
+    business_id = Column(Integer, nullable=True)
+    provider = Column(String(30), nullable=False)
+    model = Column(String(100), nullable=True)
+    calls = Column(Integer, default=1)
+    prompt_tokens = Column(Integer, default=0)
+    completion_tokens = Column(Integer, default=0)
+    cost_usd = Column(Float, default=0.0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
 class AuditQuery(Base):
     """Normalized queries from an audit with intent classification."""
     __tablename__ = "audit_queries"
@@ -278,6 +496,50 @@ class QueryVisibilityResult(Base):
     audit_query = relationship("AuditQuery", back_populates="visibility_results")
 
 
+class SharedProbeResult(Base):
+    """
+    Cross-tenant cache of business-agnostic visibility probe answers.
+    Keyed by provider, model, normalized query, region set and prompt version;
+    target detection runs per tenant against the stored raw answer.
+    """
+    __tablename__ = "shared_probe_results"
+    __table_args__ = (
+        UniqueConstraint("provider", "model", "query_norm", "regions_key", "prompt_version", name="uq_shared_probe_key"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    provider = Column(String(50), nullable=False)
+    model = Column(String(100), nullable=False)
+    query_norm = Column(String(500), nullable=False, index=True)
+    regions_key = Column(String(500), nullable=False)
+    prompt_version = Column(String(20), nullable=False)
+    raw_response = Column(Text, nullable=False)
+    hit_count = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+class ProviderResponseCache(Base):
+    """
+    Persistent cache of provider responses, keyed by a fingerprint of
+    provider, model, temperature and the request messages.
+    Entries expire per provider TTL and are evicted least-recently-used
+    once the cache exceeds its size budget.
+    """
+    __tablename__ = "provider_response_cache"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    cache_key = Column(String(64), unique=True, nullable=False, index=True)
+    provider = Column(String(50), nullable=False, index=True)
+    model = Column(String(100), nullable=True)
+    temperature = Column(String(20), nullable=True)
+    reply_json = Column(Text, nullable=False)
+    size_bytes = Column(Integer, default=0)
+    hit_count = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    last_accessed_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
 class PageBlueprint(Base):
     """Page blueprints generated by Genius Mode - stored for EkkoBrain pattern learning."""
     __tablename__ = "page_blueprints"
@@ -553,6 +815,33 @@ def generate_default_queries(
     )
 
 
+def _backfill_business_projections(conn):
+    """One-time fill of the businesses projection columns from existing audits."""
+    from sqlalchemy import text
+    conn.execute(text(
+        "UPDATE businesses SET audit_count = "
+        "(SELECT COUNT(*) FROM audits WHERE audits.business_id = businesses.id)"
+    ))
+    rows = conn.execute(text(
+        "SELECT id, business_id, visibility_summary_json, COALESCE(completed_at, created_at) AS scanned_at "
+        "FROM audits WHERE status = 'done' ORDER BY scanned_at, id"
+    )).fetchall()
+    latest_by_business = {}
+    for row in rows:
+        latest_by_business[row[1]] = row
+    for business_id, row in latest_by_business.items():
+        score = Audit(visibility_summary_json=row[2]).get_visibility_score()
+        conn.execute(
+            text(
+                "UPDATE businesses SET latest_audit_id = :audit_id, latest_visibility_score = :score, "
+                "last_scan_at = :scanned_at WHERE id = :business_id"
+            ),
+            {"audit_id": row[0], "score": score, "scanned_at": row[3], "business_id": business_id}
+        )
+    conn.commit()
+    print(f"Migration: Backfilled latest-audit projection for {len(latest_by_business)} businesses")
+
+
 def migrate_db():
     """Run migrations to add new columns to existing tables."""
     from sqlalchemy import text
@@ -585,6 +874,20 @@ def migrate_db():
             conn.commit()
             print("Migration: Added 'first_report_generated' column to businesses table")
         
+        if "audit_count" not in columns:
+            conn.execute(text("ALTER TABLE businesses ADD COLUMN latest_audit_id INTEGER"))
+            conn.execute(text("ALTER TABLE businesses ADD COLUMN latest_visibility_score FLOAT"))
+            conn.execute(text("ALTER TABLE businesses ADD COLUMN last_scan_at DATETIME"))
+            conn.execute(text("ALTER TABLE businesses ADD COLUMN audit_count INTEGER DEFAULT 0"))
+            conn.commit()
+            print("Migration: Added latest-audit projection columns to businesses table")
+            _backfill_business_projections(conn)
+        
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_businesses_created_at_id ON businesses (created_at, id)"
+        ))
+        conn.commit()
+        
         result = conn.execute(text("PRAGMA table_info(audit_queries)"))
         aq_columns = [row[1] for row in result.fetchall()]
         
@@ -605,6 +908,27 @@ def migrate_db():
             conn.execute(text("ALTER TABLE query_visibility_results ADD COLUMN prominence_score INTEGER DEFAULT 0"))
             conn.commit()
             print("Migration: Added 'prominence_score' column to query_visibility_results table")
+        
+        result = conn.execute(text("PRAGMA table_info(audits)"))
+        audit_columns = [row[1] for row in result.fetchall()]
+        
+        if "details_digest" not in audit_columns:
+            conn.execute(text("ALTER TABLE audits ADD COLUMN details_digest VARCHAR(64)"))
+            conn.commit()
+            print("Migration: Added 'details_digest' column to audits table")
+        
+        if "trace_json" not in audit_columns:
+            conn.execute(text("ALTER TABLE audits ADD COLUMN trace_json TEXT"))
+            conn.commit()
+            print("Migration: Added 'trace_json' column to audits table")
+        
+        result = conn.execute(text("PRAGMA table_info(audit_jobs)"))
+        job_columns = [row[1] for row in result.fetchall()]
+        
+        if job_columns and "tenant_key" not in job_columns:
+            conn.execute(text("ALTER TABLE audit_jobs ADD COLUMN tenant_key VARCHAR(50)"))
+            conn.commit()
+            print("Migration: Added 'tenant_key' column to audit_jobs table")
 
 
 def init_db():
@@ -625,3 +949,18 @@ def get_db():
 def get_db_session() -> Session:
     """Get a new database session directly."""
     return SessionLocal()
+
+
+def _audit_status_metrics():
+    db = SessionLocal()
+    try:
+        rows = db.query(Audit.status, func.count(Audit.id)).group_by(Audit.status).all()
+    finally:
+        db.close()
+    family = MetricFamily("ekkoscope_audits", "gauge", "Audits by status")
+    for status, count in sorted(rows, key=lambda row: row[0] or ""):
+        family.add(count, status=status or "")
+    yield family
+
+
+register_collector(_audit_status_metrics)
@@ -9,6 +9,8 @@ import uuid
 import logging
 from typing import List, Dict, Any, Optional
 
+from .provider_gateway import create_embeddings
+from .provider_cassette import is_replaying, wrap_pinecone_index
 from .config import (
     PINECONE_API_KEY, 
     PINECONE_INDEX_NAME, 
@@ -37,6 +39,12 @@ def init_ekkobrain_index():
         _initialized = True
         return
     
+    if is_replaying():
+        index = wrap_pinecone_index(None, PINECONE_INDEX_NAME)
+        logger.info("EkkoBrain serving Pinecone queries from the replay cassette")
+        _initialized = True
+        return
+    
     try:
         from pinecone import Pinecone
         
@@ -49,7 +57,7 @@ def init_ekkobrain_index():
             _initialized = True
             return
         
-        index = pc.Index(PINECONE_INDEX_NAME)
+        index = wrap_pinecone_index(pc.Index(PINECONE_INDEX_NAME), PINECONE_INDEX_NAME)
         logger.info("EkkoBrain Pinecone connected to index: %s", PINECONE_INDEX_NAME)
         _initialized = True
         
@@ -71,11 +79,12 @@ def embed_text(text: str) -> Optional[List[float]]:
         from openai import OpenAI
         
         client = OpenAI(api_key=OPENAI_API_KEY)
-        response = client.embeddings.create(
+        response = create_embeddings(
+            client,
             model=EKKOBRAIN_EMBED_MODEL,
             input=text[:8000],
         )
-        return response.data[0].embedding
+        return response.embeddings[0]
         
     except Exception as e:
         logger.warning("Error generating EkkoBrain embedding: %s", e)
@@ -9,12 +9,14 @@ import logging
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from .database import (
     Business, Audit, AuditQuery, QueryVisibilityResult,
     PageBlueprint, RoadmapTask, derive_region_group
 )
+from .brand_matcher import get_business_matcher
 from .ekkobrain_pinecone import (
     upsert_patterns, embed_text, generate_pattern_id, is_ekkobrain_enabled
 )
@@ -170,86 +172,34 @@ def _log_queries_to_db(
     visibility_data: Optional[Dict[str, Any]],
     region_group: str
 ):
-    """Log queries and visibility results to database."""
+    """
+    Log queries and visibility results to database.
+    
+    Rows are built in memory first and written with one executemany per
+    table; query IDs are read back in a single select so the visibility
+    results can reference them.
+    """
     visibility_by_query = {}
     if visibility_data and "queries" in visibility_data:
         for q in visibility_data["queries"]:
             query_text = q.get("query", "")
             visibility_by_query[query_text] = q.get("providers", [])
     
-    import re
-    
-    def normalize_name(name: str) -> str:
-        """Normalize a business name for comparison by removing punctuation and extra spaces."""
-        name = name.lower().strip()
-        name = re.sub(r'[^\w\s]', '', name)
-        name = re.sub(r'\s+', ' ', name)
-        return name
-    
-    def extract_domain_name(url: str) -> str:
-        """Extract clean domain name from URL for comparison."""
-        if not url:
-            return ""
-        url = url.lower()
-        url = re.sub(r'^https?://', '', url)
-        url = re.sub(r'^www\.', '', url)
-        domain = url.split('/')[0].split(':')[0]
-        return domain.replace('.com', '').replace('.net', '').replace('.org', '')
-    
-    def is_target_match(brand_name: str, brand_url: str, business_name: str, business_url: str, aliases: list) -> bool:
-        """Check if a brand matches the target business using multiple strategies."""
-        norm_brand = normalize_name(brand_name)
-        norm_business = normalize_name(business_name)
-        
-        if norm_brand == norm_business:
-            return True
-        
-        for alias in aliases:
-            if normalize_name(alias) == norm_brand:
-                return True
-        
-        brand_domain = extract_domain_name(brand_url)
-        business_domain = extract_domain_name(business_url)
-        if brand_domain and business_domain and brand_domain == business_domain:
-            return True
-        
-        brand_words = set(norm_brand.split())
-        business_words = set(norm_business.split())
-        if brand_words and business_words:
-            overlap = brand_words & business_words
-            if len(overlap) >= 2 or (len(overlap) == 1 and len(brand_words) == 1):
-                primary_word = norm_business.split()[0] if norm_business else ""
-                if primary_word in overlap:
-                    return True
-        
-        return False
+    matcher = get_business_matcher(business)
     
-    business_name_lower = business.name.lower()
-    business_url = getattr(business, 'primary_domain', '') or ''
-    business_aliases = []
-    if hasattr(business, 'brand_aliases') and business.brand_aliases:
-        business_aliases.extend([a.strip() for a in business.brand_aliases.split(',') if a.strip()])
+    query_rows = []
+    results_by_query = []
     
     for q_data in queries_with_intent:
         query_text = q_data.get("query", "")
         intent = q_data.get("intent", "informational")
         
-        audit_query = AuditQuery(
-            audit_id=audit.id,
-            query_text=query_text,
-            intent=intent,
-            region=region_group,
-            target_found=False
-        )
-        db.add(audit_query)
-        db.flush()
-        
         query_target_found = False
+        result_rows = []
         
         providers = visibility_by_query.get(query_text, [])
         for provider_data in providers:
             provider = provider_data.get("provider", "unknown")
-            target_found_in_provider = provider_data.get("target_found", False)
             brands = provider_data.get("recommended_brands", [])
             
             for rank, brand in enumerate(brands[:5], 1):
@@ -263,26 +213,57 @@ def _log_queries_to_db(
                     reason = ""
                 
                 if brand_name:
-                    is_target = is_target_match(brand_name, brand_url, business.name, business_url, business_aliases)
+                    is_target = matcher.matches(brand_name, brand_url)
                     prominence = 6 - rank if is_target and rank <= 5 else 0
                     
                     if is_target:
                         query_target_found = True
                     
-                    vis_result = QueryVisibilityResult(
-                        audit_query_id=audit_query.id,
-                        provider=provider,
-                        brand_name=brand_name,
-                        brand_url=brand_url,
-                        reason=reason,
-                        rank=rank,
-                        is_target=is_target,
-                        prominence_score=prominence
-                    )
-                    db.add(vis_result)
-        
-        if query_target_found:
-            audit_query.target_found = True
+                    result_rows.append({
+                        "provider": provider,
+                        "brand_name": brand_name,
+                        "brand_url": brand_url,
+                        "reason": reason,
+                        "rank": rank,
+                        "is_target": is_target,
+                        "prominence_score": prominence
+                    })
+        
+        query_rows.append({
+            "audit_id": audit.id,
+            "query_text": query_text,
+            "intent": intent,
+            "region": region_group,
+            "target_found": query_target_found,
+            "created_at": datetime.utcnow()
+        })
+        results_by_query.append(result_rows)
+    
+    if not query_rows:
+        return
+    
+    last_existing_id = db.query(func.max(AuditQuery.id)).filter(
+        AuditQuery.audit_id == audit.id
+    ).scalar() or 0
+    db.execute(AuditQuery.__table__.insert(), query_rows)
+    query_ids = [
+        row_id for (row_id,) in db.query(AuditQuery.id).filter(
+            AuditQuery.audit_id == audit.id,
+            AuditQuery.id > last_existing_id
+        ).order_by(AuditQuery.id)
+    ]
+    if len(query_ids) != len(query_rows):
+        raise RuntimeError(
+            f"Expected {len(query_rows)} new audit queries for audit {audit.id}, found {len(query_ids)}"
+        )
+    
+    vis_rows = [
+        dict(row, audit_query_id=query_id)
+        for query_id, result_rows in zip(query_ids, results_by_query)
+        for row in result_rows
+    ]
+    if vis_rows:
+        db.execute(QueryVisibilityResult.__table__.insert(), vis_rows)
 
 
 def _log_blueprints_to_db(
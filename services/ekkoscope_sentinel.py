@@ -5,10 +5,14 @@
 """
 import os
 import json
+import time
+import atexit
 import hashlib
 import functools
+import threading
+from collections import deque
 from datetime import datetime
-from typing import Optional, Dict, Any, Callable
+from typing import Optional, Dict, Any, Callable, Iterable, List
 try:
     import requests
     HAS_REQUESTS = True
@@ -16,76 +20,244 @@ except ImportError:
     HAS_REQUESTS = False
     import urllib.request
     import urllib.error
+from services.metrics import MetricFamily, register_collector
 class SentinelClient:
     def __init__(
         self, 
         api_key: str = None,
         base_url: str = "https://sentinelos.an2b.com",
         agent_id: str = "ekkoscope-agent",
-        fail_open: bool = True,
         verbose: bool = True
     ):
         self.api_key = api_key or os.environ.get("SENTINEL_API_KEY", "")
         self.base_url = base_url.rstrip("/")
         self.agent_id = agent_id
-        self.fail_open = fail_open
         self.verbose = verbose
         self.run_id = f"ekko_{int(datetime.utcnow().timestamp())}_{os.urandom(4).hex()}"
         self._sequence = 0
         self._last_hash = "0" * 64
+        self._chain_lock = threading.Lock()
+        self.shipper = SentinelShipper(self) if self.api_key else None
         if self.verbose and self.api_key:
             print(f"[SENTINEL] Connected: {self.api_key[:16]}...")
     def _compute_hash(self, data: Dict) -> str:
         payload = json.dumps(data, sort_keys=True, default=str) + self._last_hash
         self._last_hash = hashlib.sha256(payload.encode()).hexdigest()
         return self._last_hash
-    def _request(self, endpoint: str, payload: Dict) -> Dict:
-        if not self.api_key:
-            return {"decision": "allow", "reason": "no_api_key"}
+    def _post_batch(self, endpoint: str, events: List[Dict]):
+        """POST a batch of events; raises on network or HTTP errors."""
         url = f"{self.base_url}{endpoint}"
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
             "User-Agent": "EkkoScope-Sentinel/1.0"
         }
-        try:
-            if HAS_REQUESTS:
-                resp = requests.post(url, json=payload, headers=headers, timeout=5)
-                return resp.json()
-            else:
-                data = json.dumps(payload).encode()
-                req = urllib.request.Request(url, data=data, headers=headers, method="POST")
-                with urllib.request.urlopen(req, timeout=5) as resp:
-                    return json.loads(resp.read().decode())
-        except Exception as e:
-            if self.verbose:
-                print(f"[SENTINEL] Request error: {e}")
-            if self.fail_open:
-                return {"decision": "allow", "reason": "network_error", "error": str(e)}
-            raise
-    def check_action(self, action: Dict, context: Dict = None) -> Dict:
-        self._sequence += 1
-        event = {
-            "action": action,
-            "context": context or {},
-            "agent_id": self.agent_id,
-            "run_id": self.run_id,
-            "sequence": self._sequence,
-            "timestamp": datetime.utcnow().isoformat() + "Z",
-        }
-        event["hash"] = self._compute_hash(event)
-        result = self._request("/api/ingest", event)
-        if self.verbose:
-            decision = result.get("decision", "unknown")
-            action_type = action.get("type", "unknown")
-            print(f"[SENTINEL] {action_type} -> {decision}")
-        return result
+        if HAS_REQUESTS:
+            resp = requests.post(url, json={"events": events}, headers=headers, timeout=5)
+            resp.raise_for_status()
+            return
+        data = json.dumps({"events": events}, default=str).encode()
+        req = urllib.request.Request(url, data=data, headers=headers, method="POST")
+        with urllib.request.urlopen(req, timeout=5) as resp:
+            resp.read()
+    def _chain_event(self, action: Dict, context: Dict = None) -> Dict:
+        """
+        Number, hash and queue an event. Every numbered event goes through the
+        shipper, queued under the same lock, so Sentinel receives the chain in order.
+        """
+        with self._chain_lock:
+            self._sequence += 1
+            event = {
+                "action": action,
+                "context": context or {},
+                "agent_id": self.agent_id,
+                "run_id": self.run_id,
+                "sequence": self._sequence,
+                "timestamp": datetime.utcnow().isoformat() + "Z",
+            }
+            event["hash"] = self._compute_hash(event)
+            if self.shipper is not None:
+                self.shipper.enqueue(event)
+            return event
     def log_event(self, event_type: str, data: Dict = None) -> Dict:
+        """Record a telemetry event without waiting: it is queued for the background shipper."""
+        if not self.api_key:
+            return {"decision": "allow", "reason": "no_api_key"}
         action = {"type": event_type}
         if data:
             action.update(data)
-        return self.check_action(action, {"eventOnly": True})
+        self._chain_event(action, {"eventOnly": True})
+        return {"decision": "allow", "reason": "queued"}
+class SentinelShipper:
+    """
+    Background shipper for event-only telemetry. Events wait in a bounded
+    in-memory queue and are POSTed in batches every flush interval. While the
+    endpoint is down, batches are appended to a JSONL spool on disk, which is
+    drained (oldest first) before any newer batch is sent, so events reach
+    Sentinel in hash-chain order. Overflow of the queue or spool, and spool
+    lines that cannot be parsed, are dropped and counted.
+    """
+    def __init__(self, client: "SentinelClient"):
+        self.client = client
+        self.max_queue = int(os.environ.get("SENTINEL_QUEUE_SIZE", "1000"))
+        self.batch_size = int(os.environ.get("SENTINEL_BATCH_SIZE", "50"))
+        self.flush_interval = float(os.environ.get("SENTINEL_FLUSH_SECONDS", "2"))
+        self.batch_endpoint = os.environ.get("SENTINEL_BATCH_ENDPOINT", "/api/ingest/batch")
+        self.spool_path = os.environ.get("SENTINEL_SPOOL_PATH", "data/sentinel_spool.jsonl")
+        self.spool_max_bytes = int(float(os.environ.get("SENTINEL_SPOOL_MAX_MB", "50")) * 1024 * 1024)
+        self._queue: deque = deque()
+        self._cond = threading.Condition()
+        self._send_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._retry_at = 0.0
+        self._backoff = 0.0
+        self.stats = {
+            "enqueued": 0,
+            "shipped": 0,
+            "spooled": 0,
+            "dropped_queue_full": 0,
+            "dropped_spool_full": 0,
+            "dropped_unreadable": 0,
+            "failed_flushes": 0,
+        }
+        atexit.register(self.flush)
+    def enqueue(self, event: Dict):
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                self.stats["dropped_queue_full"] += 1
+                return
+            self._queue.append(event)
+            self.stats["enqueued"] += 1
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify()
+        self._ensure_started()
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="sentinel-shipper", daemon=True)
+                self._thread.start()
+    def _run(self):
+        while True:
+            with self._cond:
+                if len(self._queue) < self.batch_size:
+                    self._cond.wait(timeout=self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                if self.client.verbose:
+                    print(f"[SENTINEL] Shipper error: {e}")
+    def _take_batch(self) -> List[Dict]:
+        with self._cond:
+            batch = []
+            while self._queue and len(batch) < self.batch_size:
+                batch.append(self._queue.popleft())
+            return batch
+    def flush(self):
+        """
+        Ship the spool, then everything queued; batches that fail are spooled.
+        After a failure, sends pause (backing off up to a minute) and new
+        batches go straight to the spool.
+        """
+        with self._send_lock:
+            spool_ok = time.monotonic() >= self._retry_at and self._drain_spool()
+            while True:
+                batch = self._take_batch()
+                if not batch:
+                    return
+                if not spool_ok or not self._send(batch):
+                    spool_ok = False
+                    self._spool(batch)
+    def _send(self, batch: List[Dict]) -> bool:
+        try:
+            self.client._post_batch(self.batch_endpoint, batch)
+        except Exception as e:
+            self.stats["failed_flushes"] += 1
+            self._backoff = min(max(self._backoff * 2, self.flush_interval), 60.0)
+            self._retry_at = time.monotonic() + self._backoff
+            if self.client.verbose:
+                print(f"[SENTINEL] Batch of {len(batch)} not shipped, retrying in {self._backoff:.0f}s: {e}")
+            return False
+        self._backoff = 0.0
+        self.stats["shipped"] += len(batch)
+        return True
+    def _spool(self, batch: List[Dict]):
+        try:
+            size = os.path.getsize(self.spool_path) if os.path.exists(self.spool_path) else 0
+            lines = [json.dumps(event, default=str) + "\n" for event in batch]
+            if size + sum(len(line) for line in lines) > self.spool_max_bytes:
+                self.stats["dropped_spool_full"] += len(batch)
+                return
+            os.makedirs(os.path.dirname(self.spool_path) or ".", exist_ok=True)
+            with open(self.spool_path, "a", encoding="utf-8") as f:
+                f.writelines(lines)
+            self.stats["spooled"] += len(batch)
+        except OSError as e:
+            self.stats["dropped_spool_full"] += len(batch)
+            if self.client.verbose:
+                print(f"[SENTINEL] Spool write failed: {e}")
+    def _drain_spool(self) -> bool:
+        """Ship spooled events in order; returns False if the spool is still non-empty."""
+        if not os.path.exists(self.spool_path):
+            return True
+        events = []
+        try:
+            with open(self.spool_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        events.append(json.loads(line))
+                    except ValueError:
+                        # e.g. a write cut short by a crash; keep the rest of the spool
+                        self.stats["dropped_unreadable"] += 1
+        except OSError as e:
+            # Leave the spool in place and retry on a later flush
+            if self.client.verbose:
+                print(f"[SENTINEL] Spool unreadable, will retry: {e}")
+            return False
+        shipped = 0
+        for start in range(0, len(events), self.batch_size):
+            if not self._send(events[start:start + self.batch_size]):
+                break
+            shipped = min(len(events), start + self.batch_size)
+        remaining = events[shipped:]
+        if remaining and not shipped:
+            return False
+        try:
+            if remaining:
+                tmp_path = self.spool_path + ".tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.writelines(json.dumps(event, default=str) + "\n" for event in remaining)
+                os.replace(tmp_path, self.spool_path)
+            else:
+                os.remove(self.spool_path)
+        except OSError as e:
+            # The spool still holds the shipped events; they are re-sent later
+            if self.client.verbose:
+                print(f"[SENTINEL] Spool rewrite failed: {e}")
+            return False
+        return not remaining
+    def snapshot(self) -> Dict[str, int]:
+        with self._cond:
+            queued = len(self._queue)
+        return dict(self.stats, queued=queued)
 sentinel = SentinelClient()
+def get_sentinel_stats() -> Dict[str, int]:
+    """Shipper counters (queued, shipped, spooled, dropped); empty when Sentinel is disabled."""
+    return sentinel.shipper.snapshot() if sentinel.shipper is not None else {}
+def _sentinel_metrics() -> Iterable[MetricFamily]:
+    stats = get_sentinel_stats()
+    if not stats:
+        return
+    yield MetricFamily("ekkoscope_sentinel_queued", "gauge", "Sentinel events waiting in the in-memory queue").add(stats["queued"])
+    events = MetricFamily("ekkoscope_sentinel_events_total", "counter", "Sentinel events by outcome (enqueued, shipped, spooled, dropped_*)")
+    for outcome in ("enqueued", "shipped", "spooled", "dropped_queue_full", "dropped_spool_full", "dropped_unreadable"):
+        events.add(stats[outcome], outcome=outcome)
+    yield events
+    yield MetricFamily("ekkoscope_sentinel_failed_flushes_total", "counter", "Sentinel batch sends that failed").add(stats["failed_flushes"])
+register_collector(_sentinel_metrics)
 def log_ai_query(model: str, prompt: str, business_name: str = None, tokens: int = None):
     """Log an AI query (ChatGPT, Gemini, Perplexity, etc.)"""
     sentinel.log_event("ai.query", {
@@ -8,6 +8,7 @@ import json
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 from services.ekkoscope_sentinel import log_ai_query
+from services.provider_gateway import chat_completion
 
 try:
     from openai import OpenAI
@@ -152,7 +153,8 @@ Generate specific, implementable fixes for {business_name}. Include actual conte
     try:
         log_ai_query("gpt-4o", prompt[:200], business_name)
         
-        response = client.chat.completions.create(
+        response = chat_completion(
+            client,
             model="gpt-4o",
             messages=[
                 {"role": "system", "content": SYSTEM_PROMPT},
@@ -163,7 +165,7 @@ Generate specific, implementable fixes for {business_name}. Include actual conte
             response_format={"type": "json_object"}
         )
         
-        fix_plan = json.loads(response.choices[0].message.content)
+        fix_plan = json.loads(response.text)
         
         fix_plan["generated_at"] = datetime.utcnow().isoformat() + "Z"
         fix_plan["business_name"] = business_name
@@ -272,7 +274,8 @@ Generate the specific content fix as JSON:
     try:
         log_ai_query("gpt-4o", f"Content fix: {fix_type}", business_name)
         
-        response = client.chat.completions.create(
+        response = chat_completion(
+            client,
             model="gpt-4o",
             messages=[
                 {"role": "system", "content": "You are an AI visibility content specialist. Generate production-ready content optimized for AI assistant recommendations."},
@@ -283,7 +286,7 @@ Generate the specific content fix as JSON:
             response_format={"type": "json_object"}
         )
         
-        return json.loads(response.choices[0].message.content)
+        return json.loads(response.text)
         
     except Exception as e:
         return {"error": str(e), "content_type": fix_type, "content": ""}
@@ -319,7 +322,8 @@ Generate complete, valid JSON-LD schema that maximizes AI visibility:
     try:
         log_ai_query("gpt-4o", "Schema markup generation", business_name)
         
-        response = client.chat.completions.create(
+        response = chat_completion(
+            client,
             model="gpt-4o",
             messages=[
                 {"role": "system", "content": "You are a schema markup expert. Generate valid, comprehensive JSON-LD that helps AI assistants understand and recommend businesses."},
@@ -330,7 +334,7 @@ Generate complete, valid JSON-LD schema that maximizes AI visibility:
             response_format={"type": "json_object"}
         )
         
-        return json.loads(response.choices[0].message.content)
+        return json.loads(response.text)
         
     except Exception as e:
         return {"error": str(e), "schemas": []}
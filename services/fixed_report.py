@@ -8,6 +8,7 @@ from datetime import datetime
 from typing import Dict, Any, List
 from fpdf import FPDF
 from services.ekkoscope_sentinel import log_report_generated
+from services.metrics import PDF_RENDER_SECONDS
 
 
 BLACK_BG = (10, 10, 15)
@@ -94,22 +95,22 @@ def build_fixed_report_pdf(
     original_analysis: Dict[str, Any] = None
 ) -> bytes:
     """Generate a Fixed Report PDF with before/after comparison."""
-    
-    pdf = FixedReportPDF(business_name)
-    pdf.alias_nb_pages()
-    
-    _add_cover_page(pdf, business_name, remediation_result)
-    _add_improvement_dashboard(pdf, remediation_result)
-    _add_agent_results(pdf, remediation_result)
-    _add_content_fixes_section(pdf, remediation_result)
-    _add_seo_fixes_section(pdf, remediation_result)
-    _add_deployment_section(pdf, remediation_result)
-    _add_next_steps_section(pdf, remediation_result)
-    _add_bundle_upsell_page(pdf, business_name)
-    
-    log_report_generated(business_name, "fixed_report", pages=pdf.page_no())
-    
-    return pdf.output()
+    with PDF_RENDER_SECONDS.time(report="fixed_report"):
+        pdf = FixedReportPDF(business_name)
+        pdf.alias_nb_pages()
+    
+        _add_cover_page(pdf, business_name, remediation_result)
+        _add_improvement_dashboard(pdf, remediation_result)
+        _add_agent_results(pdf, remediation_result)
+        _add_content_fixes_section(pdf, remediation_result)
+        _add_seo_fixes_section(pdf, remediation_result)
+        _add_deployment_section(pdf, remediation_result)
+        _add_next_steps_section(pdf, remediation_result)
+        _add_bundle_upsell_page(pdf, business_name)
+    
+        log_report_generated(business_name, "fixed_report", pages=pdf.page_no())
+    
+        return pdf.output()
 
 
 def _add_cover_page(pdf: FixedReportPDF, business_name: str, result: Dict[str, Any]):
@@ -3,15 +3,23 @@ Gemini API Client Module for EkkoScope.
 Provides a clean interface to Google's Gemini generative AI.
 """
 
+import asyncio
 import logging
+import threading
 from typing import Optional
 
 from services.config import GEMINI_API_KEY, GEMINI_MODEL, GEMINI_ENABLED
+from services.cancellation import AuditCancelled
+from services.provider_gateway import (
+    ProviderReply, call_provider, call_provider_async, estimate_tokens
+)
 
 logger = logging.getLogger(__name__)
 
 _genai = None
 _configured = False
+_model = None
+_model_lock = threading.Lock()
 
 
 def _configure_gemini():
@@ -48,16 +56,56 @@ def gemini_enabled() -> bool:
 
 
 def get_gemini_model():
-    """Get a Gemini generative model instance."""
+    """
+    Get the shared Gemini generative model instance.
+    The model wraps the SDK's long-lived transport, so it is built once and reused.
+    """
+    global _model
+    
+    if _model is not None:
+        return _model
+    
     genai = _configure_gemini()
     if genai is None:
         return None
     
-    try:
-        return genai.GenerativeModel(GEMINI_MODEL)
-    except Exception as e:
-        logger.warning("Failed to create Gemini model: %s", e)
-        return None
+    with _model_lock:
+        if _model is None:
+            try:
+                _model = genai.GenerativeModel(GEMINI_MODEL)
+            except Exception as e:
+                logger.warning("Failed to create Gemini model: %s", e)
+                return None
+    return _model
+
+
+def _extract_gemini_text(response) -> Optional[str]:
+    """Pull the generated text out of a Gemini response."""
+    if hasattr(response, 'text'):
+        text = response.text
+        if text:
+            return text
+    
+    if hasattr(response, 'candidates') and response.candidates:
+        candidate = response.candidates[0]
+        if hasattr(candidate, 'content') and candidate.content:
+            parts = candidate.content.parts
+            if parts:
+                return parts[0].text
+    
+    logger.warning("Gemini response had unexpected structure: %s", type(response).__name__)
+    return None
+
+
+def _parse_gemini_response(response) -> ProviderReply:
+    """Normalize a Gemini response for the provider gateway."""
+    usage = getattr(response, "usage_metadata", None)
+    return ProviderReply(
+        text=_extract_gemini_text(response),
+        prompt_tokens=getattr(usage, "prompt_token_count", 0) or 0,
+        completion_tokens=getattr(usage, "candidates_token_count", 0) or 0,
+        raw=response
+    )
 
 
 def gemini_generate_content(prompt: str) -> Optional[str]:
@@ -70,41 +118,61 @@ def gemini_generate_content(prompt: str) -> Optional[str]:
     Returns:
         The generated text content, or None on error
     """
-    import sys
-    
     if not gemini_enabled():
         logger.info("Gemini is disabled. Skipping generation.")
         return None
     
     model = get_gemini_model()
     if model is None:
-        print("[GEMINI CLIENT] Model is None")
-        sys.stdout.flush()
+        logger.warning("Gemini model unavailable, skipping generation")
         return None
     
     try:
-        response = model.generate_content(prompt)
-        
-        if hasattr(response, 'text'):
-            text = response.text
-            if text:
-                return text
+        return call_provider(
+            "gemini",
+            lambda: model.generate_content(prompt),
+            parse=_parse_gemini_response,
+            estimated_tokens=estimate_tokens(prompt),
+            request={"model": GEMINI_MODEL, "prompt": prompt}
+        ).text
         
-        if hasattr(response, 'candidates') and response.candidates:
-            candidate = response.candidates[0]
-            if hasattr(candidate, 'content') and candidate.content:
-                parts = candidate.content.parts
-                if parts:
-                    return parts[0].text
-        
-        print(f"[GEMINI CLIENT] Response structure unexpected: {type(response)}")
-        sys.stdout.flush()
-        logger.warning("Gemini response had unexpected structure")
+    except AuditCancelled:
+        raise
+    except Exception as e:
+        logger.warning("Gemini generation failed: %s", e)
         return None
-        
+
+
+async def gemini_generate_content_async(prompt: str) -> Optional[str]:
+    """
+    Async variant of gemini_generate_content using the SDK's native async transport.
+    
+    Args:
+        prompt: The prompt to send to Gemini
+    
+    Returns:
+        The generated text content, or None on error
+    """
+    if not gemini_enabled():
+        logger.info("Gemini is disabled. Skipping generation.")
+        return None
+    
+    model = get_gemini_model()
+    if model is None:
+        return None
+    
+    try:
+        reply = await call_provider_async(
+            "gemini",
+            lambda: model.generate_content_async(prompt),
+            parse=_parse_gemini_response,
+            estimated_tokens=estimate_tokens(prompt),
+            request={"model": GEMINI_MODEL, "prompt": prompt}
+        )
+        return reply.text
+    except (asyncio.CancelledError, AuditCancelled):
+        raise
     except Exception as e:
-        print(f"[GEMINI CLIENT] Exception: {e}")
-        sys.stdout.flush()
         logger.warning("Gemini generation failed: %s", e)
         return None
 
@@ -121,3 +189,8 @@ def gemini_generate_json(prompt: str) -> Optional[str]:
         The generated text (should be JSON), or None on error
     """
     return gemini_generate_content(prompt)
+
+
+async def gemini_generate_json_async(prompt: str) -> Optional[str]:
+    """Async variant of gemini_generate_json."""
+    return await gemini_generate_content_async(prompt)
@@ -4,14 +4,22 @@ Asks Gemini to simulate an AI assistant answer to see which brands it would reco
 """
 
 import json
+import asyncio
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
-from services.gemini_client import gemini_generate_json, gemini_enabled
+from services.gemini_client import gemini_generate_json, gemini_generate_json_async, gemini_enabled
+from services.config import GEMINI_MODEL
+from services.cancellation import AuditCancelled
 from services.visibility_models import BrandHit, ProviderVisibility
+from services.shared_probes import (
+    find_target_in_brands, get_or_run_shared_probe, get_or_run_shared_probe_async
+)
 
 logger = logging.getLogger(__name__)
 
+GEMINI_VISIBILITY_PROMPT_VERSION = "v1"
+
 
 def build_gemini_visibility_prompt(
     business_name: str,
@@ -46,9 +54,17 @@ No markdown formatting, no extra text - just the JSON object."""
     return prompt
 
 
-def parse_gemini_response(raw: str, business_name: str) -> Dict[str, Any]:
+def parse_gemini_response(
+    raw: str,
+    business_name: str,
+    brand_aliases: Optional[List[str]] = None,
+    domains: Optional[List[str]] = None
+) -> Dict[str, Any]:
     """
     Parse Gemini's JSON response.
+    
+    Like the OpenAI probe, the prompt never names the target business, so
+    target detection runs here against the tenant's name, aliases and domains.
     """
     if not raw:
         return {"recommended_brands": [], "target_found": False}
@@ -75,21 +91,11 @@ def parse_gemini_response(raw: str, business_name: str) -> Dict[str, Any]:
         data = json.loads(raw)
         
         recommended = data.get("recommended_brands", [])
-        target_found = data.get("target_business_mentioned", False)
-        target_position = data.get("target_position")
-        
-        if not target_found and recommended:
-            for i, rec in enumerate(recommended):
-                name = (rec.get("name") or "").lower()
-                url = (rec.get("url") or "").lower()
-                if business_name.lower() in name or business_name.lower() in url:
-                    target_found = True
-                    target_position = i + 1
-                    break
+        target_position = find_target_in_brands(recommended, business_name, brand_aliases, domains)
         
         return {
             "recommended_brands": recommended,
-            "target_found": target_found,
+            "target_found": target_position is not None,
             "target_position": target_position
         }
     except json.JSONDecodeError as e:
@@ -97,11 +103,157 @@ def parse_gemini_response(raw: str, business_name: str) -> Dict[str, Any]:
         return {"recommended_brands": [], "target_found": False}
 
 
+def _is_shareable_answer(raw: str) -> bool:
+    """Only share answers that parse into at least one recommendation."""
+    return bool(parse_gemini_response(raw, "").get("recommended_brands"))
+
+
+def _build_gemini_visibility(
+    query: str,
+    intent: Optional[str],
+    raw: str,
+    business_name: str,
+    brand_aliases: Optional[List[str]] = None,
+    domains: Optional[List[str]] = None
+) -> ProviderVisibility:
+    """Turn a raw Gemini answer into a ProviderVisibility."""
+    parsed = parse_gemini_response(raw, business_name, brand_aliases, domains)
+    
+    recommended_brands = [
+        BrandHit(
+            name=rec.get("name", "Unknown"),
+            url=rec.get("url"),
+            reason=rec.get("reason")
+        )
+        for rec in parsed.get("recommended_brands", [])
+    ]
+    
+    return ProviderVisibility(
+        provider="gemini_sim",
+        query=query,
+        intent=intent,
+        recommended_brands=recommended_brands,
+        target_found=parsed.get("target_found", False),
+        target_position=parsed.get("target_position"),
+        raw_response=raw,
+        success=True
+    )
+
+
+def _failed_gemini_visibility(query: str, intent: Optional[str]) -> ProviderVisibility:
+    return ProviderVisibility(
+        provider="gemini_sim",
+        query=query,
+        intent=intent,
+        recommended_brands=[],
+        target_found=False,
+        success=False
+    )
+
+
+def probe_gemini_visibility(
+    business_name: str,
+    primary_domain: str,
+    regions: List[str],
+    item: Dict[str, Any],
+    brand_aliases: Optional[List[str]] = None,
+    domains: Optional[List[str]] = None
+) -> Optional[ProviderVisibility]:
+    """
+    Run a single Gemini simulated assistant visibility probe.
+    
+    The prompt is business-agnostic, so the raw answer comes from the shared
+    probe store when another tenant asked the same query recently.
+    
+    Args:
+        business_name: Name of the target business
+        primary_domain: Business website URL
+        regions: Geographic regions
+        item: Dict with 'query' and 'intent' keys
+        brand_aliases: Optional extra names that identify the target business
+        domains: Domains of the target business (defaults to primary_domain)
+    
+    Returns:
+        ProviderVisibility for the query, or None if the query is empty
+    """
+    query = item.get("query", "")
+    intent = item.get("intent")
+    
+    if not query:
+        return None
+    
+    try:
+        prompt = build_gemini_visibility_prompt(
+            business_name, primary_domain, regions, query
+        )
+        
+        raw = get_or_run_shared_probe(
+            "gemini_sim", GEMINI_MODEL, query, regions,
+            GEMINI_VISIBILITY_PROMPT_VERSION,
+            lambda: gemini_generate_json(prompt),
+            _is_shareable_answer
+        )
+        
+        if raw is None:
+            logger.info("Gemini visibility query %r returned no answer, marking failed", query[:30])
+            return _failed_gemini_visibility(query, intent)
+        
+        return _build_gemini_visibility(query, intent, raw, business_name, brand_aliases, domains or [primary_domain])
+        
+    except AuditCancelled:
+        raise
+    except Exception as e:
+        logger.warning("Gemini visibility probe failed for query '%s': %s", query, e)
+        return _failed_gemini_visibility(query, intent)
+
+
+async def probe_gemini_visibility_async(
+    business_name: str,
+    primary_domain: str,
+    regions: List[str],
+    item: Dict[str, Any],
+    brand_aliases: Optional[List[str]] = None,
+    domains: Optional[List[str]] = None
+) -> Optional[ProviderVisibility]:
+    """
+    Async variant of probe_gemini_visibility.
+    """
+    query = item.get("query", "")
+    intent = item.get("intent")
+    
+    if not query:
+        return None
+    
+    try:
+        prompt = build_gemini_visibility_prompt(
+            business_name, primary_domain, regions, query
+        )
+        
+        raw = await get_or_run_shared_probe_async(
+            "gemini_sim", GEMINI_MODEL, query, regions,
+            GEMINI_VISIBILITY_PROMPT_VERSION,
+            lambda: gemini_generate_json_async(prompt),
+            _is_shareable_answer
+        )
+        if raw is None:
+            return _failed_gemini_visibility(query, intent)
+        
+        return _build_gemini_visibility(query, intent, raw, business_name, brand_aliases, domains or [primary_domain])
+        
+    except (asyncio.CancelledError, AuditCancelled):
+        raise
+    except Exception as e:
+        logger.warning("Gemini visibility probe failed for query '%s': %s", query, e)
+        return _failed_gemini_visibility(query, intent)
+
+
 def run_gemini_visibility_for_queries(
     business_name: str,
     primary_domain: str,
     regions: List[str],
-    queries_with_intent: List[Dict[str, Any]]
+    queries_with_intent: List[Dict[str, Any]],
+    brand_aliases: Optional[List[str]] = None,
+    domains: Optional[List[str]] = None
 ) -> List[ProviderVisibility]:
     """
     Run Gemini simulated assistant visibility probe for each query.
@@ -111,88 +263,50 @@ def run_gemini_visibility_for_queries(
         primary_domain: Business website URL
         regions: Geographic regions
         queries_with_intent: List of dicts with 'query' and 'intent' keys
+        brand_aliases: Optional extra names that identify the target business
+        domains: Domains of the target business (defaults to primary_domain)
     
     Returns:
         List of ProviderVisibility objects
     """
-    import sys
-    
     if not gemini_enabled():
-        print("[GEMINI VISIBILITY] Skipped - Gemini not enabled")
-        sys.stdout.flush()
         logger.info("Gemini visibility probe skipped - not enabled")
         return []
     
-    print(f"[GEMINI VISIBILITY] Starting for {len(queries_with_intent)} queries")
-    sys.stdout.flush()
+    logger.info("Gemini visibility probe starting for %d queries", len(queries_with_intent))
     
     results: List[ProviderVisibility] = []
     
     for item in queries_with_intent:
-        query = item.get("query", "")
-        intent = item.get("intent")
-        
-        if not query:
-            continue
-        
-        try:
-            prompt = build_gemini_visibility_prompt(
-                business_name, primary_domain, regions, query
-            )
-            
-            raw = gemini_generate_json(prompt)
-            
-            if raw is None:
-                print(f"[GEMINI VISIBILITY] Query '{query[:30]}...' - raw is None, marking failed")
-                sys.stdout.flush()
-                results.append(ProviderVisibility(
-                    provider="gemini_sim",
-                    query=query,
-                    intent=intent,
-                    recommended_brands=[],
-                    target_found=False,
-                    success=False
-                ))
-                continue
-            
-            print(f"[GEMINI VISIBILITY] Query '{query[:30]}...' - got response, parsing...")
-            sys.stdout.flush()
-            
-            parsed = parse_gemini_response(raw, business_name)
-            
-            recommended_brands = [
-                BrandHit(
-                    name=rec.get("name", "Unknown"),
-                    url=rec.get("url"),
-                    reason=rec.get("reason")
-                )
-                for rec in parsed.get("recommended_brands", [])
-            ]
-            
-            results.append(ProviderVisibility(
-                provider="gemini_sim",
-                query=query,
-                intent=intent,
-                recommended_brands=recommended_brands,
-                target_found=parsed.get("target_found", False),
-                target_position=parsed.get("target_position"),
-                raw_response=raw,
-                success=True
-            ))
-            print(f"[GEMINI VISIBILITY] Query '{query[:30]}...' - SUCCESS")
-            sys.stdout.flush()
-            
-        except Exception as e:
-            print(f"[GEMINI VISIBILITY] Query '{query[:30]}...' - EXCEPTION: {e}")
-            sys.stdout.flush()
-            logger.warning("Gemini visibility probe failed for query '%s': %s", query, e)
-            results.append(ProviderVisibility(
-                provider="gemini_sim",
-                query=query,
-                intent=intent,
-                recommended_brands=[],
-                target_found=False,
-                success=False
-            ))
+        vis = probe_gemini_visibility(
+            business_name, primary_domain, regions, item, brand_aliases=brand_aliases, domains=domains
+        )
+        if vis is not None:
+            results.append(vis)
     
     return results
+
+
+async def run_gemini_visibility_for_queries_async(
+    business_name: str,
+    primary_domain: str,
+    regions: List[str],
+    queries_with_intent: List[Dict[str, Any]],
+    brand_aliases: Optional[List[str]] = None,
+    domains: Optional[List[str]] = None
+) -> List[ProviderVisibility]:
+    """
+    Async variant of run_gemini_visibility_for_queries; probes all queries concurrently.
+    """
+    if not gemini_enabled():
+        logger.info("Gemini visibility probe skipped - not enabled")
+        return []
+    
+    results = await asyncio.gather(*[
+        probe_gemini_visibility_async(
+            business_name, primary_domain, regions, item,
+            brand_aliases=brand_aliases, domains=domains
+        )
+        for item in queries_with_intent
+    ])
+    return [vis for vis in results if vis is not None]
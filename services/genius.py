@@ -9,6 +9,7 @@ import os
 import json
 from typing import Dict, Any, List, Optional
 from openai import OpenAI
+from services.provider_gateway import chat_completion
 from services.site_inspector import summarize_site_content
 from services.perplexity_visibility import format_perplexity_visibility_for_genius
 from services.ekkobrain_reader import format_ekkobrain_context_for_genius
@@ -230,7 +231,8 @@ Generate 2-3 patterns, 2-3 priority opportunities with full page blueprints, 3-5
 - {"Cross-reference visibility across OpenAI, Perplexity, and Gemini to find consistent patterns and gaps" if multi_llm_available else "Multi-LLM cross-referencing was not available for this run"}
 - {"Use EkkoBrain patterns as inspiration but adapt them specifically to THIS business" if ekkobrain_enabled else ""}"""
 
-        response = client.chat.completions.create(
+        response = chat_completion(
+            client,
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -240,7 +242,7 @@ Generate 2-3 patterns, 2-3 priority opportunities with full page blueprints, 3-5
             response_format={"type": "json_object"}
         )
         
-        content = response.choices[0].message.content
+        content = response.text
         if not content:
             return _empty_genius_insights()
         
@@ -0,0 +1,232 @@
+"""
+Latency-aware Request Hedging for EkkoScope.
+Each provider keeps a rolling window of its recent response times. When a
+request is still outstanding after the provider's observed p95, a duplicate
+is sent and whichever answers first wins. Hedges are capped by a budget
+(HEDGE_BUDGET_FRACTION of requests), so tail latency drops without a blanket
+timeout that would throw results away.
+"""
+
+import math
+import time
+import asyncio
+import logging
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from services.config import (
+    HEDGING_ENABLED,
+    HEDGE_PROVIDERS,
+    HEDGE_BUDGET_FRACTION,
+    HEDGE_MIN_SAMPLES,
+    HEDGE_MIN_DELAY_SECONDS,
+    PROVIDER_RATE_LIMITS,
+)
+
+logger = logging.getLogger(__name__)
+
+_WINDOW_SIZE = 200
+_BUDGET_DECAY_AT = 10000
+
+
+class LatencyTracker:
+    """Rolling window of successful request latencies for one provider."""
+
+    def __init__(self, window: int = _WINDOW_SIZE):
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, math.ceil(pct / 100.0 * len(ordered)) - 1))
+        return ordered[index]
+
+
+class HedgeBudget:
+    """Allows at most `fraction` extra requests relative to requests made."""
+
+    def __init__(self, fraction: float):
+        self.fraction = fraction
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.hedges = 0
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+            if self.requests >= _BUDGET_DECAY_AT:
+                self.requests //= 2
+                self.hedges //= 2
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self.hedges + 1 > self.fraction * self.requests:
+                return False
+            self.hedges += 1
+            return True
+
+
+_state_lock = threading.Lock()
+_trackers: Dict[str, LatencyTracker] = {}
+_budgets: Dict[str, HedgeBudget] = {}
+_pool: Optional[ThreadPoolExecutor] = None
+
+
+def get_latency_tracker(provider: str) -> LatencyTracker:
+    with _state_lock:
+        if provider not in _trackers:
+            _trackers[provider] = LatencyTracker()
+        return _trackers[provider]
+
+
+def get_hedge_budget(provider: str) -> HedgeBudget:
+    with _state_lock:
+        if provider not in _budgets:
+            _budgets[provider] = HedgeBudget(HEDGE_BUDGET_FRACTION)
+        return _budgets[provider]
+
+
+def hedge_delay(provider: str) -> Optional[float]:
+    """
+    Seconds to wait before hedging a request to this provider, or None if
+    hedging is off for it or there are not yet enough latency samples.
+    """
+    if not HEDGING_ENABLED or provider not in HEDGE_PROVIDERS:
+        return None
+    p95 = get_latency_tracker(provider).percentile(95)
+    if p95 is None:
+        return None
+    return max(p95, HEDGE_MIN_DELAY_SECONDS)
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _state_lock:
+        if _pool is None:
+            # Room for every provider's full concurrency plus its hedges.
+            workers = sum(l.get("max_concurrency", 8) for l in PROVIDER_RATE_LIMITS.values()) * 2
+            _pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="provider-call")
+        return _pool
+
+
+def _timed(send: Callable[[], Any], record_latency: Optional[Callable[[float], None]]) -> Callable[[], Any]:
+    """Wrap send so a successful call reports its own latency."""
+    if record_latency is None:
+        return send
+
+    def _send() -> Any:
+        start = time.perf_counter()
+        result = send()
+        record_latency(time.perf_counter() - start)
+        return result
+    return _send
+
+
+def _timed_async(
+    send: Callable[[], Awaitable[Any]],
+    record_latency: Optional[Callable[[float], None]]
+) -> Callable[[], Awaitable[Any]]:
+    """Async variant of _timed."""
+    if record_latency is None:
+        return send
+
+    async def _send() -> Any:
+        start = time.perf_counter()
+        result = await send()
+        record_latency(time.perf_counter() - start)
+        return result
+    return _send
+
+
+def run_hedged(
+    send: Callable[[], Any],
+    delay: float,
+    try_start_hedge: Callable[[], bool],
+    on_hedge_done: Callable[[Future], None],
+    record_latency: Optional[Callable[[float], None]] = None
+) -> Any:
+    """
+    Run send(); if it has not finished after delay seconds and
+    try_start_hedge() allows it, run a duplicate and return the first
+    successful result. If both fail, the first failure is raised.
+
+    The losing request is left to finish in the background. on_hedge_done
+    is called with whichever request finishes last, so the extra rate-limit
+    slot taken for the hedge is held until both requests are off the wire.
+    record_latency gets the primary request's own latency when it succeeds,
+    never the hedged (shorter) time.
+    """
+    pool = _get_pool()
+    primary = pool.submit(contextvars.copy_context().run, _timed(send, record_latency))
+    done, _ = wait([primary], timeout=delay)
+    if done or not try_start_hedge():
+        return primary.result()
+
+    hedge = pool.submit(contextvars.copy_context().run, send)
+
+    pending = {primary, hedge}
+    first_error: Optional[BaseException] = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            error = future.exception()
+            if error is None:
+                if future is hedge:
+                    logger.info("Hedged request won after %.1fs", delay)
+                loser = hedge if future is primary else primary
+                loser.add_done_callback(on_hedge_done)
+                return future.result()
+            first_error = first_error or error
+    on_hedge_done(hedge)
+    raise first_error or RuntimeError("Hedged request produced no result")
+
+
+async def run_hedged_async(
+    send: Callable[[], Awaitable[Any]],
+    delay: float,
+    try_start_hedge: Callable[[], bool],
+    on_hedge_done: Callable[[asyncio.Future], None],
+    record_latency: Optional[Callable[[float], None]] = None
+) -> Any:
+    """
+    Async variant of run_hedged; the losing request is cancelled, so a
+    primary that loses reports no latency.
+    """
+    primary = asyncio.ensure_future(_timed_async(send, record_latency)())
+    hedge: Optional[asyncio.Future] = None
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done or not try_start_hedge():
+            return await primary
+
+        hedge = asyncio.ensure_future(send())
+        hedge.add_done_callback(on_hedge_done)
+
+        pending = {primary, hedge}
+        first_error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.cancelled():
+                    continue
+                error = task.exception()
+                if error is None:
+                    if task is hedge:
+                        logger.info("Hedged request won after %.1fs", delay)
+                    return task.result()
+                first_error = first_error or error
+        raise first_error or asyncio.CancelledError()
+    finally:
+        for task in (primary, hedge):
+            if task is not None and not task.done():
+                task.cancel()
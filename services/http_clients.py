@@ -0,0 +1,117 @@
+"""
+Shared HTTP Connection Pools for EkkoScope provider clients.
+Keeps long-lived keep-alive (and HTTP/2 when available) pools so provider
+SDK clients stop paying a fresh TCP/TLS handshake on every call.
+"""
+
+import asyncio
+import logging
+import threading
+import weakref
+from typing import Any, Callable, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+POOL_LIMITS = httpx.Limits(
+    max_connections=100,
+    max_keepalive_connections=40,
+    keepalive_expiry=120.0
+)
+POOL_TIMEOUT = httpx.Timeout(60.0, connect=10.0)
+
+_lock = threading.Lock()
+_sync_client: Optional[httpx.Client] = None
+_loop_singletons: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+_cancellable_clients: "weakref.WeakKeyDictionary[Any, httpx.Client]" = weakref.WeakKeyDictionary()
+
+
+def get_shared_http_client() -> httpx.Client:
+    """Get the process-wide blocking HTTP client (thread-safe, keep-alive pooled)."""
+    global _sync_client
+    if _sync_client is None:
+        with _lock:
+            if _sync_client is None:
+                _sync_client = httpx.Client(
+                    http2=HTTP2_AVAILABLE,
+                    limits=POOL_LIMITS,
+                    timeout=POOL_TIMEOUT
+                )
+                logger.info("Shared HTTP client created (http2=%s)", HTTP2_AVAILABLE)
+    return _sync_client
+
+
+def get_cancellable_http_client(token: Any) -> httpx.Client:
+    """
+    Get the blocking HTTP client for one cancellable run (keyed by its
+    CancellationToken).
+
+    Cancelling the token closes the client, which aborts that run's requests
+    still on the wire; the shared pool, and so every other run, is untouched.
+    Call close_cancellable_http_client when the run finishes.
+    """
+    with _lock:
+        client = _cancellable_clients.get(token)
+        if client is not None:
+            return client
+        client = httpx.Client(
+            http2=HTTP2_AVAILABLE,
+            limits=POOL_LIMITS,
+            timeout=POOL_TIMEOUT
+        )
+        _cancellable_clients[token] = client
+    token.add_callback(client.close)
+    return client
+
+
+def close_cancellable_http_client(token: Any):
+    """Close the run's cancellable HTTP client, if one was created."""
+    with _lock:
+        client = _cancellable_clients.pop(token, None)
+    if client is not None:
+        client.close()
+
+
+def get_loop_singleton(name: str, factory: Callable[[], Any]) -> Any:
+    """
+    Get (or build) an object scoped to the running event loop.
+
+    httpx async pools are bound to the loop that opened their connections,
+    so async clients are kept once per loop and dropped with the loop.
+    """
+    loop = asyncio.get_running_loop()
+    objects = _loop_singletons.setdefault(loop, {})
+    obj = objects.get(name)
+    if obj is None:
+        obj = factory()
+        objects[name] = obj
+    return obj
+
+
+def get_shared_async_http_client() -> httpx.AsyncClient:
+    """Get the async HTTP client (keep-alive pooled) for the running event loop."""
+    def _build() -> httpx.AsyncClient:
+        logger.info("Shared async HTTP client created (http2=%s)", HTTP2_AVAILABLE)
+        return httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            limits=POOL_LIMITS,
+            timeout=POOL_TIMEOUT
+        )
+    
+    return get_loop_singleton("http_client", _build)
+
+
+async def close_shared_async_http_client():
+    """Close the async HTTP client bound to the running event loop, if any."""
+    loop = asyncio.get_running_loop()
+    objects = _loop_singletons.pop(loop, {})
+    client = objects.get("http_client")
+    if client is not None and not client.is_closed:
+        await client.aclose()
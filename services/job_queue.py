@@ -0,0 +1,393 @@
+"""
+Durable Audit Job Queue for EkkoScope.
+Audits are persisted as rows in audit_jobs and executed by a pool of worker
+threads, so in-flight work survives deploys/restarts and throughput is
+governed by AUDIT_WORKER_COUNT rather than by request handlers.
+
+Workers claim a job with a time-limited lease and extend it with heartbeats
+while the job runs. If a worker dies, its lease lapses and another worker
+picks the job up again. Failures are retried with exponential backoff up to
+the job's max_attempts.
+"""
+
+import os
+import socket
+import logging
+import threading
+import traceback
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import or_, and_, func
+
+from services.config import (
+    AUDIT_WORKER_COUNT,
+    AUDIT_JOB_LEASE_SECONDS,
+    AUDIT_JOB_HEARTBEAT_SECONDS,
+    AUDIT_JOB_MAX_ATTEMPTS,
+    AUDIT_JOB_RETRY_BASE_SECONDS,
+    AUDIT_JOB_POLL_SECONDS,
+    AUDIT_JOB_MAX_PER_TENANT,
+)
+from services.database import AuditJob, Audit, Business, get_db_session
+from services.metrics import MetricFamily, register_collector
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[int, int], None]
+
+_handlers: Dict[str, JobHandler] = {}
+_wakeup = threading.Event()
+
+
+class PermanentJobError(Exception):
+    """Raised by a job handler for failures that retrying cannot fix."""
+    pass
+
+
+def register_job_handler(kind: str, handler: JobHandler):
+    """Register the function that runs jobs of a given kind: handler(business_id, audit_id)."""
+    _handlers[kind] = handler
+
+
+def tenant_key_for_business(db, business_id: int) -> str:
+    """
+    Fairness key for a business: its owning user account when there is one,
+    so one owner with many businesses cannot occupy every worker.
+    """
+    owner_id = db.query(Business.owner_user_id).filter(Business.id == business_id).scalar()
+    return f"user:{owner_id}" if owner_id else f"business:{business_id}"
+
+
+def enqueue_audit(
+    business_id: int,
+    audit_id: int,
+    kind: str = "audit",
+    priority: int = 0,
+    run_after: Optional[datetime] = None,
+    max_attempts: Optional[int] = None
+) -> int:
+    """
+    Persist a job for an existing Audit row and wake the worker pool.
+
+    Enqueueing an audit that already has a queued or running job is a no-op.
+    Higher priority jobs are claimed first; run_after delays the earliest start.
+
+    Returns:
+        The job id
+    """
+    db = get_db_session()
+    try:
+        existing = db.query(AuditJob).filter(
+            AuditJob.audit_id == audit_id,
+            AuditJob.status.in_(["queued", "claimed"])
+        ).first()
+        if existing:
+            return existing.id
+
+        job = AuditJob(
+            kind=kind,
+            audit_id=audit_id,
+            business_id=business_id,
+            tenant_key=tenant_key_for_business(db, business_id),
+            status="queued",
+            priority=priority,
+            max_attempts=max_attempts or AUDIT_JOB_MAX_ATTEMPTS,
+            run_after=run_after or datetime.utcnow()
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        logger.info("Enqueued %s job %d for audit %d", kind, job.id, audit_id)
+    finally:
+        db.close()
+
+    _wakeup.set()
+    return job.id
+
+
+def _fail_exhausted_jobs(db, now: datetime):
+    """Mark jobs whose lease lapsed after their final attempt as failed."""
+    exhausted = db.query(AuditJob).filter(
+        AuditJob.status == "claimed",
+        AuditJob.claim_expires_at < now,
+        AuditJob.attempts >= AuditJob.max_attempts
+    ).all()
+    for job in exhausted:
+        job.status = "failed"
+        job.finished_at = now
+        job.last_error = (job.last_error or "") + "\nLease expired on final attempt (worker lost)"
+        audit = db.query(Audit).filter(Audit.id == job.audit_id).first()
+        if audit and audit.status in ("pending", "running"):
+            audit.status = "error"
+            audit.set_visibility_summary({"error": "Audit worker stopped responding"})
+        logger.warning("Job %d failed: lease expired on final attempt", job.id)
+    if exhausted:
+        db.commit()
+
+
+def claim_next_job(worker_id: str) -> Optional[AuditJob]:
+    """
+    Atomically claim the next runnable job for this worker.
+
+    Runnable means queued and due, or claimed by a worker whose lease has
+    expired. Tenants already holding AUDIT_JOB_MAX_PER_TENANT live claims are
+    passed over so one tenant's backlog cannot starve the others. The claim
+    is a conditional UPDATE, so two workers racing for the same row cannot
+    both win.
+
+    Returns:
+        A detached AuditJob snapshot, or None if nothing is runnable
+    """
+    db = get_db_session()
+    try:
+        now = datetime.utcnow()
+        _fail_exhausted_jobs(db, now)
+
+        runnable = or_(
+            and_(AuditJob.status == "queued", AuditJob.run_after <= now),
+            and_(
+                AuditJob.status == "claimed",
+                AuditJob.claim_expires_at < now,
+                AuditJob.attempts < AuditJob.max_attempts
+            )
+        )
+        busy = dict(
+            db.query(AuditJob.tenant_key, func.count(AuditJob.id))
+            .filter(AuditJob.status == "claimed", AuditJob.claim_expires_at >= now)
+            .group_by(AuditJob.tenant_key)
+            .all()
+        )
+        candidates = (
+            db.query(AuditJob.id, AuditJob.tenant_key)
+            .filter(runnable)
+            .order_by(AuditJob.priority.desc(), AuditJob.run_after, AuditJob.id)
+            .limit(50)
+            .all()
+        )
+
+        for job_id, tenant_key in candidates:
+            if tenant_key and busy.get(tenant_key, 0) >= AUDIT_JOB_MAX_PER_TENANT:
+                continue
+            claimed = db.query(AuditJob).filter(AuditJob.id == job_id, runnable).update({
+                AuditJob.status: "claimed",
+                AuditJob.claimed_by: worker_id,
+                AuditJob.claim_expires_at: now + timedelta(seconds=AUDIT_JOB_LEASE_SECONDS),
+                AuditJob.heartbeat_at: now,
+                AuditJob.attempts: AuditJob.attempts + 1
+            }, synchronize_session=False)
+            db.commit()
+            if claimed:
+                job = db.query(AuditJob).filter(AuditJob.id == job_id).first()
+                db.expunge(job)
+                return job
+        return None
+    finally:
+        db.close()
+
+
+def heartbeat_job(job_id: int, worker_id: str) -> bool:
+    """
+    Extend this worker's lease on a job.
+
+    Returns:
+        False if the lease was lost (another worker reclaimed the job)
+    """
+    db = get_db_session()
+    try:
+        now = datetime.utcnow()
+        updated = db.query(AuditJob).filter(
+            AuditJob.id == job_id,
+            AuditJob.status == "claimed",
+            AuditJob.claimed_by == worker_id
+        ).update({
+            AuditJob.heartbeat_at: now,
+            AuditJob.claim_expires_at: now + timedelta(seconds=AUDIT_JOB_LEASE_SECONDS)
+        }, synchronize_session=False)
+        db.commit()
+        return bool(updated)
+    finally:
+        db.close()
+
+
+def complete_job(job_id: int, worker_id: str):
+    """Mark a job done, provided this worker still holds it."""
+    db = get_db_session()
+    try:
+        db.query(AuditJob).filter(
+            AuditJob.id == job_id,
+            AuditJob.claimed_by == worker_id
+        ).update({
+            AuditJob.status: "done",
+            AuditJob.finished_at: datetime.utcnow(),
+            AuditJob.claim_expires_at: None
+        }, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def fail_job(job_id: int, worker_id: str, error: str, retryable: bool = True):
+    """
+    Record a failed attempt: requeue with exponential backoff while attempts
+    remain, otherwise mark the job failed.
+    """
+    db = get_db_session()
+    try:
+        job = db.query(AuditJob).filter(
+            AuditJob.id == job_id,
+            AuditJob.claimed_by == worker_id
+        ).first()
+        if not job:
+            return
+
+        now = datetime.utcnow()
+        job.last_error = error[:4000]
+        job.claim_expires_at = None
+
+        if retryable and (job.attempts or 0) < (job.max_attempts or 1):
+            delay = AUDIT_JOB_RETRY_BASE_SECONDS * (2 ** max((job.attempts or 1) - 1, 0))
+            job.status = "queued"
+            job.claimed_by = None
+            job.run_after = now + timedelta(seconds=delay)
+
+            audit = db.query(Audit).filter(Audit.id == job.audit_id).first()
+            if audit and audit.status == "error":
+                audit.status = "pending"
+            logger.info("Job %d attempt %d failed; retrying in %ds", job.id, job.attempts, delay)
+        else:
+            job.status = "failed"
+            job.finished_at = now
+            logger.warning("Job %d failed permanently after %d attempts", job.id, job.attempts)
+
+        db.commit()
+    finally:
+        db.close()
+
+
+def get_queue_stats() -> Dict[str, int]:
+    """Count jobs by status (for admin views)."""
+    db = get_db_session()
+    try:
+        rows = db.query(AuditJob.status, func.count(AuditJob.id)).group_by(AuditJob.status).all()
+        return {status: count for status, count in rows}
+    finally:
+        db.close()
+
+
+def _queue_metrics() -> Iterable[MetricFamily]:
+    family = MetricFamily("ekkoscope_audit_jobs", "gauge", "Audit jobs by status (queued jobs are the queue depth)")
+    for status, count in sorted(get_queue_stats().items()):
+        family.add(count, status=status)
+    yield family
+
+
+register_collector(_queue_metrics)
+
+
+class AuditWorkerPool:
+    """
+    Fixed-size pool of worker threads draining the audit_jobs table.
+    """
+
+    def __init__(self, size: int = AUDIT_WORKER_COUNT):
+        self.size = max(1, size)
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._prefix = f"{socket.gethostname()}:{os.getpid()}"
+
+    def start(self):
+        """Start the worker threads (idempotent)."""
+        if self._threads:
+            return
+        self._stop.clear()
+        for n in range(self.size):
+            worker_id = f"{self._prefix}:{n}"
+            thread = threading.Thread(
+                target=self._worker_loop,
+                args=(worker_id,),
+                name=f"audit-worker-{n}",
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        logger.info("Started %d audit workers", self.size)
+
+    def stop(self, timeout: float = 5.0):
+        """
+        Ask workers to stop after their current job. Jobs still running when
+        the process exits keep their lease until it expires and are then
+        picked up again by the next process.
+        """
+        self._stop.set()
+        _wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+
+    def _worker_loop(self, worker_id: str):
+        while not self._stop.is_set():
+            try:
+                job = claim_next_job(worker_id)
+            except Exception as e:
+                logger.error("Worker %s failed to claim a job: %s", worker_id, e)
+                job = None
+
+            if job is None:
+                _wakeup.wait(AUDIT_JOB_POLL_SECONDS)
+                _wakeup.clear()
+                continue
+
+            self._run_job(job, worker_id)
+
+    def _run_job(self, job: AuditJob, worker_id: str):
+        handler = _handlers.get(job.kind)
+        if handler is None:
+            fail_job(job.id, worker_id, f"No handler registered for job kind '{job.kind}'", retryable=False)
+            return
+
+        done = threading.Event()
+
+        def _heartbeat():
+            while not done.wait(AUDIT_JOB_HEARTBEAT_SECONDS):
+                try:
+                    if not heartbeat_job(job.id, worker_id):
+                        logger.warning("Worker %s lost lease on job %d", worker_id, job.id)
+                        return
+                except Exception as e:
+                    logger.warning("Heartbeat failed for job %d: %s", job.id, e)
+
+        beat = threading.Thread(target=_heartbeat, name=f"audit-heartbeat-{job.id}", daemon=True)
+        beat.start()
+
+        logger.info(
+            "%s running %s job %d (audit %d, attempt %d)",
+            worker_id, job.kind, job.id, job.audit_id, job.attempts
+        )
+        try:
+            handler(job.business_id, job.audit_id)
+            complete_job(job.id, worker_id)
+        except PermanentJobError as e:
+            fail_job(job.id, worker_id, f"{e}\n{traceback.format_exc()}", retryable=False)
+        except Exception as e:
+            fail_job(job.id, worker_id, f"{e}\n{traceback.format_exc()}")
+        finally:
+            done.set()
+
+
+_pool: Optional[AuditWorkerPool] = None
+
+
+def start_worker_pool(size: int = AUDIT_WORKER_COUNT) -> AuditWorkerPool:
+    """Start the process-wide worker pool."""
+    global _pool
+    if _pool is None:
+        _pool = AuditWorkerPool(size)
+    _pool.start()
+    return _pool
+
+
+def stop_worker_pool():
+    """Stop the process-wide worker pool, if running."""
+    if _pool is not None:
+        _pool.stop()
@@ -0,0 +1,304 @@
+"""
+Prometheus-style Metrics for EkkoScope.
+Counters, gauges and histograms kept in process memory and rendered in the
+Prometheus text exposition format by the /metrics endpoint. Modules update
+them as work happens (provider calls, probes, cache lookups, audits, PDF
+renders); values that live elsewhere, such as job counts in the database,
+are read by collectors registered with register_collector() at scrape time.
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+LabelValues = Tuple[str, ...]
+Sample = Tuple[str, Dict[str, str], float]
+
+_registry_lock = threading.Lock()
+_metrics: List["_Metric"] = []
+_collectors: List[Callable[[], Iterable["MetricFamily"]]] = []
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class MetricFamily:
+    """A metric's samples as produced by a scrape-time collector."""
+
+    def __init__(self, name: str, kind: str, help_text: str, samples: Optional[List[Sample]] = None):
+        self.name = name
+        self.kind = kind
+        self.help_text = help_text
+        self.samples: List[Sample] = samples or []
+
+    def add(self, value: float, **labels: str) -> "MetricFamily":
+        self.samples.append((self.name, labels, value))
+        return self
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        for name, labels, value in self.samples:
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _metrics.append(self)
+
+    def _key(self, labels: Dict[str, object]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple("" if labels[name] is None else str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: LabelValues) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def collect(self) -> MetricFamily:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonic count, e.g. calls made."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: object):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def values(self) -> Dict[LabelValues, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def collect(self) -> MetricFamily:
+        family = MetricFamily(self.name, self.kind, self.help_text)
+        for key, value in sorted(self.values().items()):
+            family.add(value, **self._labels(key))
+        return family
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, e.g. connections in use."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: object):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels: object):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: object):
+        self.inc(-amount, **labels)
+
+    def collect(self) -> MetricFamily:
+        family = MetricFamily(self.name, self.kind, self.help_text)
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            family.add(value, **self._labels(key))
+        return family
+
+
+class Histogram(_Metric):
+    """Distribution of observed values (seconds) in cumulative buckets."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: object):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # bucket counts, then sum and count
+                series = [0.0] * (len(self.buckets) + 2)
+                self._series[key] = series
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels: object) -> Iterator[None]:
+        """Observe the duration of a block, whether or not it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def collect(self) -> MetricFamily:
+        family = MetricFamily(self.name, self.kind, self.help_text)
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        for key, series in items:
+            labels = self._labels(key)
+            for bound, count in zip(self.buckets, series):
+                family.samples.append((f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, count))
+            family.samples.append((f"{self.name}_bucket", {**labels, "le": "+Inf"}, series[-1]))
+            family.samples.append((f"{self.name}_sum", labels, series[-2]))
+            family.samples.append((f"{self.name}_count", labels, series[-1]))
+        return family
+
+
+def register_collector(collector: Callable[[], Iterable[MetricFamily]]):
+    """Register a function that yields MetricFamily values at scrape time."""
+    with _registry_lock:
+        _collectors.append(collector)
+
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format (v0.0.4)."""
+    with _registry_lock:
+        metrics = list(_metrics)
+        collectors = list(_collectors)
+
+    lines: List[str] = []
+    for metric in metrics:
+        lines.extend(metric.collect().render())
+    for collector in collectors:
+        try:
+            for family in collector():
+                lines.extend(family.render())
+        except Exception as e:
+            logger.warning("Metrics collector %s failed: %s", getattr(collector, "__name__", collector), e)
+    return "\n".join(lines) + "\n"
+
+
+# Provider gateway
+PROVIDER_CALLS = Counter(
+    "ekkoscope_provider_calls_total",
+    "Provider call attempts by outcome (success, failure, rate_limited)",
+    ("provider", "model", "outcome")
+)
+PROVIDER_CALL_SECONDS = Histogram(
+    "ekkoscope_provider_call_duration_seconds",
+    "Provider call attempt latency",
+    ("provider", "model", "outcome")
+)
+
+# Visibility probes and their caches
+PROBES = Counter(
+    "ekkoscope_probes_total",
+    "Visibility probes by outcome (found, not_found, failed)",
+    ("provider", "outcome")
+)
+PROBE_CACHE_LOOKUPS = Counter(
+    "ekkoscope_probe_cache_lookups_total",
+    "Shared probe store and response cache lookups by result (hit, miss)",
+    ("cache", "provider", "result")
+)
+
+# Audits and reports
+AUDIT_RUNS = Counter(
+    "ekkoscope_audit_runs_total",
+    "Finished audit runs by final status",
+    ("status",)
+)
+AUDIT_RUN_SECONDS = Histogram(
+    "ekkoscope_audit_run_duration_seconds",
+    "Wall time of audit runs",
+    ("status",),
+    buckets=(10, 30, 60, 120, 300, 600, 900, 1800, 3600)
+)
+PDF_RENDER_SECONDS = Histogram(
+    "ekkoscope_pdf_render_duration_seconds",
+    "PDF report build time",
+    ("report",),
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+
+# Process
+DB_CONNECTIONS_IN_USE = Gauge(
+    "ekkoscope_db_connections_in_use",
+    "Database connections currently checked out by sessions"
+)
+EVENT_LOOP_LAG_SECONDS = Gauge(
+    "ekkoscope_event_loop_lag_seconds",
+    "How late the last event loop lag probe woke up"
+)
+
+
+def _probe_cache_hit_ratio() -> Iterable[MetricFamily]:
+    totals: Dict[str, Dict[str, float]] = {}
+    for (cache, _provider, result), value in PROBE_CACHE_LOOKUPS.values().items():
+        counts = totals.setdefault(cache, {"hit": 0, "miss": 0})
+        counts[result] = counts.get(result, 0) + value
+
+    family = MetricFamily(
+        "ekkoscope_probe_cache_hit_ratio", "gauge",
+        "Hits over lookups since process start, per cache"
+    )
+    for cache, counts in sorted(totals.items()):
+        lookups = counts["hit"] + counts["miss"]
+        family.add(round(counts["hit"] / lookups, 4) if lookups else 0.0, cache=cache)
+    yield family
+
+
+register_collector(_probe_cache_hit_ratio)
+
+
+async def monitor_event_loop_lag(interval: float = 1.0):
+    """
+    Sleep in a loop and record how late each wake-up is; a blocked event
+    loop shows up as lag. Run as a background task.
+    """
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG_SECONDS.set(max(0.0, time.perf_counter() - start - interval))
@@ -4,21 +4,47 @@ Asks OpenAI to simulate a ChatGPT-style answer to see which brands it would reco
 """
 
 import json
+import asyncio
 import logging
 from typing import List, Dict, Any, Optional
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 
 from services.config import OPENAI_API_KEY, OPENAI_MODEL, OPENAI_ENABLED
+from services.cancellation import AuditCancelled
 from services.visibility_models import BrandHit, ProviderVisibility
+from services.shared_probes import (
+    find_target_in_brands, get_or_run_shared_probe, get_or_run_shared_probe_async
+)
+from services.provider_gateway import chat_completion, chat_completion_async
+from services.http_clients import (
+    get_shared_http_client, get_shared_async_http_client, get_loop_singleton
+)
 
 logger = logging.getLogger(__name__)
 
+OPENAI_VISIBILITY_PROMPT_VERSION = "v1"
+
+_client: Optional[OpenAI] = None
+
 
 def get_openai_client() -> Optional[OpenAI]:
-    """Get an OpenAI client. Returns None if not configured."""
+    """Get the shared OpenAI client. Returns None if not configured."""
+    global _client
+    if not OPENAI_ENABLED:
+        return None
+    if _client is None:
+        _client = OpenAI(api_key=OPENAI_API_KEY, http_client=get_shared_http_client())
+    return _client
+
+
+def get_async_openai_client() -> Optional[AsyncOpenAI]:
+    """Get the AsyncOpenAI client for the running event loop. Returns None if not configured."""
     if not OPENAI_ENABLED:
         return None
-    return OpenAI(api_key=OPENAI_API_KEY)
+    return get_loop_singleton(
+        "openai_client",
+        lambda: AsyncOpenAI(api_key=OPENAI_API_KEY, http_client=get_shared_async_http_client())
+    )
 
 
 def build_openai_visibility_prompt(
@@ -60,9 +86,18 @@ def build_openai_visibility_prompt(
     return [system_msg, user_msg]
 
 
-def parse_openai_response(raw: str, business_name: str) -> Dict[str, Any]:
+def parse_openai_response(
+    raw: str,
+    business_name: str,
+    brand_aliases: Optional[List[str]] = None,
+    domains: Optional[List[str]] = None
+) -> Dict[str, Any]:
     """
     Parse OpenAI's JSON response.
+    
+    The prompt never names the target business (so answers can be shared across
+    tenants), which means target detection is done here against the tenant's
+    name, aliases and domains rather than trusting the model's own flag.
     """
     if not raw:
         return {"recommended_brands": [], "target_found": False, "target_position": None}
@@ -82,29 +117,11 @@ def parse_openai_response(raw: str, business_name: str) -> Dict[str, Any]:
         data = json.loads(raw)
         
         recommended = data.get("recommended_brands", [])
-        target_found = data.get("target_business_mentioned", False)
-        target_position = data.get("target_position")
-        
-        if target_position is not None:
-            if isinstance(target_position, int):
-                pass
-            elif isinstance(target_position, str) and target_position.isdigit():
-                target_position = int(target_position)
-            else:
-                target_position = None
-        
-        if not target_found and recommended:
-            for i, rec in enumerate(recommended):
-                name = (rec.get("name") or "").lower()
-                url = (rec.get("url") or "").lower()
-                if business_name.lower() in name or business_name.lower() in url:
-                    target_found = True
-                    target_position = i + 1
-                    break
+        target_position = find_target_in_brands(recommended, business_name, brand_aliases, domains)
         
         return {
             "recommended_brands": recommended,
-            "target_found": target_found,
+            "target_found": target_position is not None,
             "target_position": target_position
         }
     except json.JSONDecodeError as e:
@@ -112,11 +129,174 @@ def parse_openai_response(raw: str, business_name: str) -> Dict[str, Any]:
         return {"recommended_brands": [], "target_found": False, "target_position": None}
 
 
+def _is_shareable_answer(raw: str) -> bool:
+    """Only share answers that parse into at least one recommendation."""
+    return bool(parse_openai_response(raw, "").get("recommended_brands"))
+
+
+def _build_openai_visibility(
+    query: str,
+    intent: Optional[str],
+    raw: Optional[str],
+    business_name: str,
+    brand_aliases: Optional[List[str]] = None,
+    domains: Optional[List[str]] = None
+) -> ProviderVisibility:
+    """Turn a raw OpenAI answer into a ProviderVisibility."""
+    parsed = parse_openai_response(raw, business_name, brand_aliases, domains)
+    
+    recommended_brands = [
+        BrandHit(
+            name=rec.get("name", "Unknown"),
+            url=rec.get("url"),
+            reason=rec.get("reason")
+        )
+        for rec in parsed.get("recommended_brands", [])
+    ]
+    
+    return ProviderVisibility(
+        provider="openai_sim",
+        query=query,
+        intent=intent,
+        recommended_brands=recommended_brands,
+        target_found=parsed.get("target_found", False),
+        target_position=parsed.get("target_position"),
+        raw_response=raw,
+        success=True
+    )
+
+
+def _failed_openai_visibility(query: str, intent: Optional[str]) -> ProviderVisibility:
+    return ProviderVisibility(
+        provider="openai_sim",
+        query=query,
+        intent=intent,
+        recommended_brands=[],
+        target_found=False,
+        success=False
+    )
+
+
+def probe_openai_visibility(
+    business_name: str,
+    primary_domain: str,
+    regions: List[str],
+    item: Dict[str, Any],
+    client: Optional[OpenAI] = None,
+    brand_aliases: Optional[List[str]] = None,
+    domains: Optional[List[str]] = None
+) -> Optional[ProviderVisibility]:
+    """
+    Run a single OpenAI simulated assistant visibility probe.
+    
+    The prompt is business-agnostic, so the raw answer comes from the shared
+    probe store when another tenant asked the same query recently.
+    
+    Args:
+        business_name: Name of the target business
+        primary_domain: Business website URL
+        regions: Geographic regions
+        item: Dict with 'query' and 'intent' keys
+        client: Optional OpenAI client to reuse across probes
+        brand_aliases: Optional extra names that identify the target business
+        domains: Domains of the target business (defaults to primary_domain)
+    
+    Returns:
+        ProviderVisibility for the query, or None if the query is empty
+    """
+    query = item.get("query", "")
+    intent = item.get("intent")
+    
+    if not query:
+        return None
+    
+    try:
+        client = client or get_openai_client()
+        if client is None:
+            raise RuntimeError("OpenAI client not configured")
+        
+        messages = build_openai_visibility_prompt(
+            business_name, primary_domain, regions, query
+        )
+        
+        def _run_probe() -> Optional[str]:
+            return chat_completion(
+                client,
+                model=OPENAI_MODEL,
+                messages=messages,
+                temperature=0.3,
+                max_tokens=500
+            ).text
+        
+        raw = get_or_run_shared_probe(
+            "openai_sim", OPENAI_MODEL, query, regions,
+            OPENAI_VISIBILITY_PROMPT_VERSION, _run_probe, _is_shareable_answer
+        )
+        return _build_openai_visibility(query, intent, raw, business_name, brand_aliases, domains or [primary_domain])
+        
+    except AuditCancelled:
+        raise
+    except Exception as e:
+        logger.warning("OpenAI visibility probe failed for query '%s': %s", query, e)
+        return _failed_openai_visibility(query, intent)
+
+
+async def probe_openai_visibility_async(
+    business_name: str,
+    primary_domain: str,
+    regions: List[str],
+    item: Dict[str, Any],
+    brand_aliases: Optional[List[str]] = None,
+    domains: Optional[List[str]] = None
+) -> Optional[ProviderVisibility]:
+    """
+    Async variant of probe_openai_visibility using the shared AsyncOpenAI client.
+    """
+    query = item.get("query", "")
+    intent = item.get("intent")
+    
+    if not query:
+        return None
+    
+    try:
+        client = get_async_openai_client()
+        if client is None:
+            raise RuntimeError("OpenAI client not configured")
+        
+        messages = build_openai_visibility_prompt(
+            business_name, primary_domain, regions, query
+        )
+        
+        async def _run_probe() -> Optional[str]:
+            reply = await chat_completion_async(
+                client,
+                model=OPENAI_MODEL,
+                messages=messages,
+                temperature=0.3,
+                max_tokens=500
+            )
+            return reply.text
+        
+        raw = await get_or_run_shared_probe_async(
+            "openai_sim", OPENAI_MODEL, query, regions,
+            OPENAI_VISIBILITY_PROMPT_VERSION, _run_probe, _is_shareable_answer
+        )
+        return _build_openai_visibility(query, intent, raw, business_name, brand_aliases, domains or [primary_domain])
+        
+    except (asyncio.CancelledError, AuditCancelled):
+        raise
+    except Exception as e:
+        logger.warning("OpenAI visibility probe failed for query '%s': %s", query, e)
+        return _failed_openai_visibility(query, intent)
+
+
 def run_openai_visibility_for_queries(
     business_name: str,
     primary_domain: str,
     regions: List[str],
-    queries_with_intent: List[Dict[str, Any]]
+    queries_with_intent: List[Dict[str, Any]],
+    brand_aliases: Optional[List[str]] = None,
+    domains: Optional[List[str]] = None
 ) -> List[ProviderVisibility]:
     """
     Run OpenAI simulated assistant visibility probe for each query.
@@ -126,12 +306,12 @@ def run_openai_visibility_for_queries(
         primary_domain: Business website URL
         regions: Geographic regions
         queries_with_intent: List of dicts with 'query' and 'intent' keys
+        brand_aliases: Optional extra names that identify the target business
+        domains: Domains of the target business (defaults to primary_domain)
     
     Returns:
         List of ProviderVisibility objects
     """
-    import sys
-    
     if not OPENAI_ENABLED:
         logger.info("OpenAI visibility probe skipped - not enabled")
         return []
@@ -144,58 +324,38 @@ def run_openai_visibility_for_queries(
     total = len(queries_with_intent)
     
     for idx, item in enumerate(queries_with_intent):
-        print(f"[OPENAI VIS] Query {idx+1}/{total}...")
-        sys.stdout.flush()
-        query = item.get("query", "")
-        intent = item.get("intent")
-        
-        if not query:
-            continue
+        logger.debug("OpenAI visibility query %d/%d", idx + 1, total)
         
-        try:
-            messages = build_openai_visibility_prompt(
-                business_name, primary_domain, regions, query
-            )
-            
-            response = client.chat.completions.create(
-                model=OPENAI_MODEL,
-                messages=messages,
-                temperature=0.3,
-                max_tokens=500
-            )
-            
-            raw = response.choices[0].message.content if response.choices else None
-            parsed = parse_openai_response(raw, business_name)
-            
-            recommended_brands = [
-                BrandHit(
-                    name=rec.get("name", "Unknown"),
-                    url=rec.get("url"),
-                    reason=rec.get("reason")
-                )
-                for rec in parsed.get("recommended_brands", [])
-            ]
-            
-            results.append(ProviderVisibility(
-                provider="openai_sim",
-                query=query,
-                intent=intent,
-                recommended_brands=recommended_brands,
-                target_found=parsed.get("target_found", False),
-                target_position=parsed.get("target_position"),
-                raw_response=raw,
-                success=True
-            ))
-            
-        except Exception as e:
-            logger.warning("OpenAI visibility probe failed for query '%s': %s", query, e)
-            results.append(ProviderVisibility(
-                provider="openai_sim",
-                query=query,
-                intent=intent,
-                recommended_brands=[],
-                target_found=False,
-                success=False
-            ))
+        vis = probe_openai_visibility(
+            business_name, primary_domain, regions, item, client=client,
+            brand_aliases=brand_aliases, domains=domains
+        )
+        if vis is not None:
+            results.append(vis)
     
     return results
+
+
+async def run_openai_visibility_for_queries_async(
+    business_name: str,
+    primary_domain: str,
+    regions: List[str],
+    queries_with_intent: List[Dict[str, Any]],
+    brand_aliases: Optional[List[str]] = None,
+    domains: Optional[List[str]] = None
+) -> List[ProviderVisibility]:
+    """
+    Async variant of run_openai_visibility_for_queries; probes all queries concurrently.
+    """
+    if not OPENAI_ENABLED:
+        logger.info("OpenAI visibility probe skipped - not enabled")
+        return []
+    
+    results = await asyncio.gather(*[
+        probe_openai_visibility_async(
+            business_name, primary_domain, regions, item,
+            brand_aliases=brand_aliases, domains=domains
+        )
+        for item in queries_with_intent
+    ])
+    return [vis for vis in results if vis is not None]
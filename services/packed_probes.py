@@ -0,0 +1,257 @@
+"""
+Packed Visibility Probes for EkkoScope.
+Optional mode for scheduled monitoring audits: instead of one request per
+query, K queries are sent in a single OpenAI or Gemini request that asks for
+a JSON array of per-query recommendations. The answer is split back into one
+ProviderVisibility per query, so the rest of the pipeline is unchanged.
+
+Because packing changes the prompt the model sees, each packed run also
+re-probes a sample of its queries unpacked and reports how well the two
+agree (target found and recommended brands). That lets us measure whether
+the cost/latency saving shifts scores.
+"""
+
+import json
+import random
+import logging
+from typing import Any, Dict, List, Optional
+
+from services.config import (
+    OPENAI_MODEL,
+    GEMINI_MODEL,
+    PACKED_PROBE_SIZE,
+    PACKED_AGREEMENT_SAMPLE_RATE,
+)
+from services.visibility_models import ProviderVisibility
+from services.shared_probes import normalize_query, get_shared_probe, shared_store_access, store_shared_probe
+from services.provider_gateway import chat_completion
+from services.openai_visibility import (
+    get_openai_client, probe_openai_visibility, _build_openai_visibility
+)
+from services.gemini_client import gemini_generate_json
+from services.gemini_visibility import probe_gemini_visibility, _build_gemini_visibility
+
+logger = logging.getLogger(__name__)
+
+PACKED_PROMPT_VERSION = "packed-v1"
+_TOKENS_PER_ANSWER = 300
+
+
+def _packed_instructions(regions: List[str], queries: List[str]) -> str:
+    regions_str = ", ".join(regions) if regions else "United States"
+    numbered = "\n".join(f"{i + 1}. \"{q}\"" for i, q in enumerate(queries))
+    return (
+        f"Several users in the {regions_str} area asked the questions below. "
+        "Answer each question independently, as if it were the only one asked: "
+        "recommend up to 5 businesses or brands for it, with their websites if known.\n\n"
+        f"{numbered}\n\n"
+        "Respond in STRICT JSON only, matching this structure:\n"
+        "{\n"
+        "  \"answers\": [\n"
+        "    {\"index\": 1, \"recommended_brands\": [{\"name\": \"Business Name\", \"url\": \"https://example.com\", \"reason\": \"Brief reason\"}]}\n"
+        "  ]\n"
+        "}\n"
+        f"Include exactly one entry per question ({len(queries)} entries), using the question's number as index. "
+        "No markdown, no extra commentary."
+    )
+
+
+def build_openai_packed_messages(regions: List[str], queries: List[str]) -> List[Dict[str, str]]:
+    return [
+        {
+            "role": "system",
+            "content": (
+                "You are a helpful AI assistant answering user questions about businesses and services. "
+                "When asked for recommendations, provide helpful suggestions based on your knowledge."
+            )
+        },
+        {"role": "user", "content": _packed_instructions(regions, queries)}
+    ]
+
+
+def build_gemini_packed_prompt(regions: List[str], queries: List[str]) -> str:
+    return (
+        "You are a helpful AI assistant answering user questions about businesses and services.\n\n"
+        + _packed_instructions(regions, queries)
+    )
+
+
+def split_packed_response(raw: Optional[str], count: int) -> List[Optional[str]]:
+    """
+    Split a packed answer into per-query raw answers in the single-probe
+    JSON shape ({"recommended_brands": [...]}).
+
+    Returns:
+        A list of length count; entries the model left out are None
+    """
+    parts: List[Optional[str]] = [None] * count
+    if not raw:
+        return parts
+
+    text = raw.strip()
+    if "```json" in text:
+        start = text.find("```json") + 7
+        end = text.find("```", start)
+        if end > start:
+            text = text[start:end].strip()
+    elif "```" in text:
+        start = text.find("```") + 3
+        end = text.find("```", start)
+        if end > start:
+            text = text[start:end].strip()
+
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        logger.warning("Could not parse packed visibility JSON: %s", e)
+        return parts
+
+    answers = data.get("answers", []) if isinstance(data, dict) else data
+    if not isinstance(answers, list):
+        return parts
+
+    for position, answer in enumerate(answers):
+        if not isinstance(answer, dict):
+            continue
+        index = answer.get("index", position + 1)
+        try:
+            index = int(index) - 1
+        except (TypeError, ValueError):
+            continue
+        brands = answer.get("recommended_brands")
+        if 0 <= index < count and isinstance(brands, list) and brands:
+            parts[index] = json.dumps({"recommended_brands": brands})
+    return parts
+
+
+def _send_packed(provider: str, regions: List[str], queries: List[str]) -> Optional[str]:
+    if provider == "openai_sim":
+        client = get_openai_client()
+        if client is None:
+            raise RuntimeError("OpenAI client not configured")
+        return chat_completion(
+            client,
+            model=OPENAI_MODEL,
+            messages=build_openai_packed_messages(regions, queries),
+            temperature=0.3,
+            max_tokens=_TOKENS_PER_ANSWER * len(queries)
+        ).text
+    return gemini_generate_json(build_gemini_packed_prompt(regions, queries))
+
+
+PACKED_PROVIDERS: Dict[str, Dict[str, Any]] = {
+    "openai_sim": {"model": OPENAI_MODEL, "build": _build_openai_visibility, "probe": probe_openai_visibility},
+    "gemini_sim": {"model": GEMINI_MODEL, "build": _build_gemini_visibility, "probe": probe_gemini_visibility},
+}
+
+
+def probe_packed_chunk(
+    provider: str,
+    business_name: str,
+    primary_domain: str,
+    regions: List[str],
+    items: List[Dict[str, Any]],
+    brand_aliases: Optional[List[str]] = None,
+    domains: Optional[List[str]] = None
+) -> List[ProviderVisibility]:
+    """
+    Probe up to PACKED_PROBE_SIZE queries with one packed request.
+
+    Per-query answers are shared across tenants under the packed prompt
+    version. Queries the packed answer leaves out fall back to a normal
+    single probe.
+    """
+    spec = PACKED_PROVIDERS[provider]
+    items = [item for item in items if item.get("query")]
+    raws: Dict[str, Optional[str]] = {}
+    read_shared, publish_shared = shared_store_access()
+
+    if read_shared:
+        for item in items:
+            raws[item["query"]] = get_shared_probe(
+                provider, spec["model"], item["query"], regions, PACKED_PROMPT_VERSION
+            )
+
+    to_ask = [item for item in items if not raws.get(item["query"])]
+    if to_ask:
+        try:
+            packed_raw = _send_packed(provider, regions, [item["query"] for item in to_ask])
+        except Exception as e:
+            logger.warning("Packed %s probe failed for %d queries: %s", provider, len(to_ask), e)
+            packed_raw = None
+        for item, part in zip(to_ask, split_packed_response(packed_raw, len(to_ask))):
+            raws[item["query"]] = part
+            if part and publish_shared:
+                store_shared_probe(provider, spec["model"], item["query"], regions, PACKED_PROMPT_VERSION, part)
+
+    results: List[ProviderVisibility] = []
+    for item in items:
+        raw = raws.get(item["query"])
+        if raw:
+            results.append(spec["build"](
+                item["query"], item.get("intent"), raw, business_name, brand_aliases, domains or [primary_domain]
+            ))
+        else:
+            vis = spec["probe"](business_name, primary_domain, regions, item, brand_aliases=brand_aliases, domains=domains)
+            if vis is not None:
+                results.append(vis)
+    return results
+
+
+def chunk_queries(items: List[Dict[str, Any]], size: int = PACKED_PROBE_SIZE) -> List[List[Dict[str, Any]]]:
+    size = max(1, size)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def sample_for_agreement(
+    items: List[Dict[str, Any]],
+    rate: float = PACKED_AGREEMENT_SAMPLE_RATE
+) -> List[Dict[str, Any]]:
+    """Pick the queries to re-probe unpacked (at least one when rate > 0)."""
+    items = [item for item in items if item.get("query")]
+    if rate <= 0 or not items:
+        return []
+    count = min(len(items), max(1, round(len(items) * rate)))
+    return random.sample(items, count)
+
+
+def _brand_names(vis: ProviderVisibility) -> set:
+    return {normalize_query(b.name) for b in vis.recommended_brands if b.name}
+
+
+def measure_agreement(
+    packed: List[ProviderVisibility],
+    unpacked: List[ProviderVisibility]
+) -> Dict[str, Any]:
+    """
+    Compare packed results against unpacked probes of the same queries.
+
+    Returns:
+        sampled (pairs compared), target_agreement (share of queries where
+        target_found matches), brand_overlap (mean Jaccard similarity of the
+        recommended brand sets) and the found rate under each mode
+    """
+    packed_by_query = {vis.query: vis for vis in packed if vis.success}
+    pairs = [
+        (packed_by_query[vis.query], vis)
+        for vis in unpacked
+        if vis is not None and vis.success and vis.query in packed_by_query
+    ]
+    if not pairs:
+        return {"sampled": 0}
+
+    target_matches = sum(1 for p, u in pairs if p.target_found == u.target_found)
+    overlaps = []
+    for p, u in pairs:
+        p_names, u_names = _brand_names(p), _brand_names(u)
+        union = p_names | u_names
+        overlaps.append(len(p_names & u_names) / len(union) if union else 1.0)
+
+    return {
+        "sampled": len(pairs),
+        "target_agreement": round(target_matches / len(pairs), 3),
+        "brand_overlap": round(sum(overlaps) / len(overlaps), 3),
+        "packed_found_rate": round(sum(1 for p, _ in pairs if p.target_found) / len(pairs), 3),
+        "unpacked_found_rate": round(sum(1 for _, u in pairs if u.target_found) / len(pairs), 3),
+    }
+
@@ -3,25 +3,56 @@ Perplexity API Client Module for EkkoScope.
 Uses OpenAI-compatible interface with Perplexity's base URL.
 """
 
+import asyncio
 import logging
 from typing import List, Dict, Optional, Any
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 
 from services.config import PERPLEXITY_API_KEY, PERPLEXITY_MODEL, PERPLEXITY_ENABLED
+from services.cancellation import AuditCancelled
+from services.provider_gateway import chat_completion, chat_completion_async
+from services.http_clients import (
+    get_shared_http_client, get_shared_async_http_client, get_loop_singleton
+)
 
 logger = logging.getLogger(__name__)
 
+PERPLEXITY_BASE_URL = "https://api.perplexity.ai"
+
+_client: Optional[OpenAI] = None
+
 
 def get_perplexity_client() -> Optional[OpenAI]:
     """
-    Get a Perplexity API client using OpenAI-compatible interface.
+    Get the shared Perplexity API client using OpenAI-compatible interface.
     Returns None if Perplexity is not configured.
     """
+    global _client
     if not PERPLEXITY_ENABLED:
         return None
-    return OpenAI(
-        api_key=PERPLEXITY_API_KEY,
-        base_url="https://api.perplexity.ai"
+    if _client is None:
+        _client = OpenAI(
+            api_key=PERPLEXITY_API_KEY,
+            base_url=PERPLEXITY_BASE_URL,
+            http_client=get_shared_http_client()
+        )
+    return _client
+
+
+def get_async_perplexity_client() -> Optional[AsyncOpenAI]:
+    """
+    Get the async Perplexity client for the running event loop.
+    Returns None if Perplexity is not configured.
+    """
+    if not PERPLEXITY_ENABLED:
+        return None
+    return get_loop_singleton(
+        "perplexity_client",
+        lambda: AsyncOpenAI(
+            api_key=PERPLEXITY_API_KEY,
+            base_url=PERPLEXITY_BASE_URL,
+            http_client=get_shared_async_http_client()
+        )
     )
 
 
@@ -56,9 +87,44 @@ def call_perplexity_chat(
             "temperature": 0,
             **kwargs
         }
-        resp = client.chat.completions.create(**call_kwargs)
-        choice = resp.choices[0] if resp.choices else None
-        return choice.message.content if choice and choice.message else None
+        return chat_completion(client, provider="perplexity", **call_kwargs).text
+    except AuditCancelled:
+        raise
+    except Exception as e:
+        logger.warning("Perplexity call failed: %s", e, exc_info=True)
+        return None
+
+
+async def call_perplexity_chat_async(
+    messages: List[Dict[str, str]],
+    model: Optional[str] = None,
+    **kwargs
+) -> Optional[str]:
+    """
+    Async variant of call_perplexity_chat using the shared AsyncOpenAI client.
+    
+    Returns:
+        The assistant's response content, or None on error/disabled
+    """
+    if not PERPLEXITY_ENABLED:
+        logger.info("Perplexity is disabled (no API key). Skipping call.")
+        return None
+
+    client = get_async_perplexity_client()
+    if client is None:
+        return None
+
+    try:
+        call_kwargs = {
+            "model": model or PERPLEXITY_MODEL,
+            "messages": messages,
+            "temperature": 0,
+            **kwargs
+        }
+        reply = await chat_completion_async(client, provider="perplexity", **call_kwargs)
+        return reply.text
+    except (asyncio.CancelledError, AuditCancelled):
+        raise
     except Exception as e:
         logger.warning("Perplexity call failed: %s", e, exc_info=True)
         return None
@@ -84,24 +150,22 @@ def call_perplexity_chat_with_citations(
         return None
 
     try:
-        resp = client.chat.completions.create(
+        reply = chat_completion(
+            client,
+            provider="perplexity",
             model=model or PERPLEXITY_MODEL,
             messages=messages,
             **kwargs
         )
-        choice = resp.choices[0] if resp.choices else None
-        if not choice or not choice.message:
+        if reply.text is None:
             return None
         
-        result = {
-            "content": choice.message.content,
-            "citations": []
+        return {
+            "content": reply.text,
+            "citations": reply.citations
         }
-        
-        if hasattr(resp, 'citations'):
-            result["citations"] = resp.citations or []
-        
-        return result
+    except AuditCancelled:
+        raise
     except Exception as e:
         logger.warning("Perplexity call failed: %s", e, exc_info=True)
         return None
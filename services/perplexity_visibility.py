@@ -7,9 +7,11 @@ import json
 import logging
 from typing import List, Dict, Any, Optional
 
-from services.perplexity_client import call_perplexity_chat
+from services.perplexity_client import call_perplexity_chat, call_perplexity_chat_async
 from services.config import PERPLEXITY_ENABLED
 from services.visibility_models import BrandHit, ProviderVisibility
+from services.shared_probes import find_target_in_brands
+from services.brand_matcher import get_brand_matcher
 
 logger = logging.getLogger(__name__)
 
@@ -101,6 +103,8 @@ def run_perplexity_visibility_probe(
     primary_domain: str,
     regions: List[str],
     queries: List[str],
+    brand_aliases: Optional[List[str]] = None,
+    domains: Optional[List[str]] = None
 ) -> Dict[str, Any]:
     """
     For each query, call Perplexity and try to parse the JSON result.
@@ -110,6 +114,8 @@ def run_perplexity_visibility_probe(
         primary_domain: Primary website URL
         regions: Geographic regions the business operates in
         queries: List of GEO queries to test
+        brand_aliases: Optional extra names that identify the target business
+        domains: Domains of the target business (defaults to primary_domain)
     
     Returns:
         Dict with structure:
@@ -140,16 +146,84 @@ def run_perplexity_visibility_probe(
             "summary": None
         }
     
+    raw_by_query: Dict[str, Optional[str]] = {}
+    for q in queries:
+        messages = build_perplexity_visibility_prompt(
+            business_name, primary_domain, regions, q
+        )
+        raw_by_query[q] = call_perplexity_chat(messages)
+    
+    return _summarize_perplexity_answers(
+        business_name, queries, raw_by_query, brand_aliases, domains or [primary_domain]
+    )
+
+
+def perplexity_visibility_from_results(
+    business_name: str,
+    primary_domain: str,
+    regions: List[str],
+    queries: List[str],
+    provider_results: List[ProviderVisibility],
+    brand_aliases: Optional[List[str]] = None,
+    domains: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    Build the run_perplexity_visibility_probe output from answers the
+    multi-LLM hub already fetched, so Perplexity is not called twice.
+    
+    Queries the hub did not probe (it caps queries per provider) are sent
+    to Perplexity here so the legacy shape still covers every query.
+    
+    Args:
+        business_name: Name of the business being analyzed
+        primary_domain: Primary website URL
+        regions: Geographic regions the business operates in
+        queries: List of GEO queries to report on
+        provider_results: perplexity_web ProviderVisibility entries from the hub
+        brand_aliases: Optional extra names that identify the target business
+        domains: Domains of the target business (defaults to primary_domain)
+    
+    Returns:
+        Same structure as run_perplexity_visibility_probe
+    """
+    if not PERPLEXITY_ENABLED:
+        return {
+            "enabled": False,
+            "queries": [],
+            "summary": None
+        }
+    
+    raw_by_query: Dict[str, Optional[str]] = {
+        vis.query: vis.raw_response for vis in provider_results
+    }
+    for q in queries:
+        if q not in raw_by_query:
+            messages = build_perplexity_visibility_prompt(
+                business_name, primary_domain, regions, q
+            )
+            raw_by_query[q] = call_perplexity_chat(messages)
+    
+    return _summarize_perplexity_answers(
+        business_name, queries, raw_by_query, brand_aliases, domains or [primary_domain]
+    )
+
+
+def _summarize_perplexity_answers(
+    business_name: str,
+    queries: List[str],
+    raw_by_query: Dict[str, Optional[str]],
+    brand_aliases: Optional[List[str]] = None,
+    domains: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """Parse raw Perplexity answers into the legacy per-query + summary structure."""
     results: List[Dict[str, Any]] = []
     all_competitors: Dict[str, int] = {}
     target_found_count = 0
     successful_probes = 0
+    matcher = get_brand_matcher(business_name, brand_aliases, domains)
 
     for q in queries:
-        messages = build_perplexity_visibility_prompt(
-            business_name, primary_domain, regions, q
-        )
-        raw = call_perplexity_chat(messages)
+        raw = raw_by_query.get(q)
         
         if raw is None:
             results.append({
@@ -166,13 +240,13 @@ def run_perplexity_visibility_probe(
         if success:
             successful_probes += 1
             
-            if parsed.get("target_business_found"):
+            recommended = parsed.get("recommended_brands", [])
+            if parsed.get("target_business_found") or matcher.find_position(recommended) is not None:
                 target_found_count += 1
             
-            recommended = parsed.get("recommended_brands", [])
             for rec in recommended:
                 name = rec.get("name", "Unknown")
-                if name.lower() != business_name.lower():
+                if not matcher.matches(name, rec.get("url")):
                     all_competitors[name] = all_competitors.get(name, 0) + 1
         
         results.append({
@@ -268,11 +342,137 @@ def format_perplexity_visibility_for_genius(
     return "\n".join(lines)
 
 
+def _build_perplexity_visibility(
+    query: str,
+    intent: Optional[str],
+    raw: Optional[str],
+    business_name: str,
+    brand_aliases: Optional[List[str]] = None,
+    domains: Optional[List[str]] = None
+) -> ProviderVisibility:
+    """Turn a raw Perplexity answer (or None on failure) into a ProviderVisibility."""
+    if raw is None:
+        return ProviderVisibility(
+            provider="perplexity_web",
+            query=query,
+            intent=intent,
+            recommended_brands=[],
+            target_found=False,
+            success=False
+        )
+    
+    parsed = parse_perplexity_response(raw)
+    
+    if parsed is None:
+        return ProviderVisibility(
+            provider="perplexity_web",
+            query=query,
+            intent=intent,
+            recommended_brands=[],
+            target_found=False,
+            raw_response=raw,
+            success=False
+        )
+    
+    recommended_brands = [
+        BrandHit(
+            name=rec.get("name", "Unknown"),
+            url=rec.get("url"),
+            reason=rec.get("reason")
+        )
+        for rec in parsed.get("recommended_brands", [])
+    ]
+    
+    target_found = parsed.get("target_business_found", False)
+    target_position = parsed.get("target_position")
+    
+    if not target_found and recommended_brands:
+        position = find_target_in_brands(
+            [{"name": b.name, "url": b.url} for b in recommended_brands],
+            business_name, brand_aliases, domains
+        )
+        if position is not None:
+            target_found = True
+            target_position = position
+    
+    return ProviderVisibility(
+        provider="perplexity_web",
+        query=query,
+        intent=intent,
+        recommended_brands=recommended_brands,
+        target_found=target_found,
+        target_position=target_position,
+        raw_response=raw,
+        success=True
+    )
+
+
+def probe_perplexity_visibility(
+    business_name: str,
+    primary_domain: str,
+    regions: List[str],
+    item: Dict[str, Any],
+    brand_aliases: Optional[List[str]] = None,
+    domains: Optional[List[str]] = None
+) -> Optional[ProviderVisibility]:
+    """
+    Run a single Perplexity web-grounded visibility probe.
+    
+    Args:
+        business_name: Name of the target business
+        primary_domain: Business website URL
+        regions: Geographic regions
+        item: Dict with 'query' and 'intent' keys
+        brand_aliases: Optional extra names that identify the target business
+        domains: Domains of the target business (defaults to primary_domain)
+    
+    Returns:
+        ProviderVisibility for the query, or None if the query is empty
+    """
+    query = item.get("query", "")
+    if not query:
+        return None
+    
+    messages = build_perplexity_visibility_prompt(
+        business_name, primary_domain, regions, query
+    )
+    raw = call_perplexity_chat(messages)
+    return _build_perplexity_visibility(
+        query, item.get("intent"), raw, business_name, brand_aliases, domains or [primary_domain]
+    )
+
+
+async def probe_perplexity_visibility_async(
+    business_name: str,
+    primary_domain: str,
+    regions: List[str],
+    item: Dict[str, Any],
+    brand_aliases: Optional[List[str]] = None,
+    domains: Optional[List[str]] = None
+) -> Optional[ProviderVisibility]:
+    """
+    Async variant of probe_perplexity_visibility using the shared async client.
+    """
+    query = item.get("query", "")
+    if not query:
+        return None
+    
+    messages = build_perplexity_visibility_prompt(
+        business_name, primary_domain, regions, query
+    )
+    raw = await call_perplexity_chat_async(messages)
+    return _build_perplexity_visibility(
+        query, item.get("intent"), raw, business_name, brand_aliases, domains or [primary_domain]
+    )
+
+
 def run_perplexity_visibility_for_queries(
     business_name: str,
     primary_domain: str,
     regions: List[str],
-    queries_with_intent: List[Dict[str, Any]]
+    queries_with_intent: List[Dict[str, Any]],
+    brand_aliases: Optional[List[str]] = None,
+    domains: Optional[List[str]] = None
 ) -> List[ProviderVisibility]:
     """
     Run Perplexity web-grounded visibility probe for each query.
@@ -283,90 +483,25 @@ def run_perplexity_visibility_for_queries(
         primary_domain: Business website URL
         regions: Geographic regions
         queries_with_intent: List of dicts with 'query' and 'intent' keys
+        brand_aliases: Optional extra names that identify the target business
+        domains: Domains of the target business (defaults to primary_domain)
     
     Returns:
         List of ProviderVisibility objects
     """
-    import sys
-    print(f"[PERPLEXITY VIS] run_perplexity_visibility_for_queries called, {len(queries_with_intent)} queries")
-    sys.stdout.flush()
-    
     if not PERPLEXITY_ENABLED:
-        print("[PERPLEXITY VIS] Skipped - not enabled")
-        sys.stdout.flush()
         logger.info("Perplexity visibility probe skipped - not enabled")
         return []
     
-    print(f"[PERPLEXITY VIS] Starting for {len(queries_with_intent)} queries")
-    sys.stdout.flush()
+    logger.info("Perplexity visibility probe starting for %d queries", len(queries_with_intent))
     
     results: List[ProviderVisibility] = []
     
     for item in queries_with_intent:
-        query = item.get("query", "")
-        intent = item.get("intent")
-        
-        if not query:
-            continue
-        
-        messages = build_perplexity_visibility_prompt(
-            business_name, primary_domain, regions, query
+        vis = probe_perplexity_visibility(
+            business_name, primary_domain, regions, item, brand_aliases=brand_aliases, domains=domains
         )
-        raw = call_perplexity_chat(messages)
-        
-        if raw is None:
-            results.append(ProviderVisibility(
-                provider="perplexity_web",
-                query=query,
-                intent=intent,
-                recommended_brands=[],
-                target_found=False,
-                success=False
-            ))
-            continue
-        
-        parsed = parse_perplexity_response(raw)
-        
-        if parsed is None:
-            results.append(ProviderVisibility(
-                provider="perplexity_web",
-                query=query,
-                intent=intent,
-                recommended_brands=[],
-                target_found=False,
-                raw_response=raw,
-                success=False
-            ))
-            continue
-        
-        recommended_brands = [
-            BrandHit(
-                name=rec.get("name", "Unknown"),
-                url=rec.get("url"),
-                reason=rec.get("reason")
-            )
-            for rec in parsed.get("recommended_brands", [])
-        ]
-        
-        target_found = parsed.get("target_business_found", False)
-        target_position = parsed.get("target_position")
-        
-        if not target_found and recommended_brands:
-            for i, brand in enumerate(recommended_brands):
-                if business_name.lower() in brand.name.lower():
-                    target_found = True
-                    target_position = i + 1
-                    break
-        
-        results.append(ProviderVisibility(
-            provider="perplexity_web",
-            query=query,
-            intent=intent,
-            recommended_brands=recommended_brands,
-            target_found=target_found,
-            target_position=target_position,
-            raw_response=raw,
-            success=True
-        ))
+        if vis is not None:
+            results.append(vis)
     
     return results
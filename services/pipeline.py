@@ -0,0 +1,141 @@
+"""
+Stage Graph Runner for the EkkoScope audit pipeline.
+Stages declare the stages they depend on; every stage whose dependencies are
+satisfied runs concurrently on a small thread pool, so the audit's wall time
+follows its critical path instead of the sum of all stages. Per-stage timings
+are recorded for reporting.
+
+Stages run inside the graph's own cancellation scope. When the graph fails,
+that scope is cancelled (aborting in-flight provider requests) and the graph
+waits for running stages to return, so no stage outlives the call and keeps
+using the caller's session-bound objects.
+"""
+
+import time
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from services.cancellation import CancellationToken, cancellation_scope, check_cancelled
+from services.tracing import span
+
+logger = logging.getLogger(__name__)
+
+WAIT_SLICE_SECONDS = 0.5
+
+
+@dataclass
+class PipelineStage:
+    """
+    A named unit of work. fn receives the outputs of all finished stages.
+    Expensive stages (paid provider calls) are checked by the graph's guard
+    before they start.
+    """
+    name: str
+    fn: Callable[[Dict[str, Any]], Any]
+    deps: List[str] = field(default_factory=list)
+    expensive: bool = False
+
+
+def run_stage_graph(
+    stages: List[PipelineStage],
+    max_workers: int = 4,
+    cancel_token: Optional[CancellationToken] = None,
+    guard: Optional[Callable[[PipelineStage], None]] = None
+) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+    """
+    Run stages in dependency order, overlapping independent stages.
+
+    Args:
+        stages: Stages to run; deps must name other stages in the list
+        max_workers: Maximum stages running at once
+        cancel_token: Checked before each stage starts and while stages run;
+            cancelling it also cancels the stages' own scope
+        guard: Called before each expensive stage starts; raising stops the graph
+
+    Returns:
+        (outputs by stage name, timings by stage name). Each timing has
+        start_ms (offset from graph start), duration_ms and status.
+
+    Raises:
+        The first exception raised by a stage, the guard or a cancel check;
+        stages not yet started are dropped, and in-flight stages are
+        cancelled and waited for before it propagates.
+    """
+    by_name = {stage.name: stage for stage in stages}
+    for stage in stages:
+        missing = [dep for dep in stage.deps if dep not in by_name]
+        if missing:
+            raise ValueError(f"Stage '{stage.name}' depends on unknown stages: {missing}")
+
+    outputs: Dict[str, Any] = {}
+    timings: Dict[str, Dict[str, Any]] = {}
+    running: Dict[Future, str] = {}
+    started = set()
+    graph_start = time.perf_counter()
+    stage_token = CancellationToken(cancel_token.audit_id if cancel_token is not None else None)
+
+    def _timed(stage: PipelineStage, snapshot: Dict[str, Any]) -> Any:
+        start = time.perf_counter()
+        timings[stage.name] = {
+            "start_ms": round((start - graph_start) * 1000),
+            "duration_ms": None,
+            "status": "running",
+            "deps": list(stage.deps),
+        }
+        try:
+            with cancellation_scope(stage_token), span(stage.name, kind="stage", deps=list(stage.deps) or None):
+                value = stage.fn(snapshot)
+            timings[stage.name]["status"] = "ok"
+            return value
+        except Exception:
+            timings[stage.name]["status"] = "error"
+            raise
+        finally:
+            timings[stage.name]["duration_ms"] = round((time.perf_counter() - start) * 1000)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="audit-stage")
+    unlink = cancel_token.add_callback(stage_token.cancel) if cancel_token is not None else (lambda: None)
+    try:
+        while len(outputs) < len(stages):
+            for stage in stages:
+                if stage.name in started or not all(dep in outputs for dep in stage.deps):
+                    continue
+                check_cancelled(cancel_token)
+                if stage.expensive and guard is not None:
+                    guard(stage)
+                started.add(stage.name)
+                running[executor.submit(contextvars.copy_context().run, _timed, stage, dict(outputs))] = stage.name
+
+            if not running:
+                pending = sorted(set(by_name) - set(outputs))
+                raise ValueError(f"Stage graph has a dependency cycle among: {pending}")
+
+            # Wait in short slices so a cancel is noticed while long stages run
+            done: set = set()
+            while not done:
+                check_cancelled(cancel_token)
+                done, _ = wait(list(running), timeout=WAIT_SLICE_SECONDS, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                outputs[name] = future.result()
+            # A stage cut short by a cancel may still return normally
+            check_cancelled(cancel_token)
+    except BaseException:
+        # Stop in-flight stages and wait for them, so none keeps running
+        # against the caller's state after the error is raised.
+        stage_token.cancel()
+        raise
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        unlink()
+
+    total_ms = round((time.perf_counter() - graph_start) * 1000)
+    logger.info(
+        "Stage graph finished in %dms: %s",
+        total_ms,
+        ", ".join(f"{name}={t['duration_ms']}ms" for name, t in timings.items())
+    )
+    return outputs, timings
@@ -0,0 +1,319 @@
+"""
+Provider Record/Replay for EkkoScope.
+Lets the audit pipeline, teaser audits, Sherlock and remediation run without
+network access, for benchmarks and regression runs.
+
+PROVIDER_CASSETTE_MODE=record sends traffic as usual and saves each answer
+under PROVIDER_CASSETTE_DIR, keyed by a fingerprint of the request.
+PROVIDER_CASSETTE_MODE=replay serves the saved answers and never touches the
+network. Three kinds of traffic are covered:
+- LLM calls through the provider gateway (OpenAI, Perplexity, Gemini,
+  embeddings). The gateway keeps its rate limiting, retries, breakers and
+  metrics; only the SDK send is swapped out. Replayed answers cost nothing,
+  so they are not written to the cost ledger and never count toward a
+  business's spend caps.
+- Pinecone index queries (wrap_pinecone_index)
+- Site fetches made with httpx clients built with cassette_transport()
+
+A fingerprint that was answered several times while recording (e.g. adaptive
+sampling re-asking a query) replays its answers in order. Replay can add
+PROVIDER_REPLAY_LATENCY_MS (+ jitter) per call and fail calls at
+PROVIDER_REPLAY_ERROR_RATE (503) / PROVIDER_REPLAY_RATE_LIMIT_RATE (429).
+Latency and failures are drawn from PROVIDER_REPLAY_SEED, the fingerprint and
+the call number, so a replay run is repeatable.
+"""
+
+import os
+import json
+import time
+import base64
+import random
+import asyncio
+import hashlib
+import logging
+import threading
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from services.config import (
+    PROVIDER_CASSETTE_MODE,
+    PROVIDER_CASSETTE_DIR,
+    PROVIDER_REPLAY_LATENCY_MS,
+    PROVIDER_REPLAY_JITTER_MS,
+    PROVIDER_REPLAY_ERROR_RATE,
+    PROVIDER_REPLAY_RATE_LIMIT_RATE,
+    PROVIDER_REPLAY_SEED,
+)
+
+logger = logging.getLogger(__name__)
+
+RECORD = "record"
+REPLAY = "replay"
+
+# Response headers that no longer apply once the body is stored decoded
+_DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+
+class CassetteMissError(Exception):
+    """Replay found no recorded answer for a request (not retryable)."""
+    pass
+
+
+class ReplayInjectedError(Exception):
+    """Failure injected during replay; status_code drives the gateway's retry logic."""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def cassette_mode() -> str:
+    return PROVIDER_CASSETTE_MODE if PROVIDER_CASSETTE_MODE in (RECORD, REPLAY) else ""
+
+
+def is_replaying() -> bool:
+    return cassette_mode() == REPLAY
+
+
+def fingerprint(kind: str, request: Dict[str, Any]) -> str:
+    encoded = json.dumps({"kind": kind, "request": request}, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class Cassette:
+    """
+    Recorded answers on disk, one JSON file per fingerprint:
+    <dir>/<kind>/<fingerprint>.json with {"kind", "request", "responses": [...]}.
+    A recording run replaces the answers of every fingerprint it touches.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._recorded: set = set()
+        self._loaded: Dict[str, List[Any]] = {}
+        self._served: Dict[str, int] = {}
+
+    def _path(self, kind: str, fp: str) -> str:
+        return os.path.join(self.directory, kind, f"{fp}.json")
+
+    def record(self, kind: str, fp: str, request: Dict[str, Any], response: Any):
+        path = self._path(kind, fp)
+        with self._lock:
+            entry = {"kind": kind, "request": request, "responses": []}
+            if fp in self._recorded and os.path.exists(path):
+                with open(path) as f:
+                    entry = json.load(f)
+            entry["responses"].append(response)
+            self._recorded.add(fp)
+
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(entry, f, default=str)
+            os.replace(tmp, path)
+
+    def next_response(self, kind: str, fp: str) -> Tuple[Any, int]:
+        """The next recorded answer for a fingerprint (cycling) and the call number."""
+        with self._lock:
+            responses = self._loaded.get(fp)
+            if responses is None:
+                path = self._path(kind, fp)
+                if not os.path.exists(path):
+                    raise CassetteMissError(f"No recorded {kind} answer for request {fp[:12]}")
+                with open(path) as f:
+                    responses = json.load(f).get("responses") or []
+                self._loaded[fp] = responses
+            if not responses:
+                raise CassetteMissError(f"Recorded {kind} entry {fp[:12]} has no answers")
+            served = self._served.get(fp, 0)
+            self._served[fp] = served + 1
+        return responses[served % len(responses)], served
+
+
+_cassette: Optional[Cassette] = None
+_cassette_lock = threading.Lock()
+
+
+def get_cassette() -> Cassette:
+    global _cassette
+    with _cassette_lock:
+        if _cassette is None:
+            _cassette = Cassette(PROVIDER_CASSETTE_DIR)
+            logger.info("Provider cassette %s mode at %s", cassette_mode(), PROVIDER_CASSETTE_DIR)
+        return _cassette
+
+
+def _replay_effects(fp: str, call: int) -> Tuple[float, Optional[ReplayInjectedError]]:
+    """Injected delay (seconds) and failure for one replayed call."""
+    rng = random.Random(f"{PROVIDER_REPLAY_SEED}:{fp}:{call}")
+    delay = max(0.0, PROVIDER_REPLAY_LATENCY_MS + rng.uniform(-1, 1) * PROVIDER_REPLAY_JITTER_MS) / 1000.0
+    roll = rng.random()
+    if roll < PROVIDER_REPLAY_RATE_LIMIT_RATE:
+        return delay, ReplayInjectedError(429, "Injected rate limit (replay)")
+    if roll < PROVIDER_REPLAY_RATE_LIMIT_RATE + PROVIDER_REPLAY_ERROR_RATE:
+        return delay, ReplayInjectedError(503, "Injected provider error (replay)")
+    return delay, None
+
+
+def wrap_provider_call(
+    provider: str,
+    request: Optional[Dict[str, Any]],
+    send: Callable[[], Any],
+    parse: Callable[[Any], Any],
+    reply_from_payload: Callable[[Dict[str, Any]], Any],
+    is_async: bool = False
+) -> Tuple[Callable[[], Any], Callable[[Any], Any]]:
+    """
+    Swap a gateway call's send/parse for record or replay. Every attempt
+    (retry or hedge) of a replayed call serves the same recorded answer.
+
+    Returns:
+        (send, parse) to use for the call; unchanged when the cassette is off
+        or the call has no request to fingerprint
+    """
+    mode = cassette_mode()
+    if not mode or request is None:
+        return send, parse
+
+    cassette = get_cassette()
+    fp = fingerprint(provider, request)
+
+    if mode == RECORD:
+        def _record_parse(raw: Any) -> Any:
+            reply = parse(raw)
+            cassette.record(provider, fp, request, reply.to_cache_payload())
+            return reply
+        return send, _record_parse
+
+    payload, served = cassette.next_response(provider, fp)
+    attempts = [0]
+
+    if is_async:
+        async def _replay_send_async() -> Dict[str, Any]:
+            delay, error = _replay_effects(fp, served * 100 + attempts[0] + 1)
+            attempts[0] += 1
+            await asyncio.sleep(delay)
+            if error is not None:
+                raise error
+            return payload
+        replay_send: Callable[[], Any] = _replay_send_async
+    else:
+        def _replay_send() -> Dict[str, Any]:
+            delay, error = _replay_effects(fp, served * 100 + attempts[0] + 1)
+            attempts[0] += 1
+            time.sleep(delay)
+            if error is not None:
+                raise error
+            return payload
+        replay_send = _replay_send
+
+    return replay_send, lambda raw: reply_from_payload(dict(raw))
+
+
+class CassetteIndex:
+    """
+    Pinecone index stand-in. query() is recorded/replayed; in replay, writes
+    (upsert, delete) are accepted and dropped. Other calls pass through
+    while recording.
+    """
+
+    def __init__(self, index: Any, name: str):
+        self._index = index
+        self._name = name
+
+    def query(self, **kwargs) -> Any:
+        request = {"index": self._name, **kwargs}
+        fp = fingerprint("pinecone", request)
+        cassette = get_cassette()
+
+        if cassette_mode() == RECORD:
+            result = self._index.query(**kwargs)
+            matches = [
+                {"id": m.id, "score": m.score, "metadata": getattr(m, "metadata", None)}
+                for m in (getattr(result, "matches", None) or [])
+            ]
+            stored_request = {k: v for k, v in request.items() if k != "vector"}
+            cassette.record("pinecone", fp, stored_request, {"matches": matches})
+            return result
+
+        payload, served = cassette.next_response("pinecone", fp)
+        delay, error = _replay_effects(fp, served)
+        time.sleep(delay)
+        if error is not None:
+            raise error
+        return SimpleNamespace(matches=[SimpleNamespace(**m) for m in payload.get("matches", [])])
+
+    def upsert(self, *args, **kwargs) -> Any:
+        if self._index is None:
+            return {}
+        return self._index.upsert(*args, **kwargs)
+
+    def delete(self, *args, **kwargs) -> Any:
+        if self._index is None:
+            return {}
+        return self._index.delete(*args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        if self._index is None:
+            raise CassetteMissError(f"Pinecone '{name}' is not available in replay")
+        return getattr(self._index, name)
+
+
+def wrap_pinecone_index(index: Any, name: str) -> Any:
+    """Wrap a Pinecone index for record/replay; index may be None in replay."""
+    if not cassette_mode():
+        return index
+    return CassetteIndex(None if is_replaying() else index, name)
+
+
+class CassetteTransport(httpx.BaseTransport):
+    """httpx transport that records or replays plain HTTP fetches (site pages)."""
+
+    def __init__(self):
+        self._inner = httpx.HTTPTransport() if cassette_mode() == RECORD else None
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        key = {"method": request.method, "url": str(request.url)}
+        body = request.read()
+        if body:
+            key["body_sha256"] = hashlib.sha256(body).hexdigest()
+        fp = fingerprint("http", key)
+        cassette = get_cassette()
+
+        if self._inner is not None:
+            response = self._inner.handle_request(request)
+            content = response.read()
+            headers = {k: v for k, v in response.headers.items() if k.lower() not in _DROPPED_HEADERS}
+            cassette.record("http", fp, key, {
+                "status": response.status_code,
+                "headers": headers,
+                "content_b64": base64.b64encode(content).decode("ascii"),
+            })
+            return httpx.Response(response.status_code, headers=headers, content=content, request=request)
+
+        try:
+            payload, served = cassette.next_response("http", fp)
+        except CassetteMissError as e:
+            raise httpx.ConnectError(str(e), request=request)
+        delay, error = _replay_effects(fp, served)
+        time.sleep(delay)
+        if error is not None:
+            raise httpx.ConnectError(str(error), request=request)
+        return httpx.Response(
+            payload["status"],
+            headers=payload.get("headers") or {},
+            content=base64.b64decode(payload.get("content_b64") or ""),
+            request=request
+        )
+
+    def close(self):
+        if self._inner is not None:
+            self._inner.close()
+
+
+def cassette_transport() -> Optional[httpx.BaseTransport]:
+    """Transport for httpx.Client(transport=...); None (the default) when the cassette is off."""
+    return CassetteTransport() if cassette_mode() else None
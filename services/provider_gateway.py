@@ -0,0 +1,555 @@
+"""
+Provider Gateway for EkkoScope.
+Every outbound LLM/embedding request goes through call_provider (or its async
+twin), which serves repeated requests from the response cache, fails fast
+while the provider's circuit breaker is open, acquires the provider's
+rate-limit governor, retries transient failures (429s honouring
+Retry-After, 5xx, timeouts) with jittered backoff, and normalizes the
+response into a ProviderReply.
+
+Inside a cancellation scope (a running audit), no attempt or retry starts
+once the token is cancelled, backoff waits end early, and requests on the
+wire are aborted: sync SDK clients are moved onto the run's own HTTP client,
+which the token closes, and async calls have their task cancelled.
+"""
+
+import time
+import random
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from services.config import PROVIDER_MAX_RETRIES
+from services.tracing import current_span, span
+from services.metrics import PROVIDER_CALLS, PROVIDER_CALL_SECONDS
+from services.cost_ledger import record_usage
+from services.provider_cassette import is_replaying, wrap_provider_call
+from services.rate_limiter import ProviderRateLimiter, get_rate_limiter
+from services.circuit_breaker import CircuitBreaker, get_circuit_breaker
+from services.cancellation import CancellationToken, check_cancelled, current_cancel_token
+from services.http_clients import get_cancellable_http_client
+from services.hedging import (
+    get_latency_tracker, get_hedge_budget, hedge_delay, run_hedged, run_hedged_async
+)
+from services.response_cache import (
+    cache_ttl_hours, make_cache_key, get_cached_response, store_cached_response
+)
+
+logger = logging.getLogger(__name__)
+
+_RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+_RATE_LIMIT_ERRORS = {"RateLimitError", "ResourceExhausted", "TooManyRequests"}
+_TRANSIENT_ERRORS = {
+    "APITimeoutError", "APIConnectionError", "InternalServerError",
+    "ServiceUnavailable", "DeadlineExceeded",
+    "TimeoutException", "ConnectError", "ReadTimeout", "RemoteProtocolError",
+}
+_BACKOFF_BASE_SECONDS = 1.0
+_BACKOFF_MAX_SECONDS = 30.0
+
+
+@dataclass
+class ProviderReply:
+    """Normalized provider response."""
+    text: Optional[str] = None
+    embeddings: List[List[float]] = field(default_factory=list)
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    citations: List[str] = field(default_factory=list)
+    raw: Any = None
+    from_cache: bool = False
+
+    def to_cache_payload(self) -> Dict[str, Any]:
+        return {
+            "text": self.text,
+            "embeddings": self.embeddings,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "citations": self.citations,
+        }
+
+    @classmethod
+    def from_cache_payload(cls, payload: Dict[str, Any]) -> "ProviderReply":
+        return cls(from_cache=True, **payload)
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any]) -> "ProviderReply":
+        """A reply rebuilt from to_cache_payload() output that counts as a live call (replay)."""
+        return cls(**payload)
+
+
+def estimate_tokens(messages: Any = None, max_tokens: Optional[int] = None) -> int:
+    """
+    Rough token estimate for TPM budgeting before a call (~4 chars per token).
+    The governor corrects its bucket with the provider's reported usage.
+    """
+    if isinstance(messages, str):
+        chars = len(messages)
+    elif isinstance(messages, list):
+        chars = sum(
+            len(m.get("content") or "") if isinstance(m, dict) else len(str(m))
+            for m in messages
+        )
+    else:
+        chars = 0
+    return chars // 4 + (max_tokens or 256)
+
+
+def parse_chat_response(response: Any) -> ProviderReply:
+    """Parse an OpenAI-compatible chat completion (OpenAI, Perplexity)."""
+    choice = response.choices[0] if getattr(response, "choices", None) else None
+    usage = getattr(response, "usage", None)
+    return ProviderReply(
+        text=choice.message.content if choice and choice.message else None,
+        prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+        completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+        citations=list(getattr(response, "citations", None) or []),
+        raw=response
+    )
+
+
+def parse_embedding_response(response: Any) -> ProviderReply:
+    """Parse an OpenAI embeddings response."""
+    usage = getattr(response, "usage", None)
+    return ProviderReply(
+        embeddings=[item.embedding for item in response.data],
+        prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+        raw=response
+    )
+
+
+def _retry_info(exc: BaseException) -> Tuple[bool, bool, Optional[float]]:
+    """
+    Classify a provider exception.
+
+    Returns:
+        (retryable, rate_limited, retry_after_seconds)
+    """
+    name = type(exc).__name__
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        code = getattr(exc, "code", None)
+        status = code if isinstance(code, int) else None
+
+    retry_after = None
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers is not None:
+        try:
+            if headers.get("retry-after-ms"):
+                retry_after = float(headers.get("retry-after-ms")) / 1000.0
+            elif headers.get("retry-after"):
+                retry_after = float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            retry_after = None
+
+    rate_limited = status == 429 or name in _RATE_LIMIT_ERRORS
+    retryable = rate_limited or status in _RETRYABLE_STATUS or name in _TRANSIENT_ERRORS
+    return retryable, rate_limited, retry_after
+
+
+def _reported_tokens(reply: ProviderReply) -> Optional[int]:
+    total = reply.prompt_tokens + reply.completion_tokens
+    return total or None
+
+
+def _record_outcome(breaker: CircuitBreaker, retryable: bool, rate_limited: bool):
+    """
+    Only outage-like failures (5xx, timeouts, connection errors) count
+    toward opening the circuit; a 429 or a 4xx shows the provider is up.
+    """
+    if retryable and not rate_limited:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+
+
+def _backoff_seconds(attempt: int, retry_after: Optional[float]) -> float:
+    if retry_after is not None:
+        return min(retry_after, _BACKOFF_MAX_SECONDS * 2)
+    delay = min(_BACKOFF_MAX_SECONDS, _BACKOFF_BASE_SECONDS * (2 ** attempt))
+    return random.uniform(delay / 2, delay)
+
+
+def _cache_key(provider: str, request: Optional[Dict[str, Any]]) -> Optional[str]:
+    if request is None or cache_ttl_hours(provider) <= 0:
+        return None
+    return make_cache_key(provider, request)
+
+
+def _cacheable(reply: ProviderReply) -> bool:
+    return bool(reply.text or reply.embeddings)
+
+
+def _hedge_starter(provider: str, limiter: ProviderRateLimiter, estimated_tokens: int) -> Callable[[], bool]:
+    """A hedge needs both a free rate-limit slot and hedge budget."""
+    def _start() -> bool:
+        if not limiter.try_acquire(estimated_tokens):
+            return False
+        if not get_hedge_budget(provider).try_spend():
+            limiter.release(estimated_tokens, succeeded=False)
+            return False
+        return True
+    return _start
+
+
+def _hedge_finisher(limiter: ProviderRateLimiter, estimated_tokens: int) -> Callable[[Any], None]:
+    """Return the hedge's extra rate-limit slot once the losing request completes."""
+    def _finish(future: Any):
+        if future.cancelled():
+            limiter.release(estimated_tokens, succeeded=False)
+            return
+        error = future.exception()
+        if error is None:
+            limiter.release(estimated_tokens)
+        else:
+            _, rate_limited, retry_after = _retry_info(error)
+            limiter.release(
+                estimated_tokens, rate_limited=rate_limited, retry_after=retry_after, succeeded=False
+            )
+    return _finish
+
+
+def _dispatch(provider: str, send: Callable[[], Any], limiter: ProviderRateLimiter, estimated_tokens: int) -> Any:
+    """Send one attempt, hedged past the provider's p95 when budget allows."""
+    get_hedge_budget(provider).record_request()
+    tracker = get_latency_tracker(provider)
+    delay = hedge_delay(provider)
+    if delay is None:
+        start = time.perf_counter()
+        result = send()
+        tracker.record(time.perf_counter() - start)
+        return result
+    return run_hedged(
+        send, delay,
+        _hedge_starter(provider, limiter, estimated_tokens),
+        _hedge_finisher(limiter, estimated_tokens),
+        record_latency=tracker.record
+    )
+
+
+async def _dispatch_async(
+    provider: str,
+    send: Callable[[], Awaitable[Any]],
+    limiter: ProviderRateLimiter,
+    estimated_tokens: int
+) -> Any:
+    """Async variant of _dispatch; a losing hedge is cancelled."""
+    get_hedge_budget(provider).record_request()
+    tracker = get_latency_tracker(provider)
+    delay = hedge_delay(provider)
+    if delay is None:
+        start = time.perf_counter()
+        result = await send()
+        tracker.record(time.perf_counter() - start)
+        return result
+    return await run_hedged_async(
+        send, delay,
+        _hedge_starter(provider, limiter, estimated_tokens),
+        _hedge_finisher(limiter, estimated_tokens),
+        record_latency=tracker.record
+    )
+
+
+def _record_call_metrics(provider: str, model: Optional[str], outcome: str, started: float):
+    """Count one call attempt and observe its latency."""
+    PROVIDER_CALLS.inc(provider=provider, model=model or "", outcome=outcome)
+    PROVIDER_CALL_SECONDS.observe(time.perf_counter() - started, provider=provider, model=model or "", outcome=outcome)
+
+
+def _trace_reply(call_span: Any, reply: ProviderReply):
+    """Record cache and token details of a reply on the provider span."""
+    call_span.set(
+        cache_hit=reply.from_cache,
+        prompt_tokens=reply.prompt_tokens,
+        completion_tokens=reply.completion_tokens
+    )
+
+
+def call_provider(
+    provider: str,
+    send: Callable[[], Any],
+    parse: Callable[[Any], ProviderReply] = parse_chat_response,
+    estimated_tokens: int = 0,
+    request: Optional[Dict[str, Any]] = None
+) -> ProviderReply:
+    """
+    Make a cached, rate-governed provider call with retries.
+
+    Args:
+        provider: Rate-limit key ("openai", "openai_embeddings", "perplexity", "gemini")
+        send: Performs one raw SDK request
+        parse: Converts the raw response into a ProviderReply
+        estimated_tokens: Tokens to reserve against the TPM budget
+        request: The request parameters (model, temperature, messages, ...)
+            used as the response cache key; None disables caching
+
+    Raises:
+        The last provider exception once retries are exhausted or the
+        failure is not transient
+    """
+    model = (request or {}).get("model")
+    with span(provider, kind="provider", model=model) as call_span:
+        cache_key = _cache_key(provider, request)
+        if cache_key:
+            cached = get_cached_response(provider, cache_key)
+            if cached is not None:
+                reply = ProviderReply.from_cache_payload(cached)
+                _trace_reply(call_span, reply)
+                return reply
+
+        send, parse = wrap_provider_call(provider, request, send, parse, ProviderReply.from_payload)
+        reply = _send_with_retries(provider, send, parse, estimated_tokens, model)
+        _trace_reply(call_span, reply)
+        if not is_replaying():
+            record_usage(provider, model, reply.prompt_tokens, reply.completion_tokens)
+        if cache_key and _cacheable(reply):
+            store_cached_response(provider, cache_key, request, reply.to_cache_payload())
+        return reply
+
+
+def _wait_before_retry(token: Optional[CancellationToken], delay: float):
+    """Back off before a retry; a cancel ends the wait early."""
+    if token is None:
+        time.sleep(delay)
+    else:
+        token.wait(delay)
+
+
+def _send_with_retries(
+    provider: str,
+    send: Callable[[], Any],
+    parse: Callable[[Any], ProviderReply],
+    estimated_tokens: int,
+    model: Optional[str] = None
+) -> ProviderReply:
+    limiter = get_rate_limiter(provider)
+    breaker = get_circuit_breaker(provider)
+    token = current_cancel_token()
+    attempt = 0
+    while True:
+        check_cancelled(token)
+        breaker.check()
+        limiter.acquire(estimated_tokens)
+        started = time.perf_counter()
+        try:
+            reply = parse(_dispatch(provider, send, limiter, estimated_tokens))
+        except Exception as e:
+            if token is not None and token.cancelled:
+                # Aborted by the cancel (its client was closed), not a provider failure.
+                limiter.release(estimated_tokens, succeeded=False)
+                breaker.abandon_trial()
+                check_cancelled(token)
+            retryable, rate_limited, retry_after = _retry_info(e)
+            _record_call_metrics(provider, model, "rate_limited" if rate_limited else "failure", started)
+            limiter.release(
+                estimated_tokens, rate_limited=rate_limited, retry_after=retry_after, succeeded=False
+            )
+            _record_outcome(breaker, retryable, rate_limited)
+            if not retryable or attempt >= PROVIDER_MAX_RETRIES:
+                raise
+            delay = _backoff_seconds(attempt, retry_after)
+            logger.info("%s call failed (%s); retry %d in %.1fs", provider, e, attempt + 1, delay)
+            attempt += 1
+            current_span().incr("retries")
+            _wait_before_retry(token, delay)
+            continue
+        _record_call_metrics(provider, model, "success", started)
+        limiter.release(estimated_tokens, actual_tokens=_reported_tokens(reply))
+        breaker.record_success()
+        return reply
+
+
+async def call_provider_async(
+    provider: str,
+    send: Callable[[], Awaitable[Any]],
+    parse: Callable[[Any], ProviderReply] = parse_chat_response,
+    estimated_tokens: int = 0,
+    request: Optional[Dict[str, Any]] = None
+) -> ProviderReply:
+    """Async variant of call_provider; send returns an awaitable."""
+    model = (request or {}).get("model")
+    with span(provider, kind="provider", model=model) as call_span:
+        cache_key = _cache_key(provider, request)
+        if cache_key:
+            cached = await asyncio.to_thread(get_cached_response, provider, cache_key)
+            if cached is not None:
+                reply = ProviderReply.from_cache_payload(cached)
+                _trace_reply(call_span, reply)
+                return reply
+
+        send, parse = wrap_provider_call(
+            provider, request, send, parse, ProviderReply.from_payload, is_async=True
+        )
+        reply = await _send_with_retries_async(provider, send, parse, estimated_tokens, model)
+        _trace_reply(call_span, reply)
+        if not is_replaying():
+            await asyncio.to_thread(record_usage, provider, model, reply.prompt_tokens, reply.completion_tokens)
+        if cache_key and _cacheable(reply):
+            await asyncio.to_thread(
+                store_cached_response, provider, cache_key, request, reply.to_cache_payload()
+            )
+        return reply
+
+
+def _cancel_task_on_abort(token: Optional[CancellationToken]) -> Callable[[], None]:
+    """
+    Cancel the calling task when token is cancelled, aborting its in-flight
+    request or backoff sleep.
+
+    Returns:
+        A function that stops watching the token
+    """
+    if token is None:
+        return lambda: None
+    task = asyncio.current_task()
+    loop = asyncio.get_running_loop()
+    watching = True
+
+    def _cancel():
+        if watching:
+            task.cancel()
+
+    unregister = token.add_callback(lambda: loop.call_soon_threadsafe(_cancel))
+
+    def _stop():
+        nonlocal watching
+        watching = False
+        unregister()
+    return _stop
+
+
+async def _send_with_retries_async(
+    provider: str,
+    send: Callable[[], Awaitable[Any]],
+    parse: Callable[[Any], ProviderReply],
+    estimated_tokens: int,
+    model: Optional[str] = None
+) -> ProviderReply:
+    token = current_cancel_token()
+    check_cancelled(token)
+    stop_watching = _cancel_task_on_abort(token)
+    try:
+        return await _send_with_retries_watched(provider, send, parse, estimated_tokens, model, token)
+    except asyncio.CancelledError:
+        check_cancelled(token)
+        raise
+    finally:
+        stop_watching()
+
+
+async def _send_with_retries_watched(
+    provider: str,
+    send: Callable[[], Awaitable[Any]],
+    parse: Callable[[Any], ProviderReply],
+    estimated_tokens: int,
+    model: Optional[str],
+    token: Optional[CancellationToken]
+) -> ProviderReply:
+    limiter = get_rate_limiter(provider)
+    breaker = get_circuit_breaker(provider)
+    attempt = 0
+    while True:
+        check_cancelled(token)
+        breaker.check()
+        await limiter.acquire_async(estimated_tokens)
+        started = time.perf_counter()
+        try:
+            reply = parse(await _dispatch_async(provider, send, limiter, estimated_tokens))
+        except asyncio.CancelledError:
+            limiter.release(estimated_tokens, succeeded=False)
+            breaker.abandon_trial()
+            raise
+        except Exception as e:
+            retryable, rate_limited, retry_after = _retry_info(e)
+            _record_call_metrics(provider, model, "rate_limited" if rate_limited else "failure", started)
+            limiter.release(
+                estimated_tokens, rate_limited=rate_limited, retry_after=retry_after, succeeded=False
+            )
+            _record_outcome(breaker, retryable, rate_limited)
+            if not retryable or attempt >= PROVIDER_MAX_RETRIES:
+                raise
+            delay = _backoff_seconds(attempt, retry_after)
+            logger.info("%s call failed (%s); retry %d in %.1fs", provider, e, attempt + 1, delay)
+            attempt += 1
+            current_span().incr("retries")
+            await asyncio.sleep(delay)
+            continue
+        _record_call_metrics(provider, model, "success", started)
+        limiter.release(estimated_tokens, actual_tokens=_reported_tokens(reply))
+        breaker.record_success()
+        return reply
+
+
+def _without_sdk_retries(client: Any) -> Any:
+    """The gateway owns retries; stop the OpenAI SDK from retrying 429s out of sight."""
+    with_options = getattr(client, "with_options", None)
+    return with_options(max_retries=0) if with_options else client
+
+
+def _sync_sdk(client: Any) -> Any:
+    """
+    _without_sdk_retries for blocking clients; inside a cancellation scope the
+    client is moved onto the run's cancellable HTTP client, so a cancel aborts
+    its requests on the wire.
+    """
+    with_options = getattr(client, "with_options", None)
+    if with_options is None:
+        return client
+    token = current_cancel_token()
+    if token is None:
+        return with_options(max_retries=0)
+    return with_options(max_retries=0, http_client=get_cancellable_http_client(token))
+
+
+def chat_completion(client: Any, provider: str = "openai", **kwargs) -> ProviderReply:
+    """
+    Rate-governed chat completion on an OpenAI-compatible client.
+
+    Args:
+        client: OpenAI (or Perplexity-configured OpenAI) client
+        provider: Rate-limit key for the client's API key
+        **kwargs: Passed to chat.completions.create
+    """
+    sdk = _sync_sdk(client)
+    return call_provider(
+        provider,
+        lambda: sdk.chat.completions.create(**kwargs),
+        estimated_tokens=estimate_tokens(kwargs.get("messages"), kwargs.get("max_tokens")),
+        request=kwargs
+    )
+
+
+async def chat_completion_async(client: Any, provider: str = "openai", **kwargs) -> ProviderReply:
+    """Async variant of chat_completion for AsyncOpenAI clients."""
+    sdk = _without_sdk_retries(client)
+    return await call_provider_async(
+        provider,
+        lambda: sdk.chat.completions.create(**kwargs),
+        estimated_tokens=estimate_tokens(kwargs.get("messages"), kwargs.get("max_tokens")),
+        request=kwargs
+    )
+
+
+def create_embeddings(client: Any, **kwargs) -> ProviderReply:
+    """
+    Rate-governed embeddings request.
+
+    Args:
+        client: OpenAI client
+        **kwargs: Passed to embeddings.create (model, input, ...)
+    """
+    sdk = _sync_sdk(client)
+    texts = kwargs.get("input")
+    if isinstance(texts, list):
+        estimated = sum(len(str(t)) for t in texts) // 4
+    else:
+        estimated = len(str(texts or "")) // 4
+    return call_provider(
+        "openai_embeddings",
+        lambda: sdk.embeddings.create(**kwargs),
+        parse=parse_embedding_response,
+        estimated_tokens=estimated,
+        request=kwargs
+    )
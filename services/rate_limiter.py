@@ -0,0 +1,209 @@
+"""
+Adaptive Provider Rate Limiter for EkkoScope.
+One governor per provider API key (OpenAI chat, OpenAI embeddings, Perplexity,
+Gemini) combining:
+- token buckets for requests per minute and tokens per minute
+- AIMD concurrency: the in-flight cap grows by ~1 per window of successes and
+  halves on a 429, never exceeding the configured ceiling
+- a cooldown honouring the provider's Retry-After after a 429
+Sync callers block in acquire(); async callers await acquire_async().
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+from services.config import PROVIDER_RATE_LIMITS
+from services.metrics import MetricFamily, register_collector
+
+logger = logging.getLogger(__name__)
+
+_CONCURRENCY_POLL_SECONDS = 0.05
+_DEFAULT_COOLDOWN_SECONDS = 2.0
+
+
+class TokenBucket:
+    """
+    Refills continuously at rate_per_minute up to one minute of capacity.
+    A rate of 0 means unlimited. A request larger than the capacity is let
+    through once the bucket is full and leaves it in debt.
+    """
+
+    def __init__(self, rate_per_minute: int):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = float(rate_per_minute)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.rate_per_second <= 0
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate_per_second)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount can be consumed (0 if available now)."""
+        if self.unlimited:
+            return 0.0
+        self._refill(now)
+        needed = min(amount, self.capacity)
+        if self.level >= needed:
+            return 0.0
+        return (needed - self.level) / self.rate_per_second
+
+    def consume(self, amount: float):
+        if not self.unlimited:
+            self.level -= amount
+
+    def refund(self, amount: float):
+        """Return (or, with a negative amount, charge) tokens after the fact."""
+        if not self.unlimited:
+            self.level = min(self.capacity, self.level + amount)
+
+
+class ProviderRateLimiter:
+    """
+    Rate-limit governor for one provider API key.
+    """
+
+    def __init__(self, name: str, rpm: int = 0, tpm: int = 0, max_concurrency: int = 8):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self._lock = threading.Lock()
+        self._requests = TokenBucket(rpm)
+        self._tokens = TokenBucket(tpm)
+        self._limit = float(self.max_concurrency)
+        self._in_flight = 0
+        self._cooldown_until = 0.0
+        self.rate_limited_count = 0
+
+    def _try_acquire(self, tokens: int) -> Tuple[bool, float]:
+        with self._lock:
+            now = time.monotonic()
+            if now < self._cooldown_until:
+                return False, self._cooldown_until - now
+            if self._in_flight >= int(self._limit):
+                return False, _CONCURRENCY_POLL_SECONDS
+            wait = max(self._requests.wait_time(1, now), self._tokens.wait_time(tokens, now))
+            if wait > 0:
+                return False, wait
+            self._requests.consume(1)
+            self._tokens.consume(tokens)
+            self._in_flight += 1
+            return True, 0.0
+
+    def try_acquire(self, tokens: int = 0) -> bool:
+        """Take a slot only if one is available right now."""
+        return self._try_acquire(tokens)[0]
+
+    def acquire(self, tokens: int = 0):
+        """Block until a request slot and token budget are available."""
+        while True:
+            acquired, wait = self._try_acquire(tokens)
+            if acquired:
+                return
+            time.sleep(min(wait, 1.0))
+
+    async def acquire_async(self, tokens: int = 0):
+        """Await a request slot and token budget without blocking the loop."""
+        while True:
+            acquired, wait = self._try_acquire(tokens)
+            if acquired:
+                return
+            await asyncio.sleep(min(wait, 1.0))
+
+    def release(
+        self,
+        estimated_tokens: int = 0,
+        actual_tokens: Optional[int] = None,
+        rate_limited: bool = False,
+        retry_after: Optional[float] = None,
+        succeeded: bool = True
+    ):
+        """
+        Return a slot and feed the outcome back into the governor.
+
+        Args:
+            estimated_tokens: Tokens reserved at acquire time
+            actual_tokens: Tokens the provider reported, to correct the TPM bucket
+            rate_limited: The call was rejected with a 429
+            retry_after: Provider's Retry-After in seconds, if given
+            succeeded: False for other failures (no additive increase)
+        """
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+            if actual_tokens is not None:
+                self._tokens.refund(estimated_tokens - actual_tokens)
+
+            if rate_limited:
+                self.rate_limited_count += 1
+                self._limit = max(1.0, self._limit / 2)
+                cooldown = retry_after if retry_after is not None else _DEFAULT_COOLDOWN_SECONDS
+                self._cooldown_until = max(self._cooldown_until, time.monotonic() + cooldown)
+                logger.warning(
+                    "%s rate limited; concurrency cap now %d, cooling down %.1fs",
+                    self.name, int(self._limit), cooldown
+                )
+            elif succeeded:
+                self._limit = min(float(self.max_concurrency), self._limit + 1.0 / self._limit)
+
+    def snapshot(self) -> Dict[str, float]:
+        """Current governor state (for metrics/admin views)."""
+        with self._lock:
+            return {
+                "concurrency_limit": int(self._limit),
+                "in_flight": self._in_flight,
+                "cooldown_seconds": max(0.0, self._cooldown_until - time.monotonic()),
+                "rate_limited_count": self.rate_limited_count,
+            }
+
+
+_limiters_lock = threading.Lock()
+_limiters: Dict[str, ProviderRateLimiter] = {}
+
+
+def get_rate_limiter(name: str) -> ProviderRateLimiter:
+    """Get the process-wide limiter for a provider key (see PROVIDER_RATE_LIMITS)."""
+    limiter = _limiters.get(name)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(name)
+            if limiter is None:
+                limits = PROVIDER_RATE_LIMITS.get(name, {})
+                limiter = ProviderRateLimiter(
+                    name,
+                    rpm=limits.get("rpm", 0),
+                    tpm=limits.get("tpm", 0),
+                    max_concurrency=limits.get("max_concurrency", 8)
+                )
+                _limiters[name] = limiter
+    return limiter
+
+
+def all_rate_limiters() -> Dict[str, ProviderRateLimiter]:
+    with _limiters_lock:
+        return dict(_limiters)
+
+
+def _limiter_metrics() -> Iterable[MetricFamily]:
+    limit = MetricFamily("ekkoscope_rate_limit_concurrency", "gauge", "Current AIMD in-flight cap per provider key")
+    in_flight = MetricFamily("ekkoscope_rate_limit_in_flight", "gauge", "Requests in flight per provider key")
+    cooldown = MetricFamily("ekkoscope_rate_limit_cooldown_seconds", "gauge", "Seconds left in the Retry-After cooldown")
+    limited = MetricFamily("ekkoscope_rate_limited_total", "counter", "Calls rejected by the provider with a 429")
+    for name, limiter in sorted(all_rate_limiters().items()):
+        snap = limiter.snapshot()
+        limit.add(snap["concurrency_limit"], provider=name)
+        in_flight.add(snap["in_flight"], provider=name)
+        cooldown.add(round(snap["cooldown_seconds"], 3), provider=name)
+        limited.add(snap["rate_limited_count"], provider=name)
+    yield limit
+    yield in_flight
+    yield cooldown
+    yield limited
+
+
+register_collector(_limiter_metrics)
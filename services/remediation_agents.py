@@ -10,6 +10,7 @@ from datetime import datetime
 from dataclasses import dataclass, asdict
 from enum import Enum
 from services.ekkoscope_sentinel import log_ai_query
+from services.provider_gateway import chat_completion
 
 try:
     from openai import OpenAI
@@ -147,14 +148,15 @@ Return JSON: {{"meta_description": "...", "keywords": [...], "target_page": "hom
         try:
             log_ai_query("gpt-4o", "Meta description generation", self.business_name)
             
-            response = client.chat.completions.create(
+            response = chat_completion(
+                client,
                 model="gpt-4o",
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.7,
                 max_tokens=500,
                 response_format={"type": "json_object"}
             )
-            return json.loads(response.choices[0].message.content)
+            return json.loads(response.text)
         except:
             return {"meta_description": "", "keywords": [], "target_page": "homepage"}
     
@@ -179,14 +181,15 @@ Generate 5-7 FAQ items in JSON:
         try:
             log_ai_query("gpt-4o", "FAQ section generation", self.business_name)
             
-            response = client.chat.completions.create(
+            response = chat_completion(
+                client,
                 model="gpt-4o",
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.7,
                 max_tokens=1500,
                 response_format={"type": "json_object"}
             )
-            return json.loads(response.choices[0].message.content)
+            return json.loads(response.text)
         except:
             return {"faq_items": [], "schema_ready": False}
     
@@ -213,14 +216,15 @@ Generate comprehensive page content in JSON:
         try:
             log_ai_query("gpt-4o", f"Page content: {page_spec.get('page_title', 'new page')}", self.business_name)
             
-            response = client.chat.completions.create(
+            response = chat_completion(
+                client,
                 model="gpt-4o",
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.7,
                 max_tokens=2000,
                 response_format={"type": "json_object"}
             )
-            return json.loads(response.choices[0].message.content)
+            return json.loads(response.text)
         except:
             return {"page_title": page_spec.get("page_title", ""), "sections": []}
 
@@ -315,14 +319,15 @@ Return valid JSON-LD:
         try:
             log_ai_query("gpt-4o", "LocalBusiness schema", self.business_name)
             
-            response = client.chat.completions.create(
+            response = chat_completion(
+                client,
                 model="gpt-4o",
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.5,
                 max_tokens=1000,
                 response_format={"type": "json_object"}
             )
-            return json.loads(response.choices[0].message.content)
+            return json.loads(response.text)
         except:
             return {"schema_type": "LocalBusiness", "jsonld": {}}
     
@@ -365,14 +370,15 @@ Return valid JSON-LD for their primary service:
         try:
             log_ai_query("gpt-4o", "Service schema", self.business_name)
             
-            response = client.chat.completions.create(
+            response = chat_completion(
+                client,
                 model="gpt-4o",
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.5,
                 max_tokens=800,
                 response_format={"type": "json_object"}
             )
-            return json.loads(response.choices[0].message.content)
+            return json.loads(response.text)
         except:
             return {"schema_type": "Service", "jsonld": {}}
     
@@ -11,6 +11,8 @@ from collections import Counter
 import os
 from services.genius import generate_executive_summary
 from services.ekkoscope_sentinel import log_report_generated
+from services.cancellation import CancellationToken, check_cancelled
+from services.metrics import PDF_RENDER_SECONDS
 
 BLACK_BG = (10, 10, 15)
 CYAN_GLOW = (0, 240, 255)
@@ -306,29 +308,39 @@ def normalize_analysis_data(analysis: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
-def build_ekkoscope_pdf(tenant: Dict[str, Any], analysis: Dict[str, Any]) -> bytes:
+def build_ekkoscope_pdf(
+    tenant: Dict[str, Any],
+    analysis: Dict[str, Any],
+    cancel_token: Optional[CancellationToken] = None
+) -> bytes:
     """Generate a premium black-ops PDF report from tenant config and analysis results."""
-    data = normalize_analysis_data(analysis)
-    tenant_name = data["tenant_name"]
-    business_type = tenant.get("business_type", "")
-    
-    pdf = EkkoScopePDF(tenant_name, business_type)
-    pdf.alias_nb_pages()
-    
-    _add_cover_page(pdf, data, tenant)
-    _add_executive_dashboard(pdf, data, analysis)
-    _add_query_analysis_section(pdf, data, tenant)
-    _add_competitor_matrix(pdf, data)
-    _add_multi_source_visibility(pdf, data)
-    _add_genius_insights_section(pdf, data)
-    _add_page_blueprints_section(pdf, data, tenant)
-    _add_30_day_action_plan(pdf, data, tenant)
-    _add_recommendations_section(pdf, data)
-    _add_upsell_page(pdf, data)
-    
-    log_report_generated(tenant_name, "geo_report", pages=pdf.page_no())
-    
-    return pdf.output()
+    with PDF_RENDER_SECONDS.time(report="geo_report"):
+        data = normalize_analysis_data(analysis)
+        tenant_name = data["tenant_name"]
+        business_type = tenant.get("business_type", "")
+    
+        pdf = EkkoScopePDF(tenant_name, business_type)
+        pdf.alias_nb_pages()
+    
+        sections = [
+            lambda: _add_cover_page(pdf, data, tenant),
+            lambda: _add_executive_dashboard(pdf, data, analysis),
+            lambda: _add_query_analysis_section(pdf, data, tenant),
+            lambda: _add_competitor_matrix(pdf, data),
+            lambda: _add_multi_source_visibility(pdf, data),
+            lambda: _add_genius_insights_section(pdf, data),
+            lambda: _add_page_blueprints_section(pdf, data, tenant),
+            lambda: _add_30_day_action_plan(pdf, data, tenant),
+            lambda: _add_recommendations_section(pdf, data),
+            lambda: _add_upsell_page(pdf, data),
+        ]
+        for add_section in sections:
+            check_cancelled(cancel_token)
+            add_section()
+    
+        log_report_generated(tenant_name, "geo_report", pages=pdf.page_no())
+    
+        return pdf.output()
 
 
 def _draw_cover_logo(pdf: EkkoScopePDF):
@@ -805,7 +817,22 @@ def _add_multi_source_visibility(pdf: EkkoScopePDF, data: Dict[str, Any]):
                 pdf.set_text_color(*primary_col)
                 pdf.cell(40, 6, f"Primary: {primary_rate:.0f}%", align="L")
                 pdf.ln(8)
-    
+
+    skipped = multi_llm.get("providers_skipped") or []
+    if skipped:
+        skipped_names = ", ".join(
+            {"openai_sim": "ChatGPT (OpenAI)", "gemini_sim": "Gemini (Google)", "perplexity_web": "Perplexity"}.get(p, p)
+            for p in skipped
+        )
+        pdf.set_font(pdf.default_font, "", 9)
+        pdf.set_text_color(*WARNING_YELLOW)
+        pdf.multi_cell(
+            0, 5,
+            f"Not measured in this audit (provider unavailable): {skipped_names}. "
+            "Results above exclude this provider."
+        )
+        pdf.ln(4)
+
     queries = multi_llm.get("queries", [])
     if queries:
         pdf.ln(5)
@@ -0,0 +1,239 @@
+"""
+Provider Response Cache for EkkoScope.
+Persistent cache in front of every provider call made through the gateway.
+Identical requests (same provider, model, temperature and messages) repeated
+within the provider's TTL are served from the cache. This covers teaser runs,
+/analyze, /report and audit reruns that re-send the same prompts minutes
+apart. The cache is LRU-evicted by total size, and bypass_response_cache()
+forces a fresh call whose result replaces the cached one.
+"""
+
+import json
+import hashlib
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from services.config import (
+    RESPONSE_CACHE_ENABLED, RESPONSE_CACHE_MAX_MB, RESPONSE_CACHE_TTL_HOURS, PROVIDER_CASSETTE_MODE
+)
+from services.database import ProviderResponseCache, get_db_session
+from services.metrics import PROBE_CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+_EVICTION_CHECK_EVERY = 50
+
+_bypass: contextvars.ContextVar[bool] = contextvars.ContextVar("response_cache_bypass", default=False)
+
+_stats_lock = threading.Lock()
+_stats: Dict[str, Dict[str, int]] = {}
+_writes_since_eviction = 0
+
+
+@contextmanager
+def bypass_response_cache(enabled: bool = True):
+    """
+    Skip cache reads for provider calls made inside this block (forced
+    refresh); fresh responses are still written back. The flag follows the
+    context into asyncio tasks and into the analysis/probe worker threads.
+    """
+    token = _bypass.set(enabled or _bypass.get())
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def cache_bypassed() -> bool:
+    # Record/replay must see every provider call, so cache reads are skipped.
+    return _bypass.get() or PROVIDER_CASSETTE_MODE in ("record", "replay")
+
+
+def cache_ttl_hours(provider: str) -> float:
+    if not RESPONSE_CACHE_ENABLED:
+        return 0
+    return RESPONSE_CACHE_TTL_HOURS.get(provider, 0)
+
+
+def make_cache_key(provider: str, request: Dict[str, Any]) -> str:
+    """
+    Fingerprint a provider request. model and temperature are keyed
+    explicitly; the remaining request fields (messages, max_tokens,
+    response_format, ...) are hashed together.
+    """
+    payload = {
+        "provider": provider,
+        "model": request.get("model"),
+        "temperature": request.get("temperature"),
+        "request": {k: v for k, v in request.items() if k not in ("model", "temperature")},
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _count(provider: str, field: str, amount: int = 1):
+    with _stats_lock:
+        counters = _stats.setdefault(provider, {"hits": 0, "misses": 0, "bypassed": 0, "tokens_saved": 0})
+        counters[field] += amount
+
+
+def get_cached_response(provider: str, cache_key: str) -> Optional[Dict[str, Any]]:
+    """
+    Look up a cached response payload, recording a hit or miss.
+
+    Returns:
+        The stored reply dict, or None on miss/expiry/bypass
+    """
+    if cache_bypassed():
+        _count(provider, "bypassed")
+        return None
+
+    db = get_db_session()
+    try:
+        now = datetime.utcnow()
+        row = db.query(ProviderResponseCache).filter(
+            ProviderResponseCache.cache_key == cache_key,
+            ProviderResponseCache.expires_at > now
+        ).first()
+        if row is None:
+            _count(provider, "misses")
+            PROBE_CACHE_LOOKUPS.inc(cache="response", provider=provider, result="miss")
+            return None
+
+        row.hit_count = (row.hit_count or 0) + 1
+        row.last_accessed_at = now
+        db.commit()
+        payload = json.loads(row.reply_json)
+    except Exception as e:
+        logger.warning("Response cache lookup failed: %s", e)
+        return None
+    finally:
+        db.close()
+
+    _count(provider, "hits")
+    PROBE_CACHE_LOOKUPS.inc(cache="response", provider=provider, result="hit")
+    _count(provider, "tokens_saved", payload.get("prompt_tokens", 0) + payload.get("completion_tokens", 0))
+    return payload
+
+
+def store_cached_response(
+    provider: str,
+    cache_key: str,
+    request: Dict[str, Any],
+    payload: Dict[str, Any]
+):
+    """Store (or replace) a response payload for the provider's TTL."""
+    global _writes_since_eviction
+
+    ttl = cache_ttl_hours(provider)
+    if ttl <= 0:
+        return
+
+    reply_json = json.dumps(payload)
+    now = datetime.utcnow()
+    values = {
+        "provider": provider,
+        "model": request.get("model"),
+        "temperature": None if request.get("temperature") is None else str(request.get("temperature")),
+        "reply_json": reply_json,
+        "size_bytes": len(reply_json),
+        "created_at": now,
+        "expires_at": now + timedelta(hours=ttl),
+        "last_accessed_at": now,
+    }
+
+    db = get_db_session()
+    try:
+        updated = db.query(ProviderResponseCache).filter(
+            ProviderResponseCache.cache_key == cache_key
+        ).update(values, synchronize_session=False)
+        if not updated:
+            db.add(ProviderResponseCache(cache_key=cache_key, hit_count=0, **values))
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+    except Exception as e:
+        db.rollback()
+        logger.warning("Response cache store failed: %s", e)
+    finally:
+        db.close()
+
+    with _stats_lock:
+        _writes_since_eviction += 1
+        run_eviction = _writes_since_eviction >= _EVICTION_CHECK_EVERY
+        if run_eviction:
+            _writes_since_eviction = 0
+    if run_eviction:
+        evict_response_cache()
+
+
+def evict_response_cache() -> int:
+    """
+    Drop expired entries, then least-recently-used entries until the cache
+    is back under 90% of RESPONSE_CACHE_MAX_MB.
+
+    Returns:
+        Number of entries removed
+    """
+    budget = int(RESPONSE_CACHE_MAX_MB * 1024 * 1024)
+    db = get_db_session()
+    try:
+        removed = db.query(ProviderResponseCache).filter(
+            ProviderResponseCache.expires_at <= datetime.utcnow()
+        ).delete(synchronize_session=False)
+
+        total = db.query(func.coalesce(func.sum(ProviderResponseCache.size_bytes), 0)).scalar() or 0
+        if total > budget:
+            target = int(budget * 0.9)
+            victims = []
+            rows = db.query(ProviderResponseCache.id, ProviderResponseCache.size_bytes).order_by(
+                ProviderResponseCache.last_accessed_at
+            ).yield_per(500)
+            for row_id, size in rows:
+                if total <= target:
+                    break
+                victims.append(row_id)
+                total -= size or 0
+            for i in range(0, len(victims), 500):
+                removed += db.query(ProviderResponseCache).filter(
+                    ProviderResponseCache.id.in_(victims[i:i + 500])
+                ).delete(synchronize_session=False)
+
+        db.commit()
+        if removed:
+            logger.info("Response cache evicted %d entries", removed)
+        return removed
+    finally:
+        db.close()
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters since process start plus current cache size."""
+    with _stats_lock:
+        by_provider = {p: dict(c) for p, c in _stats.items()}
+
+    db = get_db_session()
+    try:
+        entries, size = db.query(
+            func.count(ProviderResponseCache.id),
+            func.coalesce(func.sum(ProviderResponseCache.size_bytes), 0)
+        ).one()
+    finally:
+        db.close()
+
+    hits = sum(c["hits"] for c in by_provider.values())
+    lookups = hits + sum(c["misses"] for c in by_provider.values())
+    return {
+        "providers": by_provider,
+        "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+        "tokens_saved": sum(c["tokens_saved"] for c in by_provider.values()),
+        "entries": entries,
+        "size_bytes": int(size or 0),
+    }
@@ -3,13 +3,14 @@ Sales Mode Orchestrator for EkkoScope.
 Provides headless teaser audits for cold outreach campaigns.
 """
 
+import asyncio
 import logging
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 
 from services.auto_configure import auto_configure_business
 from services.query_generator import generate_teaser_queries
-from services.visibility_hub import run_teaser_visibility
+from services.visibility_hub import run_teaser_visibility, run_teaser_visibility_async
 
 logger = logging.getLogger(__name__)
 
@@ -87,6 +88,71 @@ def run_teaser_audit(url: str) -> Dict[str, Any]:
     return result
 
 
+async def run_teaser_audit_async(url: str) -> Dict[str, Any]:
+    """
+    Async variant of run_teaser_audit for async routes.
+    
+    Auto-configuration (site scrape + LLM inference) still runs in a worker
+    thread; the visibility probes are awaited on the shared async provider
+    clients so they do not hold a thread each.
+    """
+    logger.info(f"[SALES MODE] Starting async teaser audit for: {url}")
+    
+    result = {
+        "success": False,
+        "url": url,
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "business_config": None,
+        "visibility_result": None,
+        "sales_packet": None,
+        "error": None
+    }
+    
+    try:
+        config = await asyncio.to_thread(auto_configure_business, url)
+        
+        if not config.get("success"):
+            result["error"] = config.get("error", "Failed to auto-configure business")
+            return result
+        
+        result["business_config"] = config
+        
+        teaser_queries = generate_teaser_queries(
+            category=config.get("category", "services"),
+            region=config.get("service_area", "United States"),
+            business_type=config.get("business_type", "local_service")
+        )
+        
+        visibility = await run_teaser_visibility_async(
+            business_name=config.get("business_name", "Unknown Business"),
+            primary_domain=config.get("domain", ""),
+            regions=[config.get("service_area", "United States")],
+            teaser_queries=teaser_queries,
+            early_exit_on_zero=True
+        )
+        
+        result["visibility_result"] = visibility
+        
+        if visibility.get("error"):
+            result["error"] = visibility["error"]
+            result["success"] = False
+            return result
+        
+        result["sales_packet"] = build_sales_packet(config, visibility)
+        result["success"] = True
+        
+        logger.info(
+            f"[SALES MODE] Complete: {config.get('business_name')} - "
+            f"{visibility.get('score_percent', '0%')} visibility"
+        )
+        
+    except Exception as e:
+        logger.error(f"[SALES MODE] Teaser audit failed: {e}")
+        result["error"] = str(e)
+    
+    return result
+
+
 def build_sales_packet(
     config: Dict[str, Any],
     visibility: Dict[str, Any]
@@ -0,0 +1,289 @@
+"""
+Shared Probe Store for EkkoScope.
+Business-agnostic visibility prompts (OpenAI and Gemini simulated assistants)
+depend only on the query text and regions, so one answer can serve every
+tenant in the same category/region. Answers are stored once per
+(provider, model, normalized query, region set, prompt version) and reused
+within a freshness window; each tenant's target detection runs afterwards
+against the stored raw answer.
+
+A forced refresh (bypass_response_cache) skips the stored answer and
+republishes the fresh one, so every tenant gets it. Repeat samples taken
+inside independent_samples() neither read nor publish: they are private
+draws that must not replace the shared answer.
+"""
+
+import re
+import asyncio
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Callable, Awaitable, Dict, List, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+
+from services.config import SHARED_PROBES_ENABLED, SHARED_PROBE_TTL_HOURS
+from services.database import SharedProbeResult, get_db_session
+from services.http_clients import get_loop_singleton
+from services.response_cache import bypass_response_cache, cache_bypassed
+from services.provider_cassette import is_replaying
+from services.brand_matcher import get_brand_matcher
+from services.metrics import PROBE_CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+_inflight_lock = threading.Lock()
+_inflight: Dict[tuple, threading.Lock] = {}
+_independent: contextvars.ContextVar[bool] = contextvars.ContextVar("shared_probe_independent", default=False)
+
+
+@contextmanager
+def independent_samples():
+    """
+    Treat probes in this block as independent repeat samples: they bypass the
+    response cache and the shared store, and their answers are not published.
+    """
+    token = _independent.set(True)
+    try:
+        with bypass_response_cache():
+            yield
+    finally:
+        _independent.reset(token)
+
+
+def shared_store_access() -> Tuple[bool, bool]:
+    """
+    (read, publish) for the shared store in the current context. A forced
+    refresh publishes without reading; independent samples and replayed
+    answers are never published.
+    """
+    if not SHARED_PROBES_ENABLED or _independent.get():
+        return False, False
+    return not cache_bypassed(), not is_replaying()
+
+
+def normalize_query(query: str) -> str:
+    """Normalize query text so trivially different phrasings share one probe."""
+    query = query.lower().strip()
+    query = re.sub(r"[^\w\s]", " ", query)
+    return re.sub(r"\s+", " ", query).strip()
+
+
+def make_regions_key(regions: List[str]) -> str:
+    """Order-independent key for a region set."""
+    cleaned = sorted({r.strip().lower() for r in (regions or []) if r and r.strip()})
+    return "|".join(cleaned) or "united states"
+
+
+def _probe_key(provider: str, model: str, query: str, regions: List[str], prompt_version: str) -> tuple:
+    return (provider, model, normalize_query(query), make_regions_key(regions), prompt_version)
+
+
+def find_target_in_brands(
+    recommended: List[dict],
+    business_name: str,
+    brand_aliases: Optional[List[str]] = None,
+    domains: Optional[List[str]] = None
+) -> Optional[int]:
+    """
+    Per-tenant target detection over a (possibly shared) list of recommendations,
+    using the business's compiled BrandMatcher (name, aliases and domains).
+
+    Returns:
+        1-based position of the first matching recommendation, or None
+    """
+    return get_brand_matcher(business_name, brand_aliases, domains).find_position(recommended)
+
+
+def get_shared_probe(
+    provider: str,
+    model: str,
+    query: str,
+    regions: List[str],
+    prompt_version: str
+) -> Optional[str]:
+    """
+    Look up a fresh shared probe answer.
+
+    Returns:
+        The stored raw response, or None if missing or older than SHARED_PROBE_TTL_HOURS
+    """
+    provider, model, query_norm, regions_key, prompt_version = _probe_key(
+        provider, model, query, regions, prompt_version
+    )
+    cutoff = datetime.utcnow() - timedelta(hours=SHARED_PROBE_TTL_HOURS)
+
+    db = get_db_session()
+    try:
+        row = db.query(SharedProbeResult).filter(
+            SharedProbeResult.provider == provider,
+            SharedProbeResult.model == model,
+            SharedProbeResult.query_norm == query_norm,
+            SharedProbeResult.regions_key == regions_key,
+            SharedProbeResult.prompt_version == prompt_version,
+            SharedProbeResult.created_at >= cutoff
+        ).first()
+        return row.raw_response if row is not None else None
+    except Exception as e:
+        logger.warning("Shared probe lookup failed (non-fatal): %s", e)
+        db.rollback()
+        return None
+    finally:
+        db.close()
+
+
+def store_shared_probe(
+    provider: str,
+    model: str,
+    query: str,
+    regions: List[str],
+    prompt_version: str,
+    raw_response: str
+):
+    """Insert or refresh the shared answer for a probe key."""
+    provider, model, query_norm, regions_key, prompt_version = _probe_key(
+        provider, model, query, regions, prompt_version
+    )
+
+    db = get_db_session()
+    try:
+        row = db.query(SharedProbeResult).filter(
+            SharedProbeResult.provider == provider,
+            SharedProbeResult.model == model,
+            SharedProbeResult.query_norm == query_norm,
+            SharedProbeResult.regions_key == regions_key,
+            SharedProbeResult.prompt_version == prompt_version
+        ).first()
+        if row is None:
+            db.add(SharedProbeResult(
+                provider=provider,
+                model=model,
+                query_norm=query_norm,
+                regions_key=regions_key,
+                prompt_version=prompt_version,
+                raw_response=raw_response
+            ))
+        else:
+            row.raw_response = raw_response
+            row.created_at = datetime.utcnow()
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+    except Exception as e:
+        logger.warning("Shared probe store failed (non-fatal): %s", e)
+        db.rollback()
+    finally:
+        db.close()
+
+
+def get_or_run_shared_probe(
+    provider: str,
+    model: str,
+    query: str,
+    regions: List[str],
+    prompt_version: str,
+    run_probe: Callable[[], Optional[str]],
+    is_valid: Callable[[str], bool] = lambda raw: True
+) -> Optional[str]:
+    """
+    Return a fresh shared answer for the probe key, running the probe on a miss.
+
+    Concurrent misses for the same key inside this process wait on a single
+    in-flight call instead of each paying for the probe. Only answers that
+    pass is_valid are shared. A forced refresh skips the stored answer and
+    replaces it with the fresh one (see shared_store_access).
+    """
+    read, publish = shared_store_access()
+    if not read:
+        raw = run_probe()
+        if publish and raw is not None and is_valid(raw):
+            store_shared_probe(provider, model, query, regions, prompt_version, raw)
+        return raw
+
+    key = _probe_key(provider, model, query, regions, prompt_version)
+
+    raw = get_shared_probe(provider, model, query, regions, prompt_version)
+    if raw is not None:
+        logger.info("Shared probe hit: %s %r", provider, key[2])
+        PROBE_CACHE_LOOKUPS.inc(cache="shared_probe", provider=provider, result="hit")
+        return raw
+
+    # Only the caller that created the lock removes it; a waiter popping it
+    # could drop a newer lock another caller is already holding.
+    with _inflight_lock:
+        key_lock = _inflight.get(key)
+        owner = key_lock is None
+        if owner:
+            key_lock = _inflight[key] = threading.Lock()
+
+    with key_lock:
+        try:
+            raw = get_shared_probe(provider, model, query, regions, prompt_version)
+            if raw is not None:
+                PROBE_CACHE_LOOKUPS.inc(cache="shared_probe", provider=provider, result="hit")
+                return raw
+
+            PROBE_CACHE_LOOKUPS.inc(cache="shared_probe", provider=provider, result="miss")
+            raw = run_probe()
+            if raw is not None and is_valid(raw):
+                store_shared_probe(provider, model, query, regions, prompt_version, raw)
+            return raw
+        finally:
+            if owner:
+                with _inflight_lock:
+                    if _inflight.get(key) is key_lock:
+                        del _inflight[key]
+
+
+async def get_or_run_shared_probe_async(
+    provider: str,
+    model: str,
+    query: str,
+    regions: List[str],
+    prompt_version: str,
+    run_probe: Callable[[], Awaitable[Optional[str]]],
+    is_valid: Callable[[str], bool] = lambda raw: True
+) -> Optional[str]:
+    """
+    Async variant of get_or_run_shared_probe; store access runs in a worker thread.
+
+    Concurrent misses on the same event loop await one shared task; callers
+    that join it count as hits, since they do not pay for a probe.
+    """
+    read, publish = shared_store_access()
+    if not read:
+        raw = await run_probe()
+        if publish and raw is not None and is_valid(raw):
+            await asyncio.to_thread(store_shared_probe, provider, model, query, regions, prompt_version, raw)
+        return raw
+
+    raw = await asyncio.to_thread(get_shared_probe, provider, model, query, regions, prompt_version)
+    if raw is not None:
+        PROBE_CACHE_LOOKUPS.inc(cache="shared_probe", provider=provider, result="hit")
+        return raw
+
+    key = _probe_key(provider, model, query, regions, prompt_version)
+    inflight: Dict[tuple, asyncio.Task] = get_loop_singleton("shared_probe_inflight", dict)
+
+    async def _run() -> Optional[str]:
+        try:
+            result = await run_probe()
+            if result is not None and is_valid(result):
+                await asyncio.to_thread(
+                    store_shared_probe, provider, model, query, regions, prompt_version, result
+                )
+            return result
+        finally:
+            if inflight.get(key) is task:
+                del inflight[key]
+
+    task = inflight.get(key)
+    if task is None:
+        PROBE_CACHE_LOOKUPS.inc(cache="shared_probe", provider=provider, result="miss")
+        task = asyncio.ensure_future(_run())
+        inflight[key] = task
+    else:
+        PROBE_CACHE_LOOKUPS.inc(cache="shared_probe", provider=provider, result="hit")
+    return await asyncio.shield(task)
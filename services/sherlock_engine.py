@@ -18,6 +18,8 @@ from collections import Counter
 import httpx
 from bs4 import BeautifulSoup
 
+from .provider_gateway import chat_completion, create_embeddings
+from .provider_cassette import cassette_transport, is_replaying, wrap_pinecone_index
 from .config import (
     OPENAI_API_KEY,
     PINECONE_API_KEY,
@@ -59,6 +61,11 @@ def init_sherlock():
         _sherlock_initialized = True
         return False
     
+    if is_replaying():
+        sherlock_index = wrap_pinecone_index(None, SHERLOCK_INDEX_NAME)
+        _sherlock_initialized = True
+        return True
+    
     try:
         from pinecone import Pinecone
         
@@ -80,7 +87,7 @@ def init_sherlock():
                 _sherlock_initialized = True
                 return False
         
-        sherlock_index = pc.Index(SHERLOCK_INDEX_NAME)
+        sherlock_index = wrap_pinecone_index(pc.Index(SHERLOCK_INDEX_NAME), SHERLOCK_INDEX_NAME)
         logger.info("Sherlock connected to Pinecone index: %s", SHERLOCK_INDEX_NAME)
         _sherlock_initialized = True
         return True
@@ -117,11 +124,12 @@ def embed_text(text: str) -> Optional[List[float]]:
         client = OpenAI(api_key=OPENAI_API_KEY)
         text_truncated = text.strip()[:8000]
         
-        response = client.embeddings.create(
+        response = create_embeddings(
+            client,
             model=SHERLOCK_EMBED_MODEL,
             input=text_truncated,
         )
-        return response.data[0].embedding
+        return response.embeddings[0]
         
     except Exception as e:
         logger.warning("Error generating Sherlock embedding: %s", e)
@@ -149,7 +157,7 @@ def scrape_url(url: str, timeout: float = 10.0) -> Dict[str, Any]:
             "User-Agent": "Mozilla/5.0 (compatible; EkkoScope/1.0; Sherlock Semantic Analyzer)"
         }
         
-        with httpx.Client(timeout=timeout, follow_redirects=True) as client:
+        with httpx.Client(timeout=timeout, follow_redirects=True, transport=cassette_transport()) as client:
             response = client.get(url, headers=headers)
             
             if response.status_code != 200:
@@ -221,14 +229,15 @@ Return JSON array of topics:
 
 Extract 10-20 meaningful topics. Focus on business-relevant themes."""
 
-        response = client.chat.completions.create(
+        response = chat_completion(
+            client,
             model="gpt-4o-mini",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.3,
             max_tokens=2000
         )
         
-        content = response.choices[0].message.content.strip()
+        content = response.text.strip()
         if content.startswith("```"):
             content = re.sub(r'^```\w*\n?', '', content)
             content = re.sub(r'\n?```$', '', content)
@@ -1235,7 +1244,8 @@ Based on this evidence, provide your strategic analysis and recommendations."""
         from openai import OpenAI
         client = OpenAI(api_key=OPENAI_API_KEY)
         
-        response = client.chat.completions.create(
+        response = chat_completion(
+            client,
             model="gpt-4o",
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -1245,7 +1255,7 @@ Based on this evidence, provide your strategic analysis and recommendations."""
             max_tokens=1500
         )
         
-        answer = response.choices[0].message.content
+        answer = response.text
         
         result["success"] = True
         result["answer"] = answer
@@ -1342,14 +1352,15 @@ Requirements:
 
 The JSON should be ready to paste into a <script type="application/ld+json"> tag."""
 
-            response = client.chat.completions.create(
+            response = chat_completion(
+                client,
                 model="gpt-4o",
                 messages=[{"role": "user", "content": schema_prompt}],
                 temperature=0.3,
                 max_tokens=2000
             )
             
-            schema_content = response.choices[0].message.content
+            schema_content = response.text
             schema_content = schema_content.strip()
             if schema_content.startswith("```"):
                 lines = schema_content.split("\n")
@@ -1390,14 +1401,15 @@ Requirements:
 
 Return ONLY the complete HTML - no markdown code blocks or explanation."""
 
-            response = client.chat.completions.create(
+            response = chat_completion(
+                client,
                 model="gpt-4o",
                 messages=[{"role": "user", "content": page_prompt}],
                 temperature=0.7,
                 max_tokens=4000
             )
             
-            html_content = response.choices[0].message.content
+            html_content = response.text
             html_content = html_content.strip()
             if html_content.startswith("```"):
                 lines = html_content.split("\n")
@@ -1430,14 +1442,15 @@ Requirements:
 
 Return ONLY valid JSON - no markdown or explanation."""
 
-            response = client.chat.completions.create(
+            response = chat_completion(
+                client,
                 model="gpt-4o",
                 messages=[{"role": "user", "content": faq_prompt}],
                 temperature=0.7,
                 max_tokens=3000
             )
             
-            faq_content = response.choices[0].message.content
+            faq_content = response.text
             faq_content = faq_content.strip()
             if faq_content.startswith("```"):
                 lines = faq_content.split("\n")
@@ -1465,14 +1478,15 @@ Create a comprehensive content piece (minimum 500 words) that:
 
 Format as clean HTML with proper heading tags. No full page structure needed - just the content section."""
 
-            response = client.chat.completions.create(
+            response = chat_completion(
+                client,
                 model="gpt-4o",
                 messages=[{"role": "user", "content": content_prompt}],
                 temperature=0.7,
                 max_tokens=2000
             )
             
-            content = response.choices[0].message.content
+            content = response.text
             content = content.strip()
             if content.startswith("```"):
                 lines = content.split("\n")
@@ -8,6 +8,8 @@ import httpx
 from typing import Dict, Any, List
 from bs4 import BeautifulSoup
 
+from services.provider_cassette import cassette_transport
+
 
 def fetch_site_snapshot(tenant: Dict[str, Any], timeout: float = 5.0) -> Dict[str, Any]:
     """
@@ -36,7 +38,7 @@ def fetch_site_snapshot(tenant: Dict[str, Any], timeout: float = 5.0) -> Dict[st
             result["fetch_status"] = "no_urls_configured"
             return result
         
-        with httpx.Client(timeout=timeout, follow_redirects=True) as client:
+        with httpx.Client(timeout=timeout, follow_redirects=True, transport=cassette_transport()) as client:
             for url in urls_to_fetch[:3]:
                 page_data = _fetch_single_page(client, url)
                 if page_data:
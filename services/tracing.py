@@ -0,0 +1,211 @@
+"""
+Lightweight per-audit tracing for EkkoScope.
+An audit run opens a Trace; pipeline stages and provider calls open nested
+spans inside it. Each span records its offset from the start of the trace,
+its duration and status, plus attributes such as token counts, retries and
+cache hits. The active trace and span live in contextvars, so spans nest
+correctly across the stage and probe thread pools (which submit work via
+contextvars.copy_context). Outside a trace, span() does nothing.
+
+Traces serialize to a compact list of spans that is stored on the Audit and
+drawn as a waterfall on the admin audit page.
+"""
+
+import time
+import threading
+import itertools
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+MAX_SPANS_PER_TRACE = 2000
+
+_current_trace: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar("ekko_trace", default=None)
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("ekko_span", default=None)
+
+
+class Span:
+    """One timed operation inside a trace."""
+
+    __slots__ = ("span_id", "parent_id", "name", "kind", "start_ms", "duration_ms", "status", "attrs", "_start")
+
+    def __init__(self, span_id: int, parent_id: Optional[int], name: str, kind: str, start_ms: float, attrs: Dict[str, Any]):
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ms = start_ms
+        self.duration_ms: Optional[float] = None
+        self.status = "ok"
+        self.attrs = attrs
+        self._start = time.perf_counter()
+
+    def set(self, **attrs: Any):
+        """Attach attributes (None values are skipped)."""
+        self.attrs.update({k: v for k, v in attrs.items() if v is not None})
+
+    def incr(self, key: str, amount: int = 1):
+        self.attrs[key] = self.attrs.get(key, 0) + amount
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "id": self.span_id,
+            "parent": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_ms": round(self.start_ms),
+            "duration_ms": round(self.duration_ms) if self.duration_ms is not None else None,
+            "status": self.status,
+        }
+        if self.attrs:
+            data["attrs"] = self.attrs
+        return data
+
+
+class _NullSpan:
+    """Stand-in used when no trace is active."""
+
+    def set(self, **attrs: Any):
+        pass
+
+    def incr(self, key: str, amount: int = 1):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Trace:
+    """All spans recorded for one audit run."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._start = time.perf_counter()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.spans: List[Span] = []
+        self.dropped = 0
+        self.duration_ms: Optional[float] = None
+
+    def _new_span(self, name: str, kind: str, parent: Optional[Span], attrs: Dict[str, Any]) -> Optional[Span]:
+        with self._lock:
+            if len(self.spans) >= MAX_SPANS_PER_TRACE:
+                self.dropped += 1
+                return None
+            span = Span(
+                next(self._ids),
+                parent.span_id if parent else None,
+                name,
+                kind,
+                (time.perf_counter() - self._start) * 1000,
+                attrs
+            )
+            self.spans.append(span)
+            return span
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = [span.to_dict() for span in self.spans]
+        duration = self.duration_ms
+        if duration is None:
+            duration = (time.perf_counter() - self._start) * 1000
+        return {
+            "name": self.name,
+            "duration_ms": round(duration),
+            "dropped_spans": self.dropped,
+            "spans": spans,
+        }
+
+
+@contextmanager
+def start_trace(name: str) -> Iterator[Trace]:
+    """Open a trace for the current context (e.g. one audit run)."""
+    trace = Trace(name)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(None)
+    try:
+        yield trace
+    finally:
+        trace.duration_ms = (time.perf_counter() - trace._start) * 1000
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", **attrs: Any) -> Iterator[Any]:
+    """
+    Time a block as a child of the current span. Yields the span so callers
+    can attach attributes; errors mark it failed and propagate.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield _NULL_SPAN
+        return
+
+    current = trace._new_span(name, kind, _current_span.get(), {k: v for k, v in attrs.items() if v is not None})
+    if current is None:
+        yield _NULL_SPAN
+        return
+
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.status = "cancelled" if type(e).__name__ in ("AuditCancelled", "CancelledError") else "error"
+        current.set(error=type(e).__name__)
+        raise
+    finally:
+        current.duration_ms = (time.perf_counter() - current._start) * 1000
+        _current_span.reset(token)
+
+
+def current_span() -> Any:
+    """The innermost active span, or a no-op stand-in."""
+    return _current_span.get() or _NULL_SPAN
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def waterfall_rows(trace: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Flatten a stored trace into waterfall rows: depth-first, children ordered
+    by start time, each with its bar offset and width as a percentage of the
+    trace duration.
+    """
+    if not trace or not trace.get("spans"):
+        return []
+    spans = trace["spans"]
+    total = max(
+        [trace.get("duration_ms") or 0]
+        + [(s.get("start_ms") or 0) + (s.get("duration_ms") or 0) for s in spans]
+    ) or 1
+
+    ids = {s["id"] for s in spans}
+    children: Dict[Optional[int], List[Dict[str, Any]]] = {}
+    for s in spans:
+        parent = s.get("parent") if s.get("parent") in ids else None
+        children.setdefault(parent, []).append(s)
+    for group in children.values():
+        group.sort(key=lambda s: s.get("start_ms") or 0)
+
+    rows: List[Dict[str, Any]] = []
+    stack = [(s, 0) for s in reversed(children.get(None, []))]
+    while stack:
+        s, depth = stack.pop()
+        start = s.get("start_ms") or 0
+        duration = s.get("duration_ms")
+        rows.append({
+            "name": s.get("name"),
+            "kind": s.get("kind"),
+            "status": s.get("status"),
+            "depth": depth,
+            "start_ms": start,
+            "duration_ms": duration,
+            "attrs": s.get("attrs") or {},
+            "left_pct": round(start * 100 / total, 2),
+            "width_pct": max(0.3, round((duration if duration is not None else total - start) * 100 / total, 2)),
+        })
+        stack.extend((child, depth + 1) for child in reversed(children.get(s["id"], [])))
+    return rows
@@ -3,29 +3,50 @@ Visibility Hub - Orchestrates multi-LLM visibility analysis.
 Aggregates results from OpenAI, Perplexity, and Gemini into unified visibility data.
 """
 
+import asyncio
 import logging
-from typing import List, Dict, Any
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_EXCEPTION
+from typing import List, Dict, Any, Callable, Optional
 from collections import Counter
 
 from services.config import (
     OPENAI_ENABLED, PERPLEXITY_ENABLED, GEMINI_ENABLED,
-    MAX_VISIBILITY_QUERIES_PER_PROVIDER, get_enabled_providers
+    MAX_VISIBILITY_QUERIES_PER_PROVIDER, PROVIDER_PROBE_CONCURRENCY, ADAPTIVE_SAMPLING_ENABLED,
+    get_enabled_providers
 )
 from services.visibility_models import (
     QueryVisibilityAggregate, ProviderVisibility, 
     VisibilitySummary, MultiLLMVisibilityResult
 )
-from services.openai_visibility import run_openai_visibility_for_queries
-from services.perplexity_visibility import run_perplexity_visibility_for_queries
-from services.gemini_visibility import run_gemini_visibility_for_queries
+from services.openai_visibility import (
+    run_openai_visibility_for_queries, run_openai_visibility_for_queries_async,
+    probe_openai_visibility, probe_openai_visibility_async
+)
+from services.perplexity_visibility import probe_perplexity_visibility, probe_perplexity_visibility_async
+from services.gemini_visibility import (
+    run_gemini_visibility_for_queries, run_gemini_visibility_for_queries_async,
+    probe_gemini_visibility, probe_gemini_visibility_async
+)
 from services.ekkoscope_sentinel import log_ai_query
+from services.cancellation import CancellationToken, cancellation_scope, check_cancelled
+from services.circuit_breaker import get_circuit_breaker
+from services.packed_probes import (
+    PACKED_PROVIDERS, probe_packed_chunk, chunk_queries, sample_for_agreement, measure_agreement
+)
+from services.adaptive_sampling import sample_probe
+from services.brand_matcher import BrandMatcher, get_brand_matcher
+from services.tracing import span
+from services.metrics import PROBES
 
 logger = logging.getLogger(__name__)
 
 
 def compute_visibility_summary(
     aggregates: List[QueryVisibilityAggregate],
-    business_name: str
+    business_name: str,
+    brand_aliases: Optional[List[str]] = None,
+    domains: Optional[List[str]] = None
 ) -> VisibilitySummary:
     """
     Compute summary statistics across all queries and providers.
@@ -33,6 +54,8 @@ def compute_visibility_summary(
     Args:
         aggregates: List of QueryVisibilityAggregate objects
         business_name: Name of the target business
+        brand_aliases: Extra names that identify the target business
+        domains: Domains of the target business
     
     Returns:
         VisibilitySummary with computed stats
@@ -43,7 +66,9 @@ def compute_visibility_summary(
     competitor_counts: Dict[str, int] = {}
     competitor_by_provider: Dict[str, Dict[str, int]] = {}
     intent_breakdown: Dict[str, int] = {}
+    query_confidence: List[Dict[str, Any]] = []
     overall_target_found = 0
+    matcher = get_brand_matcher(business_name, brand_aliases, domains)
     
     provider_names = ["openai_sim", "perplexity_web", "gemini_sim"]
     for pname in provider_names:
@@ -81,9 +106,19 @@ def compute_visibility_summary(
                 provider_stats[provider]["target_found"] += 1
                 query_target_found = True
             
+            if pv.found_rate is not None:
+                query_confidence.append({
+                    "query": agg.query,
+                    "provider": provider,
+                    "samples": pv.samples,
+                    "found": pv.found_count,
+                    "found_rate": pv.found_rate,
+                    "interval": pv.found_interval,
+                })
+            
             for brand in pv.recommended_brands:
                 name = brand.name
-                if name.lower() != business_name.lower():
+                if not matcher.matches(name, brand.url):
                     competitor_counts[name] = competitor_counts.get(name, 0) + 1
                     if provider not in competitor_by_provider:
                         competitor_by_provider[provider] = {}
@@ -117,10 +152,221 @@ def compute_visibility_summary(
         overall_target_percent=round((overall_target_found / total_queries) * 100, 1) if total_queries > 0 else 0.0,
         top_competitors=top_competitors,
         competitor_by_provider=competitor_by_provider_formatted,
-        intent_breakdown=intent_breakdown
+        intent_breakdown=intent_breakdown,
+        query_confidence=query_confidence
     )
 
 
+PROVIDER_PROBES = [
+    ("openai_sim", "chatgpt", "OpenAI", probe_openai_visibility, probe_openai_visibility_async),
+    ("perplexity_web", "perplexity", "Perplexity", probe_perplexity_visibility, probe_perplexity_visibility_async),
+    ("gemini_sim", "gemini", "Gemini", probe_gemini_visibility, probe_gemini_visibility_async),
+]
+
+
+# Visibility provider -> gateway provider key (rate limiter / circuit breaker)
+PROVIDER_API_KEYS = {
+    "openai_sim": "openai",
+    "perplexity_web": "perplexity",
+    "gemini_sim": "gemini",
+}
+
+
+def _circuit_open(provider: str) -> bool:
+    """True if the provider's circuit breaker is rejecting calls right now."""
+    return get_circuit_breaker(PROVIDER_API_KEYS.get(provider, provider)).is_open()
+
+
+def _skipped_after_probing(provider: str, results: List[ProviderVisibility]) -> bool:
+    """A provider whose circuit opened mid-run and produced no successful probe."""
+    return not any(r.success for r in results) and _circuit_open(provider)
+
+
+def _provider_limit(provider: str) -> int:
+    return max(1, PROVIDER_PROBE_CONCURRENCY.get(provider, 4))
+
+
+def _active_provider_probes(run_openai: bool, run_perplexity: bool, run_gemini: bool) -> list:
+    """Get the PROVIDER_PROBES entries that were requested and are enabled."""
+    requested = {
+        "openai_sim": run_openai and OPENAI_ENABLED,
+        "perplexity_web": run_perplexity and PERPLEXITY_ENABLED,
+        "gemini_sim": run_gemini and GEMINI_ENABLED,
+    }
+    return [p for p in PROVIDER_PROBES if requested[p[0]]]
+
+
+def _init_aggregates(queries_to_probe: List[Dict[str, Any]]) -> Dict[str, QueryVisibilityAggregate]:
+    agg_by_query: Dict[str, QueryVisibilityAggregate] = {}
+    for item in queries_to_probe:
+        q = item.get("query", "")
+        if q:
+            agg_by_query[q] = QueryVisibilityAggregate(
+                query=q,
+                intent=item.get("intent"),
+                intent_value=item.get("intent_value"),
+                providers=[]
+            )
+    return agg_by_query
+
+
+def _merge_provider_results(
+    agg_by_query: Dict[str, QueryVisibilityAggregate],
+    providers_used: List[str],
+    provider: str,
+    sentinel_model: str,
+    label: str,
+    results: List[ProviderVisibility],
+    business_name: str,
+    logged_results: Optional[List[ProviderVisibility]] = None
+):
+    """
+    Merge one provider's probe results into the per-query aggregates.
+    A provider only counts as used if at least one of its probes succeeded.
+    Only logged_results (default: all) are sent to Sentinel, so probes
+    restored from a checkpoint are not counted twice.
+    """
+    if not results:
+        logger.info("%s visibility: no results returned", label)
+        return
+    
+    successful_count = sum(1 for r in results if r.success)
+    
+    if successful_count == 0:
+        logger.warning("%s visibility: all %d probes failed", label, len(results))
+        return
+    
+    for vis in results:
+        if vis.query in agg_by_query:
+            agg_by_query[vis.query].providers.append(vis)
+    for vis in results if logged_results is None else logged_results:
+        log_ai_query(model=sentinel_model, prompt=vis.query, business_name=business_name)
+    providers_used.append(provider)
+    logger.info("%s visibility: %d results (%d successful)", label, len(results), successful_count)
+
+
+def _build_multi_llm_result(
+    agg_by_query: Dict[str, QueryVisibilityAggregate],
+    providers_used: List[str],
+    business_name: str,
+    providers_skipped: Optional[List[str]] = None,
+    packing_agreement: Optional[Dict[str, Dict[str, Any]]] = None,
+    brand_aliases: Optional[List[str]] = None,
+    domains: Optional[List[str]] = None
+) -> MultiLLMVisibilityResult:
+    aggregates = list(agg_by_query.values())
+    
+    summary = compute_visibility_summary(aggregates, business_name, brand_aliases, domains)
+    
+    logger.info("Visibility providers used: %s", providers_used)
+    if providers_skipped:
+        logger.info("Visibility providers skipped (circuit open): %s", providers_skipped)
+    
+    return MultiLLMVisibilityResult(
+        queries=aggregates,
+        summary=summary,
+        providers_used=providers_used,
+        providers_skipped=providers_skipped or [],
+        packing_agreement=packing_agreement or {}
+    )
+
+
+def _count_probe(provider: str, vis: Optional[ProviderVisibility]) -> Optional[ProviderVisibility]:
+    """Count a probe outcome for /metrics and pass the result through."""
+    if vis is None or not vis.success:
+        outcome = "failed"
+    else:
+        outcome = "found" if vis.target_found else "not_found"
+    PROBES.inc(provider=provider, outcome=outcome)
+    return vis
+
+
+def _run_provider_probes(
+    provider: str,
+    probe_fn: Callable[..., Optional[ProviderVisibility]],
+    business_name: str,
+    primary_domain: str,
+    regions: List[str],
+    queries_to_probe: List[Dict[str, Any]],
+    executor: ThreadPoolExecutor,
+    brand_aliases: Optional[List[str]] = None,
+    domains: Optional[List[str]] = None,
+    cancel_token: Optional[CancellationToken] = None,
+    sampling: bool = False
+) -> List[Future]:
+    """
+    Schedule every query for one provider on that provider's executor, whose
+    size is the provider's concurrency limit.
+    With sampling, each query is re-asked until its found-rate is decided.
+    Returns futures in query order.
+    """
+    def _probe(item: Dict[str, Any]) -> Optional[ProviderVisibility]:
+        with span("probe", kind="probe", provider=provider, query=item.get("query")):
+            check_cancelled(cancel_token)
+            if sampling:
+                return _count_probe(provider, sample_probe(
+                    probe_fn, business_name, primary_domain, regions, item,
+                    brand_aliases=brand_aliases, domains=domains
+                ))
+            return _count_probe(provider, probe_fn(
+                business_name, primary_domain, regions, item, brand_aliases=brand_aliases, domains=domains
+            ))
+    
+    # Probes run under the token, so the gateway aborts them on cancel.
+    with cancellation_scope(cancel_token):
+        return [executor.submit(contextvars.copy_context().run, _probe, item) for item in queries_to_probe]
+
+
+def _run_packed_provider_probes(
+    provider: str,
+    probe_fn: Callable[..., Optional[ProviderVisibility]],
+    business_name: str,
+    primary_domain: str,
+    regions: List[str],
+    queries_to_probe: List[Dict[str, Any]],
+    executor: ThreadPoolExecutor,
+    brand_aliases: Optional[List[str]] = None,
+    domains: Optional[List[str]] = None,
+    cancel_token: Optional[CancellationToken] = None
+) -> tuple:
+    """
+    Schedule packed probes (one request per chunk of queries) plus unpacked
+    probes of a sample of the queries for the agreement check, on the
+    provider's own executor.
+
+    Returns:
+        (chunk futures resolving to lists of results, sample futures)
+    """
+    def _chunk(items: List[Dict[str, Any]]) -> List[ProviderVisibility]:
+        with span("packed_probe", kind="probe", provider=provider, queries=len(items)):
+            check_cancelled(cancel_token)
+            results = probe_packed_chunk(
+                provider, business_name, primary_domain, regions, items,
+                brand_aliases=brand_aliases, domains=domains
+            )
+            for vis in results:
+                _count_probe(provider, vis)
+            return results
+    
+    def _sample(item: Dict[str, Any]) -> Optional[ProviderVisibility]:
+        with span("probe", kind="probe", provider=provider, query=item.get("query")):
+            check_cancelled(cancel_token)
+            return _count_probe(provider, probe_fn(
+                business_name, primary_domain, regions, item, brand_aliases=brand_aliases, domains=domains
+            ))
+    
+    with cancellation_scope(cancel_token):
+        chunk_futures = [
+            executor.submit(contextvars.copy_context().run, _chunk, items)
+            for items in chunk_queries(queries_to_probe)
+        ]
+        sample_futures = [
+            executor.submit(contextvars.copy_context().run, _sample, item)
+            for item in sample_for_agreement(queries_to_probe)
+        ]
+    return chunk_futures, sample_futures
+
+
 def run_multi_llm_visibility(
     business_name: str,
     primary_domain: str,
@@ -128,11 +374,23 @@ def run_multi_llm_visibility(
     queries_with_intent: List[Dict[str, Any]],
     run_openai: bool = True,
     run_perplexity: bool = True,
-    run_gemini: bool = True
+    run_gemini: bool = True,
+    brand_aliases: Optional[List[str]] = None,
+    domains: Optional[List[str]] = None,
+    cancel_token: Optional[CancellationToken] = None,
+    completed_results: Optional[Dict[str, List[ProviderVisibility]]] = None,
+    on_provider_complete: Optional[Callable[[str, List[ProviderVisibility]], None]] = None,
+    packed: bool = False,
+    sampling: Optional[bool] = None
 ) -> MultiLLMVisibilityResult:
     """
     Run visibility probes across all enabled LLM providers.
     
+    Every (provider, query) pair is scheduled at once. Each provider gets its
+    own thread pool sized to PROVIDER_PROBE_CONCURRENCY, so wall time tracks
+    the slowest provider rather than the sum of all probes, and a provider
+    with a long backlog cannot hold workers the others need.
+    
     Args:
         business_name: Name of the business being analyzed
         primary_domain: Business website URL
@@ -141,150 +399,241 @@ def run_multi_llm_visibility(
         run_openai: Whether to run OpenAI visibility (if enabled)
         run_perplexity: Whether to run Perplexity visibility (if enabled)
         run_gemini: Whether to run Gemini visibility (if enabled)
+        brand_aliases: Optional extra names that identify the business in answers
+        domains: Domains of the business (defaults to primary_domain); answers
+            linking to one of them count as the business
+        cancel_token: Optional token; cancelling it drops outstanding probes
+            and raises AuditCancelled
+        completed_results: Provider -> results restored from a checkpoint;
+            their successful probes are reused and only the other queries
+            are probed again
+        on_provider_complete: Called with (provider, results) for each provider
+            probed in this run, restored probes included, e.g. to checkpoint them
+        packed: Send several queries per OpenAI/Gemini request and measure
+            agreement against unpacked probes on a sample
+        sampling: Re-ask each query until its found-rate is decided (defaults
+            to ADAPTIVE_SAMPLING_ENABLED); packed providers are not sampled
     
     Returns:
         MultiLLMVisibilityResult with aggregated data from all providers
     """
-    import sys
     queries_to_probe = queries_with_intent[:MAX_VISIBILITY_QUERIES_PER_PROVIDER]
-    
-    print(f"[VISIBILITY HUB] Starting with {len(queries_to_probe)} queries for {business_name}")
-    sys.stdout.flush()
+    domains = domains or [primary_domain]
     
     logger.info(
         "Running multi-LLM visibility for %s with %d queries across providers: %s",
         business_name, len(queries_to_probe), get_enabled_providers()
     )
     
-    agg_by_query: Dict[str, QueryVisibilityAggregate] = {}
-    for item in queries_to_probe:
-        q = item.get("query", "")
-        if q:
-            agg_by_query[q] = QueryVisibilityAggregate(
-                query=q,
-                intent=item.get("intent"),
-                intent_value=item.get("intent_value"),
-                providers=[]
-            )
+    agg_by_query = _init_aggregates(queries_to_probe)
+    active = _active_provider_probes(run_openai, run_perplexity, run_gemini)
+    if sampling is None:
+        sampling = ADAPTIVE_SAMPLING_ENABLED
+    
+    # Reuse restored probes that succeeded; only the other queries are probed.
+    restored_by_provider: Dict[str, List[ProviderVisibility]] = {}
+    remaining_by_provider: Dict[str, List[Dict[str, Any]]] = {}
+    for provider, _, _, _, _ in active:
+        restored = [r for r in (completed_results or {}).get(provider, []) if r.success and r.query in agg_by_query]
+        restored_queries = {r.query for r in restored}
+        restored_by_provider[provider] = restored
+        remaining_by_provider[provider] = [q for q in queries_to_probe if q.get("query", "") not in restored_queries]
+    
+    providers_skipped = [
+        p[0] for p in active
+        if remaining_by_provider[p[0]] and not restored_by_provider[p[0]] and _circuit_open(p[0])
+    ]
+    to_probe = [
+        p for p in active
+        if remaining_by_provider[p[0]] and p[0] not in providers_skipped and not _circuit_open(p[0])
+    ]
     
-    providers_used = []
+    logger.info("Fanning out to providers: %s", [p[0] for p in to_probe])
+    restored_counts = {p: len(r) for p, r in restored_by_provider.items() if r}
+    if restored_counts:
+        logger.info("Visibility probes restored from checkpoint: %s", restored_counts)
     
-    if run_openai and OPENAI_ENABLED:
-        print("[VISIBILITY HUB] Starting OpenAI visibility probe...")
-        sys.stdout.flush()
-        logger.info("Running OpenAI simulated visibility probe...")
-        try:
-            openai_results = run_openai_visibility_for_queries(
-                business_name, primary_domain, regions, queries_to_probe
-            )
-            print(f"[VISIBILITY HUB] OpenAI complete: {len(openai_results) if openai_results else 0} results")
-            sys.stdout.flush()
-            if openai_results and len(openai_results) > 0:
-                successful_count = sum(1 for r in openai_results if r.success)
-                print(f"[VISIBILITY HUB] OpenAI results: {len(openai_results)} total, {successful_count} successful")
-                sys.stdout.flush()
-                if successful_count > 0:
-                    for vis in openai_results:
-                        if vis.query in agg_by_query:
-                            agg_by_query[vis.query].providers.append(vis)
-                        log_ai_query(model="chatgpt", prompt=vis.query, business_name=business_name)
-                    providers_used.append("openai_sim")
-                    print(f"[VISIBILITY HUB] Added 'openai_sim' to providers_used")
-                    sys.stdout.flush()
-                    logger.info("OpenAI visibility: %d results (%d successful)", len(openai_results), successful_count)
-                else:
-                    logger.warning("OpenAI visibility: all %d probes failed", len(openai_results))
-            else:
-                logger.info("OpenAI visibility: no results returned")
-        except Exception as e:
-            print(f"[VISIBILITY HUB] OpenAI FAILED: {e}")
-            sys.stdout.flush()
-            logger.error("OpenAI visibility probe failed: %s", e)
-    
-    print(f"[VISIBILITY HUB] Perplexity check: run={run_perplexity}, ENABLED={PERPLEXITY_ENABLED}")
-    sys.stdout.flush()
-    
-    if run_perplexity and PERPLEXITY_ENABLED:
-        print("[VISIBILITY HUB] Starting Perplexity visibility probe...")
-        sys.stdout.flush()
-        logger.info("Running Perplexity web-grounded visibility probe...")
-        try:
-            perplexity_results = run_perplexity_visibility_for_queries(
-                business_name, primary_domain, regions, queries_to_probe
+    results_by_provider: Dict[str, List[ProviderVisibility]] = {}
+    packing_agreement: Dict[str, Dict[str, Any]] = {}
+    
+    if to_probe:
+        check_cancelled(cancel_token)
+        executors = {
+            provider: ThreadPoolExecutor(
+                max_workers=_provider_limit(provider), thread_name_prefix=f"vis-probe-{provider}"
             )
-            if perplexity_results and len(perplexity_results) > 0:
-                successful_count = sum(1 for r in perplexity_results if r.success)
-                print(f"[VISIBILITY HUB] Perplexity results: {len(perplexity_results)} total, {successful_count} successful")
-                sys.stdout.flush()
-                if successful_count > 0:
-                    for vis in perplexity_results:
-                        if vis.query in agg_by_query:
-                            agg_by_query[vis.query].providers.append(vis)
-                        log_ai_query(model="perplexity", prompt=vis.query, business_name=business_name)
-                    providers_used.append("perplexity_web")
-                    print(f"[VISIBILITY HUB] Added 'perplexity_web' to providers_used")
-                    sys.stdout.flush()
-                    logger.info("Perplexity visibility: %d results (%d successful)", len(perplexity_results), successful_count)
-                else:
-                    logger.warning("Perplexity visibility: all %d probes failed", len(perplexity_results))
-            else:
-                logger.info("Perplexity visibility: no results returned")
-        except Exception as e:
-            logger.error("Perplexity visibility probe failed: %s", e)
-    
-    print(f"[VISIBILITY HUB] Gemini check: run={run_gemini}, ENABLED={GEMINI_ENABLED}")
-    sys.stdout.flush()
-    
-    if run_gemini and GEMINI_ENABLED:
-        print("[VISIBILITY HUB] Starting Gemini visibility probe...")
-        sys.stdout.flush()
-        logger.info("Running Gemini simulated visibility probe...")
+            for provider, _, _, _, _ in to_probe
+        }
+        cancelled = False
         try:
-            gemini_results = run_gemini_visibility_for_queries(
-                business_name, primary_domain, regions, queries_to_probe
-            )
-            print(f"[VISIBILITY HUB] Gemini complete: {len(gemini_results) if gemini_results else 0} results")
-            sys.stdout.flush()
-            if gemini_results and len(gemini_results) > 0:
-                successful_count = sum(1 for r in gemini_results if r.success)
-                print(f"[VISIBILITY HUB] Gemini results: {len(gemini_results)} total, {successful_count} successful")
-                sys.stdout.flush()
-                if successful_count > 0:
-                    for vis in gemini_results:
-                        if vis.query in agg_by_query:
-                            agg_by_query[vis.query].providers.append(vis)
-                        log_ai_query(model="gemini", prompt=vis.query, business_name=business_name)
-                    providers_used.append("gemini_sim")
-                    print(f"[VISIBILITY HUB] Added 'gemini_sim' to providers_used")
-                    sys.stdout.flush()
-                    logger.info("Gemini visibility: %d results (%d successful)", len(gemini_results), successful_count)
+            futures_by_provider: Dict[str, List[Future]] = {}
+            sample_futures_by_provider: Dict[str, List[Future]] = {}
+            for provider, _, _, probe_fn, _ in to_probe:
+                if packed and provider in PACKED_PROVIDERS:
+                    futures_by_provider[provider], sample_futures_by_provider[provider] = (
+                        _run_packed_provider_probes(
+                            provider, probe_fn, business_name, primary_domain, regions,
+                            remaining_by_provider[provider], executors[provider], brand_aliases, domains,
+                            cancel_token
+                        )
+                    )
                 else:
-                    print(f"[VISIBILITY HUB] Gemini: all {len(gemini_results)} probes failed (success=False)")
-                    sys.stdout.flush()
-                    logger.warning("Gemini visibility: all %d probes failed", len(gemini_results))
-            else:
-                print("[VISIBILITY HUB] Gemini: no results returned")
-                sys.stdout.flush()
-                logger.info("Gemini visibility: no results returned")
-        except Exception as e:
-            print(f"[VISIBILITY HUB] Gemini FAILED: {e}")
-            sys.stdout.flush()
-            logger.error("Gemini visibility probe failed: %s", e)
-    else:
-        print(f"[VISIBILITY HUB] Gemini skipped: run_gemini={run_gemini}, GEMINI_ENABLED={GEMINI_ENABLED}")
-        sys.stdout.flush()
+                    futures_by_provider[provider] = _run_provider_probes(
+                        provider, probe_fn, business_name, primary_domain, regions,
+                        remaining_by_provider[provider], executors[provider], brand_aliases, domains,
+                        cancel_token, sampling
+                    )
+
+            # Wait in short slices so a cancel frees this thread within a
+            # second instead of after the slowest in-flight request.
+            pending = {
+                f for futures in list(futures_by_provider.values()) + list(sample_futures_by_provider.values())
+                for f in futures
+            }
+            while pending:
+                if cancel_token is not None and cancel_token.cancelled:
+                    cancelled = True
+                    check_cancelled(cancel_token)
+                _, pending = wait(pending, timeout=0.5, return_when=FIRST_EXCEPTION)
+            
+            for provider, _, label, _, _ in to_probe:
+                results: List[ProviderVisibility] = []
+                for future in futures_by_provider[provider]:
+                    try:
+                        vis = future.result()
+                    except Exception as e:
+                        logger.error("%s visibility probe failed: %s", label, e)
+                        continue
+                    if isinstance(vis, list):
+                        results.extend(vis)
+                    elif vis is not None:
+                        results.append(vis)
+                results_by_provider[provider] = results
+                
+                if provider in sample_futures_by_provider:
+                    unpacked = [
+                        f.result() for f in sample_futures_by_provider[provider] if f.exception() is None
+                    ]
+                    packing_agreement[provider] = measure_agreement(results, unpacked)
+                    logger.info("%s packed/unpacked agreement: %s", label, packing_agreement[provider])
+                
+                if on_provider_complete is not None:
+                    on_provider_complete(provider, restored_by_provider[provider] + results)
+        finally:
+            # On cancel, drop queued probes and return without waiting for
+            # requests already on the wire; their results are discarded.
+            for executor in executors.values():
+                executor.shutdown(wait=not cancelled, cancel_futures=cancelled)
+    
+    providers_used: List[str] = []
+    for provider, sentinel_model, label, _, _ in active:
+        if provider in providers_skipped:
+            continue
+        restored = restored_by_provider[provider]
+        probed = results_by_provider.get(provider, [])
+        if not restored and _skipped_after_probing(provider, probed):
+            providers_skipped.append(provider)
+            continue
+        _merge_provider_results(
+            agg_by_query, providers_used, provider, sentinel_model, label,
+            restored + probed, business_name, logged_results=probed
+        )
+    
+    return _build_multi_llm_result(
+        agg_by_query, providers_used, business_name, providers_skipped, packing_agreement,
+        brand_aliases, domains
+    )
+
+
+async def run_multi_llm_visibility_async(
+    business_name: str,
+    primary_domain: str,
+    regions: List[str],
+    queries_with_intent: List[Dict[str, Any]],
+    run_openai: bool = True,
+    run_perplexity: bool = True,
+    run_gemini: bool = True,
+    brand_aliases: Optional[List[str]] = None,
+    domains: Optional[List[str]] = None,
+    cancel_token: Optional[CancellationToken] = None
+) -> MultiLLMVisibilityResult:
+    """
+    Async variant of run_multi_llm_visibility.
     
-    aggregates = list(agg_by_query.values())
+    Probes are awaited on the shared async provider clients instead of a
+    thread pool, with the same per-provider concurrency caps and the same
+    MultiLLMVisibilityResult output.
+    """
+    queries_to_probe = queries_with_intent[:MAX_VISIBILITY_QUERIES_PER_PROVIDER]
+    domains = domains or [primary_domain]
     
-    summary = compute_visibility_summary(aggregates, business_name)
+    logger.info(
+        "Running async multi-LLM visibility for %s with %d queries across providers: %s",
+        business_name, len(queries_to_probe), get_enabled_providers()
+    )
     
-    print(f"[VISIBILITY HUB] FINAL providers_used: {providers_used} (count: {len(providers_used)})")
-    sys.stdout.flush()
+    agg_by_query = _init_aggregates(queries_to_probe)
+    active = _active_provider_probes(run_openai, run_perplexity, run_gemini)
+    providers_skipped = [p[0] for p in active if _circuit_open(p[0])]
+    active = [p for p in active if p[0] not in providers_skipped]
+    providers_used: List[str] = []
     
-    return MultiLLMVisibilityResult(
-        queries=aggregates,
-        summary=summary,
-        providers_used=providers_used
+    async def _provider_results(provider: str, label: str, probe_fn) -> List[ProviderVisibility]:
+        limit = asyncio.Semaphore(_provider_limit(provider))
+        
+        async def _probe(item: Dict[str, Any]) -> Optional[ProviderVisibility]:
+            async with limit:
+                check_cancelled(cancel_token)
+                return _count_probe(provider, await probe_fn(
+                    business_name, primary_domain, regions, item, brand_aliases=brand_aliases, domains=domains
+                ))
+        
+        outcomes = await asyncio.gather(
+            *[_probe(item) for item in queries_to_probe],
+            return_exceptions=True
+        )
+        results: List[ProviderVisibility] = []
+        for outcome in outcomes:
+            if isinstance(outcome, BaseException):
+                if isinstance(outcome, asyncio.CancelledError):
+                    raise outcome
+                logger.error("%s visibility probe failed: %s", label, outcome)
+            elif outcome is not None:
+                results.append(outcome)
+        return results
+    
+    check_cancelled(cancel_token)
+    with cancellation_scope(cancel_token):
+        gathered = asyncio.ensure_future(asyncio.gather(*[
+            _provider_results(provider, label, async_probe_fn)
+            for provider, _, label, _, async_probe_fn in active
+        ]))
+    
+    # Cancelling the token cancels the gather, which aborts in-flight requests.
+    unregister = lambda: None
+    if cancel_token is not None:
+        loop = asyncio.get_running_loop()
+        unregister = cancel_token.add_callback(lambda: loop.call_soon_threadsafe(gathered.cancel))
+    try:
+        all_results = await gathered
+    except asyncio.CancelledError:
+        check_cancelled(cancel_token)
+        raise
+    finally:
+        unregister()
+    
+    for (provider, sentinel_model, label, _, _), results in zip(active, all_results):
+        if _skipped_after_probing(provider, results):
+            providers_skipped.append(provider)
+            continue
+        _merge_provider_results(
+            agg_by_query, providers_used, provider, sentinel_model,
+            label, results, business_name
+        )
+    
+    return _build_multi_llm_result(
+        agg_by_query, providers_used, business_name, providers_skipped,
+        brand_aliases=brand_aliases, domains=domains
     )
 
 
@@ -373,12 +722,112 @@ def get_provider_description(provider: str) -> str:
     }.get(provider, provider)
 
 
+def _new_teaser_result(business_name: str, primary_domain: str) -> Dict[str, Any]:
+    return {
+        "business_name": business_name,
+        "domain": primary_domain,
+        "score": 0,
+        "score_percent": "0%",
+        "total_probes": 0,
+        "hits": 0,
+        "queries_tested": [],
+        "top_competitor": None,
+        "missing_query": None,
+        "providers_used": [],
+        "providers_skipped": [],
+        "early_exit": False
+    }
+
+
+def _teaser_provider_skipped(result: Dict[str, Any], provider: str) -> bool:
+    """Skip (and record) a teaser provider whose circuit is open."""
+    if not _circuit_open(provider):
+        return False
+    if provider not in result["providers_skipped"]:
+        result["providers_skipped"].append(provider)
+    return True
+
+
+def _tally_teaser_probes(
+    result: Dict[str, Any],
+    query_result: Dict[str, Any],
+    all_competitors: Dict[str, int],
+    provider: str,
+    vis_results: List[ProviderVisibility],
+    matcher: BrandMatcher
+):
+    """Fold one provider's teaser probe results into the running teaser tallies."""
+    if not vis_results:
+        return
+    
+    for vis in vis_results:
+        result["total_probes"] += 1
+        if vis.success:
+            if vis.target_found:
+                result["hits"] += 1
+                query_result["target_found"] = True
+            
+            for brand in vis.recommended_brands:
+                if not matcher.matches(brand.name, brand.url):
+                    all_competitors[brand.name] = all_competitors.get(brand.name, 0) + 1
+            
+            query_result["provider_results"].append({
+                "provider": provider,
+                "target_found": vis.target_found,
+                "competitors": [b.name for b in vis.recommended_brands[:3]]
+            })
+    
+    if provider not in result["providers_used"]:
+        result["providers_used"].append(provider)
+
+
+def _finish_teaser_result(result: Dict[str, Any], all_competitors: Dict[str, int]) -> Dict[str, Any]:
+    """Compute the teaser score, top competitor and missing query."""
+    successful_probes = sum(
+        1 for qt in result["queries_tested"] 
+        for pr in qt.get("provider_results", [])
+    )
+    
+    if successful_probes == 0:
+        result["error"] = "No providers available - cannot determine visibility"
+        result["score_percent"] = "N/A"
+        logger.warning("Teaser for %s failed: no successful provider probes", result["business_name"])
+        return result
+    
+    if result["total_probes"] > 0:
+        score_pct = round((result["hits"] / result["total_probes"]) * 100, 1)
+        result["score"] = score_pct
+        result["score_percent"] = f"{score_pct}%"
+    
+    if all_competitors:
+        top_comp = max(all_competitors.keys(), key=lambda k: all_competitors[k])
+        result["top_competitor"] = {
+            "name": top_comp,
+            "mentions": all_competitors[top_comp]
+        }
+    
+    if not result["missing_query"] and result["queries_tested"]:
+        for qt in result["queries_tested"]:
+            if not qt["target_found"]:
+                result["missing_query"] = qt["query"]
+                break
+    
+    logger.info(
+        "Teaser for %s complete: %s visibility, %d providers, %d successful probes",
+        result["business_name"], result["score_percent"], len(result["providers_used"]), successful_probes
+    )
+    
+    return result
+
+
 def run_teaser_visibility(
     business_name: str,
     primary_domain: str,
     regions: List[str],
     teaser_queries: List[Dict[str, Any]],
-    early_exit_on_zero: bool = True
+    early_exit_on_zero: bool = True,
+    brand_aliases: Optional[List[str]] = None,
+    domains: Optional[List[str]] = None
 ) -> Dict[str, Any]:
     """
     Run a lightweight teaser visibility probe for Sales Mode.
@@ -392,30 +841,18 @@ def run_teaser_visibility(
         regions: Geographic regions
         teaser_queries: Exactly 3 queries from generate_teaser_queries()
         early_exit_on_zero: If True, stop after first query shows 0% visibility
+        brand_aliases: Optional extra names that identify the business in answers
+        domains: Domains of the business (defaults to primary_domain)
     
     Returns:
         Dict with teaser-specific results for sales packet generation
     """
-    import sys
-    
-    print(f"[TEASER MODE] Starting teaser visibility for {business_name}")
-    sys.stdout.flush()
-    
-    result = {
-        "business_name": business_name,
-        "domain": primary_domain,
-        "score": 0,
-        "score_percent": "0%",
-        "total_probes": 0,
-        "hits": 0,
-        "queries_tested": [],
-        "top_competitor": None,
-        "missing_query": None,
-        "providers_used": [],
-        "early_exit": False
-    }
+    logger.info("Starting teaser visibility for %s", business_name)
     
+    result = _new_teaser_result(business_name, primary_domain)
     all_competitors: Dict[str, int] = {}
+    domains = domains or [primary_domain]
+    matcher = get_brand_matcher(business_name, brand_aliases, domains)
     
     for idx, query_item in enumerate(teaser_queries[:3]):
         query = query_item.get("query", "")
@@ -424,8 +861,7 @@ def run_teaser_visibility(
         if not query:
             continue
         
-        print(f"[TEASER MODE] Query {idx+1}/3: {query}")
-        sys.stdout.flush()
+        logger.debug("Teaser query %d/3: %s", idx + 1, query)
         
         query_result = {
             "query": query,
@@ -436,62 +872,27 @@ def run_teaser_visibility(
         
         queries_with_intent = [{"query": query, "intent": intent, "intent_value": query_item.get("intent_value", 8)}]
         
-        if OPENAI_ENABLED:
+        if OPENAI_ENABLED and not _teaser_provider_skipped(result, "openai_sim"):
             try:
                 openai_results = run_openai_visibility_for_queries(
-                    business_name, primary_domain, regions, queries_with_intent
+                    business_name, primary_domain, regions, queries_with_intent,
+                    brand_aliases=brand_aliases, domains=domains
+                )
+                _tally_teaser_probes(
+                    result, query_result, all_competitors, "openai_sim", openai_results, matcher
                 )
-                if openai_results:
-                    for vis in openai_results:
-                        result["total_probes"] += 1
-                        if vis.success:
-                            if vis.target_found:
-                                result["hits"] += 1
-                                query_result["target_found"] = True
-                            
-                            for brand in vis.recommended_brands:
-                                if brand.name.lower() != business_name.lower():
-                                    all_competitors[brand.name] = all_competitors.get(brand.name, 0) + 1
-                            
-                            query_result["provider_results"].append({
-                                "provider": "openai_sim",
-                                "target_found": vis.target_found,
-                                "competitors": [b.name for b in vis.recommended_brands[:3]]
-                            })
-                    
-                    if "openai_sim" not in result["providers_used"]:
-                        result["providers_used"].append("openai_sim")
-                        
             except Exception as e:
                 logger.warning(f"Teaser OpenAI probe failed: {e}")
         
-        if GEMINI_ENABLED:
+        if GEMINI_ENABLED and not _teaser_provider_skipped(result, "gemini_sim"):
             try:
-                from services.gemini_visibility import run_gemini_visibility_for_queries
                 gemini_results = run_gemini_visibility_for_queries(
-                    business_name, primary_domain, regions, queries_with_intent
+                    business_name, primary_domain, regions, queries_with_intent,
+                    brand_aliases=brand_aliases, domains=domains
+                )
+                _tally_teaser_probes(
+                    result, query_result, all_competitors, "gemini_sim", gemini_results, matcher
                 )
-                if gemini_results:
-                    for vis in gemini_results:
-                        result["total_probes"] += 1
-                        if vis.success:
-                            if vis.target_found:
-                                result["hits"] += 1
-                                query_result["target_found"] = True
-                            
-                            for brand in vis.recommended_brands:
-                                if brand.name.lower() != business_name.lower():
-                                    all_competitors[brand.name] = all_competitors.get(brand.name, 0) + 1
-                            
-                            query_result["provider_results"].append({
-                                "provider": "gemini_sim",
-                                "target_found": vis.target_found,
-                                "competitors": [b.name for b in vis.recommended_brands[:3]]
-                            })
-                    
-                    if "gemini_sim" not in result["providers_used"]:
-                        result["providers_used"].append("gemini_sim")
-                        
             except Exception as e:
                 logger.warning(f"Teaser Gemini probe failed: {e}")
         
@@ -500,41 +901,79 @@ def run_teaser_visibility(
         if early_exit_on_zero and not query_result["target_found"] and result["hits"] == 0:
             result["early_exit"] = True
             result["missing_query"] = query
-            print(f"[TEASER MODE] Early exit - 0% visibility confirmed on query: {query}")
-            sys.stdout.flush()
+            logger.info("Teaser early exit: 0%% visibility confirmed on query %r", query)
             break
     
-    successful_probes = sum(
-        1 for qt in result["queries_tested"] 
-        for pr in qt.get("provider_results", [])
-    )
+    return _finish_teaser_result(result, all_competitors)
+
+
+async def run_teaser_visibility_async(
+    business_name: str,
+    primary_domain: str,
+    regions: List[str],
+    teaser_queries: List[Dict[str, Any]],
+    early_exit_on_zero: bool = True,
+    brand_aliases: Optional[List[str]] = None,
+    domains: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    Async variant of run_teaser_visibility.
     
-    if successful_probes == 0:
-        result["error"] = "No providers available - cannot determine visibility"
-        result["score_percent"] = "N/A"
-        print(f"[TEASER MODE] FAILED: No successful provider probes - cannot claim 0% visibility")
-        sys.stdout.flush()
-        return result
+    The OpenAI and Gemini runners for each teaser query are awaited together,
+    so async routes can run a teaser without tying up a worker thread.
+    """
+    result = _new_teaser_result(business_name, primary_domain)
+    all_competitors: Dict[str, int] = {}
+    domains = domains or [primary_domain]
+    matcher = get_brand_matcher(business_name, brand_aliases, domains)
     
-    if result["total_probes"] > 0:
-        score_pct = round((result["hits"] / result["total_probes"]) * 100, 1)
-        result["score"] = score_pct
-        result["score_percent"] = f"{score_pct}%"
+    teaser_providers = []
+    if OPENAI_ENABLED:
+        teaser_providers.append(("openai_sim", "OpenAI", run_openai_visibility_for_queries_async))
+    if GEMINI_ENABLED:
+        teaser_providers.append(("gemini_sim", "Gemini", run_gemini_visibility_for_queries_async))
+    teaser_providers = [p for p in teaser_providers if not _teaser_provider_skipped(result, p[0])]
     
-    if all_competitors:
-        top_comp = max(all_competitors.keys(), key=lambda k: all_competitors[k])
-        result["top_competitor"] = {
-            "name": top_comp,
-            "mentions": all_competitors[top_comp]
+    for query_item in teaser_queries[:3]:
+        query = query_item.get("query", "")
+        intent = query_item.get("intent_type", "informational")
+        
+        if not query:
+            continue
+        
+        query_result = {
+            "query": query,
+            "intent": intent,
+            "provider_results": [],
+            "target_found": False
         }
+        
+        queries_with_intent = [{"query": query, "intent": intent, "intent_value": query_item.get("intent_value", 8)}]
+        
+        outcomes = await asyncio.gather(
+            *[
+                run_fn(
+                    business_name, primary_domain, regions, queries_with_intent,
+                    brand_aliases=brand_aliases, domains=domains
+                )
+                for _, _, run_fn in teaser_providers
+            ],
+            return_exceptions=True
+        )
+        
+        for (provider, label, _), outcome in zip(teaser_providers, outcomes):
+            if isinstance(outcome, BaseException):
+                if isinstance(outcome, asyncio.CancelledError):
+                    raise outcome
+                logger.warning(f"Teaser {label} probe failed: {outcome}")
+                continue
+            _tally_teaser_probes(result, query_result, all_competitors, provider, outcome, matcher)
+        
+        result["queries_tested"].append(query_result)
+        
+        if early_exit_on_zero and not query_result["target_found"] and result["hits"] == 0:
+            result["early_exit"] = True
+            result["missing_query"] = query
+            break
     
-    if not result["missing_query"] and result["queries_tested"]:
-        for qt in result["queries_tested"]:
-            if not qt["target_found"]:
-                result["missing_query"] = qt["query"]
-                break
-    
-    print(f"[TEASER MODE] Complete: {result['score_percent']} visibility, {len(result['providers_used'])} providers, {successful_probes} successful probes")
-    sys.stdout.flush()
-    
-    return result
+    return _finish_teaser_result(result, all_competitors)
@@ -24,6 +24,10 @@ class ProviderVisibility(BaseModel):
     target_position: Optional[int] = None
     raw_response: Optional[str] = None
     success: bool = True
+    samples: int = 1
+    found_count: Optional[int] = None
+    found_rate: Optional[float] = None
+    found_interval: Optional[List[float]] = None
 
 
 class QueryVisibilityAggregate(BaseModel):
@@ -68,6 +72,8 @@ class VisibilitySummary(BaseModel):
     competitor_by_provider: Dict[str, List[Dict[str, Any]]] = Field(default_factory=dict)
     
     intent_breakdown: Dict[str, int] = Field(default_factory=dict)
+    
+    query_confidence: List[Dict[str, Any]] = Field(default_factory=list)
 
 
 class MultiLLMVisibilityResult(BaseModel):
@@ -75,3 +81,5 @@ class MultiLLMVisibilityResult(BaseModel):
     queries: List[QueryVisibilityAggregate] = Field(default_factory=list)
     summary: VisibilitySummary = Field(default_factory=VisibilitySummary)
     providers_used: List[str] = Field(default_factory=list)
+    providers_skipped: List[str] = Field(default_factory=list)
+    packing_agreement: Dict[str, Dict[str, Any]] = Field(default_factory=dict)
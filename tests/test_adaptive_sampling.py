@@ -0,0 +1,62 @@
+import pytest
+
+from services import adaptive_sampling
+from services.adaptive_sampling import sample_probe, sampling_decided, wilson_interval
+from services.visibility_models import ProviderVisibility
+
+
+@pytest.fixture(autouse=True)
+def sampling_config(monkeypatch):
+    monkeypatch.setattr(adaptive_sampling, "ADAPTIVE_SAMPLING_MIN_SAMPLES", 3)
+    monkeypatch.setattr(adaptive_sampling, "ADAPTIVE_SAMPLING_MAX_SAMPLES", 8)
+    monkeypatch.setattr(adaptive_sampling, "ADAPTIVE_SAMPLING_MAX_HALF_WIDTH", 0.2)
+
+
+def test_wilson_interval_bounds():
+    assert wilson_interval(0, 0) == (0.0, 1.0)
+    low, high = wilson_interval(5, 10, confidence=0.9)
+    assert low == pytest.approx(1 - high)
+    assert 0.0 <= low < 0.5 < high <= 1.0
+    low, high = wilson_interval(10, 10, confidence=0.9)
+    assert 0.5 < low < high == 1.0
+
+
+def test_consistent_answers_stop_at_minimum():
+    assert not sampling_decided(2, 2)
+    assert sampling_decided(3, 3)
+    assert sampling_decided(0, 3)
+
+
+def test_borderline_answers_keep_sampling_until_cap():
+    assert not sampling_decided(2, 3)
+    assert not sampling_decided(4, 7)
+    assert sampling_decided(4, 8)
+
+
+def _probe(answers):
+    calls = iter(answers)
+
+    def probe(business_name, primary_domain, regions, item, brand_aliases=None, domains=None):
+        found = next(calls)
+        if found is None:
+            return ProviderVisibility(provider="openai", query=item["query"], success=False)
+        return ProviderVisibility(
+            provider="openai", query=item["query"], target_found=found,
+            target_position=1 if found else None,
+        )
+    return probe
+
+
+def test_sample_probe_stops_early_on_consistent_answers():
+    vis = sample_probe(_probe([True, True, True, False]), "Biz", "biz.com", [], {"query": "q"})
+    assert vis.samples == 3
+    assert vis.found_count == 3
+    assert vis.target_found and vis.target_position == 1
+
+
+def test_sample_probe_failures_count_toward_cap_only():
+    answers = [True, None, False, None, True, None, False, None]
+    vis = sample_probe(_probe(answers), "Biz", "biz.com", [], {"query": "q"})
+    assert vis.samples == 4
+    assert vis.found_count == 2
+    assert vis.found_rate == 0.5
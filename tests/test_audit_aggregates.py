@@ -0,0 +1,148 @@
+from services.audit_aggregates import PROVIDER_NAME_MAP, get_audit_aggregates, materialize_audit_aggregates
+from services.brand_matcher import get_business_matcher
+from services.database import Audit, AuditAggregate, AuditQuery, Business, QueryVisibilityResult
+
+# (query, intent, [(provider, brand_name, brand_url, is_target)])
+FIXTURE_QUERIES = [
+    ("best plumber austin", "emergency", [
+        ("openai_sim", "Acme Plumbing", None, False),
+        ("perplexity_web", "Rival Pipes", "rivalpipes.com", False),
+        ("gemini_sim", "Rival Pipes", None, False),
+    ]),
+    ("burst pipe repair", "emergency", [
+        ("openai_sim", "Drain Pros", "drainpros.com", False),
+        ("gemini_sim", "Austin's Finest", "https://acme-plumbing.com/about", False),
+        ("perplexity_web", "AP Services", None, True),
+    ]),
+    ("water heater install", None, [
+        ("openai_sim", "Rival Pipes", None, False),
+        ("claude_sim", "Drain Pros", None, False),
+        ("gemini_sim", None, None, False),
+    ]),
+    ("plumber prices", "pricing", []),
+]
+
+
+def _fixture_audit(db):
+    business = Business(name="Acme Plumbing", primary_domain="acme-plumbing.com")
+    db.add(business)
+    db.flush()
+    audit = Audit(business_id=business.id, status="completed")
+    db.add(audit)
+    db.flush()
+    for text, intent, results in FIXTURE_QUERIES:
+        aq = AuditQuery(audit_id=audit.id, query_text=text, intent=intent)
+        db.add(aq)
+        db.flush()
+        for rank, (provider, brand, url, is_target) in enumerate(results, 1):
+            db.add(QueryVisibilityResult(
+                audit_query_id=aq.id, provider=provider, brand_name=brand,
+                brand_url=url, rank=rank, is_target=is_target
+            ))
+    db.commit()
+    return business, audit
+
+
+def _per_request_rollup(audit, business):
+    """The dashboards' former per-request computation over the ORM relationships."""
+    matcher = get_business_matcher(business)
+    provider_stats = {name: {"target_found": 0, "total_probes": 0} for name in ("openai", "perplexity", "gemini")}
+    competitor_counts = {}
+    intent_breakdown = {}
+    queries = []
+    total_probes = 0
+    total_hits = 0
+
+    for aq in audit.audit_queries:
+        providers = []
+        query_hits = 0
+        query_probes = 0
+        if aq.intent:
+            intent_breakdown[aq.intent] = intent_breakdown.get(aq.intent, 0) + 1
+        for vr in aq.visibility_results:
+            is_target = vr.is_target or matcher.matches(vr.brand_name, vr.brand_url)
+            provider = PROVIDER_NAME_MAP.get(vr.provider, vr.provider)
+            total_probes += 1
+            query_probes += 1
+            if provider in provider_stats:
+                provider_stats[provider]["total_probes"] += 1
+                if is_target:
+                    provider_stats[provider]["target_found"] += 1
+            if is_target:
+                total_hits += 1
+                query_hits += 1
+            if vr.brand_name and not is_target:
+                competitor_counts[vr.brand_name] = competitor_counts.get(vr.brand_name, 0) + 1
+            providers.append({"provider": provider, "target_found": is_target, "brand_name": vr.brand_name, "rank": vr.rank})
+        queries.append({
+            "query": aq.query_text,
+            "intent": aq.intent,
+            "providers": providers,
+            "target_found_count": query_hits,
+            "total_probes": query_probes,
+            "score_percent": round((query_hits / query_probes) * 100) if query_probes > 0 else 0,
+        })
+
+    for stats in provider_stats.values():
+        stats["target_percent"] = (
+            round((stats["target_found"] / stats["total_probes"]) * 100, 1) if stats["total_probes"] > 0 else 0.0
+        )
+    competitors = [
+        {"name": name, "count": count}
+        for name, count in sorted(competitor_counts.items(), key=lambda x: -x[1])
+    ]
+    return {
+        "total_queries": len(audit.audit_queries),
+        "total_probes": total_probes,
+        "target_hits": total_hits,
+        "provider_stats": provider_stats,
+        "competitors": competitors,
+        "intent_breakdown": intent_breakdown,
+        "queries": queries,
+    }
+
+
+def test_materialized_aggregates_match_the_per_request_computation(session_factory):
+    db = session_factory()
+    business, audit = _fixture_audit(db)
+
+    aggregate = materialize_audit_aggregates(db, audit, business)
+    expected = _per_request_rollup(audit, business)
+
+    assert (aggregate.total_queries, aggregate.total_probes, aggregate.target_hits) == (4, 9, 3)
+    assert aggregate.total_queries == expected["total_queries"]
+    assert aggregate.total_probes == expected["total_probes"]
+    assert aggregate.target_hits == expected["target_hits"]
+    assert aggregate.get_provider_stats() == expected["provider_stats"]
+    assert aggregate.get_competitor_counts() == expected["competitors"]
+    assert aggregate.get_query_rows() == expected["queries"]
+    assert {
+        intent: stats["queries"] for intent, stats in aggregate.get_intent_stats().items() if intent
+    } == expected["intent_breakdown"]
+    assert aggregate.get_intent_stats()["emergency"] == {"queries": 2, "total_probes": 6, "found": 3}
+    assert aggregate.get_missing_queries() == [
+        {"text": "water heater install", "intent": "general"},
+        {"text": "plumber prices", "intent": "pricing"},
+    ]
+    db.close()
+
+
+def test_first_view_of_an_older_completed_audit_backfills_its_row(session_factory):
+    db = session_factory()
+    business, audit = _fixture_audit(db)
+    assert db.query(AuditAggregate).count() == 0
+
+    first = get_audit_aggregates(db, audit, business)
+    assert first.id is not None and first.target_hits == 3
+    assert db.query(AuditAggregate).filter(AuditAggregate.audit_id == audit.id).count() == 1
+
+    # Later views read the stored row rather than recomputing it
+    db.query(QueryVisibilityResult).delete()
+    db.commit()
+    again = get_audit_aggregates(db, audit, business)
+    assert again.id == first.id and again.total_probes == 9
+
+    refreshed = materialize_audit_aggregates(db, audit, business)
+    assert refreshed.id == first.id and refreshed.total_probes == 0
+    assert db.query(AuditAggregate).count() == 1
+    db.close()
@@ -0,0 +1,103 @@
+import copy
+import json
+
+from services import blob_store
+from services.blob_store import load_visibility_summary, put_blob, store_visibility_summary
+from services.database import Audit, Business, ContentBlob
+
+SUMMARY = {
+    "tenant_name": "Acme Plumbing",
+    "total_queries": 2,
+    "mentioned_count": 1,
+    "avg_score": 1.5,
+    "results": [
+        {"query": "best plumber", "mentioned": True, "raw_recommendations": [{"name": "Acme Plumbing"}]},
+        {"query": "water heater", "mentioned": False, "raw_recommendations": []},
+    ],
+    "perplexity_visibility": {"results": [{"query": "best plumber", "raw_response": "long answer " * 50}]},
+    "multi_llm_visibility": {
+        "queries": [{"query": "best plumber", "provider_results": [{"raw_response": "{...}" * 100}]}],
+        "summary": {"overall_score": 50.0},
+        "providers_used": ["openai_sim", "gemini_sim"],
+        "providers_skipped": [],
+        "packing_agreement": None,
+    },
+    "site_snapshot": {"pages": [], "fetch_status": "ok"},
+}
+
+
+def _audit(db):
+    business = Business(name="Acme Plumbing", primary_domain="acme-plumbing.com")
+    db.add(business)
+    db.flush()
+    audit = Audit(business_id=business.id, status="completed")
+    db.add(audit)
+    db.flush()
+    return audit
+
+
+def test_slim_row_and_blob_reproduce_the_summary(session_factory):
+    db = session_factory()
+    audit = _audit(db)
+    store_visibility_summary(db, audit, copy.deepcopy(SUMMARY))
+    db.commit()
+    audit_id = audit.id
+    db.close()
+
+    db = session_factory()
+    audit = db.get(Audit, audit_id)
+    slim = json.loads(audit.visibility_summary_json)
+    assert "results" not in slim and "perplexity_visibility" not in slim
+    assert slim["multi_llm_visibility"] == {
+        k: SUMMARY["multi_llm_visibility"][k]
+        for k in ("summary", "providers_used", "providers_skipped", "packing_agreement")
+    }
+    assert slim["results_count"] == 2
+
+    full = load_visibility_summary(audit)
+    assert full == {**SUMMARY, "results_count": 2}
+    db.close()
+
+
+def test_identical_details_are_stored_once(session_factory):
+    db = session_factory()
+    first, second = _audit(db), _audit(db)
+    store_visibility_summary(db, first, copy.deepcopy(SUMMARY))
+    store_visibility_summary(db, second, copy.deepcopy(SUMMARY))
+    db.commit()
+
+    assert first.details_digest == second.details_digest
+    assert db.query(ContentBlob).count() == 1
+    db.close()
+
+
+def test_legacy_inline_summary_still_loads(session_factory):
+    db = session_factory()
+    audit = _audit(db)
+    audit.set_visibility_summary(SUMMARY)
+    db.commit()
+
+    assert audit.details_digest is None
+    assert load_visibility_summary(audit, db) == SUMMARY
+    db.close()
+
+
+def test_losing_a_concurrent_insert_keeps_the_callers_changes(session_factory, monkeypatch):
+    data = b'{"results":[]}'
+    other = session_factory()
+    digest = put_blob(other, data)
+    other.commit()
+    other.close()
+
+    # The other worker's insert lands between this worker's check and insert
+    monkeypatch.setattr(blob_store, "_blob_exists", lambda db, digest: False)
+    db = session_factory()
+    audit = _audit(db)
+    audit.status = "done"
+
+    assert put_blob(db, data) == digest
+    db.commit()
+
+    assert db.get(Audit, audit.id).status == "done"
+    assert db.query(ContentBlob).count() == 1
+    db.close()
@@ -0,0 +1,79 @@
+import json
+
+from services.brand_matcher import BrandMatcher, extract_domain, get_brand_matcher, normalize_brand
+from services.openai_visibility import parse_openai_response
+from services.perplexity_visibility import _summarize_perplexity_answers
+from services.visibility_hub import compute_visibility_summary
+from services.visibility_models import BrandHit, ProviderVisibility, QueryVisibilityAggregate
+
+NAME = "Joe's Pipe Pros"
+ALIASES = ["JPP Plumbing"]
+DOMAINS = ["https://www.jpp.com"]
+
+
+def test_normalize_and_extract_domain():
+    assert normalize_brand("  Joe's   Pipe-Pros! ") == "joes pipepros"
+    assert extract_domain("https://www.jpp.com:443/x?y=1") == "jpp.com"
+    assert extract_domain("") == ""
+
+
+def test_name_alias_and_domain_match():
+    matcher = BrandMatcher(NAME, ALIASES, DOMAINS)
+    assert matcher.matches("Joe's Pipe Pros")
+    assert matcher.matches("Joe's Pipe Pros of Tampa")
+    assert matcher.matches("JPP Plumbing")
+    assert matcher.matches("Some Listing", "https://www.jpp.com/x")
+    assert matcher.matches("Some Listing", "https://joespipepros.net/")
+    assert not matcher.matches("Roto-Rooter", "https://www.rotorooter.com")
+
+
+def test_single_word_alias_only_matches_exactly():
+    matcher = BrandMatcher("Best Plumbing", ["Best"])
+    assert matcher.matches("Best")
+    assert not matcher.matches("Best Buy")
+
+
+def test_find_position_is_one_based():
+    matcher = BrandMatcher(NAME, ALIASES, DOMAINS)
+    recommended = [{"name": "Roto-Rooter"}, "not a dict", {"name": "Listing", "url": "jpp.com"}]
+    assert matcher.find_position(recommended) == 3
+    assert matcher.find_position([{"name": "Roto-Rooter"}]) is None
+
+
+def test_matcher_is_memoized():
+    assert get_brand_matcher(NAME, ALIASES, DOMAINS) is get_brand_matcher(NAME, list(ALIASES), list(DOMAINS))
+
+
+def test_probe_parsing_uses_domains():
+    raw = json.dumps({"recommended_brands": [{"name": "Other Co"}, {"name": "Listing", "url": "https://www.jpp.com/x"}]})
+    assert parse_openai_response(raw, NAME)["target_found"] is False
+    parsed = parse_openai_response(raw, NAME, ALIASES, DOMAINS)
+    assert parsed["target_found"] is True
+    assert parsed["target_position"] == 2
+
+
+def test_summary_does_not_count_own_alias_or_domain_as_competitor():
+    probe = ProviderVisibility(
+        provider="openai_sim",
+        query="best plumber",
+        recommended_brands=[
+            BrandHit(name="JPP Plumbing"),
+            BrandHit(name="Listing", url="https://www.jpp.com/x"),
+            BrandHit(name="Roto-Rooter"),
+        ],
+        target_found=True,
+    )
+    aggregates = [QueryVisibilityAggregate(query="best plumber", providers=[probe])]
+
+    summary = compute_visibility_summary(aggregates, NAME, ALIASES, DOMAINS)
+    assert [c["name"] for c in summary.top_competitors] == ["Roto-Rooter"]
+
+
+def test_perplexity_summary_uses_aliases_and_domains():
+    raw = json.dumps({
+        "target_business_found": False,
+        "recommended_brands": [{"name": "JPP Plumbing"}, {"name": "Roto-Rooter"}],
+    })
+    result = _summarize_perplexity_answers(NAME, ["q"], {"q": raw}, ALIASES, DOMAINS)
+    assert result["summary"]["target_found_count"] == 1
+    assert result["summary"]["top_competitors"] == [{"name": "Roto-Rooter", "count": 1}]
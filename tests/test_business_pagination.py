@@ -0,0 +1,92 @@
+import html
+import re
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from main import _decode_business_cursor, _encode_business_cursor, _page_businesses
+from services.database import Business
+
+
+def _page(db, cursor, size=2):
+    return _page_businesses(db.query(Business), cursor).limit(size).all()
+
+
+def test_null_created_at_pages_after_dated_rows(session_factory):
+    db = session_factory()
+    db.add_all([
+        Business(id=1, name="Old", primary_domain="old.com", created_at=datetime(2024, 1, 1)),
+        Business(id=2, name="New", primary_domain="new.com", created_at=datetime(2025, 1, 1)),
+        Business(id=3, name="Legacy A", primary_domain="a.com"),
+        Business(id=4, name="Legacy B", primary_domain="b.com"),
+    ])
+    db.flush()
+    db.query(Business).filter(Business.id.in_([3, 4])).update({"created_at": None}, synchronize_session=False)
+    db.commit()
+    db.expire_all()
+
+    seen = []
+    cursor = None
+    for _ in range(3):
+        page = _page(db, cursor)
+        if not page:
+            break
+        seen.extend(b.id for b in page)
+        cursor = _decode_business_cursor(_encode_business_cursor(page[-1]))
+        assert cursor is not None
+    assert seen == [2, 1, 4, 3]
+    db.close()
+
+
+@pytest.fixture
+def admin_client(monkeypatch, session_factory):
+    monkeypatch.setattr(main, "get_db_session", session_factory)
+    monkeypatch.setattr(main, "ADMIN_BUSINESSES_PAGE_SIZE", 2)
+    db = session_factory()
+    db.add_all([
+        Business(id=i, name=f"Biz {i}", primary_domain=f"biz{i}.com", created_at=datetime(2025, 1, i))
+        for i in range(1, 4)
+    ])
+    db.commit()
+    db.close()
+
+    client = TestClient(main.app)
+    response = client.post(
+        "/admin/login",
+        data={"username": main.ADMIN_USERNAME, "password": main.ADMIN_PASSWORD},
+        follow_redirects=False
+    )
+    assert response.status_code == 302
+    return client
+
+
+def _link(text, label):
+    match = re.search(r'href="([^"]+)"[^>]*>' + label, text)
+    return html.unescape(match.group(1)) if match else None
+
+
+def test_admin_businesses_route_pages_with_and_without_after(admin_client):
+    first = admin_client.get("/admin/businesses")
+    assert first.status_code == 200
+    assert "Biz 3" in first.text and "Biz 2" in first.text and "Biz 1" not in first.text
+    assert _link(first.text, "First page") is None
+    next_url = _link(first.text, "Next page")
+    assert next_url and "after=" in next_url
+
+    second = admin_client.get(next_url)
+    assert second.status_code == 200
+    assert "Biz 1" in second.text and "Biz 2" not in second.text
+    assert _link(second.text, "First page") == "/admin/businesses"
+    assert _link(second.text, "Next page") is None
+
+
+def test_admin_businesses_links_keep_filters(admin_client):
+    first = admin_client.get("/admin/businesses?plan=free")
+    next_url = _link(first.text, "Next page")
+    assert next_url.startswith("/admin/businesses?plan=free&after=")
+
+    second = admin_client.get(next_url)
+    assert "Biz 1" in second.text
+    assert _link(second.text, "First page") == "/admin/businesses?plan=free"
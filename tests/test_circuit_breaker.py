@@ -0,0 +1,78 @@
+from types import SimpleNamespace
+
+import pytest
+
+from services import circuit_breaker
+from services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, ProviderUnavailableError
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def _open_breaker():
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_seconds=60)
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+    return breaker
+
+
+def test_opens_after_threshold_consecutive_failures(clock):
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_seconds=60)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    with pytest.raises(ProviderUnavailableError):
+        breaker.check()
+    assert breaker.snapshot() == {"state": OPEN, "consecutive_failures": 3, "short_circuited": 1}
+
+
+def test_half_open_admits_a_single_trial(clock):
+    breaker = _open_breaker()
+    clock[0] += 59
+    assert not breaker.allow()
+
+    clock[0] += 1
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow() and breaker.allow()
+
+
+def test_failed_trial_reopens_for_another_window(clock):
+    breaker = _open_breaker()
+    clock[0] += 60
+    assert breaker.allow()
+    breaker.record_failure()
+
+    assert breaker.state == OPEN
+    clock[0] += 59
+    assert not breaker.allow()
+    clock[0] += 1
+    assert breaker.allow()
+
+
+def test_abandoned_trial_frees_the_half_open_slot(clock):
+    breaker = _open_breaker()
+    clock[0] += 60
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.abandon_trial()
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
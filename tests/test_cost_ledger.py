@@ -0,0 +1,126 @@
+from datetime import datetime
+
+import pytest
+
+from services import cost_ledger
+from services.cost_ledger import (
+    SpendCapExceeded, check_spend_cap, estimate_cost, get_audit_cost, get_business_spend,
+    price_for, record_usage, usage_scope
+)
+from services.database import ProviderUsage
+
+
+class _FrozenDatetime(datetime):
+    @classmethod
+    def utcnow(cls):
+        return cls(2026, 3, 15, 12, 0, 0)
+
+
+@pytest.fixture
+def ledger_db(monkeypatch, session_factory):
+    monkeypatch.setattr(cost_ledger, "get_db_session", session_factory)
+    return session_factory
+
+
+def _usage(db, cost, created_at, business_id=1, audit_id=None):
+    db.add(ProviderUsage(
+        audit_id=audit_id, business_id=business_id, provider="openai", model="gpt-4o-mini",
+        calls=1, prompt_tokens=0, completion_tokens=0, cost_usd=cost, created_at=created_at
+    ))
+
+
+def test_price_lookup_uses_the_longest_matching_prefix():
+    assert price_for("gpt-4o-mini-2024-07-18") == (0.15, 0.60)
+    assert price_for("gpt-4o-2024-08-06") == (2.50, 10.00)
+    assert price_for("GPT-4O") == (2.50, 10.00)
+    assert price_for("unknown-model") == (0.0, 0.0)
+    assert price_for(None) == (0.0, 0.0)
+
+
+def test_estimate_cost_prices_input_and_output_tokens_separately():
+    assert estimate_cost("gpt-4o-mini", 1_000_000, 0) == pytest.approx(0.15)
+    assert estimate_cost("gpt-4o-mini", 0, 1_000_000) == pytest.approx(0.60)
+    assert estimate_cost("sonar-pro", 2000, 1000) == pytest.approx(0.006 + 0.015)
+
+
+def test_usage_scope_writes_one_row_per_provider_and_model_on_exit(ledger_db):
+    with usage_scope(audit_id=5, business_id=9) as scope:
+        record_usage("openai", "gpt-4o-mini", 1000, 500)
+        record_usage("openai", "gpt-4o-mini", 1000, 500)
+        record_usage("gemini", "gemini-2.0-flash", 2000, 0)
+        db = ledger_db()
+        assert db.query(ProviderUsage).count() == 0
+        expected = 2 * estimate_cost("gpt-4o-mini", 1000, 500) + estimate_cost("gemini-2.0-flash", 2000, 0)
+        assert scope.cost() == pytest.approx(expected)
+
+    rows = {(r.provider, r.model): r for r in db.query(ProviderUsage).all()}
+    assert set(rows) == {("openai", "gpt-4o-mini"), ("gemini", "gemini-2.0-flash")}
+    openai = rows[("openai", "gpt-4o-mini")]
+    assert (openai.audit_id, openai.business_id) == (5, 9)
+    assert (openai.calls, openai.prompt_tokens, openai.completion_tokens) == (2, 2000, 1000)
+
+    cost = get_audit_cost(db, 5)
+    assert cost["calls"] == 3
+    assert [p["provider"] for p in cost["providers"]] == ["openai", "gemini"]
+    db.close()
+
+
+def test_usage_outside_a_scope_is_written_immediately_without_ids(ledger_db):
+    record_usage("perplexity", "sonar", 100, 100)
+
+    db = ledger_db()
+    (row,) = db.query(ProviderUsage).all()
+    assert (row.audit_id, row.business_id, row.provider, row.calls) == (None, None, "perplexity", 1)
+    db.close()
+
+
+def test_business_spend_uses_utc_day_and_month_boundaries(ledger_db, monkeypatch):
+    monkeypatch.setattr(cost_ledger, "datetime", _FrozenDatetime)
+    db = ledger_db()
+    _usage(db, 1.0, datetime(2026, 3, 15, 0, 0, 0))
+    _usage(db, 2.0, datetime(2026, 3, 14, 23, 59, 59))
+    _usage(db, 4.0, datetime(2026, 3, 1, 0, 0, 0))
+    _usage(db, 8.0, datetime(2026, 2, 28, 23, 59, 59))
+    _usage(db, 16.0, datetime(2026, 3, 15, 6, 0, 0), business_id=2)
+    db.commit()
+
+    assert get_business_spend(db, 1) == (pytest.approx(1.0), pytest.approx(7.0))
+    assert get_business_spend(db, 3) == (0.0, 0.0)
+    db.close()
+
+
+def test_spend_cap_counts_the_open_scope_for_the_same_business(ledger_db, monkeypatch):
+    monkeypatch.setattr(cost_ledger, "SPEND_CAPS_ENABLED", True)
+    monkeypatch.setattr(cost_ledger, "SPEND_CAPS", {"free": (2.0, 0.0)})
+    monkeypatch.setattr(cost_ledger, "PROVIDER_PRICES", {"priced": (1_000_000.0, 0.0)})
+    db = ledger_db()
+    _usage(db, 1.5, datetime.utcnow())
+    db.commit()
+    db.close()
+
+    check_spend_cap(1, "free", "probes")
+
+    with usage_scope(audit_id=5, business_id=2):
+        record_usage("openai", "priced", 1, 0)
+        check_spend_cap(1, "free", "probes")
+
+    with usage_scope(audit_id=6, business_id=1):
+        record_usage("openai", "priced", 1, 0)
+        with pytest.raises(SpendCapExceeded, match="Daily.*before stage 'probes'"):
+            check_spend_cap(1, "free", "probes")
+
+
+def test_monthly_cap_and_uncapped_plans(ledger_db, monkeypatch):
+    monkeypatch.setattr(cost_ledger, "SPEND_CAPS_ENABLED", True)
+    monkeypatch.setattr(cost_ledger, "SPEND_CAPS", {"free": (0.0, 5.0), "autofix": (0.0, 0.0)})
+    db = ledger_db()
+    _usage(db, 6.0, datetime.utcnow())
+    db.commit()
+    db.close()
+
+    with pytest.raises(SpendCapExceeded, match="Monthly"):
+        check_spend_cap(1, None)
+    check_spend_cap(1, "autofix")
+
+    monkeypatch.setattr(cost_ledger, "SPEND_CAPS_ENABLED", False)
+    check_spend_cap(1, "free")
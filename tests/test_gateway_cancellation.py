@@ -0,0 +1,164 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from services import gemini_client, gemini_visibility, openai_visibility, provider_gateway
+from services.cancellation import AuditCancelled, CancellationToken, cancellation_scope
+from services.circuit_breaker import get_circuit_breaker
+from services.provider_gateway import call_provider, call_provider_async, chat_completion
+
+
+class APIConnectionError(Exception):
+    pass
+
+
+class RateLimitError(Exception):
+    pass
+
+
+@pytest.fixture(autouse=True)
+def many_retries(monkeypatch):
+    monkeypatch.setattr(provider_gateway, "PROVIDER_MAX_RETRIES", 5)
+
+
+def _cancel_later(token, seconds=0.1):
+    timer = threading.Timer(seconds, token.cancel)
+    timer.start()
+    return timer
+
+
+def test_no_retry_once_cancelled():
+    token = CancellationToken()
+    calls = []
+
+    def send():
+        calls.append(1)
+        token.cancel()
+        raise APIConnectionError("connection reset")
+
+    with cancellation_scope(token), pytest.raises(AuditCancelled):
+        call_provider("test_cancel_retry", send)
+    assert len(calls) == 1
+
+
+def test_cancel_ends_backoff_wait(monkeypatch):
+    monkeypatch.setattr(provider_gateway, "_backoff_seconds", lambda attempt, retry_after: 30.0)
+    token = CancellationToken()
+    calls = []
+
+    def send():
+        calls.append(1)
+        raise RateLimitError("slow down")
+
+    started = time.monotonic()
+    _cancel_later(token)
+    with cancellation_scope(token), pytest.raises(AuditCancelled):
+        call_provider("test_cancel_backoff", send)
+    assert time.monotonic() - started < 2
+    assert len(calls) == 1
+
+
+def test_cancel_closes_the_runs_http_client_and_aborts_the_request():
+    token = CancellationToken()
+    calls = []
+
+    class FakeCompletions:
+        def __init__(self, http_client):
+            self.http_client = http_client
+
+        def create(self, **kwargs):
+            calls.append(self.http_client)
+            _cancel_later(token, 0.05)
+            deadline = time.monotonic() + 5
+            while not self.http_client.is_closed and time.monotonic() < deadline:
+                time.sleep(0.01)
+            raise APIConnectionError("connection closed")
+
+    class FakeClient:
+        def __init__(self, http_client=None):
+            self.chat = type("Chat", (), {"completions": FakeCompletions(http_client)})()
+
+        def with_options(self, max_retries=None, http_client=None):
+            return FakeClient(http_client)
+
+    # Cancel once the request is in flight; building the run's client is not instant.
+    started = time.monotonic()
+    with cancellation_scope(token), pytest.raises(AuditCancelled):
+        chat_completion(FakeClient(), provider="test_cancel_inflight", model="m", messages=[])
+    assert time.monotonic() - started < 2
+    assert len(calls) == 1
+    assert calls[0].is_closed
+    assert get_circuit_breaker("test_cancel_inflight").snapshot()["consecutive_failures"] == 0
+
+
+def test_cancel_aborts_async_request():
+    token = CancellationToken()
+    calls = []
+
+    async def send():
+        calls.append(1)
+        await asyncio.sleep(10)
+
+    async def run():
+        with cancellation_scope(token):
+            await call_provider_async("test_cancel_async", send)
+
+    started = time.monotonic()
+    _cancel_later(token)
+    with pytest.raises(AuditCancelled):
+        asyncio.run(run())
+    assert time.monotonic() - started < 2
+    assert len(calls) == 1
+
+
+def test_calls_after_cancel_never_reach_the_provider():
+    token = CancellationToken()
+    token.cancel()
+    calls = []
+    with cancellation_scope(token), pytest.raises(AuditCancelled):
+        call_provider("test_cancel_before", lambda: calls.append(1))
+    assert calls == []
+
+
+def _run_unshared(provider, model, query, regions, prompt_version, run_probe, is_shareable):
+    return run_probe()
+
+
+async def _run_unshared_async(provider, model, query, regions, prompt_version, run_probe, is_shareable):
+    return await run_probe()
+
+
+def test_cancel_is_not_reported_as_a_failed_probe(monkeypatch):
+    monkeypatch.setattr(openai_visibility, "get_or_run_shared_probe", _run_unshared)
+    monkeypatch.setattr(gemini_visibility, "get_or_run_shared_probe", _run_unshared)
+    monkeypatch.setattr(gemini_client, "gemini_enabled", lambda: True)
+    monkeypatch.setattr(gemini_client, "get_gemini_model", lambda: SimpleNamespace(generate_content=lambda prompt: None))
+
+    token = CancellationToken()
+    token.cancel()
+    item = {"query": "best plumber", "intent": "local"}
+    with cancellation_scope(token):
+        with pytest.raises(AuditCancelled):
+            openai_visibility.probe_openai_visibility("Acme", "acme.com", ["Tampa"], item, client=object())
+        with pytest.raises(AuditCancelled):
+            gemini_visibility.probe_gemini_visibility("Acme", "acme.com", ["Tampa"], item)
+
+
+def test_cancel_is_not_reported_as_a_failed_async_probe(monkeypatch):
+    monkeypatch.setattr(openai_visibility, "get_or_run_shared_probe_async", _run_unshared_async)
+    monkeypatch.setattr(openai_visibility, "get_async_openai_client", lambda: object())
+
+    token = CancellationToken()
+    token.cancel()
+
+    async def run():
+        with cancellation_scope(token):
+            await openai_visibility.probe_openai_visibility_async(
+                "Acme", "acme.com", ["Tampa"], {"query": "best plumber"}
+            )
+
+    with pytest.raises(AuditCancelled):
+        asyncio.run(run())
@@ -0,0 +1,50 @@
+import time
+import threading
+
+from services.hedging import run_hedged
+
+
+def test_losing_primary_holds_the_extra_slot_until_it_finishes():
+    calls = []
+    calls_lock = threading.Lock()
+    release_primary = threading.Event()
+    finished = []
+    latencies = []
+
+    def send():
+        with calls_lock:
+            calls.append(len(calls))
+            n = len(calls)
+        if n == 1:
+            release_primary.wait(5)
+            return "primary"
+        return "hedge"
+
+    result = run_hedged(send, 0.05, lambda: True, finished.append, record_latency=latencies.append)
+
+    assert result == "hedge"
+    assert finished == []
+    assert latencies == []
+
+    release_primary.set()
+    deadline = time.time() + 2
+    while not finished and time.time() < deadline:
+        time.sleep(0.01)
+    assert len(finished) == 1 and finished[0].result() == "primary"
+    assert len(latencies) == 1 and latencies[0] >= 0.05
+
+
+def test_unhedged_primary_reports_its_latency():
+    finished = []
+    latencies = []
+    result = run_hedged(lambda: "ok", 1.0, lambda: True, finished.append, record_latency=latencies.append)
+    assert result == "ok"
+    assert finished == []
+    assert len(latencies) == 1
+
+
+def test_budget_refusal_returns_primary_without_hedge():
+    finished = []
+    result = run_hedged(lambda: time.sleep(0.1) or "slow", 0.01, lambda: False, finished.append)
+    assert result == "slow"
+    assert finished == []
@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import services.job_queue as job_queue
+from services.database import Audit, AuditJob
+
+
+@pytest.fixture
+def db(session_factory, monkeypatch):
+    monkeypatch.setattr(job_queue, "get_db_session", session_factory)
+    monkeypatch.setattr(job_queue, "AUDIT_JOB_MAX_PER_TENANT", 1)
+    monkeypatch.setattr(job_queue, "AUDIT_JOB_LEASE_SECONDS", 60)
+    monkeypatch.setattr(job_queue, "AUDIT_JOB_RETRY_BASE_SECONDS", 10)
+    session = session_factory()
+    yield session
+    session.close()
+
+
+def _add_job(db, audit_id, tenant_key, **fields):
+    values = dict(
+        kind="audit",
+        audit_id=audit_id,
+        business_id=audit_id,
+        tenant_key=tenant_key,
+        status="queued",
+        attempts=0,
+        max_attempts=3,
+        run_after=datetime.utcnow() - timedelta(seconds=1),
+    )
+    values.update(fields)
+    job = AuditJob(**values)
+    db.add(job)
+    db.commit()
+    return job.id
+
+
+def test_claim_passes_over_tenant_at_its_limit(db):
+    first = _add_job(db, 1, "user:1", priority=5)
+    _add_job(db, 2, "user:1", priority=5)
+    other = _add_job(db, 3, "user:2")
+
+    assert job_queue.claim_next_job("w1").id == first
+    # user:1 already holds a live claim, so its second job waits
+    assert job_queue.claim_next_job("w2").id == other
+    assert job_queue.claim_next_job("w3") is None
+
+
+def test_expired_lease_is_reclaimed(db):
+    expired = datetime.utcnow() - timedelta(seconds=5)
+    job_id = _add_job(db, 1, "user:1", status="claimed", claimed_by="dead", attempts=1, claim_expires_at=expired)
+
+    job = job_queue.claim_next_job("w1")
+    assert job.id == job_id
+    assert job.claimed_by == "w1"
+    assert job.attempts == 2
+    assert job.claim_expires_at > datetime.utcnow()
+
+
+def test_expired_lease_on_final_attempt_fails_job_and_audit(db):
+    db.add(Audit(id=1, business_id=1, status="running"))
+    db.commit()
+    expired = datetime.utcnow() - timedelta(seconds=5)
+    job_id = _add_job(db, 1, "user:1", status="claimed", claimed_by="dead", attempts=3, claim_expires_at=expired)
+
+    assert job_queue.claim_next_job("w1") is None
+    db.expire_all()
+    assert db.get(AuditJob, job_id).status == "failed"
+    assert db.get(Audit, 1).status == "error"
+
+
+def test_fail_job_backs_off_exponentially_then_gives_up(db):
+    job_id = _add_job(db, 1, "user:1")
+
+    for attempt, delay in ((1, 10), (2, 20)):
+        job = job_queue.claim_next_job("w1")
+        assert job.id == job_id and job.attempts == attempt
+        before = datetime.utcnow()
+        job_queue.fail_job(job_id, "w1", "boom")
+        db.expire_all()
+        row = db.get(AuditJob, job_id)
+        assert row.status == "queued"
+        assert row.claimed_by is None
+        assert timedelta(seconds=delay - 1) <= row.run_after - before <= timedelta(seconds=delay + 1)
+        # not due yet
+        assert job_queue.claim_next_job("w1") is None
+        row.run_after = datetime.utcnow() - timedelta(seconds=1)
+        db.commit()
+
+    job_queue.claim_next_job("w1")
+    job_queue.fail_job(job_id, "w1", "boom")
+    db.expire_all()
+    row = db.get(AuditJob, job_id)
+    assert row.status == "failed"
+    assert row.finished_at is not None
+
+
+def test_non_retryable_failure_is_final(db):
+    job_id = _add_job(db, 1, "user:1")
+    job_queue.claim_next_job("w1")
+    job_queue.fail_job(job_id, "w1", "missing key", retryable=False)
+    db.expire_all()
+    assert db.get(AuditJob, job_id).status == "failed"
+
+
+def test_fail_job_ignores_other_workers(db):
+    job_id = _add_job(db, 1, "user:1")
+    job_queue.claim_next_job("w1")
+    job_queue.fail_job(job_id, "w2", "boom")
+    db.expire_all()
+    assert db.get(AuditJob, job_id).status == "claimed"
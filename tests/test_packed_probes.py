@@ -0,0 +1,53 @@
+import json
+
+from services.packed_probes import chunk_queries, split_packed_response
+
+
+def _brands(part):
+    return [b["name"] for b in json.loads(part)["recommended_brands"]]
+
+
+def test_split_by_index():
+    raw = json.dumps({"answers": [
+        {"index": 2, "recommended_brands": [{"name": "B"}]},
+        {"index": 1, "recommended_brands": [{"name": "A"}]},
+    ]})
+    parts = split_packed_response(raw, 2)
+    assert _brands(parts[0]) == ["A"]
+    assert _brands(parts[1]) == ["B"]
+
+
+def test_split_fenced_bare_list_uses_position():
+    raw = "```json\n" + json.dumps([
+        {"recommended_brands": [{"name": "A"}]},
+        {"recommended_brands": [{"name": "B"}]},
+    ]) + "\n```"
+    parts = split_packed_response(raw, 2)
+    assert _brands(parts[0]) == ["A"]
+    assert _brands(parts[1]) == ["B"]
+
+
+def test_split_leaves_missing_and_bad_answers_none():
+    raw = json.dumps({"answers": [
+        {"index": 1, "recommended_brands": []},
+        {"index": "x", "recommended_brands": [{"name": "A"}]},
+        {"index": 3, "recommended_brands": [{"name": "C"}]},
+        {"index": 9, "recommended_brands": [{"name": "Z"}]},
+        "not a dict",
+    ]})
+    parts = split_packed_response(raw, 3)
+    assert parts[0] is None
+    assert parts[1] is None
+    assert _brands(parts[2]) == ["C"]
+
+
+def test_split_unparseable_or_empty():
+    assert split_packed_response(None, 2) == [None, None]
+    assert split_packed_response("not json", 2) == [None, None]
+    assert split_packed_response(json.dumps({"answers": "nope"}), 1) == [None]
+
+
+def test_chunk_queries():
+    items = [{"query": str(i)} for i in range(5)]
+    assert [len(c) for c in chunk_queries(items, 2)] == [2, 2, 1]
+    assert [len(c) for c in chunk_queries(items, 0)] == [1] * 5
@@ -0,0 +1,145 @@
+import time
+import threading
+
+import pytest
+
+from services.cancellation import AuditCancelled, CancellationToken, current_cancel_token
+from services.cost_ledger import SpendCapExceeded
+from services.pipeline import PipelineStage, run_stage_graph
+
+
+def test_stages_run_after_their_dependencies():
+    order = []
+    lock = threading.Lock()
+
+    def stage(name, value):
+        def fn(outputs):
+            with lock:
+                order.append(name)
+            return value(outputs)
+        return fn
+
+    outputs, timings = run_stage_graph([
+        PipelineStage("report", stage("report", lambda o: o["a"] + o["b"]), deps=["a", "b"]),
+        PipelineStage("a", stage("a", lambda o: 1)),
+        PipelineStage("b", stage("b", lambda o: o["a"] + 1), deps=["a"]),
+    ])
+
+    assert outputs == {"a": 1, "b": 2, "report": 3}
+    assert order.index("a") < order.index("b") < order.index("report")
+    assert all(t["status"] == "ok" for t in timings.values())
+
+
+def test_independent_stages_overlap():
+    barrier = threading.Barrier(2, timeout=2)
+
+    def fn(outputs):
+        barrier.wait()
+        return True
+
+    outputs, _ = run_stage_graph([PipelineStage("a", fn), PipelineStage("b", fn)], max_workers=2)
+    assert outputs == {"a": True, "b": True}
+
+
+def test_unknown_dependency_is_rejected():
+    with pytest.raises(ValueError, match="unknown stages"):
+        run_stage_graph([PipelineStage("a", lambda o: 1, deps=["missing"])])
+
+
+def test_dependency_cycle_is_reported():
+    with pytest.raises(ValueError, match="cycle"):
+        run_stage_graph([
+            PipelineStage("a", lambda o: 1, deps=["b"]),
+            PipelineStage("b", lambda o: 2, deps=["a"]),
+        ])
+
+
+def test_stage_failure_propagates_and_drops_dependents():
+    ran = []
+
+    def boom(outputs):
+        raise RuntimeError("stage failed")
+
+    with pytest.raises(RuntimeError, match="stage failed"):
+        run_stage_graph([
+            PipelineStage("a", boom),
+            PipelineStage("b", lambda o: ran.append("b"), deps=["a"]),
+        ])
+    assert ran == []
+
+
+def _cooperative(finished, value):
+    """A stage that runs until its cancellation scope is cancelled."""
+    def fn(outputs):
+        try:
+            current_cancel_token().wait(5)
+            return value
+        finally:
+            finished.append(value)
+    return fn
+
+
+def test_cancel_is_noticed_while_a_stage_is_in_flight():
+    token = CancellationToken()
+    finished = []
+
+    threading.Timer(0.1, token.cancel).start()
+    start = time.perf_counter()
+    with pytest.raises(AuditCancelled):
+        run_stage_graph([PipelineStage("slow", _cooperative(finished, True))], cancel_token=token)
+    assert time.perf_counter() - start < 2
+    assert finished == [True]
+
+
+def test_cancelling_the_caller_token_reaches_running_stages():
+    token = CancellationToken(audit_id=7)
+    seen = []
+
+    def stage(outputs):
+        inner = current_cancel_token()
+        seen.append(inner)
+        token.cancel()
+        return inner.wait(2)
+
+    with pytest.raises(AuditCancelled):
+        run_stage_graph([PipelineStage("a", stage)], cancel_token=token)
+    assert seen[0] is not token and seen[0].cancelled
+    assert seen[0].audit_id == 7
+
+
+def test_guard_error_stops_in_flight_stages_before_returning():
+    finished = []
+    slow_fetch = _cooperative(finished, "site")
+
+    def over_cap(stage):
+        raise SpendCapExceeded(f"Daily provider spend cap reached before stage '{stage.name}'")
+
+    start = time.perf_counter()
+    with pytest.raises(SpendCapExceeded, match="probes"):
+        run_stage_graph(
+            [
+                PipelineStage("site", slow_fetch),
+                PipelineStage("queries", lambda o: ["q"]),
+                PipelineStage("probes", lambda o: o["queries"], deps=["queries"], expensive=True),
+            ],
+            guard=over_cap
+        )
+    assert time.perf_counter() - start < 2
+    # The in-flight stage was stopped and had returned before the error surfaced
+    assert finished == ["site"]
+    assert not [t for t in threading.enumerate() if t.name.startswith("audit-stage")]
+
+
+def test_stage_failure_waits_for_sibling_stages():
+    finished = []
+
+    def boom(outputs):
+        time.sleep(0.05)
+        raise RuntimeError("stage failed")
+
+    with pytest.raises(RuntimeError, match="stage failed"):
+        run_stage_graph(
+            [PipelineStage("site", _cooperative(finished, "site")), PipelineStage("probes", boom)],
+            max_workers=2
+        )
+    assert finished == ["site"]
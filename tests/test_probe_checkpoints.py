@@ -0,0 +1,113 @@
+import services.visibility_hub as hub
+from services import audit_checkpoints
+from services.analysis import _probe_checkpoint_saver
+from services.audit_checkpoints import STAGE_PROBES_PREFIX, AuditCheckpointer, clear_audit_checkpoints
+from services.visibility_models import BrandHit, ProviderVisibility
+
+
+def _vis(query, success=True):
+    return ProviderVisibility(
+        provider="openai_sim",
+        query=query,
+        recommended_brands=[BrandHit(name="Other Co")] if success else [],
+        success=success,
+    )
+
+
+def test_restored_successes_are_reused_and_failures_reprobed(monkeypatch):
+    probed = []
+
+    def fake_probe(business_name, primary_domain, regions, item, brand_aliases=None, domains=None):
+        probed.append(item["query"])
+        return _vis(item["query"])
+
+    monkeypatch.setattr(hub, "PROVIDER_PROBES", [("openai_sim", "chatgpt", "OpenAI", fake_probe, None)])
+    monkeypatch.setattr(hub, "OPENAI_ENABLED", True)
+    monkeypatch.setattr(hub, "_circuit_open", lambda provider: False)
+    monkeypatch.setattr(hub, "log_ai_query", lambda **kwargs: None)
+
+    saved = {}
+    result = hub.run_multi_llm_visibility(
+        "Acme Plumbing", "acme.com", ["Tampa"],
+        [{"query": q} for q in ("q1", "q2", "q3")],
+        run_perplexity=False, run_gemini=False, sampling=False,
+        completed_results={"openai_sim": [_vis("q1"), _vis("q2", success=False)]},
+        on_provider_complete=lambda provider, results: saved.setdefault(provider, results),
+    )
+
+    assert sorted(probed) == ["q2", "q3"]
+    assert sorted(r.query for r in saved["openai_sim"]) == ["q1", "q2", "q3"]
+    assert result.providers_used == ["openai_sim"]
+    assert all(agg.get_provider("openai_sim").success for agg in result.queries)
+
+
+def test_fully_restored_provider_is_not_probed(monkeypatch):
+    def fail_probe(*args, **kwargs):
+        raise AssertionError("should not probe")
+
+    monkeypatch.setattr(hub, "PROVIDER_PROBES", [("openai_sim", "chatgpt", "OpenAI", fail_probe, None)])
+    monkeypatch.setattr(hub, "OPENAI_ENABLED", True)
+    monkeypatch.setattr(hub, "_circuit_open", lambda provider: False)
+    monkeypatch.setattr(hub, "log_ai_query", lambda **kwargs: None)
+
+    result = hub.run_multi_llm_visibility(
+        "Acme Plumbing", "acme.com", ["Tampa"], [{"query": "q1"}],
+        run_perplexity=False, run_gemini=False, sampling=False,
+        completed_results={"openai_sim": [_vis("q1")]},
+    )
+    assert result.providers_used == ["openai_sim"]
+
+
+def test_checkpoint_saver_keeps_only_successful_probes():
+    class FakeCheckpointer:
+        def __init__(self):
+            self.saved = {}
+
+        def save(self, stage, payload):
+            self.saved[stage] = payload
+
+    checkpointer = FakeCheckpointer()
+    save = _probe_checkpoint_saver(checkpointer)
+
+    save("openai_sim", [_vis("q1", success=False)])
+    assert checkpointer.saved == {}
+
+    save("openai_sim", [_vis("q1"), _vis("q2", success=False)])
+    assert [p["query"] for p in checkpointer.saved[STAGE_PROBES_PREFIX + "openai_sim"]] == ["q1"]
+
+
+def test_clear_audit_checkpoints_only_touches_that_audit(monkeypatch, session_factory):
+    monkeypatch.setattr(audit_checkpoints, "get_db_session", session_factory)
+    AuditCheckpointer(1).save(STAGE_PROBES_PREFIX + "openai", [])
+    AuditCheckpointer(2).save(STAGE_PROBES_PREFIX + "openai", [])
+
+    clear_audit_checkpoints(1)
+    assert not AuditCheckpointer(1).has(STAGE_PROBES_PREFIX + "openai")
+    assert AuditCheckpointer(2).has(STAGE_PROBES_PREFIX + "openai")
+
+    db = session_factory()
+    clear_audit_checkpoints(2, db)
+    db.rollback()
+    db.close()
+    assert AuditCheckpointer(2).has(STAGE_PROBES_PREFIX + "openai")
+
+
+def test_restoring_tolerates_items_without_a_query(monkeypatch):
+    probed = []
+
+    def fake_probe(business_name, primary_domain, regions, item, brand_aliases=None, domains=None):
+        probed.append(item.get("query"))
+        return _vis(item.get("query", ""))
+
+    monkeypatch.setattr(hub, "PROVIDER_PROBES", [("openai_sim", "chatgpt", "OpenAI", fake_probe, None)])
+    monkeypatch.setattr(hub, "OPENAI_ENABLED", True)
+    monkeypatch.setattr(hub, "_circuit_open", lambda provider: False)
+    monkeypatch.setattr(hub, "log_ai_query", lambda **kwargs: None)
+
+    result = hub.run_multi_llm_visibility(
+        "Acme Plumbing", "acme.com", ["Tampa"], [{"query": "q1"}, {"intent": "local"}, {"query": "q2"}],
+        run_perplexity=False, run_gemini=False, sampling=False,
+        completed_results={"openai_sim": [_vis("q1")]},
+    )
+    assert "q1" not in probed and "q2" in probed
+    assert sorted(agg.query for agg in result.queries) == ["q1", "q2"]
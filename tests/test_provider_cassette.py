@@ -0,0 +1,103 @@
+from types import SimpleNamespace
+
+import pytest
+
+from services import provider_cassette, provider_gateway
+from services.provider_cassette import Cassette, CassetteMissError, ReplayInjectedError, _replay_effects
+from services.provider_gateway import call_provider
+
+
+@pytest.fixture
+def cassette_mode(monkeypatch, tmp_path):
+    """Switch the cassette mode; each switch starts a fresh Cassette on the same directory."""
+    def _set(mode):
+        monkeypatch.setattr(provider_cassette, "PROVIDER_CASSETTE_MODE", mode)
+        monkeypatch.setattr(provider_cassette, "_cassette", Cassette(str(tmp_path)))
+    return _set
+
+
+@pytest.fixture
+def ledger(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(
+        provider_gateway, "record_usage",
+        lambda provider, model, prompt, completion: recorded.append((provider, model, prompt, completion))
+    )
+    return recorded
+
+
+def _chat_response(text):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=text))],
+        usage=SimpleNamespace(prompt_tokens=10, completion_tokens=5)
+    )
+
+
+def _request(query="best plumber"):
+    return {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": query}]}
+
+
+def _offline():
+    raise AssertionError("replay must not reach the provider")
+
+
+def test_recorded_answers_replay_in_order_without_the_network(cassette_mode, ledger):
+    cassette_mode("record")
+    answers = iter(["Acme Plumbing", "Best Pipes"])
+    for _ in range(2):
+        call_provider("cassette_test", lambda: _chat_response(next(answers)), request=_request())
+
+    cassette_mode("replay")
+    replayed = [call_provider("cassette_test", _offline, request=_request()).text for _ in range(3)]
+
+    assert replayed == ["Acme Plumbing", "Best Pipes", "Acme Plumbing"]
+
+
+def test_replay_miss_raises_without_calling_the_provider(cassette_mode, ledger):
+    cassette_mode("replay")
+    with pytest.raises(CassetteMissError):
+        call_provider("cassette_test", _offline, request=_request("never recorded"))
+
+
+def test_replayed_answers_are_kept_out_of_the_cost_ledger(cassette_mode, ledger):
+    cassette_mode("record")
+    call_provider("cassette_test", lambda: _chat_response("Acme"), request=_request())
+    assert ledger == [("cassette_test", "gpt-4o-mini", 10, 5)]
+
+    cassette_mode("replay")
+    reply = call_provider("cassette_test", _offline, request=_request())
+    assert reply.prompt_tokens == 10
+    assert len(ledger) == 1
+
+
+def test_injected_latency_and_errors_are_repeatable(monkeypatch):
+    monkeypatch.setattr(provider_cassette, "PROVIDER_REPLAY_LATENCY_MS", 100)
+    monkeypatch.setattr(provider_cassette, "PROVIDER_REPLAY_JITTER_MS", 50)
+    monkeypatch.setattr(provider_cassette, "PROVIDER_REPLAY_ERROR_RATE", 0.3)
+    monkeypatch.setattr(provider_cassette, "PROVIDER_REPLAY_RATE_LIMIT_RATE", 0.2)
+
+    def run():
+        effects = [_replay_effects("fp", call) for call in range(50)]
+        return [(delay, error.status_code if error else None) for delay, error in effects]
+
+    first = run()
+    assert first == run()
+    assert all(0.05 <= delay <= 0.15 for delay, _ in first)
+    statuses = {status for _, status in first}
+    assert statuses == {None, 429, 503}
+
+    monkeypatch.setattr(provider_cassette, "PROVIDER_REPLAY_SEED", 1)
+    assert run() != first
+
+
+def test_injected_failures_go_through_gateway_retries(cassette_mode, ledger, monkeypatch):
+    cassette_mode("record")
+    call_provider("cassette_retry", lambda: _chat_response("Acme"), request=_request())
+
+    cassette_mode("replay")
+    monkeypatch.setattr(provider_gateway, "PROVIDER_MAX_RETRIES", 3)
+    monkeypatch.setattr(provider_gateway, "_backoff_seconds", lambda attempt, retry_after: 0)
+    outcomes = iter([ReplayInjectedError(503, "injected"), None])
+    monkeypatch.setattr(provider_cassette, "_replay_effects", lambda fp, call: (0.0, next(outcomes)))
+
+    assert call_provider("cassette_retry", _offline, request=_request()).text == "Acme"
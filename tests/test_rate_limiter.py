@@ -0,0 +1,90 @@
+import pytest
+
+from services import database, rate_limiter
+from services.metrics import render_metrics
+from services.rate_limiter import ProviderRateLimiter, TokenBucket
+
+
+def test_token_bucket_refills_at_rate():
+    bucket = TokenBucket(60)
+    now = bucket.updated
+    assert bucket.wait_time(60, now) == 0.0
+    bucket.consume(60)
+    assert bucket.wait_time(1, now) == pytest.approx(1.0)
+    assert bucket.wait_time(1, now + 1.0) == 0.0
+    assert bucket.level == pytest.approx(1.0)
+
+
+def test_token_bucket_oversized_request_waits_for_full_then_goes_into_debt():
+    bucket = TokenBucket(60)
+    now = bucket.updated
+    bucket.consume(30)
+    assert bucket.wait_time(120, now) == pytest.approx(30.0)
+    assert bucket.wait_time(120, now + 30.0) == 0.0
+    bucket.consume(120)
+    assert bucket.level == pytest.approx(-60.0)
+    assert bucket.wait_time(1, now + 30.0) == pytest.approx(61.0)
+
+
+def test_unlimited_bucket_never_waits():
+    bucket = TokenBucket(0)
+    bucket.consume(10 ** 6)
+    assert bucket.wait_time(10 ** 6, bucket.updated) == 0.0
+
+
+def test_refund_corrects_token_estimate():
+    bucket = TokenBucket(1000)
+    bucket.consume(500)
+    bucket.refund(500 - 200)
+    assert bucket.level == pytest.approx(800.0)
+    bucket.refund(-100)
+    assert bucket.level == pytest.approx(700.0)
+
+
+def test_concurrency_cap_blocks_try_acquire():
+    limiter = ProviderRateLimiter("test", max_concurrency=2)
+    assert limiter.try_acquire()
+    assert limiter.try_acquire()
+    assert not limiter.try_acquire()
+    limiter.release()
+    assert limiter.try_acquire()
+
+
+def test_aimd_halves_on_429_and_grows_back():
+    limiter = ProviderRateLimiter("test", max_concurrency=8)
+    limiter.acquire()
+    limiter.release(rate_limited=True, retry_after=0)
+    assert limiter.snapshot()["concurrency_limit"] == 4
+    assert limiter.rate_limited_count == 1
+
+    for _ in range(5):
+        limiter.acquire()
+        limiter.release()
+    assert limiter.snapshot()["concurrency_limit"] == 5
+
+    limiter.acquire()
+    limiter.release(succeeded=False)
+    assert limiter.snapshot()["concurrency_limit"] == 5
+
+    for _ in range(100):
+        limiter.acquire()
+        limiter.release()
+    assert limiter.snapshot()["concurrency_limit"] == 8
+
+
+def test_retry_after_sets_cooldown():
+    limiter = ProviderRateLimiter("test", max_concurrency=4)
+    limiter.acquire()
+    limiter.release(rate_limited=True, retry_after=30)
+    assert not limiter.try_acquire()
+    assert limiter.snapshot()["cooldown_seconds"] > 29
+
+
+def test_limiter_state_is_exported(monkeypatch, session_factory):
+    monkeypatch.setattr(database, "SessionLocal", session_factory)
+    limiter = ProviderRateLimiter("openai_chat", max_concurrency=4)
+    limiter.acquire()
+    monkeypatch.setattr(rate_limiter, "_limiters", {"openai_chat": limiter})
+    text = render_metrics()
+    assert 'ekkoscope_rate_limit_concurrency{provider="openai_chat"} 4' in text
+    assert 'ekkoscope_rate_limit_in_flight{provider="openai_chat"} 1' in text
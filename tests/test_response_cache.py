@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from services import response_cache
+from services.database import ProviderResponseCache
+from services.response_cache import (
+    bypass_response_cache, get_cached_response, make_cache_key, store_cached_response
+)
+
+REQUEST = {
+    "model": "gpt-4o-mini",
+    "temperature": 0.2,
+    "messages": [{"role": "user", "content": "best plumber in austin"}],
+    "max_tokens": 800,
+}
+
+
+@pytest.fixture(autouse=True)
+def cache_db(monkeypatch, session_factory):
+    monkeypatch.setattr(response_cache, "get_db_session", session_factory)
+    monkeypatch.setattr(response_cache, "RESPONSE_CACHE_ENABLED", True)
+    monkeypatch.setattr(response_cache, "RESPONSE_CACHE_TTL_HOURS", {"openai": 24})
+    monkeypatch.setattr(response_cache, "PROVIDER_CASSETTE_MODE", "off")
+    monkeypatch.setattr(response_cache, "_writes_since_eviction", 0)
+    return session_factory
+
+
+def _payload(text):
+    return {"text": text, "embeddings": [], "prompt_tokens": 10, "completion_tokens": 20, "citations": []}
+
+
+def _store(key, text):
+    store_cached_response("openai", key, REQUEST, _payload(text))
+
+
+def _keys(session_factory):
+    db = session_factory()
+    try:
+        return sorted(row.cache_key for row in db.query(ProviderResponseCache).all())
+    finally:
+        db.close()
+
+
+def test_cache_key_is_stable_and_covers_the_whole_request():
+    key = make_cache_key("openai", REQUEST)
+    reordered = dict(reversed(list(REQUEST.items())))
+    assert make_cache_key("openai", reordered) == key
+    assert len(key) == 64
+
+    assert make_cache_key("gemini", REQUEST) != key
+    assert make_cache_key("openai", {**REQUEST, "model": "gpt-4o"}) != key
+    assert make_cache_key("openai", {**REQUEST, "temperature": 0.7}) != key
+    assert make_cache_key("openai", {**REQUEST, "max_tokens": 400}) != key
+    assert make_cache_key("openai", {**REQUEST, "messages": [{"role": "user", "content": "plumber"}]}) != key
+
+
+def test_entries_expire_after_their_ttl(cache_db):
+    key = make_cache_key("openai", REQUEST)
+    _store(key, "Acme Plumbing")
+    assert get_cached_response("openai", key)["text"] == "Acme Plumbing"
+
+    db = cache_db()
+    db.query(ProviderResponseCache).update({"expires_at": datetime.utcnow() - timedelta(seconds=1)})
+    db.commit()
+    db.close()
+
+    assert get_cached_response("openai", key) is None
+
+
+def test_bypass_skips_reads_but_writes_back(cache_db):
+    key = make_cache_key("openai", REQUEST)
+    _store(key, "stale")
+    with bypass_response_cache():
+        assert get_cached_response("openai", key) is None
+        _store(key, "fresh")
+    assert get_cached_response("openai", key)["text"] == "fresh"
+    assert _keys(cache_db) == [key]
+
+
+def test_eviction_runs_every_n_writes_and_drops_least_recently_used(cache_db, monkeypatch):
+    monkeypatch.setattr(response_cache, "_EVICTION_CHECK_EVERY", 3)
+    entry_size = len(response_cache.json.dumps(_payload("a")))
+    # Room for two entries but not three
+    monkeypatch.setattr(response_cache, "RESPONSE_CACHE_MAX_MB", 2.5 * entry_size / (1024 * 1024))
+
+    _store("a", "a")
+    _store("b", "b")
+    db = cache_db()
+    db.query(ProviderResponseCache).update({"last_accessed_at": datetime.utcnow() - timedelta(hours=1)})
+    db.commit()
+    db.close()
+    assert get_cached_response("openai", "a") is not None
+
+    _store("expired", "x")
+    assert _keys(cache_db) == ["a", "expired"]
+
+    db = cache_db()
+    db.query(ProviderResponseCache).filter(ProviderResponseCache.cache_key == "expired").update(
+        {"expires_at": datetime.utcnow() - timedelta(seconds=1)}
+    )
+    db.commit()
+    db.close()
+    _store("c", "c")
+    _store("d", "d")
+    assert _keys(cache_db) == ["a", "c", "d", "expired"]
+
+    _store("e", "e")
+    keys = _keys(cache_db)
+    assert "expired" not in keys and "a" not in keys
+    assert len(keys) == 2 and "e" in keys
@@ -0,0 +1,26 @@
+import pytest
+
+from services import database, ekkoscope_sentinel
+from services.metrics import render_metrics
+
+
+@pytest.fixture(autouse=True)
+def metrics_db(monkeypatch, session_factory):
+    monkeypatch.setattr(database, "SessionLocal", session_factory)
+
+
+def test_shipper_counters_are_exported(monkeypatch):
+    stats = {
+        "enqueued": 10, "shipped": 6, "spooled": 3, "dropped_queue_full": 1,
+        "dropped_spool_full": 0, "dropped_unreadable": 0, "failed_flushes": 2, "queued": 1,
+    }
+    monkeypatch.setattr(ekkoscope_sentinel, "get_sentinel_stats", lambda: stats)
+    text = render_metrics()
+    assert "ekkoscope_sentinel_queued 1" in text
+    assert 'ekkoscope_sentinel_events_total{outcome="dropped_queue_full"} 1' in text
+    assert "ekkoscope_sentinel_failed_flushes_total 2" in text
+
+
+def test_nothing_exported_when_disabled(monkeypatch):
+    monkeypatch.setattr(ekkoscope_sentinel, "get_sentinel_stats", lambda: {})
+    assert "ekkoscope_sentinel_" not in render_metrics()
@@ -0,0 +1,209 @@
+import os
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from services import ekkoscope_sentinel
+from services.ekkoscope_sentinel import SentinelShipper
+
+
+class FakeEndpoint:
+    def __init__(self):
+        self.batches = []
+        self.down = False
+
+    def post(self, endpoint, events):
+        if self.down:
+            raise ConnectionError("sentinel unreachable")
+        self.batches.append([event["sequence"] for event in events])
+
+    @property
+    def shipped(self):
+        return [seq for batch in self.batches for seq in batch]
+
+
+@pytest.fixture
+def endpoint():
+    return FakeEndpoint()
+
+
+@pytest.fixture
+def make_shipper(monkeypatch, tmp_path, endpoint):
+    def _make(background=False, **env):
+        settings = {
+            "SENTINEL_BATCH_SIZE": "2",
+            "SENTINEL_QUEUE_SIZE": "100",
+            "SENTINEL_FLUSH_SECONDS": "1",
+            "SENTINEL_SPOOL_PATH": str(tmp_path / "spool.jsonl"),
+        }
+        settings.update(env)
+        for key, value in settings.items():
+            monkeypatch.setenv(key, value)
+        shipper = SentinelShipper(SimpleNamespace(verbose=False, _post_batch=endpoint.post))
+        if not background:
+            shipper._ensure_started = lambda: None
+        return shipper
+    return _make
+
+
+def _enqueue(shipper, sequences):
+    for seq in sequences:
+        shipper.enqueue({"sequence": seq})
+
+
+def test_queued_events_ship_in_batches(make_shipper, endpoint):
+    shipper = make_shipper()
+    _enqueue(shipper, range(1, 6))
+    shipper.flush()
+
+    assert endpoint.batches == [[1, 2], [3, 4], [5]]
+    assert shipper.snapshot()["shipped"] == 5
+    assert shipper.snapshot()["queued"] == 0
+
+
+def test_full_queue_drops_and_counts(make_shipper, endpoint):
+    shipper = make_shipper(SENTINEL_QUEUE_SIZE="2")
+    _enqueue(shipper, range(1, 4))
+    shipper.flush()
+
+    assert endpoint.shipped == [1, 2]
+    assert shipper.stats["dropped_queue_full"] == 1
+
+
+def test_spool_drains_before_newer_batches(make_shipper, endpoint):
+    shipper = make_shipper()
+    endpoint.down = True
+    _enqueue(shipper, [1, 2, 3])
+    shipper.flush()
+    assert shipper.stats["spooled"] == 3
+    assert shipper.stats["failed_flushes"] == 1
+
+    # During backoff new events go straight to the spool without a send
+    _enqueue(shipper, [4])
+    shipper.flush()
+    assert shipper.stats["failed_flushes"] == 1
+    assert shipper.stats["spooled"] == 4
+
+    endpoint.down = False
+    shipper._retry_at = 0
+    _enqueue(shipper, [5])
+    shipper.flush()
+
+    assert endpoint.shipped == [1, 2, 3, 4, 5]
+    assert not os.path.exists(shipper.spool_path)
+
+
+def test_backoff_doubles_up_to_a_minute(make_shipper, endpoint):
+    shipper = make_shipper()
+    endpoint.down = True
+    backoffs = []
+    for seq in range(8):
+        shipper._retry_at = 0
+        _enqueue(shipper, [seq])
+        shipper.flush()
+        backoffs.append(shipper._backoff)
+    assert backoffs == [1, 2, 4, 8, 16, 32, 60, 60]
+    assert shipper._retry_at > time.monotonic()
+
+    endpoint.down = False
+    shipper._retry_at = 0
+    shipper.flush()
+    assert shipper._backoff == 0
+
+
+def test_unreadable_spool_lines_are_skipped_not_the_whole_spool(make_shipper, endpoint):
+    shipper = make_shipper()
+    with open(shipper.spool_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"sequence": 1}) + "\n")
+        f.write('{"sequence": 2, "action": {"ty\n')
+        f.write(json.dumps({"sequence": 3}) + "\n")
+    _enqueue(shipper, [4])
+    shipper.flush()
+
+    assert endpoint.shipped == [1, 3, 4]
+    assert shipper.stats["dropped_unreadable"] == 1
+
+
+def test_full_spool_drops_and_counts(make_shipper, endpoint):
+    shipper = make_shipper()
+    shipper.spool_max_bytes = 40
+    endpoint.down = True
+    _enqueue(shipper, [1, 2, 3, 4])
+    shipper.flush()
+
+    assert shipper.stats["spooled"] == 2
+    assert shipper.stats["dropped_spool_full"] == 2
+
+
+def test_background_thread_ships_a_full_batch(make_shipper, endpoint):
+    shipper = make_shipper(background=True, SENTINEL_FLUSH_SECONDS="30")
+    _enqueue(shipper, [1, 2])
+
+    deadline = time.time() + 2
+    while not endpoint.batches and time.time() < deadline:
+        time.sleep(0.01)
+    assert endpoint.batches == [[1, 2]]
+
+
+def _write_spool(shipper, sequences):
+    with open(shipper.spool_path, "w", encoding="utf-8") as f:
+        f.writelines(json.dumps({"sequence": seq}) + "\n" for seq in sequences)
+
+
+def _spooled(shipper):
+    with open(shipper.spool_path, encoding="utf-8") as f:
+        return [json.loads(line)["sequence"] for line in f]
+
+
+def test_spool_read_error_keeps_the_spool(make_shipper, endpoint, monkeypatch):
+    shipper = make_shipper()
+    _write_spool(shipper, [1, 2])
+    real_open = open
+
+    def failing_open(path, mode="r", *args, **kwargs):
+        if path == shipper.spool_path and mode == "r":
+            raise OSError("I/O error")
+        return real_open(path, mode, *args, **kwargs)
+
+    monkeypatch.setattr(ekkoscope_sentinel, "open", failing_open, raising=False)
+    _enqueue(shipper, [3])
+    shipper.flush()
+
+    assert endpoint.shipped == []
+    assert _spooled(shipper) == [1, 2, 3]
+
+
+def test_spool_is_not_rewritten_when_nothing_ships(make_shipper, endpoint):
+    shipper = make_shipper()
+    _write_spool(shipper, [1, 2, 3])
+    inode = os.stat(shipper.spool_path).st_ino
+    endpoint.down = True
+    shipper.flush()
+
+    assert os.stat(shipper.spool_path).st_ino == inode
+    assert _spooled(shipper) == [1, 2, 3]
+
+
+def test_failed_spool_rewrite_still_spools_the_queue(make_shipper, endpoint, monkeypatch):
+    shipper = make_shipper()
+    _write_spool(shipper, [1, 2, 3])
+    sent = []
+
+    def post(endpoint_path, events):
+        if sent:
+            raise ConnectionError("sentinel unreachable")
+        sent.append([event["sequence"] for event in events])
+
+    def full_disk(*args, **kwargs):
+        raise OSError(28, "No space left on device")
+
+    shipper.client._post_batch = post
+    monkeypatch.setattr(ekkoscope_sentinel.os, "replace", full_disk)
+    _enqueue(shipper, [4])
+    shipper.flush()
+
+    assert sent == [[1, 2]]
+    assert _spooled(shipper) == [1, 2, 3, 4]
+    assert shipper.stats["spooled"] == 1
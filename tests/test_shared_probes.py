@@ -0,0 +1,162 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from services import shared_probes
+from services.database import SharedProbeResult
+from services.metrics import PROBE_CACHE_LOOKUPS
+from services.response_cache import bypass_response_cache
+from services.shared_probes import (
+    _probe_key,
+    get_or_run_shared_probe,
+    get_or_run_shared_probe_async,
+    independent_samples,
+    store_shared_probe,
+)
+
+PROBE = ("openai", "gpt-4o-mini", "best plumber near me", ["Austin, TX"], "v1")
+
+
+@pytest.fixture(autouse=True)
+def shared_store(monkeypatch, session_factory):
+    monkeypatch.setattr(shared_probes, "SHARED_PROBES_ENABLED", True)
+    monkeypatch.setattr(shared_probes, "get_db_session", session_factory)
+    monkeypatch.setattr(shared_probes, "_inflight", {})
+    return session_factory
+
+
+def _rows(session_factory):
+    db = session_factory()
+    try:
+        return [row.raw_response for row in db.query(SharedProbeResult).all()]
+    finally:
+        db.close()
+
+
+def test_concurrent_misses_run_probe_once(shared_store):
+    calls = []
+    release = threading.Event()
+
+    def probe():
+        calls.append(1)
+        release.wait(5)
+        return "answer"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(get_or_run_shared_probe(*PROBE, probe)))
+        for _ in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == ["answer"] * 3
+    assert len(calls) == 1
+    assert shared_probes._inflight == {}
+
+
+def test_waiter_does_not_drop_newer_inflight_lock():
+    # Invalid answers are not stored, so every caller runs the probe in turn.
+    key = _probe_key(*PROBE)
+    started = [threading.Event() for _ in range(3)]
+    gates = [threading.Event() for _ in range(3)]
+    calls = []
+
+    def probe():
+        i = len(calls)
+        calls.append(i)
+        started[i].set()
+        gates[i].wait(5)
+        return "refused"
+
+    def run():
+        get_or_run_shared_probe(*PROBE, probe, is_valid=lambda raw: False)
+
+    owner = threading.Thread(target=run)
+    owner.start()
+    assert started[0].wait(5)
+    waiter = threading.Thread(target=run)
+    waiter.start()
+    time.sleep(0.05)
+    gates[0].set()
+    assert started[1].wait(5)
+
+    newer = threading.Thread(target=run)
+    newer.start()
+    assert started[2].wait(5)
+    newer_lock = shared_probes._inflight.get(key)
+    assert newer_lock is not None
+
+    gates[1].set()
+    waiter.join(5)
+    assert shared_probes._inflight.get(key) is newer_lock
+
+    gates[2].set()
+    newer.join(5)
+    owner.join(5)
+    assert key not in shared_probes._inflight
+
+
+def test_independent_samples_are_not_published(shared_store):
+    store_shared_probe(*PROBE, "stored")
+    assert get_or_run_shared_probe(*PROBE, lambda: "unused") == "stored"
+
+    with independent_samples():
+        for i in range(3):
+            assert get_or_run_shared_probe(*PROBE, lambda: f"sample {i}") == f"sample {i}"
+        assert asyncio.run(get_or_run_shared_probe_async(*PROBE, _async_answer("async sample"))) == "async sample"
+
+    assert _rows(shared_store) == ["stored"]
+
+
+def test_independent_miss_does_not_store(shared_store):
+    with independent_samples():
+        assert get_or_run_shared_probe(*PROBE, lambda: "fresh") == "fresh"
+    assert _rows(shared_store) == []
+
+
+def test_forced_refresh_replaces_the_shared_answer(shared_store):
+    store_shared_probe(*PROBE, "stale")
+
+    with bypass_response_cache():
+        assert get_or_run_shared_probe(*PROBE, lambda: "fresh") == "fresh"
+    assert _rows(shared_store) == ["fresh"]
+    assert get_or_run_shared_probe(*PROBE, lambda: "unused") == "fresh"
+
+    with bypass_response_cache():
+        assert asyncio.run(get_or_run_shared_probe_async(*PROBE, _async_answer("async fresh"))) == "async fresh"
+        assert get_or_run_shared_probe(*PROBE, lambda: "refused", is_valid=lambda raw: False) == "refused"
+    assert _rows(shared_store) == ["async fresh"]
+
+
+def test_async_callers_joining_an_inflight_probe_count_as_hits(shared_store):
+    def lookups(result):
+        return PROBE_CACHE_LOOKUPS.values().get(("shared_probe", PROBE[0], result), 0)
+
+    hits, misses = lookups("hit"), lookups("miss")
+    calls = []
+
+    async def probe():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def run():
+        return await asyncio.gather(*[get_or_run_shared_probe_async(*PROBE, probe) for _ in range(3)])
+
+    assert asyncio.run(run()) == ["answer"] * 3
+    assert len(calls) == 1
+    assert lookups("miss") - misses == 1
+    assert lookups("hit") - hits == 2
+
+
+def _async_answer(raw):
+    async def probe():
+        return raw
+    return probe
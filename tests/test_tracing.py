@@ -0,0 +1,107 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from services.audit_runner import _save_audit_trace
+from services.database import Audit, Business
+from services.tracing import current_span, current_trace, span, start_trace, waterfall_rows
+
+
+def test_spans_nest_under_the_current_span():
+    with start_trace("audit 1") as trace:
+        with span("stage:probes", kind="stage") as outer:
+            with span("provider:openai", kind="provider", tokens=12, cache=None) as inner:
+                assert current_span() is inner
+            assert current_span() is outer
+
+    outer, inner = trace.spans
+    assert outer.parent_id is None
+    assert inner.parent_id == outer.span_id
+    assert inner.attrs == {"tokens": 12}
+    assert outer.duration_ms >= inner.duration_ms >= 0
+    assert current_trace() is None
+
+
+def test_span_is_a_no_op_outside_a_trace():
+    with span("orphan") as s:
+        s.set(tokens=1)
+        s.incr("retries")
+    assert current_span().set(tokens=1) is None
+
+
+def test_failing_span_is_marked_and_reraises():
+    with start_trace("audit 1") as trace:
+        with pytest.raises(ValueError):
+            with span("stage:snapshot"):
+                raise ValueError("boom")
+
+    (failed,) = trace.spans
+    assert failed.status == "error"
+    assert failed.attrs == {"error": "ValueError"}
+
+
+def test_spans_propagate_through_copied_contexts_in_worker_threads():
+    with start_trace("audit 1") as trace:
+        with span("stage:probes") as parent:
+            def probe(name):
+                with span(name, kind="provider"):
+                    return current_trace() is trace
+
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                futures = [
+                    pool.submit(contextvars.copy_context().run, probe, name)
+                    for name in ("provider:openai", "provider:gemini")
+                ]
+                assert all(f.result() for f in futures)
+
+    children = [s for s in trace.spans if s.span_id != parent.span_id]
+    assert sorted(s.name for s in children) == ["provider:gemini", "provider:openai"]
+    assert all(s.parent_id == parent.span_id for s in children)
+
+
+def test_serialized_trace_round_trips_through_the_audit(session_factory):
+    db = session_factory()
+    business = Business(name="Acme", primary_domain="acme.com")
+    db.add(business)
+    db.flush()
+    audit = Audit(business_id=business.id, status="completed")
+    db.add(audit)
+    db.commit()
+
+    with start_trace(f"audit {audit.id}") as trace:
+        with span("stage:queries", kind="stage"):
+            with span("provider:openai", kind="provider", tokens=40):
+                pass
+        with span("stage:probes", kind="stage"):
+            pass
+    _save_audit_trace(db, audit, trace)
+
+    db.expire_all()
+    stored = db.get(Audit, audit.id).get_trace()
+    assert stored["name"] == f"audit {audit.id}"
+    assert stored["dropped_spans"] == 0
+    assert [s["name"] for s in stored["spans"]] == ["stage:queries", "provider:openai", "stage:probes"]
+    assert stored["spans"][1]["parent"] == stored["spans"][0]["id"]
+    assert stored["spans"][1]["attrs"] == {"tokens": 40}
+
+    rows = waterfall_rows(stored)
+    assert [(r["name"], r["depth"]) for r in rows] == [
+        ("stage:queries", 0), ("provider:openai", 1), ("stage:probes", 0)
+    ]
+    assert all(0 <= r["left_pct"] <= 100 and r["width_pct"] > 0 for r in rows)
+    db.close()
+
+
+def test_waterfall_rows_handles_missing_traces_and_orphaned_parents():
+    assert waterfall_rows(None) == []
+    rows = waterfall_rows({
+        "duration_ms": 100,
+        "spans": [
+            {"id": 2, "parent": 99, "name": "late", "start_ms": 50, "duration_ms": None},
+            {"id": 1, "parent": None, "name": "early", "start_ms": 0, "duration_ms": 40},
+        ],
+    })
+    assert [r["name"] for r in rows] == ["early", "late"]
+    assert rows[1]["depth"] == 0
+    assert rows[1]["width_pct"] == 50.0
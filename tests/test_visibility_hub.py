@@ -0,0 +1,214 @@
+import asyncio
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import services.visibility_hub as hub
+from services import perplexity_client
+from services.cancellation import AuditCancelled, CancellationToken, current_cancel_token
+from services.perplexity_visibility import probe_perplexity_visibility_async
+from services.pipeline import PipelineStage, run_stage_graph
+from services.visibility_models import BrandHit, ProviderVisibility
+
+PROVIDERS = ("openai_sim", "perplexity_web", "gemini_sim")
+
+
+def _enable_all(monkeypatch, probes):
+    monkeypatch.setattr(hub, "PROVIDER_PROBES", probes)
+    monkeypatch.setattr(hub, "PROVIDER_PROBE_CONCURRENCY", {p: 2 for p in PROVIDERS})
+    for flag in ("OPENAI_ENABLED", "PERPLEXITY_ENABLED", "GEMINI_ENABLED"):
+        monkeypatch.setattr(hub, flag, True)
+    monkeypatch.setattr(hub, "_circuit_open", lambda provider: False)
+    monkeypatch.setattr(hub, "log_ai_query", lambda **kwargs: None)
+
+
+def _vis(provider, query):
+    return ProviderVisibility(provider=provider, query=query, recommended_brands=[BrandHit(name="Other Co")])
+
+
+def test_saturated_provider_does_not_starve_the_others(monkeypatch):
+    others_started = {p: threading.Event() for p in PROVIDERS[1:]}
+    openai_waited = []
+
+    def openai_probe(business_name, primary_domain, regions, item, brand_aliases=None, domains=None):
+        openai_waited.append(all(e.wait(timeout=2) for e in others_started.values()))
+        return _vis("openai_sim", item["query"])
+
+    def other_probe(provider):
+        def probe(business_name, primary_domain, regions, item, brand_aliases=None, domains=None):
+            others_started[provider].set()
+            return _vis(provider, item["query"])
+        return probe
+
+    _enable_all(monkeypatch, [
+        ("openai_sim", "chatgpt", "OpenAI", openai_probe, None),
+        ("perplexity_web", "perplexity", "Perplexity", other_probe("perplexity_web"), None),
+        ("gemini_sim", "gemini", "Gemini", other_probe("gemini_sim"), None),
+    ])
+
+    result = hub.run_multi_llm_visibility(
+        "Acme Plumbing", "acme.com", ["Tampa"],
+        [{"query": f"q{i}"} for i in range(10)], sampling=False,
+    )
+
+    assert openai_waited and all(openai_waited)
+    assert sorted(result.providers_used) == sorted(PROVIDERS)
+
+
+def test_provider_concurrency_is_capped(monkeypatch):
+    lock = threading.Lock()
+    running = {"now": 0, "peak": 0}
+    release = threading.Event()
+
+    def probe(business_name, primary_domain, regions, item, brand_aliases=None, domains=None):
+        with lock:
+            running["now"] += 1
+            running["peak"] = max(running["peak"], running["now"])
+            if running["now"] == 2:
+                release.set()
+        release.wait(timeout=2)
+        with lock:
+            running["now"] -= 1
+        return _vis("openai_sim", item["query"])
+
+    _enable_all(monkeypatch, [("openai_sim", "chatgpt", "OpenAI", probe, None)])
+    hub.run_multi_llm_visibility(
+        "Acme Plumbing", "acme.com", ["Tampa"],
+        [{"query": f"q{i}"} for i in range(6)],
+        run_perplexity=False, run_gemini=False, sampling=False,
+    )
+    assert running["peak"] == 2
+
+
+def test_async_runner_fans_out_within_provider_caps(monkeypatch):
+    running = {p: 0 for p in PROVIDERS}
+    peak = {p: 0 for p in PROVIDERS}
+
+    def async_probe(provider):
+        async def probe(business_name, primary_domain, regions, item, brand_aliases=None, domains=None):
+            running[provider] += 1
+            peak[provider] = max(peak[provider], running[provider])
+            await asyncio.sleep(0.01)
+            running[provider] -= 1
+            return _vis(provider, item["query"])
+        return probe
+
+    _enable_all(monkeypatch, [
+        (p, p, p, None, async_probe(p)) for p in PROVIDERS
+    ])
+
+    result = asyncio.run(hub.run_multi_llm_visibility_async(
+        "Acme Plumbing", "acme.com", ["Tampa"], [{"query": f"q{i}"} for i in range(6)],
+    ))
+
+    assert sorted(result.providers_used) == sorted(PROVIDERS)
+    assert all(len(agg.providers) == 3 for agg in result.queries)
+    assert peak == {p: 2 for p in PROVIDERS}
+
+
+def test_async_teaser_awaits_provider_runners(monkeypatch):
+    calls = []
+
+    def runner(provider, found):
+        async def run(business_name, primary_domain, regions, queries_with_intent, brand_aliases=None, domains=None):
+            calls.append((provider, [q["query"] for q in queries_with_intent]))
+            return [
+                _vis(provider, q["query"]).model_copy(update={"target_found": found})
+                for q in queries_with_intent
+            ]
+        return run
+
+    monkeypatch.setattr(hub, "OPENAI_ENABLED", True)
+    monkeypatch.setattr(hub, "GEMINI_ENABLED", True)
+    monkeypatch.setattr(hub, "_circuit_open", lambda provider: False)
+    monkeypatch.setattr(hub, "run_openai_visibility_for_queries_async", runner("openai_sim", True))
+    monkeypatch.setattr(hub, "run_gemini_visibility_for_queries_async", runner("gemini_sim", False))
+
+    result = asyncio.run(hub.run_teaser_visibility_async(
+        "Acme Plumbing", "acme.com", ["Tampa"], [{"query": "q1"}, {"query": "q2"}],
+    ))
+
+    assert sorted(calls) == [
+        ("gemini_sim", ["q1"]), ("gemini_sim", ["q2"]), ("openai_sim", ["q1"]), ("openai_sim", ["q2"]),
+    ]
+    assert result["total_probes"] == 4
+    assert result["hits"] == 2
+    assert sorted(result["providers_used"]) == ["gemini_sim", "openai_sim"]
+
+
+def test_async_perplexity_probe_uses_shared_async_client(monkeypatch):
+    sent = []
+
+    async def fake_chat_completion_async(client, provider, **kwargs):
+        sent.append((client, provider, kwargs["model"]))
+        answer = {"recommended_brands": [{"name": "Acme Plumbing", "url": "https://acme.com"}]}
+        return SimpleNamespace(text=json.dumps(answer))
+
+    client = object()
+    monkeypatch.setattr(perplexity_client, "PERPLEXITY_ENABLED", True)
+    monkeypatch.setattr(perplexity_client, "get_async_perplexity_client", lambda: client)
+    monkeypatch.setattr(perplexity_client, "chat_completion_async", fake_chat_completion_async)
+
+    vis = asyncio.run(probe_perplexity_visibility_async("Acme Plumbing", "acme.com", ["Tampa"], {"query": "q1"}))
+
+    assert sent == [(client, "perplexity", perplexity_client.PERPLEXITY_MODEL)]
+    assert vis.success and vis.target_found
+
+
+def test_no_probes_start_after_cancel(monkeypatch):
+    token = CancellationToken()
+    calls = []
+
+    def probe(business_name, primary_domain, regions, item, brand_aliases=None, domains=None):
+        calls.append(item["query"])
+        assert current_cancel_token() is token
+        token.cancel()
+        return _vis("openai_sim", item["query"])
+
+    _enable_all(monkeypatch, [("openai_sim", "chatgpt", "OpenAI", probe, None)])
+    monkeypatch.setattr(hub, "PROVIDER_PROBE_CONCURRENCY", {"openai_sim": 1})
+
+    with pytest.raises(AuditCancelled):
+        hub.run_multi_llm_visibility(
+            "Acme Plumbing", "acme.com", ["Tampa"], [{"query": f"q{i}"} for i in range(5)],
+            run_perplexity=False, run_gemini=False, sampling=False, cancel_token=token,
+        )
+    time.sleep(0.2)
+    assert calls == ["q0"]
+
+
+def test_sibling_stage_failure_stops_the_probe_fan_out(monkeypatch):
+    calls = []
+
+    def probe(business_name, primary_domain, regions, item, brand_aliases=None, domains=None):
+        calls.append(item["query"])
+        current_cancel_token().wait(2)
+        return _vis("openai_sim", item["query"])
+
+    _enable_all(monkeypatch, [("openai_sim", "chatgpt", "OpenAI", probe, None)])
+    monkeypatch.setattr(hub, "PROVIDER_PROBE_CONCURRENCY", {"openai_sim": 1})
+
+    def probes_stage(outputs):
+        return hub.run_multi_llm_visibility(
+            "Acme Plumbing", "acme.com", ["Tampa"], [{"query": f"q{i}"} for i in range(5)],
+            run_perplexity=False, run_gemini=False, sampling=False,
+            cancel_token=current_cancel_token(),
+        )
+
+    def boom(outputs):
+        time.sleep(0.05)
+        raise RuntimeError("site fetch failed")
+
+    audit_token = CancellationToken(audit_id=7)
+    start = time.perf_counter()
+    with pytest.raises(RuntimeError, match="site fetch failed"):
+        run_stage_graph(
+            [PipelineStage("probes", probes_stage), PipelineStage("site", boom)],
+            max_workers=2, cancel_token=audit_token
+        )
+    assert time.perf_counter() - start < 2
+    assert calls == ["q0"]
+    assert not audit_token.cancelled